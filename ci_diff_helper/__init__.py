@@ -28,6 +28,10 @@ The library supports (planned)
   * `Travis CI`_
   * `AppVeyor`_
   * `CircleCI`_
+  * `GitHub Actions`_
+  * `GitLab CI`_
+  * `Jenkins`_, `Buildkite`_ and `Drone`_ (declared via
+    :mod:`~.registry`)
 
 * Verson Control Systems
 
@@ -40,6 +44,11 @@ The library supports (planned)
 .. _Travis CI: https://travis-ci.com/
 .. _AppVeyor: https://www.appveyor.com/
 .. _CircleCI: https://circleci.com/
+.. _GitHub Actions: https://github.com/features/actions
+.. _GitLab CI: https://docs.gitlab.com/ee/ci/
+.. _Jenkins: https://www.jenkins.io/
+.. _Buildkite: https://buildkite.com/
+.. _Drone: https://www.drone.io/
 .. _git: https://git-scm.com/
 .. _GitHub: https://github.com/
 
@@ -86,8 +95,9 @@ CI system information. These config objects cache the returned values
 for each property and use them to compute other useful values.
 
 Each such configuration type (e.g. :class:`~.appveyor.AppVeyor`,
-:class:`~.circle_ci.CircleCI`, :class:`~.travis.Travis`) has a
-common set of properties.
+:class:`~.circle_ci.CircleCI`, :class:`~.github_actions.GitHubActions`,
+:class:`~.gitlab_ci.GitLabCI`, :class:`~.travis.Travis`) has a common
+set of properties.
 
 .. testsetup:: shared
 
@@ -119,6 +129,43 @@ commit is currently being built:
   >>> config.is_merge
   False
 
+Bounding Resolution Time
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Some values (e.g. the diff base of a Travis "push" build or of a CircleCI
+pull request build) require calls to ``git`` or to the GitHub API. To
+keep the latency of a job bounded, a ``deadline`` (in seconds) can be
+provided. If it expires, the value resolves to :data:`FULL_BUILD` rather
+than blocking or raising, indicating the diff is unknown and everything
+should be run:
+
+.. testsetup:: deadline
+
+  import os
+  import ci_diff_helper
+  from ci_diff_helper import _utils
+  from ci_diff_helper import travis
+
+  os.environ = {
+      'TRAVIS': 'true',
+      'TRAVIS_EVENT_TYPE': 'push',
+      'TRAVIS_REPO_SLUG': 'organization/repository',
+  }
+
+  def mock_push_base(slug, max_fetch_depth):
+      assert slug == 'organization/repository'
+      raise _utils.DeadlineExceeded('Deadline expired')
+
+  travis._push_build_base = mock_push_base
+
+.. doctest:: deadline
+
+  >>> config = ci_diff_helper.get_config(deadline=5.0)
+  >>> config.base is ci_diff_helper.FULL_BUILD
+  True
+  >>> ci_diff_helper.FULL_BUILD
+  <FULL_BUILD: diff unknown, run everything>
+
 ``git`` tools
 ~~~~~~~~~~~~~
 
@@ -140,16 +187,17 @@ branch:
   blob_name1 = 'HEAD'
   blob_name2 = 'upstream/master'
   calls = [
-      ('git', 'diff', '--name-only', blob_name1, blob_name2),
+      ('git', 'diff-tree', '-r', '-z', '--name-only', '--no-renames',
+       blob_name1, blob_name2),
   ]
   files = (
-      '/path/to/your/git_checkout/project/_supporting.py\\n'
-      '/path/to/your/git_checkout/README.md')
+      '/path/to/your/git_checkout/project/_supporting.py\\0'
+      '/path/to/your/git_checkout/README.md\\0')
   results = [
       files,
   ]
 
-  def mock_check(*args):
+  def mock_check(*args, **kwargs):
       assert args == calls.pop(0)
       return results.pop(0)
 
@@ -188,7 +236,7 @@ be useful for things like test collection, file linting, etc.
       files,
   ]
 
-  def mock_check(*args):
+  def mock_check(*args, **kwargs):
       assert args == calls.pop(0)
       return results.pop(0)
 
@@ -205,43 +253,61 @@ be useful for things like test collection, file linting, etc.
    '/path/to/your/git_checkout/project/feature.py']
 """
 
+from ci_diff_helper import registry
+from ci_diff_helper._utils import FULL_BUILD
 from ci_diff_helper.appveyor import AppVeyor
 from ci_diff_helper.circle_ci import CircleCI
 from ci_diff_helper.git_tools import get_changed_files
 from ci_diff_helper.git_tools import get_checked_in_files
 from ci_diff_helper.git_tools import git_root
+from ci_diff_helper.github_actions import GitHubActions
+from ci_diff_helper.gitlab_ci import GitLabCI
+from ci_diff_helper.registry import Buildkite
+from ci_diff_helper.registry import Drone
+from ci_diff_helper.registry import Jenkins
 from ci_diff_helper.travis import Travis
 
 
 __all__ = [
     'AppVeyor',
+    'Buildkite',
     'CircleCI',
+    'Drone',
+    'FULL_BUILD',
     'get_changed_files',
     'get_checked_in_files',
     'get_config',
     'git_root',
+    'GitHubActions',
+    'GitLabCI',
+    'Jenkins',
     'Travis',
 ]
 
 
-def get_config():
+def get_config(deadline=None):
     """Get configuration for the current environment.
 
+    The active CI system is detected via the :mod:`~.registry`, which
+    also includes CI systems provided by plugins.
+
+    Args:
+        deadline (Optional[float]): The number of seconds that may be
+            spent resolving values which require a system call or an
+            HTTP request. See :class:`~._config_base.Config`.
+
     Returns:
-        Union[~appveyor.AppVeyor, ~circle_ci.CircleCI, ~travis.Travis]: A
+        Union[~appveyor.AppVeyor, ~circle_ci.CircleCI, \
+        ~github_actions.GitHubActions, ~gitlab_ci.GitLabCI, \
+        ~travis.Travis, ~registry.DeclaredConfig]: A
         configuration class for the current environment.
 
     Raises:
         OSError: If no (unique) environment is active.
     """
-    choices = [AppVeyor(), CircleCI(), Travis()]
-    current = []
-    for choice in choices:
-        if choice.active:
-            current.append(choice)
-
+    current = registry.detect()
     if len(current) != 1:
         raise OSError(
             None, 'Could not find unique environment. Found:',
             current)
-    return current[0]
+    return current[0](deadline=deadline)
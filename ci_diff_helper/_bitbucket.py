@@ -0,0 +1,110 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helper to make calls to the Bitbucket API.
+
+Responses are cached by URL for the life of the process. Cached
+responses are revalidated with their ``ETag``, so a repeated request
+(e.g. for the same pull request from several helpers in one build)
+only transfers a payload if it has changed.
+"""
+
+import os
+
+import requests
+from six.moves import http_client
+
+from ci_diff_helper import _utils
+from ci_diff_helper import environment_vars as env
+
+
+API_ROOT = 'https://api.bitbucket.org/2.0'
+_BB_PR_TEMPLATE = '{}/repositories/{}/pullrequests/{:d}'
+_CACHE = {}  # URL -> (ETag, parsed JSON payload).
+
+
+def _get_headers():
+    """Get headers for Bitbucket API request.
+
+    Attempts to add a Bitbucket token to headers if available.
+
+    Returns:
+        dict: The headers for a Bitbucket API request.
+    """
+    headers = {}
+    bitbucket_token = os.getenv(env.BB_TOKEN, None)
+    if bitbucket_token is not None:
+        headers['Authorization'] = 'Bearer ' + bitbucket_token
+
+    return headers
+
+
+def _get_json(api_url):
+    """Make a GET request to the Bitbucket API.
+
+    If a previous response for ``api_url`` was cached, the request is
+    made conditional on its ``ETag`` and the cached payload is re-used
+    when the server responds with ``304 Not Modified``.
+
+    If a :func:`~._utils.deadline` is active, the time remaining is
+    used as the request timeout.
+
+    Args:
+        api_url (str): The Bitbucket API URL to request.
+
+    Returns:
+        dict: The parsed JSON payload of the response.
+
+    Raises:
+        requests.exceptions.HTTPError: If the Bitbucket API request fails.
+        ~._utils.DeadlineExceeded: If the active deadline expires
+            before the request completes.
+    """
+    headers = _get_headers()
+    cached = _CACHE.get(api_url)
+    if cached is not None:
+        headers['If-None-Match'] = cached[0]
+
+    response = _utils.http_get(api_url, headers)
+    if response.status_code == http_client.NOT_MODIFIED and cached:
+        return cached[1]
+    if response.status_code != http_client.OK:
+        response.raise_for_status()
+        raise requests.exceptions.HTTPError(
+            'Unexpected status code', response.status_code,
+            response=response)
+
+    payload = response.json()
+    etag = response.headers.get('ETag')
+    if etag is not None:
+        _CACHE[api_url] = (etag, payload)
+    return payload
+
+
+def pr_info(slug, pr_id):
+    """Makes Bitbucket API request to info about a pull request.
+
+    Args:
+        slug (str): The Bitbucket repo slug for the current build.
+            Of the form ``{user}/{repository}``.
+        pr_id (int): The pull request ID.
+
+    Returns:
+        dict: The pull request information.
+
+    Raises:
+        requests.exceptions.HTTPError: If the Bitbucket API request fails.
+        ~._utils.DeadlineExceeded: If the active deadline expires
+            before the request completes.
+    """
+    api_url = _BB_PR_TEMPLATE.format(API_ROOT, slug, pr_id)
+    return _get_json(api_url)
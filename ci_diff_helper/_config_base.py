@@ -13,8 +13,10 @@
 """Base for configuration classes and associated helpers."""
 
 import os
+import time
 
 from ci_diff_helper import _utils
+from ci_diff_helper import environment_vars as env
 from ci_diff_helper import git_tools
 
 
@@ -58,19 +60,116 @@ def _ci_branch(env_var):
         raise OSError(exc, msg)
 
 
+def _ci_shard(index_env_var, total_env_var, index_offset):
+    """Get the shard of a parallel CI build that is running.
+
+    Falls back to :data:`~.environment_vars.SHARD_INDEX` and
+    :data:`~.environment_vars.SHARD_TOTAL` if the CI system's
+    environment variables are not set.
+
+    Args:
+        index_env_var (Optional[str]): The environment variable which
+            holds the index of the current node.
+        total_env_var (Optional[str]): The environment variable which
+            holds the number of nodes.
+        index_offset (int): The index of the first node (e.g. ``1`` if
+            the index is one-based).
+
+    Returns:
+        Tuple[int, int]: The (zero-based) index of the current shard and
+        the number of shards. If no environment variables are set, the
+        build is a single shard, i.e. ``(0, 1)``.
+
+    Raises:
+        ValueError: If the values are not integers or the index is out
+            of range.
+    """
+    candidates = (
+        (index_env_var, total_env_var, index_offset),
+        (env.SHARD_INDEX, env.SHARD_TOTAL, 0),
+    )
+    for index_var, total_var, offset in candidates:
+        if index_var is None:
+            continue
+        index = os.getenv(index_var, '')
+        total = os.getenv(total_var, '')
+        if index == '' or total == '':
+            continue
+        try:
+            shard = (int(index) - offset, int(total))
+        except ValueError:
+            shard = None
+        if shard is None or not 0 <= shard[0] < shard[1]:
+            raise ValueError('Invalid shard', index_var, index,
+                             total_var, total)
+        return shard
+
+    return 0, 1
+
+
 class Config(object):
-    """Base class for caching CI configuration objects."""
+    """Base class for caching CI configuration objects.
+
+    Args:
+        deadline (Optional[float]): The number of seconds (from the
+            creation of this object) that may be spent resolving values
+            which require a system call or an HTTP request (e.g. the
+            diff base). Once the deadline expires, such values resolve to
+            :data:`~ci_diff_helper.FULL_BUILD` rather than blocking. If
+            not provided, resolution is unbounded.
+    """
 
     # Default instance attributes.
     _active = _utils.UNSET
     _branch = _utils.UNSET
     _is_merge = _utils.UNSET
+    _shard = _utils.UNSET
     _tag = _utils.UNSET
     # Class attributes.
     _active_env_var = None
     _branch_env_var = None
+    _shard_index_env_var = None
+    _shard_index_offset = 0
+    _shard_total_env_var = None
     _tag_env_var = None
 
+    def __init__(self, deadline=None):
+        if deadline is None:
+            self._expires = None
+        else:
+            self._expires = time.time() + deadline
+
+    def _bounded(self, func, *args):
+        """Call a function subject to the deadline of this config.
+
+        Args:
+            func (Callable): The function to call.
+            args (tuple): Positional arguments to pass to ``func``.
+
+        Returns:
+            object: The return value of ``func`` or
+            :data:`~ci_diff_helper.FULL_BUILD` if the deadline
+            expired before ``func`` completed.
+        """
+        if self._expires is None:
+            return func(*args)
+
+        try:
+            with _utils.deadline(self._expires):
+                return func(*args)
+        except _utils.DeadlineExceeded:
+            return _utils.FULL_BUILD
+
+    @classmethod
+    def get_active_env_var(cls):
+        """Get the environment variable that indicates the CI system.
+
+        Returns:
+            Optional[str]: The name of the environment variable that is
+            set when running in the target CI system.
+        """
+        return cls._active_env_var
+
     @property
     def active(self):
         """bool: Indicates if currently running in the target CI system."""
@@ -96,6 +195,23 @@ class Config(object):
             self._is_merge = git_tools.merge_commit()
         return self._is_merge
 
+    @property
+    def shard(self):
+        """Tuple[int, int]: The shard of a parallel build that is running.
+
+        A pair of the (zero-based) index of the current node and the
+        number of nodes, e.g. from ``CIRCLE_NODE_INDEX`` and
+        ``CIRCLE_NODE_TOTAL``. If the CI system doesn't split the build,
+        :data:`~.environment_vars.SHARD_INDEX` and
+        :data:`~.environment_vars.SHARD_TOTAL` are used, e.g. from a
+        build matrix. If neither is set, this is ``(0, 1)``.
+        """
+        if self._shard is _utils.UNSET:
+            self._shard = _ci_shard(
+                self._shard_index_env_var, self._shard_total_env_var,
+                self._shard_index_offset)
+        return self._shard
+
     @property
     def tag(self):
         """str: The ``git`` tag of the current CI build."""
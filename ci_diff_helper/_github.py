@@ -15,10 +15,10 @@
 import os
 import sys
 
-import requests
 import six
 from six.moves import http_client
 
+from ci_diff_helper import _utils
 from ci_diff_helper import environment_vars as env
 
 
@@ -93,11 +93,12 @@ def commit_compare(slug, start, finish):
 
     Raises:
         requests.exceptions.HTTPError: If the GitHub API request fails.
+        ~._utils.DeadlineExceeded: If the active deadline expires
+            before the request completes.
     """
     api_url = _GH_COMPARE_TEMPLATE.format(slug, start, finish)
 
-    headers = _get_headers()
-    response = requests.get(api_url, headers=headers)
+    response = _utils.http_get(api_url, _get_headers())
     _maybe_fail(response)
 
     return response.json()
@@ -116,11 +117,12 @@ def pr_info(slug, pr_id):
 
     Raises:
         requests.exceptions.HTTPError: If the GitHub API request fails.
+        ~._utils.DeadlineExceeded: If the active deadline expires
+            before the request completes.
     """
     api_url = _GH_PR_TEMPLATE.format(slug, pr_id)
 
-    headers = _get_headers()
-    response = requests.get(api_url, headers=headers)
+    response = _utils.http_get(api_url, _get_headers())
     _maybe_fail(response)
 
     return response.json()
@@ -12,12 +12,172 @@
 
 """Shared utilities for ci-diff-helper."""
 
+import contextlib
+import os
 import re
 import subprocess
+import threading
+import time
+
+import requests
+from requests import adapters
 
 
 _PR_ID_REGEX = re.compile(r'#(\d+)')
 UNSET = object()  # Sentinel for unset config values.
+_MAX_RETRIES = 3
+_SESSION = {'value': None}  # Lazily created HTTP session.
+
+
+class _DeadlineState(threading.local):
+    """The active deadline, separate for each thread."""
+
+    expires = None
+
+
+_DEADLINE = _DeadlineState()
+
+
+class _FullBuild(object):
+    """Sentinel type indicating that a diff base could not be determined."""
+
+    def __repr__(self):
+        return '<FULL_BUILD: diff unknown, run everything>'
+
+
+FULL_BUILD = _FullBuild()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the time budget of an active deadline has run out."""
+
+
+@contextlib.contextmanager
+def deadline(expires):
+    """Context manager that bounds all system and HTTP calls.
+
+    While active, :func:`check_output` and the HTTP helpers use
+    :func:`remaining_time` as their timeout. Deadlines can be nested;
+    the outer deadline is restored on exit. Each thread has its own
+    active deadline.
+
+    Args:
+        expires (Optional[float]): The time (as returned by
+            :func:`time.time`) when the deadline expires. If
+            :data:`None`, calls are unbounded.
+
+    Yields:
+        None: Control is returned to the caller with the deadline active.
+    """
+    previous = _DEADLINE.expires
+    _DEADLINE.expires = expires
+    try:
+        yield
+    finally:
+        _DEADLINE.expires = previous
+
+
+def remaining_time():
+    """Get the number of seconds left in the active deadline.
+
+    Returns:
+        Optional[float]: The seconds remaining, or :data:`None` if there
+            is no active deadline.
+
+    Raises:
+        DeadlineExceeded: If the active deadline has already expired.
+    """
+    expires = _DEADLINE.expires
+    if expires is None:
+        return None
+
+    remaining = expires - time.time()
+    if remaining <= 0:
+        raise DeadlineExceeded('Deadline expired', expires)
+    return remaining
+
+
+def get_session():
+    """Get the (lazily created) session used for all HTTP API requests.
+
+    The session pools connections and retries failed connections.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    session = _SESSION['value']
+    if session is None:
+        session = requests.Session()
+        adapter = adapters.HTTPAdapter(max_retries=_MAX_RETRIES)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _SESSION['value'] = session
+    return session
+
+
+def http_get(url, headers):
+    """Make a GET request with the shared session.
+
+    If a :func:`deadline` is active, the time remaining is used as the
+    request timeout.
+
+    Args:
+        url (str): The URL to request.
+        headers (dict): The headers for the request.
+
+    Returns:
+        requests.models.Response: The response.
+
+    Raises:
+        DeadlineExceeded: If the active deadline expires before the
+            request completes.
+    """
+    kwargs = {'headers': headers}
+    timeout = remaining_time()
+    if timeout is not None:
+        kwargs['timeout'] = timeout
+
+    try:
+        return get_session().get(url, **kwargs)
+    except requests.exceptions.Timeout as exc:
+        raise DeadlineExceeded('HTTP request exceeded deadline', url, exc)
+
+
+class _Watchdog(object):
+    """Context manager that kills a process if it outlives a timeout.
+
+    Args:
+        proc (subprocess.Popen): The running process.
+        timeout (Optional[float]): The number of seconds before the
+            process is killed. If :data:`None`, the process is never
+            killed.
+    """
+
+    def __init__(self, proc, timeout):
+        self.proc = proc
+        self.expired = False
+        self._timer = None
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self._expire)
+            self._timer.daemon = True
+
+    def _expire(self):
+        """Kill the process once the timeout has run out."""
+        self.expired = True
+        try:
+            self.proc.kill()
+        except OSError:
+            # NOTE: The process may finish just before it is killed.
+            pass
+
+    def __enter__(self):
+        if self._timer is not None:
+            self._timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._timer is not None:
+            self._timer.cancel()
 
 
 def check_output(*args, **kwargs):
@@ -30,10 +190,20 @@ def check_output(*args, **kwargs):
       >>> print(check_output('false', ignore_err=True))
       None
 
+    If a :func:`deadline` is active, the command is killed once the
+    deadline expires.
+
+    Extra environment variables for the command can be passed
+    via ``env`` (they are added to the current environment). With
+    ``capture_err``, STDERR is captured rather than passed through and,
+    if the command fails, attached to the
+    :class:`~subprocess.CalledProcessError` as ``stderr``.
+
     Args:
-        args (tuple): Arguments to pass to ``subprocess.check_output``.
+        args (tuple): Arguments to pass to :class:`subprocess.Popen`.
         kwargs (dict): Keyword arguments for this helper. Currently the
-            only accepted keyword argument is ``ignore_err`.
+            only accepted keyword arguments are ``ignore_err``, ``env``
+            and ``capture_err``.
 
     Returns:
         str: The raw STDOUT from the command (converted from bytes
@@ -43,27 +213,104 @@ def check_output(*args, **kwargs):
         TypeError: If any unrecognized keyword arguments are used.
         CalledProcessError: If ``ignore_err`` is not :data:`True` and
             the system call fails.
+        DeadlineExceeded: If the active deadline expires before the
+            command completes (even if ``ignore_err`` is set).
     """
     ignore_err = kwargs.pop('ignore_err', False)
+    extra_env = kwargs.pop('env', None)
+    capture_err = kwargs.pop('capture_err', False)
     if kwargs:
         raise TypeError('Got unexpected keyword argument(s)',
                         list(kwargs.keys()))
 
-    try:
-        kwargs = {}
-        if ignore_err:
-            kwargs['stderr'] = subprocess.PIPE  # Swallow stderr.
-        cmd_output = subprocess.check_output(args, **kwargs)
-        # On Python 3, this returns bytes (from STDOUT), so we
-        # convert to a string.
-        cmd_output_str = cmd_output.decode('utf-8')
-        # Also strip the output since it usually has a trailing newline.
-        return cmd_output_str.strip()
-    except subprocess.CalledProcessError:
+    popen_kwargs = {'stdout': subprocess.PIPE}
+    if ignore_err or capture_err:
+        popen_kwargs['stderr'] = subprocess.PIPE  # Swallow stderr.
+    if extra_env is not None:
+        cmd_env = dict(os.environ)
+        cmd_env.update(extra_env)
+        popen_kwargs['env'] = cmd_env
+    # NOTE: The ``timeout`` argument of ``subprocess.check_output``
+    #       requires Python 3, so a watchdog kills the command instead.
+    timeout = remaining_time()
+    proc = subprocess.Popen(args, **popen_kwargs)
+    with _Watchdog(proc, timeout) as watchdog:
+        cmd_output, cmd_err = proc.communicate()
+    if watchdog.expired:
+        raise DeadlineExceeded('Command exceeded deadline', args, timeout)
+    if proc.returncode:
         if ignore_err:
             return
-        else:
+        error = subprocess.CalledProcessError(
+            proc.returncode, args, output=cmd_output)
+        if capture_err:
+            # NOTE: On Python 2, the constructor has no ``stderr``.
+            error.stderr = cmd_err.decode('utf-8')
+        raise error
+
+    # On Python 3, this returns bytes (from STDOUT), so we
+    # convert to a string.
+    cmd_output_str = cmd_output.decode('utf-8')
+    # Also strip the output since it usually has a trailing newline.
+    return cmd_output_str.strip()
+
+
+def iter_output(*args, **kwargs):
+    """Run a command on the operating system and stream its output.
+
+    Unlike :func:`check_output`, the output is never held in memory
+    all at once, so this is suited to commands with very large output.
+
+    If a :func:`deadline` is active, the command is killed once the
+    deadline expires (even if it is blocked without writing any output).
+
+    Args:
+        args (tuple): Arguments to pass to :class:`subprocess.Popen`.
+        kwargs (dict): Keyword arguments for this helper. Currently the
+            only accepted keyword argument is ``env`` (extra environment
+            variables for the command, as in :func:`check_output`).
+
+    Yields:
+        str: Each line of STDOUT (converted from bytes and without the
+        trailing newline).
+
+    Raises:
+        TypeError: If any unrecognized keyword arguments are used.
+        CalledProcessError: If the command fails (raised once all of
+            its output has been consumed).
+        DeadlineExceeded: If the active deadline expires before the
+            command completes.
+    """
+    extra_env = kwargs.pop('env', None)
+    if kwargs:
+        raise TypeError('Got unexpected keyword argument(s)',
+                        list(kwargs.keys()))
+
+    popen_kwargs = {'stdout': subprocess.PIPE}
+    if extra_env is not None:
+        cmd_env = dict(os.environ)
+        cmd_env.update(extra_env)
+        popen_kwargs['env'] = cmd_env
+    timeout = remaining_time()
+    proc = subprocess.Popen(args, **popen_kwargs)
+    with _Watchdog(proc, timeout) as watchdog:
+        try:
+            for line in iter(proc.stdout.readline, b''):
+                remaining_time()
+                yield line.decode('utf-8').rstrip('\n')
+        except BaseException:
+            # NOTE: This includes ``GeneratorExit``, i.e. the caller
+            #       stopped reading early.
+            proc.kill()
             raise
+        finally:
+            proc.stdout.close()
+            return_code = proc.wait()
+
+    if watchdog.expired:
+        raise DeadlineExceeded('Command exceeded deadline', args, timeout)
+    if return_code:
+        raise subprocess.CalledProcessError(return_code, args)
 
 
 def pr_from_commit(merge_subject):
@@ -62,6 +62,43 @@ To use the :class:`AppVeyor` configuration type directly:
   'master'
   >>> config.provider
   <AppVeyorRepoProvider.github: 'github'>
+
+During a pull request build, we can determine information about
+the current PR being built. The diffbase is the merge base of the
+pull request head commit and the branch the PR is merging into,
+resolved from the local ``git`` history:
+
+.. testsetup:: appveyor-pr-base
+
+  import os
+  os.environ = {
+      'APPVEYOR': 'True',
+      'APPVEYOR_REPO_BRANCH': 'master',
+      'APPVEYOR_PULL_REQUEST_NUMBER': '1014',
+      'APPVEYOR_PULL_REQUEST_HEAD_COMMIT': (
+          'c3a3e4d9b5e0a9ff4ee1b7d3f2c7e3e53f6f2e01'),
+  }
+  import ci_diff_helper
+  from ci_diff_helper import _utils
+
+  def mock_check(*args, **kwargs):
+      assert args == (
+          'git', 'merge-base', 'origin/master',
+          'c3a3e4d9b5e0a9ff4ee1b7d3f2c7e3e53f6f2e01')
+      assert kwargs == {'ignore_err': True}
+      return '4ad7349dc7223ebc02175a16dc577a013044a538'
+
+  _utils.check_output = mock_check
+
+.. doctest:: appveyor-pr-base
+
+  >>> config = ci_diff_helper.AppVeyor()
+  >>> config.in_pr
+  True
+  >>> config.pr
+  1014
+  >>> config.base
+  '4ad7349dc7223ebc02175a16dc577a013044a538'
 """
 
 import os
@@ -71,6 +108,7 @@ import enum
 from ci_diff_helper import _config_base
 from ci_diff_helper import _utils
 from ci_diff_helper import environment_vars as env
+from ci_diff_helper import git_tools
 
 
 def _appveyor_provider():
@@ -94,6 +132,41 @@ def _appveyor_provider():
                          [enum_val.name for enum_val in AppVeyorRepoProvider])
 
 
+def _appveyor_pr():
+    """Get the current AppVeyor pull request (if any).
+
+    Returns:
+        Optional[int]: The current pull request ID.
+    """
+    try:
+        return int(os.getenv(env.APPVEYOR_PR_NUM, ''))
+    except ValueError:
+        return None
+
+
+def _pr_base(branch):
+    """Get the diffbase for an AppVeyor pull request build.
+
+    Computes the merge base of the pull request head commit and the
+    branch the pull request is merging into. Both the remote-tracking
+    branch (``origin/{branch}``) and the local branch are tried.
+
+    Args:
+        branch (str): The branch the pull request is merging into.
+
+    Returns:
+        str: The commit SHA of the merge base. If it can't be determined
+            from the local ``git`` history, returns ``branch``.
+    """
+    head = os.getenv(env.APPVEYOR_PR_HEAD, '') or 'HEAD'
+    for candidate in ('origin/' + branch, branch):
+        merge_base = git_tools.merge_base(candidate, head)
+        if merge_base is not None:
+            return merge_base
+
+    return branch
+
+
 # pylint: disable=too-few-public-methods
 class AppVeyorRepoProvider(enum.Enum):
     """Enum representing all possible AppVeyor repo providers."""
@@ -109,6 +182,8 @@ class AppVeyor(_config_base.Config):
     """Represent AppVeyor state and cache return values."""
 
     # Default instance attributes.
+    _base = _utils.UNSET
+    _pr = _utils.UNSET
     _provider = _utils.UNSET
     # Class attributes.
     _active_env_var = env.IN_APPVEYOR
@@ -134,3 +209,46 @@ class AppVeyor(_config_base.Config):
             a build started by a tag before checking for the tag.
         """
         return super(AppVeyor, self).tag
+
+    @property
+    def pr(self):
+        """int: The current AppVeyor pull request (if any).
+
+        If there is no active pull request, returns :data:`None`.
+        """
+        if self._pr is _utils.UNSET:
+            self._pr = _appveyor_pr()
+        return self._pr
+
+    @property
+    def in_pr(self):
+        """bool: Indicates if currently running in AppVeyor pull request.
+
+        This uses the ``APPVEYOR_PULL_REQUEST_NUMBER`` environment variable
+        to check if currently in a pull request.
+        """
+        return self.pr is not None
+
+    @property
+    def base(self):
+        """str: The ``git`` object that current build is changed against.
+
+        This is the merge base of the pull request head commit and the
+        branch the pull request is merging into. If that can't be
+        determined from the local ``git`` history, the name of the
+        branch is used instead.
+
+        If the config was created with a ``deadline`` that expires
+        while resolving, this will be :data:`~ci_diff_helper.FULL_BUILD`.
+
+        .. warning::
+
+            This property is only meant to be used in a "pull request"
+            build.
+        """
+        if self._base is _utils.UNSET:
+            if not self.in_pr:
+                raise NotImplementedError(
+                    'Diff base currently only supported in a PR build')
+            self._base = self._bounded(_pr_base, self.branch)
+        return self._base
@@ -0,0 +1,294 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Structured view of the changes between two ``git`` revisions.
+
+A :class:`ChangeSet` is built from a single ``git diff-tree`` call
+and records the status, path(s) and line counts of each changed file,
+so callers don't need to run ``git`` again to find out how a file
+changed.
+"""
+
+from ci_diff_helper import git_tools
+
+
+ADDED = 'A'
+"""Status of a file added in a :class:`ChangeSet`."""
+COPIED = 'C'
+"""Status of a file copied in a :class:`ChangeSet`."""
+DELETED = 'D'
+"""Status of a file deleted in a :class:`ChangeSet`."""
+MODIFIED = 'M'
+"""Status of a file modified in a :class:`ChangeSet`."""
+RENAMED = 'R'
+"""Status of a file renamed in a :class:`ChangeSet`."""
+TYPE_CHANGED = 'T'
+"""Status of a file whose type (e.g. file or symlink) changed."""
+_MODIFIED_STATUSES = (MODIFIED, TYPE_CHANGED)
+
+
+class FileChange(object):
+    """A single changed file in a :class:`ChangeSet`.
+
+    Args:
+        status (str): The one letter status of the change, e.g.
+            :data:`ADDED` or :data:`RENAMED`.
+        old_path (Optional[str]): The path before the change. Will be
+            :data:`None` for an added file.
+        new_path (Optional[str]): The path after the change. Will be
+            :data:`None` for a deleted file.
+        similarity (Optional[int]): The similarity percentage between the
+            old and new file, for renames and copies.
+        added (Optional[int]): The number of lines added. Will be
+            :data:`None` for binary files or if line counts weren't
+            computed.
+        removed (Optional[int]): The number of lines removed. Will be
+            :data:`None` for binary files or if line counts weren't
+            computed.
+    """
+
+    __slots__ = ('status', 'old_path', 'new_path', 'similarity',
+                 'added', 'removed')
+
+    def __init__(self, status, old_path, new_path, similarity=None,
+                 added=None, removed=None):
+        self.status = status
+        self.old_path = old_path
+        self.new_path = new_path
+        self.similarity = similarity
+        self.added = added
+        self.removed = removed
+
+    @property
+    def path(self):
+        """str: The current path of the file.
+
+        For a deleted file, this is the path before the change.
+        """
+        if self.new_path is None:
+            return self.old_path
+        return self.new_path
+
+    def __eq__(self, other):
+        if not isinstance(other, FileChange):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.__slots__)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self.status in (RENAMED, COPIED):
+            location = '{} -> {}'.format(self.old_path, self.new_path)
+        else:
+            location = self.path
+        return '<FileChange {}: {}>'.format(self.status, location)
+
+
+def _parse_raw(fields):
+    """Parse ``--raw -z`` records from the front of ``git`` output.
+
+    Args:
+        fields (list): The NUL-separated fields of ``git diff-tree``
+            output.
+
+    Returns:
+        Tuple[list, int]: Pair of the parsed :class:`FileChange` objects
+        and the index of the first field not consumed.
+    """
+    changes = []
+    index = 0
+    while index < len(fields) and fields[index].startswith(':'):
+        status = fields[index].split()[-1]
+        letter = status[0]
+        if letter in (RENAMED, COPIED):
+            change = FileChange(letter, fields[index + 1], fields[index + 2],
+                                similarity=int(status[1:]))
+            index += 3
+        elif letter == ADDED:
+            change = FileChange(letter, None, fields[index + 1])
+            index += 2
+        elif letter == DELETED:
+            change = FileChange(letter, fields[index + 1], None)
+            index += 2
+        else:
+            change = FileChange(letter, fields[index + 1], fields[index + 1])
+            index += 2
+        changes.append(change)
+
+    return changes, index
+
+
+def _parse_count(value):
+    """Parse a ``--numstat`` line count.
+
+    Args:
+        value (str): The count, or ``-`` for a binary file.
+
+    Returns:
+        Optional[int]: The count, or :data:`None` for a binary file.
+    """
+    if value == '-':
+        return None
+    return int(value)
+
+
+def _add_numstat(changes, fields, index):
+    """Add ``--numstat -z`` line counts to already parsed changes.
+
+    ``git`` emits the ``--numstat`` records in the same order as the
+    ``--raw`` records, one per change.
+
+    Args:
+        changes (list): The :class:`FileChange` objects to update.
+        fields (list): The NUL-separated fields of ``git diff-tree``
+            output.
+        index (int): The index of the first ``--numstat`` field.
+    """
+    for change in changes:
+        added, removed, path = fields[index].split('\t', 2)
+        change.added = _parse_count(added)
+        change.removed = _parse_count(removed)
+        # Renames and copies have an empty path, followed by two fields
+        # with the old and new path.
+        index += 1 if path else 3
+
+
+class ChangeSet(object):
+    """The set of files changed between two ``git`` revisions.
+
+    Supports ``len()``, iteration (in ``git`` order) and ``path in
+    change_set`` membership checks against both old and new paths.
+
+    Args:
+        changes (Iterable[FileChange]): The changed files.
+    """
+
+    def __init__(self, changes):
+        self._changes = tuple(changes)
+        self._by_path = {}
+        for change in self._changes:
+            if change.old_path is not None:
+                self._by_path.setdefault(change.old_path, change)
+            if change.new_path is not None:
+                self._by_path[change.new_path] = change
+        self._views = {}
+
+    @classmethod
+    def from_git(cls, blob_name1, blob_name2, renames=True, stats=True):
+        """Build a change set from a single ``git diff-tree`` call.
+
+        Effectively runs:
+
+        .. code-block:: bash
+
+          $ git diff-tree -r -z --raw --numstat --find-renames \\
+          >   ${BLOB1} ${BLOB2}
+
+        If neither ``renames`` nor ``stats`` is set, only trees are
+        compared (see :func:`.git_tools.get_raw_diff`), so no file
+        contents are fetched in a partial clone.
+
+        Args:
+            blob_name1 (str): A ``git`` object reference.
+            blob_name2 (str): A ``git`` object reference.
+            renames (Optional[bool]): Flag indicating if renames should
+                be detected. Defaults to :data:`True`.
+            stats (Optional[bool]): Flag indicating if line counts
+                should be computed. Defaults to :data:`True`.
+
+        Returns:
+            ChangeSet: The changes between the two revisions.
+        """
+        fields = git_tools.get_raw_diff(
+            blob_name1, blob_name2, renames=renames, stats=stats)
+        changes, index = _parse_raw(fields)
+        if stats:
+            _add_numstat(changes, fields, index)
+        return cls(changes)
+
+    def __len__(self):
+        return len(self._changes)
+
+    def __iter__(self):
+        return iter(self._changes)
+
+    def __contains__(self, path):
+        return path in self._by_path
+
+    def get(self, path, default=None):
+        """Get the change for a path.
+
+        Args:
+            path (str): A path before or after the change.
+            default (Optional[object]): The value to return if the path
+                was not changed.
+
+        Returns:
+            FileChange: The change for the path (or ``default``).
+        """
+        return self._by_path.get(path, default)
+
+    def _filter(self, statuses):
+        """Get (and cache) the changes with the given statuses.
+
+        Args:
+            statuses (tuple): The statuses to include.
+
+        Returns:
+            tuple: The :class:`FileChange` objects with a matching status.
+        """
+        view = self._views.get(statuses)
+        if view is None:
+            view = tuple(change for change in self._changes
+                         if change.status in statuses)
+            self._views[statuses] = view
+        return view
+
+    @property
+    def paths(self):
+        """tuple: The current path of each changed file."""
+        return tuple(change.path for change in self._changes)
+
+    @property
+    def added(self):
+        """tuple: The :class:`FileChange` objects for added files."""
+        return self._filter((ADDED,))
+
+    @property
+    def modified(self):
+        """tuple: The :class:`FileChange` objects for modified files.
+
+        Includes type changes (e.g. a file replaced by a symlink).
+        """
+        return self._filter(_MODIFIED_STATUSES)
+
+    @property
+    def deleted(self):
+        """tuple: The :class:`FileChange` objects for deleted files."""
+        return self._filter((DELETED,))
+
+    @property
+    def renamed(self):
+        """tuple: The :class:`FileChange` objects for renamed files."""
+        return self._filter((RENAMED,))
+
+    @property
+    def copied(self):
+        """tuple: The :class:`FileChange` objects for copied files."""
+        return self._filter((COPIED,))
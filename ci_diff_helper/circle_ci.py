@@ -72,7 +72,10 @@ To use the :class:`CircleCI` configuration type directly:
   'organization/repository'
 
 During a pull request build, we can determine information about
-the current PR being built:
+the current PR being built. CircleCI doesn't expose the branch a pull
+request targets, so by default the diffbase is resolved from the local
+``git`` history as the merge base of ``HEAD`` and the default branch
+of the ``origin`` remote (so no network calls are made):
 
 .. testsetup:: circle-ci-pr
 
@@ -85,19 +88,23 @@ the current PR being built:
           'https://github.com/organization/repository'),
   }
   import ci_diff_helper
-  from ci_diff_helper import _github
+  from ci_diff_helper import _utils
 
-  def mock_pr_info(slug, pr_id):
-      assert slug == 'organization/repository'
-      assert pr_id == 23
-      payload = {
-          'base': {
-              'sha': '7450ebe1a2133442098faa07f3c2c08b612d75f5',
-          },
-      }
-      return payload
+  calls = [
+      ('git', 'symbolic-ref', '--short', 'refs/remotes/origin/HEAD'),
+      ('git', 'merge-base', 'origin/master', 'HEAD'),
+  ]
+  results = [
+      'origin/master',
+      '7450ebe1a2133442098faa07f3c2c08b612d75f5',
+  ]
 
-  _github.pr_info = mock_pr_info
+  def mock_check(*args, **kwargs):
+      assert args == calls.pop(0)
+      assert kwargs == {'ignore_err': True}
+      return results.pop(0)
+
+  _utils.check_output = mock_check
 
 .. doctest:: circle-ci-pr
 
@@ -112,16 +119,98 @@ the current PR being built:
   'pull/23'
   >>> config.base
   '7450ebe1a2133442098faa07f3c2c08b612d75f5'
+
+In a "push" build, the diffbase is resolved from the commit range
+in ``CIRCLE_COMPARE_URL``:
+
+.. testsetup:: circle-ci-push-base
+
+  import os
+  os.environ = {
+      'CIRCLECI': 'true',
+      'CIRCLE_BRANCH': 'master',
+      'CIRCLE_COMPARE_URL': (
+          'https://github.com/organization/repository/compare/'
+          '4ad7349dc722...c3a3e4d9b5e0'),
+  }
+  import ci_diff_helper
+  from ci_diff_helper import _utils
+
+  def mock_check(*args, **kwargs):
+      assert args == (
+          'git', 'merge-base', '4ad7349dc722', 'c3a3e4d9b5e0')
+      assert kwargs == {'ignore_err': True}
+      return '4ad7349dc7223ebc02175a16dc577a013044a538'
+
+  _utils.check_output = mock_check
+
+.. doctest:: circle-ci-push-base
+
+  >>> config = ci_diff_helper.CircleCI()
+  >>> config.in_pr
+  False
+  >>> config.base
+  '4ad7349dc7223ebc02175a16dc577a013044a538'
+
+If the local history is not sufficient (e.g. in a shallow clone
+or if the remote ``HEAD`` was not fetched), the diffbase can't be
+determined and :data:`~ci_diff_helper.FULL_BUILD` is returned. To
+instead use the GitHub (or Bitbucket) API, use ``api_fallback``. In a
+pull request build, this also resolves the branch the pull request
+targets (which need not be the default branch) and uses its merge base
+with ``HEAD``, falling back to the base commit reported by the API if
+that branch was not fetched:
+
+.. testsetup:: circle-ci-api-fallback
+
+  import os
+  os.environ = {
+      'CIRCLECI': 'true',
+      'CIRCLE_PR_NUMBER': '23',
+      'CIRCLE_BRANCH': 'pull/23',
+      'CIRCLE_REPOSITORY_URL': (
+          'https://github.com/organization/repository'),
+  }
+  import ci_diff_helper
+  from ci_diff_helper import _github
+  from ci_diff_helper import _utils
+
+  def mock_check(*args, **kwargs):
+      assert args == ('git', 'merge-base', 'origin/develop', 'HEAD')
+      assert kwargs == {'ignore_err': True}
+      return '4ad7349dc7223ebc02175a16dc577a013044a538'
+
+  def mock_pr_info(slug, pr_id):
+      assert slug == 'organization/repository'
+      assert pr_id == 23
+      payload = {
+          'base': {
+              'ref': 'develop',
+              'sha': '7450ebe1a2133442098faa07f3c2c08b612d75f5',
+          },
+      }
+      return payload
+
+  _utils.check_output = mock_check
+  _github.pr_info = mock_pr_info
+
+.. doctest:: circle-ci-api-fallback
+
+  >>> config = ci_diff_helper.CircleCI(api_fallback=True)
+  >>> config.base
+  '4ad7349dc7223ebc02175a16dc577a013044a538'
 """
 
 import os
 
 import enum
 
+from ci_diff_helper import _bitbucket
 from ci_diff_helper import _config_base
 from ci_diff_helper import _github
 from ci_diff_helper import _utils
 from ci_diff_helper import environment_vars as env
+from ci_diff_helper import git_tools
 
 
 _REPO_URL_TEMPLATE = (
@@ -130,6 +219,8 @@ _GITHUB_HOST = 'github.com'
 _GITHUB_PREFIX = 'https://{}/'.format(_GITHUB_HOST)
 _BITBUCKET_HOST = 'bitbucket.org'
 _BITBUCKET_PREFIX = 'https://{}/'.format(_BITBUCKET_HOST)
+_COMPARE_DELIMITER = '/compare/'
+_RANGE_DELIMITER = '...'
 
 
 def _circle_ci_pr():
@@ -203,6 +294,74 @@ def _provider_slug(repo_url):
                          [enum_val.name for enum_val in CircleCIRepoProvider])
 
 
+def _compare_range():
+    """Get the commit range for a CircleCI "push" build.
+
+    Uses the ``CIRCLE_COMPARE_URL`` environment variable, which is of
+    the form ``{repo_url}/compare/{start}...{finish}``.
+
+    Returns:
+        Optional[Tuple[str, str]]: The ``start``, ``finish`` pair from
+            the commit range. If the compare URL is unset or does not
+            contain a commit range (e.g. for the first push of a
+            branch), returns :data:`None`.
+    """
+    compare_url = os.getenv(env.CIRCLE_CI_COMPARE_URL, '')
+    if _COMPARE_DELIMITER not in compare_url:
+        return None
+
+    _, commit_range = compare_url.rsplit(_COMPARE_DELIMITER, 1)
+    if _RANGE_DELIMITER not in commit_range:
+        return None
+
+    start, finish = commit_range.split(_RANGE_DELIMITER, 1)
+    return start, finish
+
+
+def _default_branch_base(default_branch=_utils.UNSET):
+    """Get the merge base of ``HEAD`` and the default remote branch.
+
+    Args:
+        default_branch (Optional[str]): The remote-tracking branch for
+            the default branch of the ``origin`` remote, if already known.
+
+    Returns:
+        Optional[str]: The commit SHA of the merge base. If the
+            default branch of the ``origin`` remote is not known locally,
+            or it has no common ancestor with ``HEAD``, returns
+            :data:`None`.
+    """
+    if default_branch is _utils.UNSET:
+        default_branch = git_tools.remote_default_branch()
+    if default_branch is None:
+        return None
+    return git_tools.merge_base(default_branch, 'HEAD')
+
+
+def _local_push_base():
+    """Get the diffbase for a CircleCI "push" build from local history.
+
+    Prefers the commit range from ``CIRCLE_COMPARE_URL``. If there is no
+    such range, falls back to the default branch of the ``origin``
+    remote (unless that is the branch being built).
+
+    Returns:
+        Optional[str]: The commit SHA of the diffbase. If it can't be
+            determined from the local ``git`` history, returns
+            :data:`None`.
+    """
+    commit_range = _compare_range()
+    if commit_range is not None:
+        return git_tools.merge_base(*commit_range)
+
+    branch = os.getenv(env.CIRCLE_CI_BRANCH, '')
+    default_branch = git_tools.remote_default_branch()
+    if default_branch == 'origin/' + branch:
+        # Diffing the default branch against itself is meaningless.
+        return None
+    return _default_branch_base(default_branch)
+
+
 # pylint: disable=too-few-public-methods
 class CircleCIRepoProvider(enum.Enum):
     """Enum representing all possible CircleCI repo providers."""
@@ -212,7 +371,18 @@ class CircleCIRepoProvider(enum.Enum):
 
 
 class CircleCI(_config_base.Config):
-    """Represent CircleCI state and cache return values."""
+    """Represent CircleCI state and cache return values.
+
+    Args:
+        deadline (Optional[float]): The number of seconds that may be
+            spent resolving values which require a system call or an
+            HTTP request. See :class:`~._config_base.Config`.
+        api_fallback (Optional[bool]): Flag indicating if the GitHub or
+            Bitbucket API should be used to find the branch a pull
+            request targets, and to determine the diffbase when it can't
+            be resolved from the local ``git`` history. Defaults to
+            :data:`False`.
+    """
 
     # Default instance attributes.
     _base = _utils.UNSET
@@ -224,8 +394,14 @@ class CircleCI(_config_base.Config):
     # Class attributes.
     _active_env_var = env.IN_CIRCLE_CI
     _branch_env_var = env.CIRCLE_CI_BRANCH
+    _shard_index_env_var = env.CIRCLE_CI_NODE_INDEX
+    _shard_total_env_var = env.CIRCLE_CI_NODE_TOTAL
     _tag_env_var = env.CIRCLE_CI_TAG
 
+    def __init__(self, deadline=None, api_fallback=False):
+        super(CircleCI, self).__init__(deadline=deadline)
+        self._api_fallback = api_fallback
+
     @property
     def pr(self):
         """int: The current CircleCI pull request (if any).
@@ -249,27 +425,32 @@ class CircleCI(_config_base.Config):
     def _pr_info(self):
         """dict: The information for the current pull request.
 
-        This information is retrieved from the GitHub API and cached.
-        It is non-public, but a ``@property`` is used for the caching.
+        This information is retrieved from the GitHub or Bitbucket API
+        (depending on the :attr:`provider`) and cached. It is non-public,
+        but a ``@property`` is used for the caching. If the deadline of
+        this config expires during the request, this will be
+        :data:`~ci_diff_helper.FULL_BUILD` (which is not cached, so the
+        request is retried by a config without a deadline).
 
         .. warning::
 
-            This property is only meant to be used in a pull request
-            from a GitHub repository.
+            This property is only meant to be used in a pull request.
         """
         if self._pr_info_cached is not _utils.UNSET:
             return self._pr_info_cached
 
         current_pr = self.pr
         if current_pr is None:
-            self._pr_info_cached = {}
+            pr_info = {}
         elif self.provider is CircleCIRepoProvider.github:
-            self._pr_info_cached = _github.pr_info(self.slug, current_pr)
+            pr_info = self._bounded(_github.pr_info, self.slug, current_pr)
         else:
-            raise NotImplementedError(
-                'GitHub is only supported way to retrieve PR info')
+            pr_info = self._bounded(
+                _bitbucket.pr_info, self.slug, current_pr)
 
-        return self._pr_info_cached
+        if pr_info is not _utils.FULL_BUILD:
+            self._pr_info_cached = pr_info
+        return pr_info
 
     @property
     def repo_url(self):
@@ -305,32 +486,124 @@ class CircleCI(_config_base.Config):
             self._provider, self._slug = _provider_slug(self.repo_url)
         return self._slug
 
-    @property
-    def base(self):
-        """str: The ``git`` object that current build is changed against.
-
-        The ``git`` object can be any of a branch name, tag, a commit SHA
-        or a special reference.
+    def _pr_target_base(self):
+        """Get the diffbase for a pull request from its target branch.
 
-        .. warning::
+        The branch the pull request targets is retrieved from the GitHub
+        or Bitbucket API (via :attr:`_pr_info`) and the diffbase is the
+        merge base of ``HEAD`` and that branch of the ``origin`` remote.
 
-            This property will currently only work in a build for a
-            pull request from a GitHub repository.
+        Returns:
+            Optional[str]: The commit SHA of the diffbase or
+            :data:`~ci_diff_helper.FULL_BUILD` if the deadline of this
+            config expires. If the target branch is unknown or was not
+            fetched, returns :data:`None`.
+        """
+        pr_info = self._pr_info
+        if pr_info is _utils.FULL_BUILD:
+            return pr_info
+        try:
+            if self.provider is CircleCIRepoProvider.github:
+                target_branch = pr_info['base']['ref']
+            else:
+                target_branch = pr_info['destination']['branch']['name']
+        except KeyError:
+            return None
+
+        return self._bounded(_default_branch_base, 'origin/' + target_branch)
+
+    def _api_base(self):
+        """Get the diffbase for the current build from the hosting API.
+
+        In a pull request build, the GitHub or Bitbucket API is used
+        (depending on the :attr:`provider`). In a "push" build, only
+        the GitHub API is supported.
+
+        Only used when the diffbase can't be resolved from the local
+        ``git`` history.
+
+        Returns:
+            str: The commit SHA of the diffbase or
+            :data:`~ci_diff_helper.FULL_BUILD` if the deadline of this
+            config expires during the request (or the config was not
+            created with ``api_fallback``).
+
+        Raises:
+            NotImplementedError: If not in a pull request build and the
+                build does not have a GitHub compare URL.
+            KeyError: If the API payload is missing the diffbase.
         """
-        if self._base is not _utils.UNSET:
-            return self._base
+        if not self._api_fallback:
+            return _utils.FULL_BUILD
 
         if self.in_pr:
             pr_info = self._pr_info
+            if pr_info is _utils.FULL_BUILD:
+                return pr_info
             try:
-                self._base = pr_info['base']['sha']
+                if self.provider is CircleCIRepoProvider.github:
+                    return pr_info['base']['sha']
+                else:
+                    return pr_info['destination']['commit']['hash']
             except KeyError:
                 raise KeyError(
-                    'Missing key in the GitHub API payload',
-                    'expected base->sha',
+                    'Missing key in the API payload',
+                    'expected base->sha (GitHub) or '
+                    'destination->commit->hash (Bitbucket)',
                     pr_info, self.slug, self.pr)
-        else:
+
+        commit_range = _compare_range()
+        if (commit_range is None or
+                self.provider is not CircleCIRepoProvider.github):
             raise NotImplementedError(
-                'Diff base currently only supported in a PR from GitHub')
+                'GitHub API fallback in a "push" build requires a '
+                'GitHub compare URL')
+
+        start, finish = commit_range
+        payload = self._bounded(
+            _github.commit_compare, self.slug, start, finish)
+        if payload is _utils.FULL_BUILD:
+            return payload
+        try:
+            return payload['merge_base_commit']['sha']
+        except KeyError:
+            raise KeyError(
+                'Missing key in the GitHub API payload',
+                'expected merge_base_commit->sha',
+                payload, self.slug, start, finish)
+
+    @property
+    def base(self):
+        """str: The ``git`` object that current build is changed against.
+
+        The diffbase is resolved from the local ``git`` history:
+
+        * In a pull request build, it is the merge base of ``HEAD`` and
+          the default branch of the ``origin`` remote. If the config was
+          created with ``api_fallback``, the branch the pull request
+          targets is used instead (as reported by the GitHub or
+          Bitbucket API).
+        * In a "push" build, it is the merge base of the commit range in
+          ``CIRCLE_COMPARE_URL`` (or of ``HEAD`` and the default branch
+          if there is no such range).
+
+        If this fails, and the config was created with ``api_fallback``,
+        the GitHub or Bitbucket API is used instead.
+
+        If the diffbase can't be resolved (or the config was created
+        with a ``deadline`` that expires while resolving), this will be
+        :data:`~ci_diff_helper.FULL_BUILD`.
+        """
+        if self._base is _utils.UNSET:
+            if self.in_pr and self._api_fallback:
+                base = self._pr_target_base()
+            elif self.in_pr:
+                base = self._bounded(_default_branch_base)
+            else:
+                base = self._bounded(_local_push_base)
+
+            if base is None:
+                base = self._api_base()
+            self._base = base
 
         return self._base
@@ -0,0 +1,188 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Resolve the owners of files from a ``CODEOWNERS`` file.
+
+Rules are parsed once and compiled into a single matcher (see
+:mod:`.path_filter`): literal rules are looked up in dictionaries and
+wildcard rules are grouped by their literal leading directories, so
+resolving owners takes time proportional to the depth of a path rather
+than the number of rules:
+
+.. code-block:: python
+
+  config = ci_diff_helper.get_config()
+  changed = ci_diff_helper.get_changed_files('HEAD', config.base)
+  code_owners = CodeOwners.from_repo()
+  reviewers = code_owners.all_owners(changed)
+
+As with GitHub and GitLab, the last matching rule wins and a rule with
+no owners marks matching files as unowned.
+"""
+
+import io
+import os
+
+from ci_diff_helper import git_tools
+from ci_diff_helper import path_filter
+
+
+CODEOWNERS_LOCATIONS = (
+    os.path.join('.github', 'CODEOWNERS'),
+    'CODEOWNERS',
+    os.path.join('docs', 'CODEOWNERS'),
+)
+"""Locations (relative to the root) searched for a ``CODEOWNERS`` file."""
+
+
+def parse_rules(lines):
+    """Parse the rules in a ``CODEOWNERS`` file.
+
+    Blank lines, comments and negated patterns (which ``CODEOWNERS``
+    does not support) are skipped.
+
+    Args:
+        lines (Iterable[str]): The lines of the file.
+
+    Returns:
+        list: Pairs of a pattern and a tuple of owners, in file order.
+    """
+    rules = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or line.startswith('!'):
+            continue
+
+        parts = line.split()
+        pattern = parts[0]
+        owners = []
+        for owner in parts[1:]:
+            if owner.startswith('#'):
+                break
+            owners.append(owner)
+        if pattern.strip('/'):
+            rules.append((pattern, tuple(owners)))
+
+    return rules
+
+
+class CodeOwners(object):
+    """Indexed matcher for the rules in a ``CODEOWNERS`` file.
+
+    Args:
+        rules (Iterable[tuple]): Pairs of a pattern and a tuple of owners,
+            in file order (i.e. as returned by :func:`parse_rules`).
+        root (Optional[str]): A directory that absolute paths are made
+            relative to (e.g. for output from
+            :func:`.git_tools.get_checked_in_files`).
+    """
+
+    def __init__(self, rules, root=None):
+        self.rules = tuple(rules)
+        self.root = root
+        self._pattern_set = path_filter.PatternSet(
+            (pattern for pattern, _ in self.rules), shallow_star=True)
+
+    @classmethod
+    def from_file(cls, filename, root=None):
+        """Load the rules from a ``CODEOWNERS`` file.
+
+        Args:
+            filename (str): The path to the file.
+            root (Optional[str]): A directory that absolute paths are
+                made relative to.
+
+        Returns:
+            CodeOwners: The owners matcher.
+        """
+        with io.open(filename, 'r', encoding='utf-8') as file_obj:
+            return cls(parse_rules(file_obj), root=root)
+
+    @classmethod
+    def from_repo(cls, root=None):
+        """Load the ``CODEOWNERS`` file in a repository.
+
+        The locations in :data:`CODEOWNERS_LOCATIONS` are checked in
+        order and the first file found is used.
+
+        Args:
+            root (Optional[str]): The root of the repository. Defaults
+                to the root of the current ``git`` checkout.
+
+        Returns:
+            CodeOwners: The owners matcher.
+
+        Raises:
+            OSError: If the repository has no ``CODEOWNERS`` file.
+        """
+        if root is None:
+            root = git_tools.git_root()
+        for location in CODEOWNERS_LOCATIONS:
+            filename = os.path.join(root, location)
+            if os.path.isfile(filename):
+                return cls.from_file(filename, root=root)
+
+        raise OSError('No CODEOWNERS file found', root)
+
+    def owners(self, path):
+        """Get the owners of a file.
+
+        Args:
+            path (str): A file path.
+
+        Returns:
+            tuple: The owners from the last matching rule. Empty if no
+            rule matches or the matching rule has no owners.
+        """
+        index = self._pattern_set.match_index(
+            path_filter.normalize_path(path, self.root))
+        if index == -1:
+            return ()
+        return self.rules[index][1]
+
+    def owners_by_file(self, paths):
+        """Get the owners of each file in a list.
+
+        Args:
+            paths (Iterable[str]): File paths, e.g. the output of
+                :func:`.git_tools.get_changed_files`.
+
+        Returns:
+            dict: Mapping of each path to a tuple of its owners.
+        """
+        return {path: self.owners(path) for path in paths}
+
+    def all_owners(self, paths):
+        """Get the union of the owners of a list of files.
+
+        Args:
+            paths (Iterable[str]): File paths, e.g. the output of
+                :func:`.git_tools.get_changed_files`.
+
+        Returns:
+            tuple: The sorted owners of any of the files.
+        """
+        result = set()
+        for path in paths:
+            result.update(self.owners(path))
+        return tuple(sorted(result))
+
+    def unowned(self, paths):
+        """Get the files in a list that have no owners.
+
+        Args:
+            paths (Iterable[str]): File paths.
+
+        Returns:
+            list: The paths (in order) without owners.
+        """
+        return [path for path in paths if not self.owners(path)]
@@ -0,0 +1,404 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Select the tests that executed the lines changed by a diff.
+
+A :class:`CoverageIndex` is built from a ``coverage.py`` data file
+recorded with a dynamic context for each test (e.g. with
+``pytest --cov --cov-context=test``) on the base revision:
+
+.. code-block:: python
+
+  index = CoverageIndex.from_coverage_data('.coverage')
+  index.save('.coverage-index.json')
+
+and then used at the start of each job to pick the tests to run:
+
+.. code-block:: python
+
+  config = ci_diff_helper.get_config()
+  index = CoverageIndex.load('.coverage-index.json')
+  tests = index.select_tests_since(config.base)
+
+Lines recorded in the empty context (e.g. module-level code run when a
+module is imported while collecting tests) are attributed to every test
+that executed the file, so a change to a module-level constant,
+decorator or class body selects those tests.
+
+For each file, the index stores the sorted measured line numbers and,
+for every line, a bitmask of the tests that executed it. A query is a
+binary search per changed range plus a bitwise OR per covered line.
+
+Changes to files the index doesn't know about (e.g. new files or
+non-Python files) can't select any tests; use :meth:`CoverageIndex.covers`
+to fall back to running everything in that case.
+"""
+
+import bisect
+import collections
+import io
+import json
+import os
+
+import six
+
+from ci_diff_helper import _utils
+from ci_diff_helper import git_tools
+
+
+_VERSION = 1
+_CONTEXT_PHASES = ('|run', '|setup', '|teardown')
+"""Suffixes added to test contexts by ``pytest-cov``."""
+
+
+def context_test_id(context):
+    """Get the test ID from a ``coverage.py`` dynamic context.
+
+    Args:
+        context (str): A context, e.g.
+            ``tests/test_foo.py::TestFoo::test_bar|run``.
+
+    Returns:
+        Optional[str]: The test ID (i.e. the context without a
+        ``pytest-cov`` phase suffix) or :data:`None` for the empty
+        context, which is used for code run outside of any test (see
+        :meth:`CoverageIndex.from_coverage_data`).
+    """
+    for phase in _CONTEXT_PHASES:
+        if context.endswith(phase):
+            context = context[:-len(phase)]
+            break
+    return context or None
+
+
+def _decode_mask(mask):
+    """Get the indices of the bits set in a bitmask.
+
+    Args:
+        mask (int): A non-negative bitmask.
+
+    Returns:
+        list: The indices, in increasing order.
+    """
+    result = []
+    while mask:
+        lowest = mask & -mask
+        result.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return result
+
+
+class CoverageIndex(object):
+    """Index from covered lines to the tests that executed them.
+
+    Args:
+        tests (Sequence[str]): The test IDs.
+        files (dict): Mapping of file paths (relative to the repository
+            root, using ``/`` as separator) to pairs of a sorted list of
+            line numbers and a list of the same length of bitmasks. Bit
+            ``i`` of a mask is set if ``tests[i]`` executed the line.
+    """
+
+    def __init__(self, tests, files):
+        self.tests = tuple(tests)
+        self._files = files
+        self._serialized = {}
+
+    @classmethod
+    def from_contexts(cls, contexts_by_file):
+        """Build an index from the tests that executed each line.
+
+        Args:
+            contexts_by_file (dict): Mapping of file paths (relative to
+                the repository root) to mappings of line numbers to the
+                IDs of the tests that executed the line.
+
+        Returns:
+            CoverageIndex: The index.
+        """
+        tests = set()
+        for by_lineno in six.itervalues(contexts_by_file):
+            for test_ids in six.itervalues(by_lineno):
+                tests.update(test_ids)
+        tests = sorted(tests)
+        bits = {test_id: 1 << index for index, test_id in enumerate(tests)}
+
+        files = {}
+        for path, by_lineno in six.iteritems(contexts_by_file):
+            line_numbers = []
+            masks = []
+            for lineno in sorted(by_lineno):
+                mask = 0
+                for test_id in by_lineno[lineno]:
+                    mask |= bits[test_id]
+                if mask:
+                    line_numbers.append(lineno)
+                    masks.append(mask)
+            if line_numbers:
+                files[path.replace(os.sep, '/')] = (line_numbers, masks)
+        return cls(tests, files)
+
+    @classmethod
+    def from_coverage_data(cls, data_file='.coverage', root=None,
+                           context_to_test=context_test_id):
+        """Build an index from a ``coverage.py`` data file.
+
+        Requires ``coverage >= 5.0``, for dynamic contexts.
+
+        Lines executed in the empty context (i.e. outside of any test,
+        such as module-level code run on import) are attributed to every
+        test that executed a line of the same file.
+
+        Args:
+            data_file (Optional[str]): The ``coverage.py`` data file.
+            root (Optional[str]): The directory the indexed paths are
+                relative to. Defaults to the root of the current ``git``
+                checkout. Files measured outside of it are skipped.
+            context_to_test (Optional[Callable[[str], Optional[str]]]):
+                Maps a context to a test ID (or :data:`None` to ignore
+                the context). Defaults to :func:`context_test_id`.
+
+        Returns:
+            CoverageIndex: The index.
+
+        Raises:
+            ValueError: If the data file has no test contexts, e.g. if
+                it wasn't recorded with dynamic contexts.
+        """
+        # NOTE: ``coverage`` is only needed to build an index, not to
+        #       query one.
+        import coverage
+
+        if root is None:
+            root = git_tools.git_root()
+        data = coverage.CoverageData(basename=data_file)
+        data.read()
+
+        contexts_by_file = {}
+        for filename in data.measured_files():
+            path = os.path.relpath(filename, root)
+            if path.startswith(os.pardir + os.sep):
+                continue
+            by_lineno = collections.defaultdict(set)
+            outside_tests = []
+            for lineno, contexts in six.iteritems(
+                    data.contexts_by_lineno(filename)):
+                for context in contexts:
+                    if not context:
+                        outside_tests.append(lineno)
+                        continue
+                    test_id = context_to_test(context)
+                    if test_id is not None:
+                        by_lineno[lineno].add(test_id)
+            file_tests = set()
+            for test_ids in six.itervalues(by_lineno):
+                file_tests.update(test_ids)
+            for lineno in outside_tests:
+                by_lineno[lineno].update(file_tests)
+            contexts_by_file[path] = by_lineno
+
+        index = cls.from_contexts(contexts_by_file)
+        if not index.tests:
+            raise ValueError('No test contexts in coverage data', data_file)
+        return index
+
+    def to_dict(self):
+        """Serialize the index.
+
+        Returns:
+            dict: A JSON-compatible representation of the index. Bitmasks
+            are stored as hex strings.
+        """
+        files = dict(self._serialized)
+        for path, (line_numbers, masks) in six.iteritems(self._files):
+            files[path] = [line_numbers, ['%x' % mask for mask in masks]]
+        return {
+            'version': _VERSION,
+            'tests': list(self.tests),
+            'files': files,
+        }
+
+    @classmethod
+    def from_dict(cls, value):
+        """Deserialize an index produced by :meth:`to_dict`.
+
+        The bitmasks for a file are only decoded the first time the file
+        is queried.
+
+        Args:
+            value (dict): The serialized index.
+
+        Returns:
+            CoverageIndex: The deserialized index.
+
+        Raises:
+            ValueError: If the serialization format is not supported.
+        """
+        if value.get('version') != _VERSION:
+            raise ValueError('Unsupported coverage index version',
+                             value.get('version'))
+        index = cls(value['tests'], {})
+        index._serialized = dict(value['files'])
+        return index
+
+    def save(self, filename):
+        """Save the index to a JSON file.
+
+        Args:
+            filename (str): The file to save to.
+        """
+        serialized = json.dumps(self.to_dict())
+        with io.open(filename, 'w', encoding='utf-8') as file_obj:
+            file_obj.write(six.text_type(serialized))
+
+    @classmethod
+    def load(cls, filename):
+        """Load an index saved by :meth:`save`.
+
+        Args:
+            filename (str): The file to load from.
+
+        Returns:
+            CoverageIndex: The loaded index.
+        """
+        with io.open(filename, 'r', encoding='utf-8') as file_obj:
+            return cls.from_dict(json.load(file_obj))
+
+    def _lines(self, path):
+        """Get the line numbers and bitmasks for a file.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+
+        Returns:
+            Optional[tuple]: Pair of the sorted line numbers and their
+            bitmasks, or :data:`None` if the file is not in the index.
+        """
+        path = path.replace(os.sep, '/')
+        result = self._files.get(path)
+        if result is None and path in self._serialized:
+            line_numbers, hex_masks = self._serialized.pop(path)
+            result = (line_numbers, [int(mask, 16) for mask in hex_masks])
+            self._files[path] = result
+        return result
+
+    def covers(self, path):
+        """Check if a file has coverage data in the index.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+
+        Returns:
+            bool: Flag indicating if any test executed the file.
+        """
+        return self._lines(path) is not None
+
+    def _mask(self, path, ranges):
+        """Combine the bitmasks of the lines in some ranges of a file.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+            ranges (Iterable[tuple]): Pairs of the first and last
+                (inclusive) line numbers of a range.
+
+        Returns:
+            int: The bitmask of the tests that executed any of the lines.
+        """
+        lines = self._lines(path)
+        if lines is None:
+            return 0
+
+        line_numbers, masks = lines
+        result = 0
+        for start, end in ranges:
+            position = bisect.bisect_left(line_numbers, start)
+            while (position < len(line_numbers) and
+                   line_numbers[position] <= end):
+                result |= masks[position]
+                position += 1
+        return result
+
+    def _test_ids(self, mask):
+        """Get the test IDs in a bitmask.
+
+        Args:
+            mask (int): A bitmask of tests.
+
+        Returns:
+            tuple: The sorted test IDs.
+        """
+        return tuple(self.tests[index] for index in _decode_mask(mask))
+
+    def tests_for_lines(self, path, ranges):
+        """Get the tests that executed some lines of a file.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+            ranges (Iterable[tuple]): Pairs of the first and last
+                (inclusive) line numbers of a range.
+
+        Returns:
+            tuple: The sorted IDs of the tests that executed any of the
+            lines.
+        """
+        return self._test_ids(self._mask(path, ranges))
+
+    def select_tests(self, changed_ranges):
+        """Get the tests that executed any changed line.
+
+        Args:
+            changed_ranges (dict): Mapping of file paths (relative to the
+                repository root) to the changed line ranges, as in
+                :meth:`tests_for_lines`.
+
+        Returns:
+            tuple: The sorted IDs of the selected tests.
+        """
+        mask = 0
+        for path, ranges in six.iteritems(changed_ranges):
+            mask |= self._mask(path, ranges)
+        return self._test_ids(mask)
+
+    def select_tests_since(self, blob_name, head='HEAD'):
+        """Get the tests that executed a line changed since a revision.
+
+        The index should be built from coverage measured at
+        ``blob_name``: the changed lines are matched on the "old" side of
+        the diff. For lines that were only added, the lines on either
+        side of the insertion are used.
+
+        Args:
+            blob_name (str): A ``git`` object reference, e.g. the
+                ``base`` of the current CI config. If it is
+                :data:`~ci_diff_helper.FULL_BUILD` (the diff is unknown),
+                every test in the index is selected.
+            head (Optional[str]): The ``git`` object reference with the
+                changes.
+
+        Returns:
+            tuple: The sorted IDs of the selected tests.
+        """
+        if blob_name is _utils.FULL_BUILD:
+            return self.tests
+
+        changed_ranges = collections.defaultdict(list)
+        for hunk in git_tools.get_changed_hunks(blob_name, head):
+            old_path, _, old_start, old_count, _, _ = hunk
+            if old_path is None:
+                # Added files have no coverage at ``blob_name``.
+                continue
+            if old_count:
+                line_range = (old_start, old_start + old_count - 1)
+            else:
+                line_range = (max(old_start, 1), old_start + 1)
+            changed_ranges[old_path].append(line_range)
+        return self.select_tests(changed_ranges)
@@ -15,13 +15,24 @@
 These environment variables are core to this library. They are used
 to detect the current environment.
 
-For more details, see the `Travis env docs`_, `AppVeyor env docs`_
-and `_CircleCI env docs`.
+For more details, see the `Travis env docs`_, `AppVeyor env docs`_,
+`_CircleCI env docs`, `GitHub Actions env docs`_,
+`GitLab CI env docs`_, `Jenkins env docs`_, `Buildkite env docs`_
+and `Drone env docs`_.
 
 .. _Travis env docs: https://docs.travis-ci.com/user/\
                      environment-variables#Default-Environment-Variables
 .. _AppVeyor env docs: https://www.appveyor.com/docs/environment-variables/
 .. _CircleCI env docs: https://circleci.com/docs/environment-variables/
+.. _GitHub Actions env docs: https://docs.github.com/en/actions/learn-\
+                             github-actions/environment-variables
+.. _GitLab CI env docs: https://docs.gitlab.com/ee/ci/variables/\
+                        predefined_variables.html
+.. _Jenkins env docs: https://www.jenkins.io/doc/book/pipeline/\
+                      jenkinsfile/#using-environment-variables
+.. _Buildkite env docs: https://buildkite.com/docs/pipelines/\
+                        environment-variables
+.. _Drone env docs: https://docs.drone.io/pipeline/environment/reference/
 """
 
 IN_TRAVIS = 'TRAVIS'
@@ -79,6 +90,13 @@ Integration server will typically be `rate limited`_.
 .. _rate limited: https://developer.github.com/v3/#rate-limiting
 """
 
+BB_TOKEN = 'BITBUCKET_OAUTH_TOKEN'
+"""Bitbucket OAuth 2.0 access token.
+
+If set, this environment variable is used to authenticate to the
+Bitbucket API (which is required for private repositories).
+"""
+
 IN_APPVEYOR = 'APPVEYOR'
 """Indicates if running in AppVeyor."""
 
@@ -99,6 +117,18 @@ This will only be valid when ``APPVEYOR_REPO_TAG``, i.e. when the
 build was started by a pushed tag.
 """
 
+APPVEYOR_PR_NUM = 'APPVEYOR_PULL_REQUEST_NUMBER'
+"""The ID of the pull request that started the current AppVeyor build.
+
+Only set during a pull request build.
+"""
+
+APPVEYOR_PR_HEAD = 'APPVEYOR_PULL_REQUEST_HEAD_COMMIT'
+"""The commit SHA of the head of the pull request being built.
+
+Only set during a pull request build.
+"""
+
 IN_CIRCLE_CI = 'CIRCLECI'
 """Indicates if running in CircleCI."""
 
@@ -145,3 +175,199 @@ CIRCLE_CI_PR_OWNER = 'CIRCLE_PR_USERNAME'
 We only expect this environment variable to be set during a
 build that is a part of a pull request from a fork.
 """
+
+CIRCLE_CI_COMPARE_URL = 'CIRCLE_COMPARE_URL'
+"""The GitHub or Bitbucket URL to compare commits in a "push" build.
+
+Of the form ``{repo_url}/compare/{start}...{finish}``, where ``start``
+is the commit the branch pointed to before the push.
+"""
+
+CIRCLE_CI_NODE_INDEX = 'CIRCLE_NODE_INDEX'
+"""The (zero-based) index of the current parallel CircleCI node."""
+
+CIRCLE_CI_NODE_TOTAL = 'CIRCLE_NODE_TOTAL'
+"""The number of parallel CircleCI nodes running the current job."""
+
+IN_GITHUB_ACTIONS = 'GITHUB_ACTIONS'
+"""Indicates if running in GitHub Actions."""
+
+GITHUB_ACTIONS_EVENT_NAME = 'GITHUB_EVENT_NAME'
+"""The name of the event that triggered the GitHub Actions workflow.
+
+For example ``push`` or ``pull_request``.
+"""
+
+GITHUB_ACTIONS_EVENT_PATH = 'GITHUB_EVENT_PATH'
+"""The path to a JSON file containing the full webhook event payload.
+
+This payload contains (among other things) the base and head commits
+of a pull request, so no GitHub API request is needed to determine
+a diff base.
+"""
+
+GITHUB_ACTIONS_REF = 'GITHUB_REF'
+"""The fully-formed ``git`` ref that triggered the workflow.
+
+For example ``refs/heads/master``, ``refs/tags/0.1.0`` or (in a
+pull request) ``refs/pull/23/merge``.
+"""
+
+GITHUB_ACTIONS_BASE_REF = 'GITHUB_BASE_REF'
+"""The name of the base branch of a pull request.
+
+Only set when the workflow was triggered by a pull request.
+"""
+
+GITHUB_ACTIONS_REPO = 'GITHUB_REPOSITORY'
+"""The GitHub repository slug for the current GitHub Actions build.
+
+A slug is of the form ``{organization}/{repository}``.
+"""
+
+IN_GITLAB_CI = 'GITLAB_CI'
+"""Indicates if running in GitLab CI."""
+
+GITLAB_CI_BRANCH = 'CI_COMMIT_REF_NAME'
+"""The branch or tag name for which the GitLab CI pipeline is running.
+
+In a merge request pipeline, this is the **source** branch of the
+merge request.
+"""
+
+GITLAB_CI_TAG = 'CI_COMMIT_TAG'
+"""The tag of the current GitLab CI pipeline.
+
+Only set in pipelines for tags.
+"""
+
+GITLAB_CI_MR = 'CI_MERGE_REQUEST_IID'
+"""The project-level ID of the merge request.
+
+Only set in merge request pipelines.
+"""
+
+GITLAB_CI_MR_DIFF_BASE = 'CI_MERGE_REQUEST_DIFF_BASE_SHA'
+"""The base SHA of the merge request diff.
+
+This is the merge base of the source and target branches, as computed
+by GitLab. Only set in merge request pipelines.
+"""
+
+GITLAB_CI_MR_TARGET = 'CI_MERGE_REQUEST_TARGET_BRANCH_NAME'
+"""The target branch name of the merge request.
+
+Only set in merge request pipelines.
+"""
+
+GITLAB_CI_BEFORE = 'CI_COMMIT_BEFORE_SHA'
+"""The previous latest commit present on a branch before a push.
+
+This is all zeros in merge request pipelines and in the first
+pipeline for a new branch.
+"""
+
+GITLAB_CI_SLUG = 'CI_PROJECT_PATH'
+"""The project namespace with the project name included.
+
+Of the form ``{namespace}/{project}``.
+"""
+
+GITLAB_CI_REPO_URL = 'CI_PROJECT_URL'
+"""The HTTP(S) address of the project."""
+
+GITLAB_CI_NODE_INDEX = 'CI_NODE_INDEX'
+"""The (one-based) index of the current job in a ``parallel`` GitLab job.
+
+Only set if the job uses ``parallel``.
+"""
+
+GITLAB_CI_NODE_TOTAL = 'CI_NODE_TOTAL'
+"""The number of instances of the current GitLab job running in parallel.
+
+Set to ``1`` if the job doesn't use ``parallel``.
+"""
+
+IN_JENKINS = 'JENKINS_URL'
+"""The URL of the Jenkins server running the current build.
+
+Unlike most CI systems, Jenkins has no boolean flag, so any non-empty
+value indicates running in Jenkins.
+"""
+
+JENKINS_BRANCH = 'BRANCH_NAME'
+"""The branch being built in a Jenkins multibranch pipeline.
+
+In a "change request" (pull request) build, this is a name such
+as ``PR-23``.
+"""
+
+JENKINS_TAG = 'TAG_NAME'
+"""The tag being built in a Jenkins multibranch pipeline."""
+
+JENKINS_PR = 'CHANGE_ID'
+"""The ID of the change request (e.g. pull request) being built."""
+
+JENKINS_PR_TARGET = 'CHANGE_TARGET'
+"""The target branch of the change request being built."""
+
+IN_BUILDKITE = 'BUILDKITE'
+"""Indicates if running in Buildkite."""
+
+BUILDKITE_BRANCH = 'BUILDKITE_BRANCH'
+"""The branch being built in Buildkite."""
+
+BUILDKITE_TAG = 'BUILDKITE_TAG'
+"""The tag being built in Buildkite (if any)."""
+
+BUILDKITE_PR = 'BUILDKITE_PULL_REQUEST'
+"""The number of the pull request being built.
+
+Is an integer when in a pull request or "false" when not.
+"""
+
+BUILDKITE_PR_BASE = 'BUILDKITE_PULL_REQUEST_BASE_BRANCH'
+"""The base branch of the pull request being built."""
+
+BUILDKITE_PARALLEL_JOB = 'BUILDKITE_PARALLEL_JOB'
+"""The (zero-based) index of the current parallel Buildkite job."""
+
+BUILDKITE_PARALLEL_JOB_COUNT = 'BUILDKITE_PARALLEL_JOB_COUNT'
+"""The number of parallel Buildkite jobs running the current step."""
+
+IN_DRONE = 'DRONE'
+"""Indicates if running in Drone."""
+
+DRONE_BRANCH = 'DRONE_BRANCH'
+"""The branch being built in Drone.
+
+In a pull request build, this is the **target** branch.
+"""
+
+DRONE_TAG = 'DRONE_TAG'
+"""The tag being built in Drone (if any)."""
+
+DRONE_PR = 'DRONE_PULL_REQUEST'
+"""The number of the pull request being built (if any)."""
+
+DRONE_PR_TARGET = 'DRONE_TARGET_BRANCH'
+"""The target branch of the pull request being built."""
+
+DRONE_SLUG = 'DRONE_REPO'
+"""The repository slug for the current Drone build.
+
+A slug is of the form ``{owner}/{repository}``.
+"""
+
+SHARD_INDEX = 'CI_SHARD_INDEX'
+"""The (zero-based) index of the current shard of a split build.
+
+A fallback for CI systems without built-in parallelism (e.g. Travis or
+GitHub Actions), where each shard is declared in a build matrix.
+"""
+
+SHARD_TOTAL = 'CI_SHARD_TOTAL'
+"""The number of shards a split build runs as.
+
+Used along with :data:`SHARD_INDEX`.
+"""
@@ -10,13 +10,47 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Helpers for interacting with ``git``."""
+"""Helpers for interacting with ``git``.
+
+Name and status diffs (:func:`get_changed_files`,
+:func:`get_changed_status`) and :func:`get_checked_in_files` only read
+commits, trees and the index, never file contents. In a partial clone
+(e.g. ``git clone --filter=blob:none``) they are run with lazy fetching
+disabled, so they don't stall on a fetch from the promisor remote. If
+an operation would need such a fetch, an :exc:`OSError` is raised
+instead.
+
+.. note::
+
+    Lazy fetches are disabled via ``GIT_NO_LAZY_FETCH``, which is only
+    documented (and so only guaranteed to be honored) as of ``git``
+    2.44. Older versions may ignore it and silently fetch the missing
+    objects over the network instead.
+"""
 
 import os
+import re
+import subprocess
 
 from ci_diff_helper import _utils
 
 
+DEFAULT_MAX_FETCH_DEPTH = 1024
+"""The default cap on the commits fetched by :func:`deepen_until`."""
+_INITIAL_FETCH_DEPTH = 64
+_NO_LAZY_FETCH_ENV = {'GIT_NO_LAZY_FETCH': '1'}
+_SUBMODULE_MODE = '160000'
+_NULL_PATH = '/dev/null'
+_HUNK_HEADER = re.compile(
+    r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+_PROMISOR_CONFIG_REGEX = r'^(extensions\.partialclone|remote\..*\.promisor)$'
+_PROMISOR_FETCH_TEMPLATE = (
+    '`{}` needs objects missing from this partial clone, but '
+    'fetching from the promisor remote is disabled')
+_LAZY_FETCH_ERROR = re.compile(
+    r'lazy fetching disabled|from promisor remote')
+
+
 def git_root():
     """Return the root directory of the current ``git`` checkout.
 
@@ -26,6 +60,63 @@ def git_root():
     return _utils.check_output('git', 'rev-parse', '--show-toplevel')
 
 
+def is_partial_clone():
+    """Checks if the current ``git`` checkout is a partial clone.
+
+    A partial clone (e.g. created with ``git clone --filter=blob:none``)
+    lazily fetches missing objects from a "promisor" remote.
+
+    Returns:
+        bool: Flag indicating if the checkout is a partial clone.
+    """
+    promisor = _utils.check_output(
+        'git', 'config', '--get-regexp', _PROMISOR_CONFIG_REGEX,
+        ignore_err=True)
+    return bool(promisor)
+
+
+def _tree_only(*args):
+    """Run a ``git`` command that must not fetch missing objects.
+
+    See the note on ``GIT_NO_LAZY_FETCH`` in the module docstring.
+
+    Args:
+        args (tuple): The ``git`` command to run.
+
+    Returns:
+        str: The output of the command.
+
+    Raises:
+        OSError: If the command fails in a partial clone because it
+            would have needed to fetch objects from the promisor remote.
+        subprocess.CalledProcessError: If the command fails otherwise
+            (e.g. for a bad revision). The STDERR of the command is
+            attached as ``stderr``.
+    """
+    try:
+        return _utils.check_output(
+            *args, env=_NO_LAZY_FETCH_ENV, capture_err=True)
+    except subprocess.CalledProcessError as exc:
+        if (_LAZY_FETCH_ERROR.search(exc.stderr) is not None and
+                is_partial_clone()):
+            raise OSError(exc, _PROMISOR_FETCH_TEMPLATE.format(' '.join(args)))
+        raise
+
+
+def _split_null(cmd_output):
+    """Split ``git`` output that was NUL-terminated (i.e. via ``-z``).
+
+    Args:
+        cmd_output (str): The output of a ``git`` command.
+
+    Returns:
+        list: The NUL-separated fields in the output.
+    """
+    if not cmd_output:
+        return []
+    return cmd_output.rstrip('\0').split('\0')
+
+
 def get_checked_in_files():
     """Gets a list of files in the current ``git`` repository.
 
@@ -35,13 +126,14 @@ def get_checked_in_files():
 
       $ git ls-files ${GIT_ROOT}
 
-    and then finds the absolute path for each file returned.
+    and then finds the absolute path for each file returned. Only
+    the index is read, so no objects are fetched in a partial clone.
 
     Returns:
         list: List of all filenames checked into the repository.
     """
     root_dir = git_root()
-    cmd_output = _utils.check_output('git', 'ls-files', root_dir)
+    cmd_output = _tree_only('git', 'ls-files', root_dir)
 
     result = []
     for filename in cmd_output.split('\n'):
@@ -50,26 +142,275 @@ def get_checked_in_files():
     return result
 
 
-def get_changed_files(blob_name1, blob_name2):
+def get_checked_in_blobs():
+    """Gets the blob SHA of each file in the current ``git`` repository.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git ls-files --stage ${GIT_ROOT}
+
+    and then finds the absolute path for each file returned. The SHAs
+    are read from the index, so they match the checked out contents
+    unless the working tree has uncommitted changes.
+
+    Returns:
+        dict: Mapping of the filename of each blob checked into the
+        repository (i.e. excluding submodules) to its SHA.
+    """
+    root_dir = git_root()
+    cmd_output = _tree_only('git', 'ls-files', '--stage', '-z', root_dir)
+
+    result = {}
+    for entry in _split_null(cmd_output):
+        info, filename = entry.split('\t', 1)
+        mode, blob_sha, _ = info.split()
+        if mode != _SUBMODULE_MODE:
+            result[os.path.abspath(filename)] = blob_sha
+
+    return result
+
+
+def get_modified_files():
+    """Gets the files with uncommitted changes in the working tree.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git ls-files --modified ${GIT_ROOT}
+
+    and then finds the absolute path for each file returned. These are
+    the files whose blob SHA in :func:`get_checked_in_blobs` doesn't
+    match their contents.
+
+    Returns:
+        list: List of the filenames of modified (or deleted) files.
+    """
+    root_dir = git_root()
+    cmd_output = _tree_only('git', 'ls-files', '--modified', '-z', root_dir)
+    return [os.path.abspath(filename) for filename in _split_null(cmd_output)]
+
+
+def _diff_tree_args(blob_name1, blob_name2, renames, *output_formats):
+    """Get the arguments for a ``git diff-tree`` call.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+        renames (bool): Flag indicating if renames should be detected.
+        output_formats (tuple): The ``git diff-tree`` output format
+            options.
+
+    Returns:
+        tuple: The ``git`` command.
+    """
+    rename_option = '--find-renames' if renames else '--no-renames'
+    return (('git', 'diff-tree', '-r', '-z') + output_formats +
+            (rename_option, blob_name1, blob_name2))
+
+
+def get_raw_diff(blob_name1, blob_name2, renames=True, stats=True):
+    """Gets the raw (and numstat) diff between two ``git`` revisions.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git diff-tree -r -z --raw --numstat --find-renames \\
+      >   ${BLOB1} ${BLOB2}
+
+    If neither ``renames`` nor ``stats`` is set, only trees are
+    compared, so (as in :func:`get_changed_files`) no file contents are
+    fetched in a partial clone.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+        renames (Optional[bool]): Flag indicating if renames should be
+            detected. Defaults to :data:`True`.
+        stats (Optional[bool]): Flag indicating if line counts should be
+            computed (via ``--numstat``). Defaults to :data:`True`.
+
+    Returns:
+        list: The NUL-separated fields of the ``--raw`` output, followed
+        by those of the ``--numstat`` output (if ``stats`` is set).
+    """
+    output_formats = ('--raw', '--numstat') if stats else ('--raw',)
+    cmd = _diff_tree_args(blob_name1, blob_name2, renames, *output_formats)
+    if stats or renames:
+        cmd_output = _utils.check_output(*cmd)
+    else:
+        cmd_output = _tree_only(*cmd)
+    return _split_null(cmd_output)
+
+
+def get_changed_files(blob_name1, blob_name2, renames=False):
     """Gets a list of changed files between two ``git`` revisions.
 
     A ``git`` object reference can be any of a branch name, tag,
     a commit SHA or a special reference.
 
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git diff-tree -r --name-only --no-renames ${BLOB1} ${BLOB2}
+
+    which only compares trees, so no file contents are needed.
+
     Args:
         blob_name1 (str): A ``git`` object reference.
         blob_name2 (str): A ``git`` object reference.
+        renames (Optional[bool]): Flag indicating if renames should be
+            detected (in which case only the new name of a renamed file
+            is listed). Defaults to :data:`False`, since detecting
+            inexact renames requires file contents.
 
     Returns:
         list: List of all filenames changed.
     """
-    cmd_output = _utils.check_output(
-        'git', 'diff', '--name-only', blob_name1, blob_name2)
+    cmd_output = _tree_only(*_diff_tree_args(
+        blob_name1, blob_name2, renames, '--name-only'))
+    return _split_null(cmd_output)
 
-    if cmd_output:
-        return cmd_output.split('\n')
-    else:
-        return []
+
+def get_changed_status(blob_name1, blob_name2, renames=False):
+    """Gets the status of each changed file between two ``git`` revisions.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git diff-tree -r --name-status --no-renames ${BLOB1} ${BLOB2}
+
+    Args:
+        blob_name1 (str): A ``git`` object reference.
+        blob_name2 (str): A ``git`` object reference.
+        renames (Optional[bool]): Flag indicating if renames should be
+            detected. Defaults to :data:`False`.
+
+    Returns:
+        list: List of tuples. Each is a pair of a status letter (e.g.
+        ``A``, ``M`` or ``D``) and a filename, except for renames and
+        copies, which are triples of a status (e.g. ``R100``), the old
+        filename and the new filename.
+    """
+    cmd_output = _tree_only(*_diff_tree_args(
+        blob_name1, blob_name2, renames, '--name-status'))
+    fields = _split_null(cmd_output)
+
+    result = []
+    index = 0
+    while index < len(fields):
+        status = fields[index]
+        num_paths = 2 if status[0] in 'RC' else 1
+        paths = fields[index + 1:index + 1 + num_paths]
+        result.append((status,) + tuple(paths))
+        index += 1 + num_paths
+
+    return result
+
+
+def _diff_path(value):
+    """Parse the path in a ``---`` / ``+++`` line of a ``git`` patch.
+
+    ``git`` adds a trailing tab to paths that contain a space.
+
+    Args:
+        value (str): The text after the ``---`` or ``+++`` marker.
+
+    Returns:
+        Optional[str]: The path, or :data:`None` for ``/dev/null`` (i.e.
+        an added or deleted file).
+    """
+    value = value.rstrip('\t')
+    if value == _NULL_PATH:
+        return None
+    return value
+
+
+def parse_hunks(lines):
+    """Parse the hunks in a ``git`` patch generated with ``--unified=0``.
+
+    Patches must be generated with ``--no-prefix`` (i.e. without the
+    ``a/`` and ``b/`` path prefixes).
+
+    Args:
+        lines (Iterable[str]): The lines of the patch.
+
+    Yields:
+        tuple: A 6-tuple for each hunk of the old path, the new path, the
+        first line and line count in the old file and the first line and
+        line count in the new file. The old (new) path is :data:`None`
+        if the file was added (deleted). A line count of 0 means lines
+        were only added (removed) and the first line is the one *before*
+        the change.
+    """
+    old_path = new_path = None
+    remaining = 0
+    for line in lines:
+        if line.startswith('\\'):
+            # I.e. "\ No newline at end of file".
+            continue
+        if remaining:
+            remaining -= 1
+        elif line.startswith('--- '):
+            old_path = _diff_path(line[4:])
+        elif line.startswith('+++ '):
+            new_path = _diff_path(line[4:])
+        else:
+            match = _HUNK_HEADER.match(line)
+            if match is not None:
+                old_start, old_count, new_start, new_count = [
+                    1 if value is None else int(value)
+                    for value in match.groups()]
+                remaining = old_count + new_count
+                yield (old_path, new_path, old_start, old_count,
+                       new_start, new_count)
+
+
+def iter_changed_hunks(blob_name1, blob_name2):
+    """Stream the changed line ranges between two ``git`` revisions.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git diff-tree -r -p --unified=0 --no-renames ${BLOB1} ${BLOB2}
+
+    The patch is parsed as it is read, so even a diff touching a huge
+    number of files is never held in memory. Unlike
+    :func:`get_changed_files`, this needs file contents.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference (the "old" side).
+        blob_name2 (str): A ``git`` object reference (the "new" side).
+
+    Returns:
+        Iterator[tuple]: The hunks in the diff, as described in
+        :func:`parse_hunks`.
+    """
+    lines = _utils.iter_output(
+        'git', '-c', 'core.quotePath=false', 'diff-tree', '-r', '-p',
+        '--unified=0', '--no-color', '--no-prefix', '--no-renames',
+        blob_name1, blob_name2)
+    return parse_hunks(lines)
+
+
+def get_changed_hunks(blob_name1, blob_name2):
+    """Gets the changed line ranges between two ``git`` revisions.
+
+    Args:
+        blob_name1 (str): A ``git`` object reference (the "old" side).
+        blob_name2 (str): A ``git`` object reference (the "new" side).
+
+    Returns:
+        list: The hunks in the diff, as described in :func:`parse_hunks`.
+        See :func:`iter_changed_hunks`.
+    """
+    return list(iter_changed_hunks(blob_name1, blob_name2))
 
 
 def merge_commit(revision='HEAD'):
@@ -109,3 +450,115 @@ def commit_subject(revision='HEAD'):
     """
     return _utils.check_output(
         'git', 'log', '--pretty=%s', '-1', revision)
+
+
+def merge_base(revision1, revision2):
+    """Gets the merge base of two ``git`` revisions.
+
+    Args:
+        revision1 (str): A ``git`` revision, any of a branch
+            name, tag, a commit SHA or a special reference.
+        revision2 (str): A ``git`` revision, any of a branch
+            name, tag, a commit SHA or a special reference.
+
+    Returns:
+        Optional[str]: The commit SHA of the merge base. If either
+            revision is not in the local history (or they have no
+            common ancestor), returns :data:`None`.
+    """
+    return _utils.check_output(
+        'git', 'merge-base', revision1, revision2, ignore_err=True)
+
+
+def remote_default_branch(remote='origin'):
+    """Gets the remote-tracking branch for the default branch of a remote.
+
+    Effectively runs:
+
+    .. code-block:: bash
+
+      $ git symbolic-ref --short refs/remotes/${REMOTE}/HEAD
+
+    Args:
+        remote (Optional[str]): The name of a ``git`` remote.
+
+    Returns:
+        Optional[str]: The remote-tracking branch, e.g. ``origin/master``.
+            If the remote ``HEAD`` has not been fetched, returns
+            :data:`None`.
+    """
+    ref_name = 'refs/remotes/{}/HEAD'.format(remote)
+    return _utils.check_output(
+        'git', 'symbolic-ref', '--short', ref_name, ignore_err=True)
+
+
+def is_shallow():
+    """Checks if the current ``git`` checkout is a shallow clone.
+
+    Returns:
+        bool: Flag indicating if the checkout is shallow.
+    """
+    return _utils.check_output(
+        'git', 'rev-parse', '--is-shallow-repository') == 'true'
+
+
+def resolve_commit(revision):
+    """Resolves a ``git`` revision into a commit SHA.
+
+    Args:
+        revision (str): A ``git`` revision, any of a branch
+            name, tag, a commit SHA or a special reference.
+
+    Returns:
+        Optional[str]: The 40-character commit SHA. If the revision is
+            not in the local history, returns :data:`None`.
+    """
+    return _utils.check_output(
+        'git', 'rev-parse', '--verify', '--quiet', revision + '^{commit}',
+        ignore_err=True)
+
+
+def deepen_until(revision, remote='origin',
+                 max_depth=DEFAULT_MAX_FETCH_DEPTH):
+    """Deepens a shallow clone until a revision is in the local history.
+
+    Deepens the history fetched from ``remote`` (i.e. runs
+    ``git fetch --deepen=${DEPTH} ${REMOTE}``), doubling the number of
+    commits fetched each time, until either ``revision`` is present, the
+    clone is no longer shallow or the commits fetched reach
+    ``max_depth``. This transfers far fewer objects than unshallowing
+    the entire history.
+
+    .. note::
+
+        ``--deepen`` extends the history from the current shallow
+        boundary, whereas ``--depth`` counts from the remote branch
+        tips, so no fetch is wasted on history that is already present.
+
+    Args:
+        revision (str): A ``git`` revision, any of a branch
+            name, tag, a commit SHA or a special reference.
+        remote (Optional[str]): The ``git`` remote to fetch from.
+        max_depth (Optional[int]): The maximum number of commits to
+            deepen the history by.
+
+    Returns:
+        Optional[str]: The 40-character commit SHA of ``revision``. If it
+            can't be found within ``max_depth`` commits (or the fetch
+            fails), returns :data:`None`.
+    """
+    commit_sha = resolve_commit(revision)
+    fetched_depth = 0
+    step = min(_INITIAL_FETCH_DEPTH, max_depth)
+    while commit_sha is None and step > 0 and is_shallow():
+        fetched = _utils.check_output(
+            'git', 'fetch', '--quiet', '--deepen={:d}'.format(step),
+            remote, ignore_err=True)
+        if fetched is None:
+            break
+
+        commit_sha = resolve_commit(revision)
+        fetched_depth += step
+        step = min(fetched_depth, max_depth - fetched_depth)
+
+    return commit_sha
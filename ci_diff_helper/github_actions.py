@@ -0,0 +1,461 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Set of utilities for dealing with GitHub Actions.
+
+This module provides a custom configuration type
+:class:`GitHubActions` for the `GitHub Actions`_ CI system.
+
+.. _GitHub Actions: https://github.com/features/actions
+
+GitHub Actions writes the full webhook event payload for the
+current workflow run to a JSON file. All of the information needed
+to determine a diffbase is contained in that payload, so (unlike
+:class:`~ci_diff_helper.travis.Travis` and
+:class:`~ci_diff_helper.circle_ci.CircleCI`) no GitHub API requests
+are made and no ``git`` processes are spawned.
+
+This module uses a selection of environment variables to detect
+the state of GitHub Actions configuration. See
+:mod:`~ci_diff_helper.environment_vars` for more details.
+
+:class:`GitHubActions` Configuration Type
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+When running in GitHub Actions, you can automatically detect your
+current environment and get the configuration object:
+
+.. testsetup:: auto-detect
+
+  import os
+  os.environ = {
+      'GITHUB_ACTIONS': 'true',
+  }
+
+.. doctest:: auto-detect
+
+  >>> import ci_diff_helper
+  >>> config = ci_diff_helper.get_config()
+  >>> config
+  <GitHubActions (active=True)>
+
+To use the :class:`GitHubActions` configuration type directly:
+
+.. testsetup:: github-actions-pr
+
+  import json
+  import os
+  import tempfile
+
+  payload = {
+      'number': 1234,
+      'pull_request': {
+          'number': 1234,
+          'base': {
+              'ref': 'master',
+              'sha': '7450ebe1a2133442098faa07f3c2c08b612d75f5',
+          },
+      },
+  }
+  _, event_path = tempfile.mkstemp(suffix='.json')
+  with open(event_path, 'w') as file_obj:
+      json.dump(payload, file_obj)
+
+  os.environ = {
+      'GITHUB_ACTIONS': 'true',
+      'GITHUB_EVENT_NAME': 'pull_request',
+      'GITHUB_EVENT_PATH': event_path,
+      'GITHUB_REF': 'refs/pull/1234/merge',
+      'GITHUB_BASE_REF': 'master',
+      'GITHUB_REPOSITORY': 'organization/repository',
+  }
+  import ci_diff_helper
+
+.. testcleanup:: github-actions-pr
+
+  os.remove(event_path)
+
+.. doctest:: github-actions-pr
+
+  >>> config = ci_diff_helper.GitHubActions()
+  >>> config
+  <GitHubActions (active=True)>
+  >>> config.event_name
+  'pull_request'
+  >>> config.in_pr
+  True
+  >>> config.pr
+  1234
+  >>> config.branch
+  'master'
+  >>> config.slug
+  'organization/repository'
+  >>> config.repo_url
+  'https://github.com/organization/repository'
+  >>> config.base
+  '7450ebe1a2133442098faa07f3c2c08b612d75f5'
+
+In a "push" build, the diffbase is the commit that the branch
+pointed to before the push:
+
+.. testsetup:: github-actions-push
+
+  import json
+  import os
+  import tempfile
+
+  payload = {
+      'before': '4ad7349dc7223ebc02175a16dc577a013044a538',
+      'head_commit': {
+          'message': (
+              'Merge pull request #1355 from queso/cheese\\n\\n'
+              'Adding cheese.'),
+      },
+  }
+  _, event_path = tempfile.mkstemp(suffix='.json')
+  with open(event_path, 'w') as file_obj:
+      json.dump(payload, file_obj)
+
+  os.environ = {
+      'GITHUB_ACTIONS': 'true',
+      'GITHUB_EVENT_NAME': 'push',
+      'GITHUB_EVENT_PATH': event_path,
+      'GITHUB_REF': 'refs/heads/master',
+  }
+  import ci_diff_helper
+
+.. testcleanup:: github-actions-push
+
+  os.remove(event_path)
+
+.. doctest:: github-actions-push
+
+  >>> config = ci_diff_helper.GitHubActions()
+  >>> config.in_pr
+  False
+  >>> config.pr is None
+  True
+  >>> config.branch
+  'master'
+  >>> config.tag is None
+  True
+  >>> config.base
+  '4ad7349dc7223ebc02175a16dc577a013044a538'
+  >>> config.merged_pr
+  1355
+"""
+
+import io
+import json
+import os
+
+from ci_diff_helper import _config_base
+from ci_diff_helper import _utils
+from ci_diff_helper import environment_vars as env
+
+
+_PR_EVENTS = ('pull_request', 'pull_request_target')
+_PUSH_EVENT = 'push'
+_HEADS_PREFIX = 'refs/heads/'
+_TAGS_PREFIX = 'refs/tags/'
+_MERGE_PREFIX = 'Merge pull request #'
+_NULL_SHA = '0' * 40
+_EVENT_NAME_TEMPLATE = (
+    'GitHub Actions build does not have an event name set (via {})')
+_EVENT_PATH_TEMPLATE = (
+    'GitHub Actions build does not have an event payload (via {})')
+_REF_TEMPLATE = (
+    'GitHub Actions build does not have a git ref set (via {})')
+_SLUG_TEMPLATE = (
+    'GitHub Actions build does not have a repo slug set (via {})')
+_URL_TEMPLATE = 'https://github.com/{}'
+
+
+def _event_name():
+    """Get the name of the event that triggered the current build.
+
+    Returns:
+        str: The event name (e.g. ``push`` or ``pull_request``).
+
+    Raises:
+        OSError: If the ``GITHUB_EVENT_NAME`` environment variable
+            isn't set during a GitHub Actions build.
+    """
+    try:
+        return os.environ[env.GITHUB_ACTIONS_EVENT_NAME]
+    except KeyError as exc:
+        msg = _EVENT_NAME_TEMPLATE.format(env.GITHUB_ACTIONS_EVENT_NAME)
+        raise OSError(exc, msg)
+
+
+def _event_payload():
+    """Load the webhook event payload for the current build.
+
+    Returns:
+        dict: The parsed JSON payload.
+
+    Raises:
+        OSError: If the ``GITHUB_EVENT_PATH`` environment variable
+            isn't set during a GitHub Actions build.
+    """
+    try:
+        event_path = os.environ[env.GITHUB_ACTIONS_EVENT_PATH]
+    except KeyError as exc:
+        msg = _EVENT_PATH_TEMPLATE.format(env.GITHUB_ACTIONS_EVENT_PATH)
+        raise OSError(exc, msg)
+
+    with io.open(event_path, 'r', encoding='utf-8') as file_obj:
+        return json.load(file_obj)
+
+
+def _github_ref():
+    """Get the fully-formed ``git`` ref that triggered the current build.
+
+    Returns:
+        str: The ``git`` ref (e.g. ``refs/heads/master``).
+
+    Raises:
+        OSError: If the ``GITHUB_REF`` environment variable isn't set
+            during a GitHub Actions build.
+    """
+    try:
+        return os.environ[env.GITHUB_ACTIONS_REF]
+    except KeyError as exc:
+        msg = _REF_TEMPLATE.format(env.GITHUB_ACTIONS_REF)
+        raise OSError(exc, msg)
+
+
+def _split_ref(ref):
+    """Split a fully-formed ``git`` ref into a short name.
+
+    Strips the ``refs/heads/`` or ``refs/tags/`` prefix from ``ref``
+    (e.g. from the ``GITHUB_REF`` environment variable).
+
+    Args:
+        ref (str): A fully-formed ``git`` ref.
+
+    Returns:
+        Tuple[str, bool]: Pair of the short ref name and a flag indicating
+            if the ref is a tag.
+    """
+    if ref.startswith(_TAGS_PREFIX):
+        return ref[len(_TAGS_PREFIX):], True
+    elif ref.startswith(_HEADS_PREFIX):
+        return ref[len(_HEADS_PREFIX):], False
+    else:
+        return ref, False
+
+
+def _github_actions_slug():
+    """Get the GitHub repo slug for the current build.
+
+    Of the form ``{organization}/{repository}``.
+
+    Returns:
+        str: The slug for the current build.
+
+    Raises:
+        OSError: If the ``GITHUB_REPOSITORY`` environment variable
+            isn't set during a GitHub Actions build.
+    """
+    try:
+        return os.environ[env.GITHUB_ACTIONS_REPO]
+    except KeyError as exc:
+        msg = _SLUG_TEMPLATE.format(env.GITHUB_ACTIONS_REPO)
+        raise OSError(exc, msg)
+
+
+class GitHubActions(_config_base.Config):
+    """Represent GitHub Actions state and cache return values."""
+
+    # Default instance attributes.
+    _base = _utils.UNSET
+    _event = _utils.UNSET
+    _event_name = _utils.UNSET
+    _merged_pr = _utils.UNSET
+    _pr = _utils.UNSET
+    _repo_url = _utils.UNSET
+    _slug = _utils.UNSET
+    # Class attributes.
+    _active_env_var = env.IN_GITHUB_ACTIONS
+    _branch_env_var = env.GITHUB_ACTIONS_BASE_REF
+
+    @property
+    def event(self):
+        """dict: The webhook event payload for the current build.
+
+        The payload is read from the file at ``GITHUB_EVENT_PATH`` the
+        first time it is needed and then cached.
+        """
+        if self._event is _utils.UNSET:
+            self._event = _event_payload()
+        return self._event
+
+    @property
+    def event_name(self):
+        """str: The name of the event that triggered the current build."""
+        if self._event_name is _utils.UNSET:
+            self._event_name = _event_name()
+        return self._event_name
+
+    @property
+    def in_pr(self):
+        """bool: Indicates if currently running in a pull request build.
+
+        This uses the ``GITHUB_EVENT_NAME`` environment variable to check
+        if currently in a pull request.
+        """
+        return self.event_name in _PR_EVENTS
+
+    @property
+    def branch(self):
+        """str: Indicates the current branch in GitHub Actions.
+
+        In a pull request build, this is the base branch of the pull
+        request (from ``GITHUB_BASE_REF``). Otherwise, it is the branch
+        (or tag) name from ``GITHUB_REF``.
+        """
+        if self._branch is _utils.UNSET:
+            if self.in_pr:
+                self._branch = super(GitHubActions, self).branch
+            else:
+                self._branch, _ = _split_ref(_github_ref())
+        return self._branch
+
+    @property
+    def tag(self):
+        """str: The ``git`` tag of the current GitHub Actions build.
+
+        .. note::
+
+            This is determined from the ``GITHUB_REF`` environment
+            variable, which only refers to a tag when the build was
+            started by a pushed tag.
+        """
+        if self._tag is _utils.UNSET:
+            ref = os.getenv(env.GITHUB_ACTIONS_REF, '')
+            ref_name, is_tag = _split_ref(ref)
+            if is_tag:
+                self._tag = ref_name
+            else:
+                self._tag = None
+        return self._tag
+
+    @property
+    def pr(self):
+        """int: The current pull request (if any).
+
+        If there is no active pull request, returns :data:`None`.
+        """
+        if self._pr is _utils.UNSET:
+            if self.in_pr:
+                self._pr = self.event['pull_request']['number']
+            else:
+                self._pr = None
+        return self._pr
+
+    @property
+    def slug(self):
+        """str: The current slug in the GitHub Actions build.
+
+        Of the form ``{organization}/{repository}``.
+        """
+        if self._slug is _utils.UNSET:
+            self._slug = _github_actions_slug()
+        return self._slug
+
+    @property
+    def repo_url(self):
+        """str: The URL of the current repository being built.
+
+        Of the form ``https://github.com/{organization}/{repository}``.
+        """
+        if self._repo_url is _utils.UNSET:
+            self._repo_url = _URL_TEMPLATE.format(self.slug)
+        return self._repo_url
+
+    @property
+    def base(self):
+        """str: The ``git`` object that current build is changed against.
+
+        In a pull request build, this is the SHA of the base commit from
+        the event payload. In a "push" build, this is the commit the
+        branch pointed to before the push.
+
+        .. note::
+
+            This will throw an :exc:`OSError` on the very first "push"
+            build for a branch, since there is no previous commit.
+
+        .. warning::
+
+            This property is only meant to be used in a "pull request" or
+            "push" build.
+        """
+        if self._base is not _utils.UNSET:
+            return self._base
+
+        event = self.event
+        if self.in_pr:
+            try:
+                self._base = event['pull_request']['base']['sha']
+            except KeyError:
+                raise KeyError(
+                    'Missing key in the event payload',
+                    'expected pull_request->base->sha', event)
+        elif self.event_name == _PUSH_EVENT:
+            before = event.get('before')
+            if before is None or before == _NULL_SHA:
+                raise OSError(
+                    None, 'Push event has no previous commit', before)
+            self._base = before
+        else:
+            raise NotImplementedError(
+                'Diff base only supported in "push" or "pull_request"',
+                self.event_name)
+
+        return self._base
+
+    @property
+    def merged_pr(self):
+        """int: The pull request corresponding to a merge commit at HEAD.
+
+        If not currently in a push build, returns :data:`None`. If
+        the HEAD commit is not a merge commit, returns :data:`None`.
+
+        .. note::
+
+            This only uses the subject of the head commit in the event
+            payload to determine the pull request ID, so it will only
+            detect pull requests merged with a merge commit.
+
+        .. warning::
+
+            This property is only meant to be used in a "pull request" or
+            "push" build.
+        """
+        if self._merged_pr is not _utils.UNSET:
+            return self._merged_pr
+
+        if self.in_pr:
+            self._merged_pr = None
+        elif self.event_name == _PUSH_EVENT:
+            head_commit = self.event.get('head_commit') or {}
+            message = head_commit.get('message', '')
+            subject = message.split('\n', 1)[0]
+            if subject.startswith(_MERGE_PREFIX):
+                self._merged_pr = _utils.pr_from_commit(subject)
+            else:
+                self._merged_pr = None
+        else:
+            raise NotImplementedError
+        return self._merged_pr
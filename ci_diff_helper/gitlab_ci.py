@@ -0,0 +1,311 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Set of utilities for dealing with GitLab CI.
+
+This module provides a custom configuration type
+:class:`GitLabCI` for the `GitLab CI`_ CI system.
+
+.. _GitLab CI: https://docs.gitlab.com/ee/ci/
+
+GitLab CI exports predefined variables which give the diffbase
+directly (for both merge request and "push" pipelines), so no
+network calls are made and no merge base is computed.
+
+This module uses a selection of environment variables to detect
+the state of GitLab CI configuration. See
+:mod:`~ci_diff_helper.environment_vars` for more details.
+
+:class:`GitLabCI` Configuration Type
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+When running in GitLab CI, you can automatically detect your
+current environment and get the configuration object:
+
+.. testsetup:: auto-detect
+
+  import os
+  os.environ = {
+      'GITLAB_CI': 'true',
+  }
+
+.. doctest:: auto-detect
+
+  >>> import ci_diff_helper
+  >>> config = ci_diff_helper.get_config()
+  >>> config
+  <GitLabCI (active=True)>
+
+To use the :class:`GitLabCI` configuration type directly:
+
+.. testsetup:: gitlab-ci-mr
+
+  import os
+  os.environ = {
+      'GITLAB_CI': 'true',
+      'CI_COMMIT_REF_NAME': 'feature',
+      'CI_MERGE_REQUEST_IID': '42',
+      'CI_MERGE_REQUEST_DIFF_BASE_SHA': (
+          '7450ebe1a2133442098faa07f3c2c08b612d75f5'),
+      'CI_MERGE_REQUEST_TARGET_BRANCH_NAME': 'master',
+      'CI_PROJECT_PATH': 'group/project',
+      'CI_PROJECT_URL': 'https://gitlab.com/group/project',
+  }
+  import ci_diff_helper
+
+.. doctest:: gitlab-ci-mr
+
+  >>> config = ci_diff_helper.GitLabCI()
+  >>> config
+  <GitLabCI (active=True)>
+  >>> config.in_pr
+  True
+  >>> config.pr
+  42
+  >>> config.branch
+  'master'
+  >>> config.slug
+  'group/project'
+  >>> config.repo_url
+  'https://gitlab.com/group/project'
+  >>> config.base
+  '7450ebe1a2133442098faa07f3c2c08b612d75f5'
+
+In a "push" pipeline, the diffbase is the commit that the branch
+pointed to before the push:
+
+.. testsetup:: gitlab-ci-push
+
+  import os
+  os.environ = {
+      'GITLAB_CI': 'true',
+      'CI_COMMIT_REF_NAME': 'master',
+      'CI_COMMIT_BEFORE_SHA': '4ad7349dc7223ebc02175a16dc577a013044a538',
+  }
+  import ci_diff_helper
+
+.. doctest:: gitlab-ci-push
+
+  >>> config = ci_diff_helper.GitLabCI()
+  >>> config.in_pr
+  False
+  >>> config.pr is None
+  True
+  >>> config.branch
+  'master'
+  >>> config.tag is None
+  True
+  >>> config.base
+  '4ad7349dc7223ebc02175a16dc577a013044a538'
+"""
+
+import os
+
+from ci_diff_helper import _config_base
+from ci_diff_helper import _utils
+from ci_diff_helper import environment_vars as env
+
+
+_NULL_SHA = '0' * 40
+_TARGET_BRANCH_TEMPLATE = (
+    'GitLab CI merge request does not have a target branch set (via {})')
+_SLUG_TEMPLATE = (
+    'GitLab CI build does not have a project path set (via {})')
+_REPO_URL_TEMPLATE = (
+    'GitLab CI build does not have a project URL set (via {})')
+
+
+def _gitlab_ci_mr():
+    """Get the current GitLab CI merge request (if any).
+
+    Returns:
+        Optional[int]: The current merge request ID.
+    """
+    try:
+        return int(os.getenv(env.GITLAB_CI_MR, ''))
+    except ValueError:
+        return None
+
+
+def _get_sha(env_var):
+    """Get a commit SHA from the environment.
+
+    Args:
+        env_var (str): The environment variable which holds the SHA.
+
+    Returns:
+        Optional[str]: The commit SHA. If the environment variable
+            is unset, empty or all zeros (GitLab's value for a missing
+            commit), returns :data:`None`.
+    """
+    sha = os.getenv(env_var, '')
+    if sha in ('', _NULL_SHA):
+        return None
+    return sha
+
+
+def _mr_base():
+    """Get the diffbase for a GitLab CI merge request pipeline.
+
+    Prefers the diff base SHA computed by GitLab and falls back
+    to the name of the target branch.
+
+    Returns:
+        str: The ``git`` object that the merge request is changed against.
+
+    Raises:
+        OSError: If neither ``CI_MERGE_REQUEST_DIFF_BASE_SHA`` nor
+            ``CI_MERGE_REQUEST_TARGET_BRANCH_NAME`` is set.
+    """
+    diff_base = _get_sha(env.GITLAB_CI_MR_DIFF_BASE)
+    if diff_base is not None:
+        return diff_base
+
+    target_branch = os.getenv(env.GITLAB_CI_MR_TARGET, '')
+    if target_branch == '':
+        raise OSError(None, 'Merge request pipeline has no diff base',
+                      env.GITLAB_CI_MR_DIFF_BASE, env.GITLAB_CI_MR_TARGET)
+    return target_branch
+
+
+def _push_base():
+    """Get the diffbase for a GitLab CI "push" pipeline.
+
+    .. note::
+
+        This will throw an :exc:`OSError` on the very first pipeline
+        for a branch. This is because GitLab sets the value to all zeros
+        in pipelines for the initial push of a new branch.
+
+    Returns:
+        str: The commit SHA the branch pointed to before the push.
+
+    Raises:
+        OSError: If ``CI_COMMIT_BEFORE_SHA`` is not a valid commit.
+    """
+    before = _get_sha(env.GITLAB_CI_BEFORE)
+    if before is None:
+        raise OSError(None, 'Push pipeline has no previous commit',
+                      env.GITLAB_CI_BEFORE)
+    return before
+
+
+def _required_env(env_var, template):
+    """Get a required value from the environment.
+
+    Args:
+        env_var (str): The environment variable which holds the value.
+        template (str): Template for the error message, formatted
+            with ``env_var``.
+
+    Returns:
+        str: The value of the environment variable.
+
+    Raises:
+        OSError: If the environment variable isn't set.
+    """
+    try:
+        return os.environ[env_var]
+    except KeyError as exc:
+        raise OSError(exc, template.format(env_var))
+
+
+class GitLabCI(_config_base.Config):
+    """Represent GitLab CI state and cache return values."""
+
+    # Default instance attributes.
+    _base = _utils.UNSET
+    _pr = _utils.UNSET
+    _repo_url = _utils.UNSET
+    _slug = _utils.UNSET
+    # Class attributes.
+    _active_env_var = env.IN_GITLAB_CI
+    _branch_env_var = env.GITLAB_CI_BRANCH
+    _shard_index_env_var = env.GITLAB_CI_NODE_INDEX
+    # NOTE: ``CI_NODE_INDEX`` is one-based.
+    _shard_index_offset = 1
+    _shard_total_env_var = env.GITLAB_CI_NODE_TOTAL
+    _tag_env_var = env.GITLAB_CI_TAG
+
+    @property
+    def pr(self):
+        """int: The current GitLab CI merge request (if any).
+
+        If there is no active merge request, returns :data:`None`.
+        """
+        if self._pr is _utils.UNSET:
+            self._pr = _gitlab_ci_mr()
+        return self._pr
+
+    @property
+    def in_pr(self):
+        """bool: Indicates if currently running in a merge request pipeline.
+
+        This uses the ``CI_MERGE_REQUEST_IID`` environment variable to
+        check if currently in a merge request.
+        """
+        return self.pr is not None
+
+    @property
+    def branch(self):
+        """str: Indicates the current branch in GitLab CI.
+
+        In a merge request pipeline, this is the target branch of the
+        merge request (from ``CI_MERGE_REQUEST_TARGET_BRANCH_NAME``).
+        Otherwise, it is the branch or tag being built.
+        """
+        if self._branch is _utils.UNSET:
+            if self.in_pr:
+                self._branch = _required_env(
+                    env.GITLAB_CI_MR_TARGET, _TARGET_BRANCH_TEMPLATE)
+            else:
+                self._branch = super(GitLabCI, self).branch
+        return self._branch
+
+    @property
+    def slug(self):
+        """str: The current slug in the GitLab CI build.
+
+        Of the form ``{namespace}/{project}``.
+        """
+        if self._slug is _utils.UNSET:
+            self._slug = _required_env(env.GITLAB_CI_SLUG, _SLUG_TEMPLATE)
+        return self._slug
+
+    @property
+    def repo_url(self):
+        """str: The URL of the current project being built."""
+        if self._repo_url is _utils.UNSET:
+            self._repo_url = _required_env(
+                env.GITLAB_CI_REPO_URL, _REPO_URL_TEMPLATE)
+        return self._repo_url
+
+    @property
+    def base(self):
+        """str: The ``git`` object that current build is changed against.
+
+        In a merge request pipeline, this is the diff base SHA computed
+        by GitLab (or the target branch, if that SHA is not available).
+        In a "push" pipeline, this is the commit the branch pointed to
+        before the push.
+
+        .. note::
+
+            This will throw an :exc:`OSError` on the very first "push"
+            pipeline for a branch, since there is no previous commit.
+        """
+        if self._base is _utils.UNSET:
+            if self.in_pr:
+                self._base = _mr_base()
+            else:
+                self._base = _push_base()
+        return self._base
@@ -0,0 +1,484 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Find the tests impacted by a change via the Python import graph.
+
+An :class:`ImportGraph` records which modules each checked in ``.py``
+file imports, so it can find the test modules that (transitively)
+import a changed module:
+
+.. code-block:: python
+
+  config = ci_diff_helper.get_config()
+  graph = ImportGraph.build(cache_filename='.import-cache.json')
+  tests = graph.impacted_tests_since(config.base)
+  # e.g. run ``py.test`` with ``tests``
+
+Files are parsed with :mod:`ast` in a pool of worker processes. The
+imports found in each file are cached by ``git`` blob SHA, so after
+the first build only files whose contents changed are parsed again.
+(Files with uncommitted changes are parsed every time.)
+
+The graph is static: imports done dynamically (e.g. with
+:func:`importlib.import_module`) are not found. A test file that can't
+be parsed is always considered impacted. So is every test file in (or
+below) the directory of an impacted ``conftest.py``, since ``py.test``
+loads it for each of them.
+"""
+
+import ast
+import collections
+import io
+import json
+import multiprocessing
+import os
+import posixpath
+
+import six
+
+from ci_diff_helper import _utils
+from ci_diff_helper import git_tools
+
+
+_VERSION = 1
+_MIN_POOL_SIZE = 64
+"""The smallest number of files worth parsing in worker processes."""
+_PY_EXTENSION = '.py'
+_PACKAGE_INIT = '__init__'
+_CONFTEST = 'conftest.py'
+
+
+def is_test_path(path):
+    """Checks if a path is a test module, using ``py.test`` defaults.
+
+    Args:
+        path (str): A file path, using ``/`` as separator.
+
+    Returns:
+        bool: Flag indicating if the file is named ``test_*.py`` or
+        ``*_test.py``.
+    """
+    name = posixpath.basename(path)
+    return name.endswith(_PY_EXTENSION) and (
+        name.startswith('test_') or name.endswith('_test.py'))
+
+
+def parse_imports(source):
+    """Find the imports in Python source code.
+
+    Args:
+        source (bytes): The contents of a Python file.
+
+    Returns:
+        Optional[list]: List of ``[level, module, names]`` triples, one
+        for each imported module. ``level`` is the number of leading dots
+        in a relative import, ``module`` may be :data:`None` (e.g. for
+        ``from . import x``) and ``names`` are the names imported from
+        the module (:data:`None` for a plain ``import``). Returns
+        :data:`None` if the source can't be parsed.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, TypeError):
+        return None
+
+    result = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                result.append([0, alias.name, None])
+        elif isinstance(node, ast.ImportFrom):
+            names = [alias.name for alias in node.names]
+            result.append([node.level or 0, node.module, names])
+    return result
+
+
+def _parse_file(args):
+    """Parse the imports in a file (in a worker process).
+
+    Args:
+        args (tuple): Pair of a key (e.g. a blob SHA) and a filename.
+
+    Returns:
+        tuple: Pair of the key and the result of :func:`parse_imports`.
+    """
+    key, filename = args
+    with open(filename, 'rb') as file_obj:
+        return key, parse_imports(file_obj.read())
+
+
+def _parse_all(to_parse, processes):
+    """Parse the imports in a collection of files.
+
+    Args:
+        to_parse (list): Pairs of a key (e.g. a blob SHA) and a filename.
+        processes (Optional[int]): The number of worker processes. If
+            :data:`None`, uses the number of CPUs.
+
+    Returns:
+        dict: Mapping of key to the result of :func:`parse_imports`.
+    """
+    if processes == 1 or len(to_parse) < _MIN_POOL_SIZE:
+        return dict(_parse_file(args) for args in to_parse)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes=processes)
+    try:
+        chunksize = max(1, len(to_parse) // (4 * processes))
+        return dict(pool.imap_unordered(
+            _parse_file, to_parse, chunksize=chunksize))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def module_name(path, source_roots=('',)):
+    """Get the name of the module in a Python file.
+
+    Args:
+        path (str): A ``.py`` file path, relative to the repository root
+            and using ``/`` as separator.
+        source_roots (Optional[Sequence[str]]): Directories (relative to
+            the repository root) that contain top-level packages, e.g.
+            ``src``. The deepest root containing the file is used.
+
+    Returns:
+        Tuple[str, bool]: Pair of the dotted module name and a flag
+        indicating if the module is a package (i.e. an ``__init__.py``).
+    """
+    best_root = ''
+    for root in source_roots:
+        root = root.strip('/')
+        if (root and path.startswith(root + '/') and
+                len(root) > len(best_root)):
+            best_root = root
+    if best_root:
+        path = path[len(best_root) + 1:]
+
+    parts = path[:-len(_PY_EXTENSION)].split('/')
+    is_package = parts[-1] == _PACKAGE_INIT
+    if is_package:
+        parts.pop()
+    return '.'.join(parts), is_package
+
+
+def _candidates(name, is_package, record):
+    """Get the absolute module names that an import record may refer to.
+
+    Args:
+        name (str): The name of the importing module.
+        is_package (bool): Flag indicating if the importing module is a
+            package.
+        record (list): A ``[level, module, names]`` triple from
+            :func:`parse_imports`.
+
+    Returns:
+        list: The possible module names.
+    """
+    level, module, names = record
+    if level:
+        parts = name.split('.') if name else []
+        if not is_package:
+            parts = parts[:-1]
+        if level > 1:
+            parts = parts[:-(level - 1)]
+        if module:
+            parts.append(module)
+        base = '.'.join(parts)
+    else:
+        base = module
+
+    result = [base] if base else []
+    for imported in names or ():
+        if imported != '*':
+            result.append(base + '.' + imported if base else imported)
+    return result
+
+
+def _load_cache(cache_filename):
+    """Load the cached imports for each blob SHA.
+
+    Args:
+        cache_filename (Optional[str]): The cache file.
+
+    Returns:
+        dict: Mapping of blob SHA to the result of :func:`parse_imports`.
+        Empty if there is no (usable) cache.
+    """
+    if cache_filename is None or not os.path.exists(cache_filename):
+        return {}
+    with io.open(cache_filename, 'r', encoding='utf-8') as file_obj:
+        try:
+            cached = json.load(file_obj)
+        except ValueError:
+            return {}
+    if cached.get('version') != _VERSION:
+        return {}
+    return cached['blobs']
+
+
+def _save_cache(cache_filename, blobs):
+    """Save the imports for each blob SHA.
+
+    Args:
+        cache_filename (str): The cache file.
+        blobs (dict): Mapping of blob SHA to the result of
+            :func:`parse_imports`.
+    """
+    serialized = json.dumps({'version': _VERSION, 'blobs': blobs})
+    with io.open(cache_filename, 'w', encoding='utf-8') as file_obj:
+        file_obj.write(six.text_type(serialized))
+
+
+class ImportGraph(object):
+    """Graph of the imports between the Python modules in a repository.
+
+    Args:
+        paths (dict): Mapping of module names to their file paths
+            (relative to the repository root).
+        imports (dict): Mapping of module names to the names of the
+            modules (in ``paths``) they import.
+        unparsed (Optional[Iterable[str]]): The names of modules that
+            could not be parsed.
+    """
+
+    def __init__(self, paths, imports, unparsed=()):
+        self.paths = paths
+        self.imports = imports
+        self.unparsed = frozenset(unparsed)
+        self._by_path = {path: name for name, path in six.iteritems(paths)}
+        self._importers = collections.defaultdict(set)
+        for name, imported in six.iteritems(imports):
+            for dependency in imported:
+                self._importers[dependency].add(name)
+
+    @classmethod
+    def from_records(cls, records, source_roots=('',)):
+        """Build a graph from the parsed imports of each file.
+
+        Args:
+            records (dict): Mapping of ``.py`` file paths (relative to
+                the repository root, using ``/`` as separator) to the
+                result of :func:`parse_imports` for the file.
+            source_roots (Optional[Sequence[str]]): Directories that
+                contain top-level packages. See :func:`module_name`.
+
+        Returns:
+            ImportGraph: The graph.
+
+        Raises:
+            ValueError: If two files have the same module name (e.g. the
+                same path under two source roots).
+        """
+        names = {}
+        paths = {}
+        for path in sorted(records):
+            names[path] = module_name(path, source_roots=source_roots)
+            name = names[path][0]
+            if name in paths:
+                raise ValueError('Files have the same module name', name,
+                                 [paths[name], path])
+            paths[name] = path
+
+        imports = {}
+        unparsed = []
+        for path, file_records in six.iteritems(records):
+            name, is_package = names[path]
+            if file_records is None:
+                unparsed.append(name)
+                file_records = ()
+
+            imported = set()
+            for record in file_records:
+                for candidate in _candidates(name, is_package, record):
+                    # Importing ``a.b.c`` also imports ``a`` and ``a.b``.
+                    parts = candidate.split('.')
+                    for end in six.moves.range(1, len(parts) + 1):
+                        prefix = '.'.join(parts[:end])
+                        if prefix in paths:
+                            imported.add(prefix)
+            imported.discard(name)
+            imports[name] = imported
+
+        return cls(paths, imports, unparsed=unparsed)
+
+    @classmethod
+    def build(cls, source_roots=('',), cache_filename=None, processes=None):
+        """Build the graph for the checked in files in a ``git`` checkout.
+
+        Args:
+            source_roots (Optional[Sequence[str]]): Directories that
+                contain top-level packages. See :func:`module_name`.
+            cache_filename (Optional[str]): A file used to cache the
+                parsed imports (by blob SHA) across builds.
+            processes (Optional[int]): The number of worker processes to
+                parse files with. Defaults to the number of CPUs.
+
+        Returns:
+            ImportGraph: The graph.
+
+        Raises:
+            ValueError: If two files have the same module name. See
+                :meth:`from_records`.
+        """
+        root_dir = git_tools.git_root()
+        modified = set(git_tools.get_modified_files())
+        keys = {}
+        clean_blobs = set()
+        for filename, blob_sha in six.iteritems(
+                git_tools.get_checked_in_blobs()):
+            if not filename.endswith(_PY_EXTENSION):
+                continue
+            path = os.path.relpath(filename, root_dir).replace(os.sep, '/')
+            if filename not in modified:
+                keys[path] = (blob_sha, filename)
+                clean_blobs.add(blob_sha)
+            elif os.path.exists(filename):
+                # NOTE: The contents don't match the blob SHA, so they
+                #       are keyed by filename and never cached.
+                keys[path] = (filename, filename)
+
+        cached = _load_cache(cache_filename)
+        to_parse = set()
+        for key, filename in six.itervalues(keys):
+            if key not in cached:
+                to_parse.add((key, filename))
+        parsed = dict(cached)
+        parsed.update(_parse_all(sorted(to_parse), processes))
+
+        records = {path: parsed[key]
+                   for path, (key, _) in six.iteritems(keys)}
+        if cache_filename is not None and clean_blobs.difference(cached):
+            # Only keep entries for current blobs, so the cache doesn't
+            # grow without bound.
+            _save_cache(cache_filename, {
+                blob_sha: parsed[blob_sha] for blob_sha in clean_blobs})
+        return cls.from_records(records, source_roots=source_roots)
+
+    def dependents(self, names):
+        """Get the modules that (transitively) import some modules.
+
+        Args:
+            names (Iterable[str]): Module names.
+
+        Returns:
+            set: The names of the importing modules, along with the
+            given modules.
+        """
+        seen = set(names)
+        to_visit = list(seen)
+        while to_visit:
+            for importer in self._importers.get(to_visit.pop(), ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    to_visit.append(importer)
+        return seen
+
+    def dependencies(self, names):
+        """Get the modules that some modules (transitively) import.
+
+        Args:
+            names (Iterable[str]): Module names.
+
+        Returns:
+            set: The names of the imported modules, along with the given
+            modules.
+        """
+        seen = set(names)
+        to_visit = list(seen)
+        while to_visit:
+            for imported in self.imports.get(to_visit.pop(), ()):
+                if imported not in seen:
+                    seen.add(imported)
+                    to_visit.append(imported)
+        return seen
+
+    def dependency_paths(self, path):
+        """Get the files that a file (transitively) imports.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+
+        Returns:
+            list: The sorted paths of the imported modules (not
+            including ``path``). Empty if ``path`` is not a module in
+            the graph.
+        """
+        name = self._by_path.get(path.replace(os.sep, '/'))
+        if name is None:
+            return []
+        names = self.dependencies([name])
+        names.discard(name)
+        return sorted(self.paths[imported] for imported in names)
+
+    def impacted_tests(self, changed_paths, is_test=is_test_path):
+        """Get the test files impacted by changes to some files.
+
+        Args:
+            changed_paths (Iterable[str]): File paths, relative to the
+                repository root, e.g. from
+                :func:`.git_tools.get_changed_files`. Files that aren't
+                Python modules in the graph are ignored.
+            is_test (Optional[Callable[[str], bool]]): Determines if a
+                file path is a test module. Defaults to
+                :func:`is_test_path`.
+
+        Returns:
+            list: The sorted paths of the test files that import (even
+            indirectly) a changed module, along with changed test files,
+            test files that could not be parsed and test files in the
+            directory tree of an impacted ``conftest.py``.
+        """
+        changed = set()
+        for path in changed_paths:
+            name = self._by_path.get(path.replace(os.sep, '/'))
+            if name is not None:
+                changed.add(name)
+
+        impacted = self.dependents(changed)
+        impacted.update(self.unparsed)
+        impacted_paths = set(self.paths[name] for name in impacted)
+        conftest_dirs = [
+            posixpath.dirname(path) for path in impacted_paths
+            if posixpath.basename(path) == _CONFTEST]
+        if conftest_dirs:
+            for path in six.itervalues(self.paths):
+                if any(not directory or path.startswith(directory + '/')
+                       for directory in conftest_dirs):
+                    impacted_paths.add(path)
+
+        return sorted(path for path in impacted_paths if is_test(path))
+
+    def impacted_tests_since(self, blob_name, head='HEAD',
+                             is_test=is_test_path):
+        """Get the test files impacted by the changes since a revision.
+
+        Args:
+            blob_name (str): A ``git`` object reference, e.g. the
+                ``base`` of the current CI config. If it is
+                :data:`~ci_diff_helper.FULL_BUILD` (the diff is unknown),
+                every test file in the graph is impacted.
+            head (Optional[str]): The ``git`` object reference with the
+                changes.
+            is_test (Optional[Callable[[str], bool]]): Determines if a
+                file path is a test module.
+
+        Returns:
+            list: The sorted paths of the impacted test files.
+        """
+        if blob_name is _utils.FULL_BUILD:
+            return sorted(
+                path for path in six.itervalues(self.paths) if is_test(path))
+
+        changed = git_tools.get_changed_files(head, blob_name)
+        return self.impacted_tests(changed, is_test=is_test)
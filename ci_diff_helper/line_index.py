@@ -0,0 +1,188 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Index of the lines changed between two revisions.
+
+A :class:`LineIndex` answers "did this change touch line ``N`` of this
+file?", e.g. to only report lint findings on lines a PR changed:
+
+.. code-block:: python
+
+  config = ci_diff_helper.get_config()
+  index = LineIndex.from_diff(config.base, 'HEAD')
+  if index.is_changed('pkg/module.py', 42):
+      ...
+
+The index is built by streaming a zero-context patch (see
+:func:`.git_tools.iter_changed_hunks`), so the patch itself is never
+held in memory. For each file, the changed lines on the "new" side of
+the diff are stored as merged, sorted intervals in two compact
+:class:`array.array` objects (first and last lines), and each lookup is
+a single binary search.
+"""
+
+import array
+import bisect
+import os
+
+import six
+
+from ci_diff_helper import git_tools
+
+
+_TYPE_CODE = 'l'
+"""The :mod:`array` type code for line numbers."""
+
+
+class LineIndex(object):
+    """Index of the changed lines in each file.
+
+    Args:
+        ranges (Optional[Iterable[tuple]]): Triples of a file path
+            (relative to the repository root) and the first and last
+            (inclusive) changed lines of a range.
+    """
+
+    def __init__(self, ranges=()):
+        self._starts = {}
+        self._ends = {}
+        for path, first, last in ranges:
+            self.add(path, first, last)
+
+    @classmethod
+    def from_hunks(cls, hunks):
+        """Build an index from the hunks in a diff.
+
+        Only the "new" side of each hunk is used: hunks that only remove
+        lines and deleted files don't add anything.
+
+        Args:
+            hunks (Iterable[tuple]): Hunks, as produced by
+                :func:`.git_tools.parse_hunks`.
+
+        Returns:
+            LineIndex: The index.
+        """
+        index = cls()
+        for _, new_path, _, _, new_start, new_count in hunks:
+            if new_path is not None and new_count:
+                index.add(new_path, new_start, new_start + new_count - 1)
+        return index
+
+    @classmethod
+    def from_diff(cls, blob_name1, blob_name2):
+        """Build an index of the lines changed between two revisions.
+
+        Args:
+            blob_name1 (str): A ``git`` object reference (the "old"
+                side), e.g. the ``base`` of the current CI config.
+            blob_name2 (str): A ``git`` object reference (the "new"
+                side), e.g. ``HEAD``.
+
+        Returns:
+            LineIndex: The index.
+        """
+        return cls.from_hunks(
+            git_tools.iter_changed_hunks(blob_name1, blob_name2))
+
+    def add(self, path, first, last):
+        """Mark a range of lines in a file as changed.
+
+        Ranges are merged with any overlapping or adjacent ranges. Adding
+        ranges in increasing order (as they appear in a diff) is
+        cheapest.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+            first (int): The first changed line.
+            last (int): The last changed line (inclusive).
+
+        Raises:
+            ValueError: If ``last`` is before ``first``.
+        """
+        if last < first:
+            raise ValueError('Empty line range', path, first, last)
+        path = path.replace(os.sep, '/')
+        starts = self._starts.get(path)
+        if starts is None:
+            self._starts[path] = array.array(_TYPE_CODE, [first])
+            self._ends[path] = array.array(_TYPE_CODE, [last])
+            return
+
+        ends = self._ends[path]
+        if first > ends[-1] + 1:
+            starts.append(first)
+            ends.append(last)
+        elif first >= starts[-1]:
+            ends[-1] = max(ends[-1], last)
+        else:
+            self._merge(path, first, last)
+
+    def _merge(self, path, first, last):
+        """Add a range that isn't after the existing ranges of a file.
+
+        Args:
+            path (str): A file path (normalized), already in the index.
+            first (int): The first changed line.
+            last (int): The last changed line (inclusive).
+        """
+        starts = self._starts[path]
+        ends = self._ends[path]
+        # The ranges that overlap or are adjacent to the new range.
+        begin = bisect.bisect_left(ends, first - 1)
+        end = bisect.bisect_right(starts, last + 1)
+        if begin < end:
+            first = min(first, starts[begin])
+            last = max(last, ends[end - 1])
+        starts[begin:end] = array.array(_TYPE_CODE, [first])
+        ends[begin:end] = array.array(_TYPE_CODE, [last])
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __contains__(self, path):
+        return path.replace(os.sep, '/') in self._starts
+
+    def __iter__(self):
+        return iter(sorted(self._starts))
+
+    def is_changed(self, path, line):
+        """Check if a line of a file was changed.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+            line (int): A line number (starting from 1).
+
+        Returns:
+            bool: Flag indicating if the line was changed.
+        """
+        path = path.replace(os.sep, '/')
+        starts = self._starts.get(path)
+        if starts is None:
+            return False
+        position = bisect.bisect_right(starts, line) - 1
+        return position >= 0 and line <= self._ends[path][position]
+
+    def ranges(self, path):
+        """Get the changed line ranges in a file.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+
+        Returns:
+            list: Sorted pairs of the first and last (inclusive) lines of
+            each changed range. Empty if the file has no changed lines.
+        """
+        path = path.replace(os.sep, '/')
+        if path not in self._starts:
+            return []
+        return list(six.moves.zip(self._starts[path], self._ends[path]))
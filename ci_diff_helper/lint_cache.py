@@ -0,0 +1,424 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache linter results for each file, keyed by ``git`` blob SHA.
+
+A linter that reports findings as ``path:line:...`` (e.g.
+``pycodestyle`` or ``pylint``) only needs to run on files whose
+contents (or configuration) changed since the results were cached:
+
+.. code-block:: python
+
+  cache = LintCache(get_cache_dir(), hash_key('pycodestyle', version))
+  keys = cache.keys_for(filenames)
+  hits = cache.lookup(keys)
+  misses = [filename for filename in filenames if filename not in hits]
+  status, lines = run_linter(misses)
+  status, lines = cache.record(
+      filenames, keys, hits, status, lines, file_status)
+  cache.prune()
+  print(cache.report())
+
+Each entry is a small JSON file in the ``entries`` subdirectory of a
+directory (e.g. one restored from a CI cache, which may also hold other
+files). Entries are evicted least recently used first once their total
+size passes a cap; a hit refreshes the entry's modification time.
+
+The key of a file combines a namespace (which should hash the tool
+version and its configuration) with the file's path and blob SHA.
+
+.. note::
+
+    **Invalidation for cross-module checks.** A ``pylint`` result also
+    depends on the modules the file imports (e.g. for ``no-member`` or
+    ``import-error``). Pass ``dependencies`` to
+    :meth:`LintCache.keys_for` (e.g. using
+    :meth:`.ImportGraph.dependency_paths`) so the key also covers the
+    blob SHAs of every module the file transitively imports. Checks
+    that compare *all* linted files with each other (``duplicate-code``
+    and ``cyclic-import``) only see the files that missed the cache:
+    don't cache their findings (see ``cacheable`` in
+    :meth:`LintCache.store`), and use a periodic run with the cache
+    disabled to enforce them.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+
+import six
+
+from ci_diff_helper import git_tools
+
+
+_VERSION = 1
+CACHE_DIR_ENV = 'LINT_CACHE_DIR'
+"""Environment variable that overrides the default cache directory."""
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_ENTRIES_DIR = 'entries'
+_ENTRY_EXTENSION = '.json'
+_FINDING = re.compile(r'^(?P<path>.+?):\d+:')
+_PYLINT_MODULE_HEADER = '*************'
+_REPORT_TEMPLATE = (
+    'Lint cache: {:d} hit(s), {:d} miss(es), {:.1f}% hit rate.')
+
+
+def get_cache_dir():
+    """Get the directory lint results are cached in.
+
+    Returns:
+        str: The value of the ``LINT_CACHE_DIR`` environment variable,
+        if set, else ``.lint_cache`` in the root of the current ``git``
+        checkout.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return cache_dir
+    return os.path.join(git_tools.git_root(), '.lint_cache')
+
+
+def hash_key(*parts):
+    """Hash JSON-compatible values into a cache key.
+
+    Args:
+        parts (tuple): The values to hash.
+
+    Returns:
+        str: The hex SHA-256 of the values.
+    """
+    serialized = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def split_output(lines, filenames, file_status):
+    """Attribute the lines of linter output to the linted files.
+
+    Findings must start with ``path:line:``, where ``path`` names one of
+    the files, either absolute or relative to the current directory
+    (e.g. ``pylint`` reports files passed as absolute paths relative to
+    the directory it runs in). ``pylint`` module headers are attributed
+    to the file of the finding after them.
+
+    .. note::
+
+        The default output format of ``pylint`` 1.x only names the
+        module in its headers, so run it with a ``--msg-template``
+        starting with ``{path}:{line}:``.
+
+    Args:
+        lines (Iterable[str]): The linter output.
+        filenames (Iterable[str]): The linted files.
+        file_status (Callable[[list], int]): Computes the exit status for
+            the (cached form of the) lines of a single file.
+
+    Returns:
+        Tuple[dict, list]: Pair of a mapping from each filename to a
+        cache entry and a list of the lines that weren't attributed to a
+        file (e.g. a summary). An entry has the exit ``status`` and the
+        ``lines`` for the file, with the leading ``path`` removed from
+        findings (so they don't depend on where the files are).
+    """
+    by_file = {filename: [] for filename in filenames}
+    by_abs_path = {os.path.abspath(filename): filename
+                   for filename in by_file}
+    other = []
+    pending = []
+    for line in lines:
+        if line.startswith(_PYLINT_MODULE_HEADER):
+            pending.append(line)
+            continue
+        match = _FINDING.match(line)
+        filename = None
+        if match is not None:
+            path = match.group('path')
+            filename = by_abs_path.get(os.path.abspath(path))
+        if filename is not None:
+            by_file[filename].extend(pending)
+            by_file[filename].append(line[len(path):])
+        else:
+            other.extend(pending)
+            other.append(line)
+        pending = []
+    other.extend(pending)
+
+    entries = {}
+    for filename, file_lines in six.iteritems(by_file):
+        entries[filename] = {
+            'status': file_status(file_lines),
+            'lines': file_lines,
+        }
+    return entries, other
+
+
+def merge_output(filenames, entries):
+    """Combine the cache entries for some files into linter output.
+
+    Args:
+        filenames (Iterable[str]): The files, in the order their output
+            should appear.
+        entries (dict): Mapping of each filename to its cache entry, as
+            produced by :func:`split_output`.
+
+    Returns:
+        Tuple[int, list]: Pair of the combined exit status (the bitwise
+        OR of the statuses of each file) and the output lines, with the
+        path of each file restored.
+    """
+    status = 0
+    lines = []
+    for filename in filenames:
+        entry = entries[filename]
+        status |= entry['status']
+        for line in entry['lines']:
+            if line.startswith(':'):
+                line = filename + line
+            lines.append(line)
+    return status, lines
+
+
+class LintCache(object):
+    """Directory of cached lint results, with LRU eviction.
+
+    Args:
+        directory (str): The directory to store the entries in.
+        namespace (str): Hashed into every key, e.g. a :func:`hash_key`
+            of the tool name, version and configuration.
+        max_bytes (Optional[int]): The size above which entries are
+            evicted by :meth:`prune`.
+
+    Attributes:
+        hits (int): The number of cache hits so far.
+        misses (int): The number of cache misses so far, including
+            files that can't be cached (see :meth:`keys_for`).
+    """
+
+    def __init__(self, directory, namespace, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_filename(self, key):
+        """Get the file an entry is stored in.
+
+        Args:
+            key (str): The key of the entry.
+
+        Returns:
+            str: The filename for the entry.
+        """
+        return os.path.join(
+            self.directory, _ENTRIES_DIR, key[:2], key + _ENTRY_EXTENSION)
+
+    def keys_for(self, filenames, dependencies=None):
+        """Compute the cache key of each file.
+
+        Files that aren't checked in, or that have uncommitted changes,
+        get no key (since their contents don't match a blob SHA) and
+        count as misses.
+
+        Args:
+            filenames (Iterable[str]): The files to lint.
+            dependencies (Optional[Callable[[str], list]]): Maps the
+                absolute filename of a file to the absolute filenames of
+                the files its lint result depends on, e.g. the modules it
+                imports. Their blob SHAs are added to the key.
+
+        Returns:
+            dict: Mapping of filename to key, for each file that can be
+            cached.
+        """
+        root_dir = git_tools.git_root()
+        blobs = git_tools.get_checked_in_blobs()
+        for filename in git_tools.get_modified_files():
+            blobs.pop(filename, None)
+
+        result = {}
+        for filename in filenames:
+            abs_filename = os.path.abspath(filename)
+            key_parts = [
+                self.namespace,
+                os.path.relpath(abs_filename, root_dir).replace(os.sep, '/'),
+                blobs.get(abs_filename),
+            ]
+            if dependencies is not None:
+                key_parts.extend(
+                    blobs.get(dependency)
+                    for dependency in dependencies(abs_filename))
+            if None in key_parts:
+                self.misses += 1
+            else:
+                result[filename] = hash_key(*key_parts)
+        return result
+
+    def get(self, key):
+        """Get a cached entry.
+
+        Args:
+            key (str): The key of the entry.
+
+        Returns:
+            Optional[dict]: The entry, or :data:`None` on a miss.
+        """
+        filename = self._entry_filename(key)
+        try:
+            with io.open(filename, 'r', encoding='utf-8') as file_obj:
+                entry = json.load(file_obj)
+        except (IOError, OSError, ValueError):
+            entry = None
+
+        if entry is None or entry.pop('version', None) != _VERSION:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        # Mark the entry as recently used.
+        os.utime(filename, None)
+        return entry
+
+    def put(self, key, entry):
+        """Cache an entry.
+
+        Args:
+            key (str): The key of the entry.
+            entry (dict): The (JSON-compatible) entry.
+        """
+        filename = self._entry_filename(key)
+        directory = os.path.dirname(filename)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        value = dict(entry, version=_VERSION)
+        with io.open(filename, 'w', encoding='utf-8') as file_obj:
+            file_obj.write(six.text_type(json.dumps(value)))
+
+    def lookup(self, keys):
+        """Get the cached entries for some files.
+
+        Args:
+            keys (dict): Mapping of filename to key, as produced by
+                :meth:`keys_for`.
+
+        Returns:
+            dict: Mapping of filename to entry, for each hit.
+        """
+        result = {}
+        for filename, key in six.iteritems(keys):
+            entry = self.get(key)
+            if entry is not None:
+                result[filename] = entry
+        return result
+
+    def store(self, keys, entries, cacheable=None):
+        """Cache the entries for some files.
+
+        Args:
+            keys (dict): Mapping of filename to key. Files without a key
+                are not cached.
+            entries (dict): Mapping of filename to entry, as produced by
+                :func:`split_output`.
+            cacheable (Optional[Callable[[dict], bool]]): Determines if
+                an entry may be cached. By default, all entries are.
+        """
+        for filename, entry in six.iteritems(entries):
+            key = keys.get(filename)
+            if key is None:
+                continue
+            if cacheable is None or cacheable(entry):
+                self.put(key, entry)
+
+    def record(self, filenames, keys, hits, status, lines, file_status,
+               cacheable=None):
+        """Cache the results for the files that missed, then replay all.
+
+        The results are only cached if the exit status of the linter
+        matches the statuses computed for each file (e.g. they won't
+        match if the linter crashed).
+
+        Args:
+            filenames (list): All files to lint, in output order.
+            keys (dict): Mapping of filename to key, as produced by
+                :meth:`keys_for`.
+            hits (dict): Mapping of filename to entry, as produced by
+                :meth:`lookup`. The linter was run on the other files.
+            status (int): The exit status of the linter.
+            lines (Iterable[str]): The output of the linter.
+            file_status (Callable[[list], int]): Computes the exit status
+                for the lines of a single file. See :func:`split_output`.
+            cacheable (Optional[Callable[[dict], bool]]): Determines if
+                an entry may be cached. See :meth:`store`.
+
+        Returns:
+            Tuple[int, list]: Pair of the combined exit status and output
+            for all files. Output that isn't attributed to a file comes
+            last.
+        """
+        misses = [filename for filename in filenames if filename not in hits]
+        entries, other = split_output(lines, misses, file_status)
+        linted_status = 0
+        for entry in six.itervalues(entries):
+            linted_status |= entry['status']
+        if linted_status == status:
+            self.store(keys, entries, cacheable=cacheable)
+
+        entries.update(hits)
+        merged_status, merged_lines = merge_output(filenames, entries)
+        return merged_status | status, merged_lines + other
+
+    def prune(self):
+        """Evict least recently used entries until under the size cap.
+
+        Only entries count towards the cap; other files in the cache
+        directory are left alone.
+
+        Returns:
+            int: The number of entries evicted.
+        """
+        entries = []
+        total = 0
+        entries_dir = os.path.join(self.directory, _ENTRIES_DIR)
+        for dirpath, _, filenames in os.walk(entries_dir):
+            for filename in filenames:
+                filename = os.path.join(dirpath, filename)
+                stat_result = os.stat(filename)
+                entries.append(
+                    (stat_result.st_mtime, filename, stat_result.st_size))
+                total += stat_result.st_size
+
+        entries.sort()
+        evicted = 0
+        for _, filename, size in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(filename)
+            total -= size
+            evicted += 1
+        return evicted
+
+    @property
+    def hit_rate(self):
+        """float: The fraction of lookups that were hits (0 if none)."""
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return float(self.hits) / lookups
+
+    def report(self):
+        """Summarize the hits and misses.
+
+        Returns:
+            str: A one line report of the hit rate.
+        """
+        return _REPORT_TEMPLATE.format(
+            self.hits, self.misses, 100.0 * self.hit_rate)
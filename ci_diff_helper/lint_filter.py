@@ -0,0 +1,237 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Only keep the linter findings on lines changed by a diff.
+
+This makes it possible to enforce new lint rules on new code only,
+while still linting every file. A :class:`DiffFilter` reads linter
+output as a stream and drops each finding on a line that wasn't
+changed relative to the diff base:
+
+.. code-block:: python
+
+  diff_filter = DiffFilter.from_config()
+  for line in diff_filter.filter_text(pycodestyle_output):
+      print(line)
+  if diff_filter.kept:
+      sys.exit(1)
+
+Two formats are supported:
+
+* Text, with one finding per line starting with ``path:line:``. This
+  covers the default ``pycodestyle`` format and the ``parseable``
+  format of ``pylint``.
+* The ``json`` format of ``pylint``: an array of message objects with
+  ``path`` and ``line`` keys.
+
+Changed lines are looked up in a :class:`.LineIndex`. If the diff base
+is unknown (i.e. it is :data:`~ci_diff_helper.FULL_BUILD`), every
+finding is kept.
+"""
+
+import json
+import os
+import re
+
+from ci_diff_helper import _utils
+from ci_diff_helper import git_tools
+from ci_diff_helper import line_index
+
+
+_TEXT_FINDING = re.compile(r'^(?P<path>.+?):(?P<line>\d+):')
+_PYLINT_MODULE_HEADER = '*************'
+_JSON_CHUNK_SIZE = 65536
+
+
+def _iter_json_array(file_obj, chunk_size=_JSON_CHUNK_SIZE):
+    """Parse the values in a JSON array as they are read.
+
+    Args:
+        file_obj (file): A text file object containing a JSON array.
+        chunk_size (Optional[int]): The number of characters to read at
+            a time.
+
+    Yields:
+        object: Each value in the array.
+
+    Raises:
+        ValueError: If the contents are not a (complete) JSON array.
+            Empty contents are treated as an empty array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    for chunk in iter(lambda: file_obj.read(chunk_size), ''):
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                break
+            if not started:
+                if buffer[0] != '[':
+                    raise ValueError('Expected a JSON array', buffer[:20])
+                started = True
+                buffer = buffer[1:]
+            elif buffer[0] == ',':
+                buffer = buffer[1:]
+            elif buffer[0] == ']':
+                return
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    # The value may continue in the next chunk.
+                    break
+                buffer = buffer[end:]
+                yield value
+
+    if started or buffer:
+        raise ValueError('Incomplete JSON array', buffer[:20])
+
+
+class DiffFilter(object):
+    """Filter for linter findings, based on the lines changed in a diff.
+
+    Args:
+        index (Optional[~ci_diff_helper.line_index.LineIndex]): The
+            changed lines. If :data:`None`, all findings are kept.
+        root (Optional[str]): The directory the paths in ``index`` are
+            relative to. Relative paths in linter output are resolved
+            against the current directory. Defaults to the current
+            directory.
+
+    Attributes:
+        kept (int): The number of findings kept so far.
+        dropped (int): The number of findings dropped so far.
+    """
+
+    def __init__(self, index, root=None):
+        self.index = index
+        self.root = os.path.abspath(os.getcwd() if root is None else root)
+        self.kept = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_diff(cls, blob_name, head='HEAD'):
+        """Build a filter for the lines changed since a revision.
+
+        Args:
+            blob_name (str): A ``git`` object reference for the diff
+                base.
+            head (Optional[str]): The ``git`` object reference with the
+                changes.
+
+        Returns:
+            DiffFilter: The filter.
+        """
+        return cls(line_index.LineIndex.from_diff(blob_name, head),
+                   root=git_tools.git_root())
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Build a filter for the lines changed in the current build.
+
+        Args:
+            config (Optional[~._config_base.Config]): The CI config. If
+                not given, uses :func:`~ci_diff_helper.get_config`.
+
+        Returns:
+            DiffFilter: The filter. Keeps all findings if the diff base
+            is unknown.
+        """
+        if config is None:
+            # NOTE: Imported here to avoid a circular import.
+            import ci_diff_helper
+            config = ci_diff_helper.get_config()
+        base = config.base
+        if base is _utils.FULL_BUILD:
+            return cls(None)
+        return cls.from_diff(base)
+
+    def keeps(self, path, line):
+        """Check if a finding is on a changed line.
+
+        Args:
+            path (str): The file path in the finding (absolute, or
+                relative to the current directory).
+            line (int): The line number of the finding.
+
+        Returns:
+            bool: Flag indicating if the finding should be kept.
+        """
+        if self.index is None:
+            return True
+        path = os.path.relpath(os.path.abspath(path), self.root)
+        return self.index.is_changed(path, line)
+
+    def _count(self, keep):
+        """Count a finding.
+
+        Args:
+            keep (bool): Flag indicating if the finding is kept.
+
+        Returns:
+            bool: ``keep``.
+        """
+        if keep:
+            self.kept += 1
+        else:
+            self.dropped += 1
+        return keep
+
+    def filter_text(self, lines):
+        """Filter text linter output.
+
+        Lines that aren't findings (e.g. the source shown by
+        ``pycodestyle --show-source``) are kept if the finding before
+        them was. A ``pylint`` module header is only kept if a finding in
+        the module is.
+
+        Args:
+            lines (Iterable[str]): Lines of ``pycodestyle`` output or of
+                ``pylint --output-format=parseable`` output.
+
+        Yields:
+            str: The lines that are kept.
+        """
+        keep = True
+        header = None
+        for line in lines:
+            if line.startswith(_PYLINT_MODULE_HEADER):
+                header = line
+                continue
+            match = _TEXT_FINDING.match(line)
+            if match is not None:
+                keep = self._count(self.keeps(
+                    match.group('path'), int(match.group('line'))))
+                if keep and header is not None:
+                    yield header
+                    header = None
+            if keep:
+                yield line
+
+    def filter_json(self, file_obj):
+        """Filter ``pylint`` JSON output.
+
+        Args:
+            file_obj (file): A text file object with the output of
+                ``pylint --output-format=json``.
+
+        Yields:
+            dict: The messages that are kept.
+
+        Raises:
+            ValueError: If the output is not a JSON array.
+        """
+        for message in _iter_json_array(file_obj):
+            if self._count(self.keeps(message['path'], message['line'])):
+                yield message
@@ -0,0 +1,313 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Prefix index over a collection of file paths.
+
+A :class:`PathIndex` stores paths in a trie keyed by path component, so
+questions like "did anything under ``services/foo/`` change?" take time
+proportional to the depth of the directory rather than the number of
+files.
+"""
+
+import os
+
+from ci_diff_helper import git_tools
+
+
+class _Node(object):
+    """A directory (or file) in a :class:`PathIndex` trie.
+
+    Args:
+        count (Optional[int]): The number of files at or below the node.
+        is_file (Optional[bool]): Flag indicating if the node is a file.
+    """
+
+    __slots__ = ('count', 'is_file', 'children')
+
+    def __init__(self, count=0, is_file=False):
+        self.count = count
+        self.is_file = is_file
+        self.children = {}
+
+    def to_list(self):
+        """Convert the subtree rooted at this node to nested lists.
+
+        Returns:
+            list: Triple of the file count, the file flag and a
+            dictionary of child names to (nested) triples.
+        """
+        children = {name: child.to_list()
+                    for name, child in self.children.items()}
+        return [self.count, self.is_file, children]
+
+    @classmethod
+    def from_list(cls, value):
+        """Build a subtree from the output of :meth:`to_list`.
+
+        Args:
+            value (list): A triple produced by :meth:`to_list`.
+
+        Returns:
+            _Node: The root of the subtree.
+        """
+        count, is_file, children = value
+        node = cls(count=count, is_file=is_file)
+        for name, child in children.items():
+            node.children[name] = cls.from_list(child)
+        return node
+
+
+class PathIndex(object):
+    """Trie-based index of file paths.
+
+    Paths are split into components on ``/`` (and :data:`os.sep`), so
+    ``services/foo`` and ``services/foo/`` refer to the same directory.
+    The empty string refers to the root of the index.
+
+    Args:
+        paths (Optional[Iterable[str]]): The file paths to index.
+        root (Optional[str]): A directory that paths are relative to.
+            If given, absolute paths (e.g. from
+            :func:`.git_tools.get_checked_in_files`) are made relative to
+            it, both when indexing and when querying.
+    """
+
+    _VERSION = 1
+
+    def __init__(self, paths=(), root=None):
+        self.root = root
+        self._root_node = _Node()
+        for path in paths:
+            self.add(path)
+
+    @classmethod
+    def from_changed_files(cls, blob_name1, blob_name2):
+        """Index the files changed between two ``git`` revisions.
+
+        Args:
+            blob_name1 (str): A ``git`` object reference.
+            blob_name2 (str): A ``git`` object reference.
+
+        Returns:
+            PathIndex: Index of the changed files, relative to the
+            ``git`` root.
+        """
+        return cls(git_tools.get_changed_files(blob_name1, blob_name2))
+
+    @classmethod
+    def from_checked_in_files(cls):
+        """Index the files checked into the current ``git`` repository.
+
+        Returns:
+            PathIndex: Index of the checked in files, relative to the
+            ``git`` root.
+        """
+        return cls(git_tools.get_checked_in_files(),
+                   root=git_tools.git_root())
+
+    def _split(self, path):
+        """Split a path into its components.
+
+        Args:
+            path (str): A file or directory path.
+
+        Returns:
+            list: The non-empty components of the path.
+        """
+        if self.root is not None and os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        path = path.replace(os.sep, '/')
+        return [part for part in path.split('/') if part not in ('', '.')]
+
+    def _find(self, path):
+        """Find the node for a path.
+
+        Args:
+            path (str): A file or directory path.
+
+        Returns:
+            Optional[_Node]: The node, or :data:`None` if no indexed file
+            is at or below the path.
+        """
+        node = self._root_node
+        for part in self._split(path):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def add(self, path):
+        """Add a file path to the index.
+
+        Adding a path more than once (or adding the root of the index)
+        has no effect.
+
+        Args:
+            path (str): The file path.
+        """
+        parts = self._split(path)
+        existing = self._find(path)
+        if not parts or (existing is not None and existing.is_file):
+            return
+
+        node = self._root_node
+        node.count += 1
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node()
+            child.count += 1
+            node = child
+        node.is_file = True
+
+    def __len__(self):
+        return self._root_node.count
+
+    def __contains__(self, path):
+        node = self._find(path)
+        return node is not None and node.is_file
+
+    def has_prefix(self, directory):
+        """Check if any indexed file is at or below a directory.
+
+        Args:
+            directory (str): A directory (or file) path.
+
+        Returns:
+            bool: Flag indicating if there is a match.
+        """
+        node = self._find(directory)
+        return node is not None and node.count > 0
+
+    def count(self, directory):
+        """Count the indexed files at or below a directory.
+
+        Args:
+            directory (str): A directory (or file) path.
+
+        Returns:
+            int: The number of matching files.
+        """
+        node = self._find(directory)
+        if node is None:
+            return 0
+        return node.count
+
+    def deepest_ancestor(self, path):
+        """Find the deepest ancestor of a path with an indexed file below.
+
+        For example, if only ``services/foo/bar.py`` is indexed, the
+        deepest ancestor of ``services/foo/baz/qux.py`` is
+        ``services/foo``.
+
+        Args:
+            path (str): A file or directory path.
+
+        Returns:
+            Optional[str]: The ancestor (possibly the path itself), using
+            ``/`` as separator. If no indexed file shares even the first
+            path component, returns :data:`None`.
+        """
+        node = self._root_node
+        matched = []
+        for part in self._split(path):
+            node = node.children.get(part)
+            if node is None:
+                break
+            matched.append(part)
+
+        if not matched:
+            return None
+        return '/'.join(matched)
+
+    def longest_prefix(self, path):
+        """Find the deepest indexed path that is an ancestor of a path.
+
+        For example, if ``services`` and ``services/foo`` are indexed
+        (e.g. as project directories), the longest prefix of
+        ``services/foo/bar.py`` is ``services/foo``.
+
+        Args:
+            path (str): A file or directory path.
+
+        Returns:
+            Optional[str]: The indexed ancestor (possibly the path
+            itself), using ``/`` as separator. If no indexed path is an
+            ancestor, returns :data:`None`.
+        """
+        node = self._root_node
+        parts = self._split(path)
+        depth = None
+        for index, part in enumerate(parts):
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.is_file:
+                depth = index + 1
+
+        if depth is None:
+            return None
+        return '/'.join(parts[:depth])
+
+    def iter_files(self, directory=''):
+        """Iterate over the indexed files at or below a directory.
+
+        Args:
+            directory (Optional[str]): A directory path. Defaults to the
+                root of the index.
+
+        Yields:
+            str: The matching file paths (sorted), using ``/`` as
+            separator.
+        """
+        node = self._find(directory)
+        if node is None:
+            return
+        stack = [(self._split(directory), node)]
+        while stack:
+            parts, node = stack.pop()
+            if node.is_file:
+                yield '/'.join(parts)
+            for name in sorted(node.children, reverse=True):
+                stack.append((parts + [name], node.children[name]))
+
+    def to_dict(self):
+        """Serialize the index (e.g. to cache it as JSON).
+
+        Returns:
+            dict: A JSON-compatible representation of the index.
+        """
+        return {
+            'version': self._VERSION,
+            'root': self.root,
+            'trie': self._root_node.to_list(),
+        }
+
+    @classmethod
+    def from_dict(cls, value):
+        """Deserialize an index produced by :meth:`to_dict`.
+
+        Args:
+            value (dict): The serialized index.
+
+        Returns:
+            PathIndex: The deserialized index.
+
+        Raises:
+            ValueError: If the serialization format is not supported.
+        """
+        if value.get('version') != cls._VERSION:
+            raise ValueError('Unsupported path index version',
+                             value.get('version'))
+        index = cls(root=value['root'])
+        index._root_node = _Node.from_list(value['trie'])
+        return index
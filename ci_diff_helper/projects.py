@@ -0,0 +1,311 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Find the projects in a monorepo affected by a change.
+
+A project map assigns a directory to each project and lists the
+projects each one depends on. It is stored as JSON:
+
+.. code-block:: json
+
+  {
+    "projects": {
+      "api": {"path": "services/api", "dependencies": ["common"]},
+      "web": {"path": "services/web", "dependencies": ["common"]},
+      "common": {"path": "lib/common"}
+    }
+  }
+
+A changed file belongs to the project with the deepest directory
+containing it. A project at the root of the repository (with path ``""``
+or ``"."``) contains every file that isn't in another project. A
+project is affected if one of its files changed or if
+it (transitively) depends on such a project:
+
+.. code-block:: python
+
+  config = ci_diff_helper.get_config()
+  project_map = ProjectMap.from_file(
+      'projects.json', cache_filename='.projects-cache.json')
+  to_build = project_map.affected_by_diff('HEAD', config.base)
+
+Directories are held in a :class:`.PathIndex` and the transitive
+dependents of every project are computed up front, so each changed
+file costs a single trie lookup.
+"""
+
+import collections
+import hashlib
+import io
+import json
+import os
+
+import six
+
+from ci_diff_helper import _utils
+from ci_diff_helper import git_tools
+from ci_diff_helper import path_index
+
+
+_VERSION = 1
+
+
+def _transitive_dependents(dependencies):
+    """Compute the transitive dependents of each project.
+
+    Args:
+        dependencies (dict): Mapping of each project to the projects it
+            depends on.
+
+    Returns:
+        dict: Mapping of each project to a sorted tuple containing it and
+        all projects that depend on it (directly or not).
+    """
+    direct_dependents = collections.defaultdict(set)
+    for name, depends_on in six.iteritems(dependencies):
+        for dependency in depends_on:
+            direct_dependents[dependency].add(name)
+
+    result = {}
+    for name in dependencies:
+        seen = set([name])
+        to_visit = [name]
+        while to_visit:
+            for dependent in direct_dependents[to_visit.pop()]:
+                if dependent not in seen:
+                    seen.add(dependent)
+                    to_visit.append(dependent)
+        result[name] = tuple(sorted(seen))
+
+    return result
+
+
+class ProjectMap(object):
+    """Map from directories to projects, with a dependency graph.
+
+    Args:
+        paths (dict): Mapping of each project name to its directory
+            (relative to the repository root).
+        dependencies (Optional[dict]): Mapping of project names to the
+            names of the projects they depend on. Projects not in the
+            mapping have no dependencies.
+
+    Raises:
+        ValueError: If two projects share a directory or a dependency is
+            not a known project.
+    """
+
+    def __init__(self, paths, dependencies=None):
+        self.paths = dict(paths)
+        self.dependencies = {name: () for name in self.paths}
+        for name, depends_on in six.iteritems(dependencies or {}):
+            if name not in self.paths:
+                raise ValueError('Unknown project', name)
+            unknown = set(depends_on).difference(self.paths)
+            if unknown:
+                raise ValueError('Unknown dependencies', name,
+                                 sorted(unknown))
+            self.dependencies[name] = tuple(depends_on)
+
+        self._index = path_index.PathIndex()
+        self._by_directory = {}
+        for name, directory in six.iteritems(self.paths):
+            self._index.add(directory)
+            # The index normalizes the directory (e.g. a trailing
+            # slash), so use its form as the key. The root of the
+            # repository isn't in the index, so its key is empty.
+            key = self._index.longest_prefix(directory)
+            if key is None:
+                key = ''
+            if key in self._by_directory:
+                raise ValueError('Projects share a directory', key,
+                                 sorted([name, self._by_directory[key]]))
+            self._by_directory[key] = name
+
+        self._dependents = _transitive_dependents(self.dependencies)
+
+    @classmethod
+    def from_json(cls, value):
+        """Build a project map from its (parsed) JSON form.
+
+        Args:
+            value (dict): The project map, with a ``projects`` key.
+
+        Returns:
+            ProjectMap: The project map.
+        """
+        projects = value['projects']
+        paths = {name: info['path'] for name, info in projects.items()}
+        dependencies = {name: info.get('dependencies', ())
+                        for name, info in projects.items()}
+        return cls(paths, dependencies)
+
+    @classmethod
+    def from_file(cls, filename, cache_filename=None):
+        """Load a project map from a JSON file.
+
+        If ``cache_filename`` is given, the precomputed indices are
+        stored there and reused by later runs, as long as the contents
+        of ``filename`` (and the serialization format) don't change.
+
+        Args:
+            filename (str): The project map file.
+            cache_filename (Optional[str]): A file to cache the indices
+                in.
+
+        Returns:
+            ProjectMap: The project map.
+        """
+        with open(filename, 'rb') as file_obj:
+            contents = file_obj.read()
+        source_hash = hashlib.sha256(contents).hexdigest()
+
+        if cache_filename is not None and os.path.exists(cache_filename):
+            with io.open(cache_filename, 'r', encoding='utf-8') as file_obj:
+                try:
+                    cached = json.load(file_obj)
+                except ValueError:
+                    cached = {}
+            if (cached.get('source_hash') == source_hash and
+                    cached.get('version') == _VERSION):
+                return cls.from_dict(cached)
+
+        project_map = cls.from_json(json.loads(contents.decode('utf-8')))
+        if cache_filename is not None:
+            serialized = project_map.to_dict()
+            serialized['source_hash'] = source_hash
+            with io.open(cache_filename, 'w', encoding='utf-8') as file_obj:
+                file_obj.write(six.text_type(json.dumps(serialized)))
+        return project_map
+
+    def to_dict(self):
+        """Serialize the project map and its indices.
+
+        Returns:
+            dict: A JSON-compatible representation of the project map.
+        """
+        return {
+            'version': _VERSION,
+            'paths': self.paths,
+            'dependencies': {name: list(depends_on) for name, depends_on
+                             in six.iteritems(self.dependencies)},
+            'by_directory': self._by_directory,
+            'dependents': {name: list(dependents) for name, dependents
+                           in six.iteritems(self._dependents)},
+            'index': self._index.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, value):
+        """Deserialize a project map produced by :meth:`to_dict`.
+
+        Doesn't recompute (or re-validate) any of the indices.
+
+        Args:
+            value (dict): The serialized project map.
+
+        Returns:
+            ProjectMap: The deserialized project map.
+
+        Raises:
+            ValueError: If the serialization format is not supported.
+        """
+        if value.get('version') != _VERSION:
+            raise ValueError('Unsupported project map version',
+                             value.get('version'))
+        project_map = cls.__new__(cls)
+        project_map.paths = value['paths']
+        project_map.dependencies = {
+            name: tuple(depends_on)
+            for name, depends_on in six.iteritems(value['dependencies'])}
+        project_map._by_directory = value['by_directory']
+        project_map._dependents = {
+            name: tuple(dependents)
+            for name, dependents in six.iteritems(value['dependents'])}
+        project_map._index = path_index.PathIndex.from_dict(value['index'])
+        return project_map
+
+    def project_for(self, path):
+        """Get the project that contains a file.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+
+        Returns:
+            Optional[str]: The project with the deepest directory
+            containing the file, or :data:`None` if no project does.
+        """
+        directory = self._index.longest_prefix(path)
+        if directory is None:
+            directory = ''
+        return self._by_directory.get(directory)
+
+    def dependents(self, name):
+        """Get the projects that (transitively) depend on a project.
+
+        Args:
+            name (str): A project name.
+
+        Returns:
+            tuple: The sorted names of the dependents, including the
+            project itself.
+        """
+        return self._dependents[name]
+
+    def changed_projects(self, paths):
+        """Get the projects containing a set of files.
+
+        Args:
+            paths (Iterable[str]): File paths, relative to the
+                repository root.
+
+        Returns:
+            tuple: The sorted names of the projects.
+        """
+        result = set(self.project_for(path) for path in paths)
+        result.discard(None)
+        return tuple(sorted(result))
+
+    def affected(self, paths):
+        """Get the projects affected by changes to a set of files.
+
+        Args:
+            paths (Iterable[str]): File paths, relative to the
+                repository root, e.g. from
+                :func:`.git_tools.get_changed_files`.
+
+        Returns:
+            tuple: The sorted names of the projects containing one of
+            the files, along with all of their transitive dependents.
+        """
+        result = set()
+        for name in self.changed_projects(paths):
+            result.update(self._dependents[name])
+        return tuple(sorted(result))
+
+    def affected_by_diff(self, blob_name1, blob_name2):
+        """Get the projects affected by the changes between two revisions.
+
+        Args:
+            blob_name1 (str): A ``git`` object reference.
+            blob_name2 (str): A ``git`` object reference, e.g. the
+                ``base`` of the current CI config.
+
+        Returns:
+            tuple: The sorted names of the affected projects. If either
+            revision is :data:`~ci_diff_helper.FULL_BUILD` (the diff is
+            unknown), every project is affected.
+        """
+        if _utils.FULL_BUILD in (blob_name1, blob_name2):
+            return tuple(sorted(self.paths))
+        return self.affected(
+            git_tools.get_changed_files(blob_name1, blob_name2))
@@ -0,0 +1,454 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Registry of configuration types for supported CI systems.
+
+:func:`~ci_diff_helper.get_config` uses this registry to detect the
+current CI system. Each registered configuration type is indexed by the
+environment variable that indicates it is active, so detection is a
+single pass over that index (rather than creating a configuration
+object for every supported CI system).
+
+Declaring a CI System
+~~~~~~~~~~~~~~~~~~~~~
+
+CI systems that only need environment variables can be declared with
+a table rather than a dedicated module:
+
+.. testsetup:: declare
+
+  import os
+  os.environ = {
+      'MY_CI': 'true',
+      'MY_CI_BRANCH': 'master',
+      'MY_CI_PR': '81',
+      'MY_CI_PR_BASE': 'develop',
+      'MY_CI_SLUG': 'organization/repository',
+  }
+  from ci_diff_helper import registry
+
+.. testcleanup:: declare
+
+  registry.unregister(MyCI)
+
+.. doctest:: declare
+
+  >>> table = {
+  ...     'active': 'MY_CI',
+  ...     'branch': 'MY_CI_BRANCH',
+  ...     'pr': 'MY_CI_PR',
+  ...     'base': 'MY_CI_PR_BASE',
+  ...     'slug': 'MY_CI_SLUG',
+  ... }
+  >>> MyCI = registry.register(registry.declare('MyCI', table))
+  >>> config = MyCI()
+  >>> config
+  <MyCI (active=True)>
+  >>> config.in_pr
+  True
+  >>> config.pr
+  81
+  >>> config.base
+  'develop'
+  >>> config.slug
+  'organization/repository'
+  >>> registry.detect() == [MyCI]
+  True
+
+The table keys are:
+
+* ``active`` (**required**): The environment variable indicating the
+  CI system is active.
+* ``active_value``: The (case-insensitive) value ``active`` must have.
+  Defaults to ``'true'``. If :data:`None`, any non-empty value is
+  accepted.
+* ``branch``, ``tag``, ``pr``, ``base`` and ``slug``: The environment
+  variables holding the corresponding values. Any of these may
+  be omitted.
+* ``shard_index`` and ``shard_total``: The environment variables holding
+  the (zero-based) index of the current parallel node and the number of
+  nodes (see :attr:`~ci_diff_helper._config_base.Config.shard`).
+
+:class:`Jenkins`, :class:`Buildkite` and :class:`Drone` are declared
+(and registered) this way.
+
+Third-party Plugins
+~~~~~~~~~~~~~~~~~~~
+
+Packages can also provide CI systems via the ``ci_diff_helper.providers``
+`entry point`_ group. Each entry point may refer to a subclass of
+:class:`~ci_diff_helper._config_base.Config` or to a table as described
+above (in which case the entry point name is used as the class name):
+
+.. code-block:: python
+
+  setup(
+      ...
+      entry_points={
+          'ci_diff_helper.providers': [
+              'Woodpecker = woodpecker_ci:TABLE',
+          ],
+      },
+  )
+
+Entry points are loaded the first time :func:`detect` is called.
+
+.. _entry point: https://packaging.python.org/specifications/\\
+                 entry-points/
+"""
+
+import os
+import warnings
+
+import six
+
+from ci_diff_helper import _config_base
+from ci_diff_helper import _utils
+from ci_diff_helper import appveyor
+from ci_diff_helper import circle_ci
+from ci_diff_helper import environment_vars as env
+from ci_diff_helper import github_actions
+from ci_diff_helper import gitlab_ci
+from ci_diff_helper import travis
+
+
+ENTRY_POINT_GROUP = 'ci_diff_helper.providers'
+_DEFAULT_ACTIVE_VALUE = 'true'
+_ENTRY_POINT_FAILED = 'Skipping the {!r} configuration entry point: {}'
+_TABLE_KEYS = frozenset([
+    'active',
+    'active_value',
+    'base',
+    'branch',
+    'pr',
+    'shard_index',
+    'shard_total',
+    'slug',
+    'tag',
+])
+_REGISTRY = []  # Registered configuration types, in order.
+_INDEX = {}  # Active environment variable -> [(expected, config type)].
+_ENTRY_POINTS = {'loaded': False}
+
+
+def _matches(value, expected):
+    """Check if an environment variable value indicates an active CI.
+
+    Args:
+        value (str): The value of the environment variable.
+        expected (Optional[str]): The expected (lowercase) value. If
+            :data:`None`, any non-empty value matches.
+
+    Returns:
+        bool: Flag indicating if ``value`` matches.
+    """
+    if expected is None:
+        return value != ''
+    return value.lower() == expected
+
+
+def _env_value(env_var):
+    """Get an optional value from the environment.
+
+    Args:
+        env_var (Optional[str]): The environment variable which holds
+            the value.
+
+    Returns:
+        Optional[str]: The value. If ``env_var`` is :data:`None` or the
+            environment variable is unset or empty, returns :data:`None`.
+    """
+    if env_var is None:
+        return None
+    value = os.getenv(env_var, '')
+    if value == '':
+        return None
+    return value
+
+
+class DeclaredConfig(_config_base.Config):
+    """Configuration type for a CI system declared with a table.
+
+    Subclasses are created with :func:`declare`.
+    """
+
+    # Default instance attributes.
+    _base = _utils.UNSET
+    _pr = _utils.UNSET
+    _slug = _utils.UNSET
+    # Class attributes.
+    _active_value = _DEFAULT_ACTIVE_VALUE
+    _base_env_var = None
+    _pr_env_var = None
+    _slug_env_var = None
+
+    @property
+    def active(self):
+        """bool: Indicates if currently running in the target CI system."""
+        if self._active is _utils.UNSET:
+            value = os.getenv(self._active_env_var, '')
+            self._active = _matches(value, self._active_value)
+        return self._active
+
+    @property
+    def tag(self):
+        """str: The ``git`` tag of the current CI build.
+
+        If the CI system does not declare a tag environment variable,
+        this is always :data:`None`.
+        """
+        if self._tag_env_var is None:
+            self._tag = None
+        return super(DeclaredConfig, self).tag
+
+    @property
+    def pr(self):
+        """int: The current pull request (if any).
+
+        If there is no active pull request, returns :data:`None`.
+        """
+        if self._pr is _utils.UNSET:
+            try:
+                self._pr = int(_env_value(self._pr_env_var))
+            except (TypeError, ValueError):
+                self._pr = None
+        return self._pr
+
+    @property
+    def in_pr(self):
+        """bool: Indicates if currently running in a pull request build."""
+        return self.pr is not None
+
+    @property
+    def base(self):
+        """str: The ``git`` object that current build is changed against.
+
+        .. warning::
+
+            This property is only supported in a pull request build.
+        """
+        if self._base is _utils.UNSET:
+            if not self.in_pr or self._base_env_var is None:
+                raise NotImplementedError(
+                    'Diff base only supported in a pull request build',
+                    self.__class__.__name__)
+            base = _env_value(self._base_env_var)
+            if base is None:
+                raise OSError(None, 'Pull request build has no diff base',
+                              self._base_env_var)
+            self._base = base
+        return self._base
+
+    @property
+    def slug(self):
+        """str: The current slug in the CI build.
+
+        Of the form ``{organization}/{repository}``.
+        """
+        if self._slug is _utils.UNSET:
+            if self._slug_env_var is None:
+                raise NotImplementedError(
+                    'Slug not supported', self.__class__.__name__)
+            slug = _env_value(self._slug_env_var)
+            if slug is None:
+                raise OSError(None, 'Build does not have a slug set',
+                              self._slug_env_var)
+            self._slug = slug
+        return self._slug
+
+
+def declare(name, table):
+    """Declare a configuration type from a table of environment variables.
+
+    Args:
+        name (str): The name of the new configuration type.
+        table (dict): Mapping describing the environment variables used
+            by the CI system. See the module documentation for the
+            supported keys.
+
+    Returns:
+        type: A new subclass of :class:`DeclaredConfig`.
+
+    Raises:
+        KeyError: If ``table`` is missing the ``active`` key.
+        ValueError: If ``table`` has unsupported keys.
+    """
+    unknown = set(table) - _TABLE_KEYS
+    if unknown:
+        raise ValueError('Unsupported keys in table', sorted(unknown))
+
+    active_value = table.get('active_value', _DEFAULT_ACTIVE_VALUE)
+    if active_value is not None:
+        active_value = active_value.lower()
+    attributes = {
+        '__doc__': 'Represent {} state and cache return values.'.format(
+            name),
+        '_active_env_var': table['active'],
+        '_active_value': active_value,
+        '_base_env_var': table.get('base'),
+        '_branch_env_var': table.get('branch'),
+        '_pr_env_var': table.get('pr'),
+        '_shard_index_env_var': table.get('shard_index'),
+        '_shard_total_env_var': table.get('shard_total'),
+        '_slug_env_var': table.get('slug'),
+        '_tag_env_var': table.get('tag'),
+    }
+    return type(str(name), (DeclaredConfig,), attributes)
+
+
+def register(config_type):
+    """Register a configuration type for detection.
+
+    Registering the same type more than once has no effect. Can also be
+    used as a class decorator.
+
+    Args:
+        config_type (type): A subclass of
+            :class:`~ci_diff_helper._config_base.Config`.
+
+    Returns:
+        type: The ``config_type`` that was passed in.
+    """
+    if config_type in _REGISTRY:
+        return config_type
+
+    expected = getattr(config_type, '_active_value', _DEFAULT_ACTIVE_VALUE)
+    entries = _INDEX.setdefault(config_type.get_active_env_var(), [])
+    entries.append((expected, config_type))
+    _REGISTRY.append(config_type)
+    return config_type
+
+
+def unregister(config_type):
+    """Remove a configuration type from the registry.
+
+    Args:
+        config_type (type): A previously registered configuration type.
+
+    Raises:
+        ValueError: If ``config_type`` is not registered.
+    """
+    _REGISTRY.remove(config_type)
+    env_var = config_type.get_active_env_var()
+    entries = [entry for entry in _INDEX[env_var]
+               if entry[1] is not config_type]
+    if entries:
+        _INDEX[env_var] = entries
+    else:
+        del _INDEX[env_var]
+
+
+def registered():
+    """Get all registered configuration types.
+
+    Returns:
+        list: The registered configuration types, in registration order.
+    """
+    return list(_REGISTRY)
+
+
+def _iter_entry_points():
+    """Iterate over all entry points in the providers group.
+
+    Returns:
+        Iterable: The entry points. Each has a ``name`` and a ``load()``
+        method.
+    """
+    try:
+        from importlib import metadata
+    except ImportError:  # pragma: NO COVER
+        import pkg_resources
+        return pkg_resources.iter_entry_points(ENTRY_POINT_GROUP)
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        return entry_points.select(group=ENTRY_POINT_GROUP)
+    return entry_points.get(ENTRY_POINT_GROUP, ())  # pragma: NO COVER
+
+
+def load_entry_points():
+    """Register all configuration types provided via entry points.
+
+    Entry points are only loaded once; subsequent calls do nothing. An
+    entry point that fails to load (or to register) is skipped with a
+    warning, so a broken plugin doesn't break detection.
+    """
+    if _ENTRY_POINTS['loaded']:
+        return
+
+    _ENTRY_POINTS['loaded'] = True
+    for entry_point in _iter_entry_points():
+        try:
+            provided = entry_point.load()
+            if isinstance(provided, dict):
+                provided = declare(entry_point.name, provided)
+            register(provided)
+        except Exception as exc:  # pylint: disable=broad-except
+            warnings.warn(_ENTRY_POINT_FAILED.format(entry_point.name, exc),
+                          RuntimeWarning)
+
+
+def detect():
+    """Detect the configuration types active in the current environment.
+
+    Uses the index of active environment variables, so no configuration
+    objects are created.
+
+    Returns:
+        list: The active configuration types, in registration order.
+    """
+    load_entry_points()
+
+    found = []
+    for env_var, entries in six.iteritems(_INDEX):
+        value = os.environ.get(env_var)
+        if value is None:
+            continue
+        for expected, config_type in entries:
+            if _matches(value, expected):
+                found.append(config_type)
+
+    found.sort(key=_REGISTRY.index)
+    return found
+
+
+Jenkins = declare('Jenkins', {
+    'active': env.IN_JENKINS,
+    'active_value': None,
+    'branch': env.JENKINS_BRANCH,
+    'tag': env.JENKINS_TAG,
+    'pr': env.JENKINS_PR,
+    'base': env.JENKINS_PR_TARGET,
+})
+Buildkite = declare('Buildkite', {
+    'active': env.IN_BUILDKITE,
+    'branch': env.BUILDKITE_BRANCH,
+    'tag': env.BUILDKITE_TAG,
+    'pr': env.BUILDKITE_PR,
+    'base': env.BUILDKITE_PR_BASE,
+    'shard_index': env.BUILDKITE_PARALLEL_JOB,
+    'shard_total': env.BUILDKITE_PARALLEL_JOB_COUNT,
+})
+Drone = declare('Drone', {
+    'active': env.IN_DRONE,
+    'branch': env.DRONE_BRANCH,
+    'tag': env.DRONE_TAG,
+    'pr': env.DRONE_PR,
+    'base': env.DRONE_PR_TARGET,
+    'slug': env.DRONE_SLUG,
+})
+
+for _config_type in (appveyor.AppVeyor, Buildkite, circle_ci.CircleCI,
+                     Drone, github_actions.GitHubActions,
+                     gitlab_ci.GitLabCI, Jenkins, travis.Travis):
+    register(_config_type)
+del _config_type
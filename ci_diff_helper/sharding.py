@@ -0,0 +1,290 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Split test files across the parallel nodes of a CI build.
+
+Each node computes the same assignment of files to shards and runs the
+files in its own shard. The assignment balances the expected duration of
+each shard using a :class:`TimingDatabase` of historical durations:
+
+.. code-block:: python
+
+  config = ci_diff_helper.get_config()
+  changed = ci_diff_helper.get_changed_files('HEAD', config.base)
+  test_files = select_test_files(changed)  # Project specific.
+  timings = TimingDatabase.load('test_timings.json')
+  for filename in current_shard(test_files, timings, config=config):
+      run_tests(filename)
+
+The index of the current node (and the number of nodes) comes from
+:attr:`~ci_diff_helper._config_base.Config.shard`, e.g. from
+``CIRCLE_NODE_INDEX`` and ``CIRCLE_NODE_TOTAL`` on CircleCI.
+
+Files are assigned longest-processing-time first: the slowest file goes
+to the least loaded shard, then the next slowest, and so on. Among the
+shards whose load is within a small ``tolerance`` of the least loaded,
+a file goes to the one it prefers by `rendezvous hashing`_, so a small
+change in the timings (or in the set of files) moves few files between
+shards.
+
+.. _rendezvous hashing: https://en.wikipedia.org/wiki/\\
+                        Rendezvous_hashing
+"""
+
+import hashlib
+import io
+import json
+import os
+
+import six
+
+
+_VERSION = 1
+DEFAULT_TOLERANCE = 0.02
+"""The imbalance allowed (as a fraction of the average shard load) to
+keep files on the shard they prefer."""
+DEFAULT_SMOOTHING = 0.5
+"""The weight of a new duration in a :class:`TimingDatabase`."""
+_DEFAULT_DURATION = 1.0
+
+
+def _normalize(path):
+    """Normalize a path to use as a key.
+
+    Args:
+        path (str): A file path, relative to the repository root.
+
+    Returns:
+        str: The path, with ``/`` as separator.
+    """
+    return path.replace(os.sep, '/')
+
+
+def _preference(path, shard):
+    """Score how strongly a file prefers a shard.
+
+    Args:
+        path (str): A (normalized) file path.
+        shard (int): The index of a shard.
+
+    Returns:
+        str: The score. A file prefers the shard with the highest score.
+    """
+    value = u'{}\0{:d}'.format(path, shard)
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+class TimingDatabase(object):
+    """Historical durations of test files.
+
+    New durations are blended with the previous ones (an exponential
+    moving average), so a single slow run doesn't reshuffle the shards.
+
+    Args:
+        durations (Optional[dict]): Mapping of file paths (relative to
+            the repository root) to their duration in seconds.
+        smoothing (Optional[float]): The weight (between 0 and 1) of a
+            new duration when it is recorded.
+    """
+
+    def __init__(self, durations=None, smoothing=DEFAULT_SMOOTHING):
+        self.durations = {}
+        for path, seconds in six.iteritems(durations or {}):
+            self.durations[_normalize(path)] = float(seconds)
+        self.smoothing = smoothing
+
+    def record(self, path, seconds):
+        """Record the duration of a run of a test file.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+            seconds (float): The duration of the run.
+        """
+        path = _normalize(path)
+        previous = self.durations.get(path)
+        if previous is None:
+            self.durations[path] = float(seconds)
+        else:
+            self.durations[path] = (
+                previous + self.smoothing * (seconds - previous))
+
+    def update(self, durations):
+        """Record the durations of runs of several test files.
+
+        Args:
+            durations (dict): Mapping of file paths (relative to the
+                repository root) to their duration in seconds, e.g. the
+                results gathered from every node.
+        """
+        for path, seconds in six.iteritems(durations):
+            self.record(path, seconds)
+
+    def default_duration(self):
+        """Get the duration expected for a file without one recorded.
+
+        Returns:
+            float: The average of all recorded durations (or 1 second if
+            there are none).
+        """
+        if not self.durations:
+            return _DEFAULT_DURATION
+        return sum(six.itervalues(self.durations)) / len(self.durations)
+
+    def estimate(self, path, default=None):
+        """Estimate the duration of a test file.
+
+        Args:
+            path (str): A file path, relative to the repository root.
+            default (Optional[float]): The duration for a file without
+                one recorded (e.g. a new file). If not given, uses
+                :meth:`default_duration`. Pass it in when estimating
+                many files, to avoid computing it for each one.
+
+        Returns:
+            float: The recorded duration, or the default.
+        """
+        seconds = self.durations.get(_normalize(path))
+        if seconds is not None:
+            return seconds
+        if default is None:
+            return self.default_duration()
+        return default
+
+    def to_dict(self):
+        """Serialize the database.
+
+        Returns:
+            dict: A JSON-compatible representation of the database.
+        """
+        return {
+            'version': _VERSION,
+            'durations': dict(self.durations),
+        }
+
+    @classmethod
+    def from_dict(cls, value):
+        """Deserialize a database produced by :meth:`to_dict`.
+
+        Args:
+            value (dict): The serialized database.
+
+        Returns:
+            TimingDatabase: The deserialized database.
+
+        Raises:
+            ValueError: If the serialization format is not supported.
+        """
+        if value.get('version') != _VERSION:
+            raise ValueError('Unsupported timing database version',
+                             value.get('version'))
+        return cls(value['durations'])
+
+    def save(self, filename):
+        """Save the database to a JSON file.
+
+        Args:
+            filename (str): The file to save to.
+        """
+        serialized = json.dumps(self.to_dict(), indent=2, sort_keys=True)
+        with io.open(filename, 'w', encoding='utf-8') as file_obj:
+            file_obj.write(six.text_type(serialized))
+
+    @classmethod
+    def load(cls, filename):
+        """Load a database saved by :meth:`save`.
+
+        Args:
+            filename (str): The file to load from.
+
+        Returns:
+            TimingDatabase: The loaded database.
+        """
+        with io.open(filename, 'r', encoding='utf-8') as file_obj:
+            return cls.from_dict(json.load(file_obj))
+
+
+def assign_shards(filenames, num_shards, timings=None,
+                  tolerance=DEFAULT_TOLERANCE):
+    """Assign files to shards with balanced expected durations.
+
+    The assignment only depends on the arguments, so every node of a
+    build computes the same one.
+
+    Args:
+        filenames (Iterable[str]): The files to split, relative to the
+            repository root.
+        num_shards (int): The number of shards.
+        timings (Optional[TimingDatabase]): The historical durations. If
+            not given, every file is expected to take as long.
+        tolerance (Optional[float]): The imbalance allowed (as a
+            fraction of the average shard load) to keep a file on the
+            shard it prefers. ``0`` gives the plain
+            longest-processing-time first assignment.
+
+    Returns:
+        list: A sorted list of files for each shard. (Some may be empty
+        if there are fewer files than shards.)
+
+    Raises:
+        ValueError: If ``num_shards`` is not positive.
+    """
+    if num_shards < 1:
+        raise ValueError('Expected at least one shard', num_shards)
+
+    durations = {}
+    if timings is None:
+        for filename in filenames:
+            durations[filename] = _DEFAULT_DURATION
+    else:
+        default = timings.default_duration()
+        for filename in filenames:
+            durations[filename] = timings.estimate(filename, default=default)
+
+    slack = tolerance * sum(six.itervalues(durations)) / num_shards
+    loads = [0.0] * num_shards
+    shards = [[] for _ in six.moves.range(num_shards)]
+    for filename in sorted(durations,
+                           key=lambda name: (-durations[name], name)):
+        max_load = min(loads) + slack
+        path = _normalize(filename)
+        shard = max(
+            (index for index, load in enumerate(loads) if load <= max_load),
+            key=lambda index: _preference(path, index))
+        loads[shard] += durations[filename]
+        shards[shard].append(filename)
+
+    return [sorted(shard) for shard in shards]
+
+
+def current_shard(filenames, timings=None, config=None,
+                  tolerance=DEFAULT_TOLERANCE):
+    """Get the files to run on the current node of a parallel build.
+
+    Args:
+        filenames (Iterable[str]): All files to split, relative to the
+            repository root.
+        timings (Optional[TimingDatabase]): The historical durations.
+        config (Optional[~._config_base.Config]): The CI config. If not
+            given, uses :func:`~ci_diff_helper.get_config`.
+        tolerance (Optional[float]): See :func:`assign_shards`.
+
+    Returns:
+        list: The sorted files in the current shard.
+    """
+    if config is None:
+        # NOTE: Imported here to avoid a circular import.
+        import ci_diff_helper
+        config = ci_diff_helper.get_config()
+    index, num_shards = config.shard
+    shards = assign_shards(
+        filenames, num_shards, timings=timings, tolerance=tolerance)
+    return shards[index]
@@ -104,7 +104,7 @@ it can also be used to find relevant information in a
   import ci_diff_helper
   from ci_diff_helper import travis
 
-  def mock_push_base(slug):
+  def mock_push_base(slug, max_fetch_depth):
       assert slug == 'organization/repository'
       return '4ad7349dc7223ebc02175a16dc577a013044a538'
 
@@ -267,20 +267,31 @@ def _get_merge_base_from_github(slug, start, finish):
             payload, slug, start, finish)
 
 
-def _push_build_base(slug):
+def _push_build_base(slug, max_fetch_depth=git_tools.DEFAULT_MAX_FETCH_DEPTH):
     """Get the diffbase for a Travis "push" build.
 
+    If the start commit is missing from a shallow clone, the clone is
+    deepened (up to ``max_fetch_depth`` commits) until it is present, so
+    that both the diffbase and the diff can be computed locally. The
+    GitHub API is only used as a last resort.
+
     Args:
         slug (str): The GitHub repo slug for the current build.
             Of the form ``{organization}/{repository}``.
+        max_fetch_depth (Optional[int]): The maximum history depth to
+            fetch when deepening a shallow clone. If ``0``, the clone
+            is never deepened.
 
     Returns:
         str: The commit SHA of the diff base.
     """
     start, finish = _get_commit_range()
-    # Resolve the start object name into a 40-char SHA1 hash.
-    start_full = _utils.check_output('git', 'rev-parse', start,
-                                     ignore_err=True)
+    # Resolve the start object name into a 40-char SHA1 hash. (A plain
+    # ``git rev-parse`` accepts any full SHA, even for a commit missing
+    # from a shallow clone, so the commit must be looked up.)
+    start_full = git_tools.resolve_commit(start)
+    if start_full is None and max_fetch_depth > 0:
+        start_full = git_tools.deepen_until(start, max_depth=max_fetch_depth)
 
     if start_full is None:
         # In this case, the start commit isn't in history so we
@@ -324,7 +335,18 @@ class TravisEventType(enum.Enum):
 
 
 class Travis(_config_base.Config):
-    """Represent Travis state and cache return values."""
+    """Represent Travis state and cache return values.
+
+    Args:
+        deadline (Optional[float]): The number of seconds that may be
+            spent resolving values which require a system call or an
+            HTTP request. See :class:`~._config_base.Config`.
+        max_fetch_depth (Optional[int]): The maximum history depth to
+            fetch when the start of the commit range in a "push" build is
+            missing from a shallow clone. Defaults to
+            :data:`~.git_tools.DEFAULT_MAX_FETCH_DEPTH`. If ``0``, the
+            GitHub API is used instead of deepening the clone.
+    """
 
     # Default instance attributes.
     _base = _utils.UNSET
@@ -338,6 +360,11 @@ class Travis(_config_base.Config):
     _branch_env_var = env.TRAVIS_BRANCH
     _tag_env_var = env.TRAVIS_TAG
 
+    def __init__(self, deadline=None,
+                 max_fetch_depth=git_tools.DEFAULT_MAX_FETCH_DEPTH):
+        super(Travis, self).__init__(deadline=deadline)
+        self._max_fetch_depth = max_fetch_depth
+
     @property
     def base(self):
         """str: The ``git`` object that current build is changed against.
@@ -365,15 +392,16 @@ class Travis(_config_base.Config):
           blob_name1 = 'HEAD'
           blob_name2 = 'master'
           calls = [
-              ('git', 'diff', '--name-only', blob_name1, blob_name2),
+              ('git', 'diff-tree', '-r', '-z', '--name-only',
+               '--no-renames', blob_name1, blob_name2),
           ]
           files = (
-              '/path/to/your/git_checkout/project/_supporting.py')
+              '/path/to/your/git_checkout/project/_supporting.py\\0')
           results = [
               files,
           ]
 
-          def mock_check(*args):
+          def mock_check(*args, **kwargs):
               assert args == calls.pop(0)
               return results.pop(0)
 
@@ -395,6 +423,18 @@ class Travis(_config_base.Config):
             for a branch. This is because Travis leaves the value empty in
             builds triggered by the initial commit of a new branch.
 
+        .. note::
+
+            In a "push" build from a shallow clone, the clone may be
+            deepened (see ``max_fetch_depth``) to find the start of
+            the commit range.
+
+        .. note::
+
+            If the config was created with a ``deadline`` that expires
+            while computing the base of a "push" build, this will be
+            :data:`~ci_diff_helper.FULL_BUILD`.
+
         .. warning::
 
             This property is only meant to be used in a "pull request" or
@@ -404,7 +444,8 @@ class Travis(_config_base.Config):
             if self.in_pr:
                 self._base = self.branch
             elif self.event_type is TravisEventType.push:
-                self._base = _push_build_base(self.slug)
+                self._base = self._bounded(
+                    _push_build_base, self.slug, self._max_fetch_depth)
             else:
                 raise NotImplementedError
         return self._base
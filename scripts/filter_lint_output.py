@@ -0,0 +1,78 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Filter linter output down to the lines changed in the current build.
+
+Reads linter output from STDIN and writes the findings on changed lines
+to STDOUT, e.g.
+
+.. code-block:: bash
+
+  $ pycodestyle ci_diff_helper | python scripts/filter_lint_output.py
+  $ pylint --output-format=json ci_diff_helper | \\
+  >     python scripts/filter_lint_output.py --json
+
+Exits with status 1 if any finding is kept.
+"""
+
+
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+from ci_diff_helper import lint_filter
+
+
+_SUMMARY_TEMPLATE = 'Kept {:d} finding(s) on changed lines, dropped {:d}.'
+
+
+def get_args():
+    """Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--json', action='store_true',
+        help='Input is pylint JSON output (default: text output).')
+    parser.add_argument(
+        '--base',
+        help='Diff base (default: the base of the current CI build).')
+    return parser.parse_args()
+
+
+def main():
+    """Script entry point. Filters STDIN to STDOUT."""
+    args = get_args()
+    if args.base is None:
+        diff_filter = lint_filter.DiffFilter.from_config()
+    else:
+        diff_filter = lint_filter.DiffFilter.from_diff(args.base)
+
+    if args.json:
+        messages = list(diff_filter.filter_json(sys.stdin))
+        print(json.dumps(messages, indent=4))
+    else:
+        for line in diff_filter.filter_text(sys.stdin):
+            print(line.rstrip('\n'))
+
+    print(_SUMMARY_TEMPLATE.format(diff_filter.kept, diff_filter.dropped),
+          file=sys.stderr)
+    if diff_filter.kept:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
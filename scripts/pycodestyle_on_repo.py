@@ -14,41 +14,366 @@
 
 This runs pycodestyle as a script via subprocess but only runs it on the
 .py files that are checked in to the repository.
+
+With ``--jobs``, the files are instead split across a pool of worker
+processes, each running ``pycodestyle.Checker`` in-process (so no
+subprocess is started per file or batch). Reports are streamed back and
+printed in file order as they arrive. Either mode can be limited to the
+files changed since the diff base of the current CI build with
+``--changed-only``, or to an explicit list of files.
+
+Results are cached per file (see :mod:`ci_diff_helper.lint_cache`), so
+only files that changed since a previous run are checked again.
 """
 
 
 from __future__ import print_function
 
+import argparse
+import io
+import multiprocessing
 import os
 import subprocess
 import sys
 
 import ci_diff_helper
+from ci_diff_helper import git_tools
+from ci_diff_helper import lint_cache
+from ci_diff_helper import path_filter
+
+
+_SCRIPTS_DIR = os.path.abspath(os.path.dirname(__file__))
+_ROOT_DIR = os.path.abspath(os.path.join(_SCRIPTS_DIR, '..'))
+_PYTHON_FILES = path_filter.PathFilter(include=['*.py'])
+# NOTE: The files pycodestyle reads its configuration from.
+_CONFIG_FILES = ('setup.cfg', 'tox.ini', '.pycodestyle')
+_FULL_RUN_FILES = path_filter.PathFilter(
+    include=list(_CONFIG_FILES) + ['scripts/pycodestyle_on_repo.py'])
+_FULL_RUN_MESSAGE = 'Checking all files, the diff base or config changed.'
+_CHUNKS_PER_WORKER = 4
+# NOTE: Set in each worker process by ``_init_worker``.
+_STYLE_GUIDE = None
+
+
+def get_pycodestyle_version():
+    """Get the version of pycodestyle, without starting it if possible.
+
+    Returns:
+        str: The version of pycodestyle.
+    """
+    try:
+        import pycodestyle
+    except ImportError:
+        # pycodestyle is not installed for this interpreter, ask the script.
+        result = subprocess.check_output(['pycodestyle', '--version'])
+        return result.decode('utf-8')
+
+    return pycodestyle.__version__
+
+
+def get_cache_namespace():
+    """Get the namespace for cached results.
+
+    Results are only valid for the same version and configuration.
+
+    Returns:
+        str: The cache namespace.
+    """
+    config = []
+    for filename in _CONFIG_FILES:
+        filename = os.path.join(_ROOT_DIR, filename)
+        if os.path.exists(filename):
+            with io.open(filename, 'r', encoding='utf-8') as file_obj:
+                config.append(file_obj.read())
+        else:
+            config.append(None)
+    return lint_cache.hash_key('pycodestyle', get_pycodestyle_version(),
+                               config)
+
+
+def file_status(lines):
+    """Get the exit status pycodestyle has for the output of one file.
+
+    Args:
+        lines (list): The cached output lines for a file.
+
+    Returns:
+        int: 1 if there are any findings, else 0.
+    """
+    return int(any(line.startswith(':') for line in lines))
+
+
+def run_pycodestyle(filenames):
+    """Run pycodestyle on some files.
+
+    Args:
+        filenames (list): The files to check.
+
+    Returns:
+        Tuple[int, list]: The exit status and the lines of output.
+    """
+    if not filenames:
+        return 0, []
+    proc = subprocess.Popen(['pycodestyle'] + filenames,
+                            stdout=subprocess.PIPE)
+    output, _ = proc.communicate()
+    return proc.returncode, output.decode('utf-8').splitlines()
+
+
+def get_changed_python_files(base):
+    """Gets the Python files changed since a diff base.
+
+    Args:
+        base (Union[str, object]): The diff base, e.g. the ``base`` of
+            the current CI config.
+
+    Returns:
+        Optional[list]: The changed files that still exist. If all files
+        must be checked (i.e. the diff base is unknown or the
+        pycodestyle configuration changed), returns :data:`None`.
+    """
+    if base is ci_diff_helper.FULL_BUILD:
+        return None
+
+    root_dir = ci_diff_helper.git_root()
+    result = []
+    for path in git_tools.get_changed_files(base, 'HEAD'):
+        if _FULL_RUN_FILES(path):
+            return None
+        filename = os.path.join(root_dir, path)
+        if _PYTHON_FILES(path) and os.path.exists(filename):
+            result.append(filename)
+    return result
+
+
+def get_num_workers():
+    """Get the number of worker processes to use by default.
+
+    Returns:
+        int: The number of CPUs (at least 1).
+    """
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def _init_worker():
+    """Load the pycodestyle configuration once in a worker process."""
+    global _STYLE_GUIDE  # pylint: disable=global-statement
+    import pycodestyle
+
+    # NOTE: The configuration is found relative to ``paths``, as it
+    #       would be for the script.
+    _STYLE_GUIDE = pycodestyle.StyleGuide(paths=[_ROOT_DIR])
 
 
-def main(all_files=None):
+def _check_file(filename):
+    """Check one file with pycodestyle, in a worker process.
+
+    Args:
+        filename (str): The file to check.
+
+    Returns:
+        dict: The results for the file, in the form of a cache entry
+        (see :func:`ci_diff_helper.lint_cache.split_output`).
+    """
+    import pycodestyle
+
+    options = _STYLE_GUIDE.options
+    report = pycodestyle.BaseReport(options)
+    checker = pycodestyle.Checker(filename, options=options, report=report)
+    findings = []
+
+    def report_error(line_number, offset, text, check):
+        """Record each error the report doesn't ignore."""
+        code = report.error(line_number, offset, text, check)
+        if code:
+            findings.append((line_number, offset, code, text[5:]))
+        return code
+
+    checker.report_error = report_error
+    checker.check_all()
+
+    # NOTE: Sorted as ``pycodestyle.StandardReport`` does, since logical
+    #       and physical line checks report out of order.
+    findings.sort()
+    line_format = pycodestyle.REPORT_FORMAT.get(
+        options.format.lower(), options.format)
+    lines = []
+    for line_number, offset, code, text in findings:
+        lines.append(line_format % {
+            'path': '',
+            'row': line_number,
+            'col': offset + 1,
+            'code': code,
+            'text': text,
+        })
+    return {'status': int(bool(lines)), 'lines': lines}
+
+
+def iter_check_results(filenames, num_workers):
+    """Check files in a pool of worker processes.
+
+    Args:
+        filenames (list): The files to check.
+        num_workers (int): The number of worker processes.
+
+    Yields:
+        dict: The results for each file (see :func:`_check_file`), in
+        the order of ``filenames``, as soon as they are available.
+    """
+    if not filenames:
+        return
+
+    num_workers = min(num_workers, len(filenames))
+    chunk_size = max(1, len(filenames) // (num_workers * _CHUNKS_PER_WORKER))
+    pool = multiprocessing.Pool(num_workers, initializer=_init_worker)
+    try:
+        for entry in pool.imap(_check_file, filenames, chunk_size):
+            yield entry
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+
+def check_parallel(filenames, num_workers, cache=None):
+    """Check files in parallel, printing the results in file order.
+
+    Args:
+        filenames (list): The files to check.
+        num_workers (int): The number of worker processes.
+        cache (Optional[~ci_diff_helper.lint_cache.LintCache]): The cache
+            to look up (and store) the results of each file in.
+
+    Returns:
+        int: The combined exit status.
+    """
+    keys = hits = {}
+    if cache is not None:
+        keys = cache.keys_for(filenames)
+        hits = cache.lookup(keys)
+
+    misses = [filename for filename in filenames if filename not in hits]
+    results = iter_check_results(misses, num_workers)
+    status_code = 0
+    for filename in filenames:
+        entry = hits.get(filename)
+        if entry is None:
+            entry = next(results)
+            if cache is not None:
+                cache.store(keys, {filename: entry})
+        file_status_code, lines = lint_cache.merge_output(
+            [filename], {filename: entry})
+        status_code |= file_status_code
+        for line in lines:
+            print(line)
+    return status_code
+
+
+def check_serial(filenames, cache=None):
+    """Check files with a single pycodestyle subprocess.
+
+    Args:
+        filenames (list): The files to check.
+        cache (Optional[~ci_diff_helper.lint_cache.LintCache]): The cache
+            to look up (and store) the results of each file in.
+
+    Returns:
+        int: The combined exit status.
+    """
+    keys = hits = {}
+    if cache is not None:
+        keys = cache.keys_for(filenames)
+        hits = cache.lookup(keys)
+
+    misses = [filename for filename in filenames if filename not in hits]
+    status_code, lines = run_pycodestyle(misses)
+    if cache is not None:
+        status_code, lines = cache.record(
+            filenames, keys, hits, status_code, lines, file_status)
+
+    for line in lines:
+        print(line)
+    return status_code
+
+
+def get_args():
+    """Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description='Run pycodestyle on the repo.')
+    parser.add_argument(
+        'filenames', nargs='*',
+        help='Files to check (default: all checked in files).')
+    parser.add_argument(
+        '--changed-only', action='store_true',
+        help='Only check the files changed since the diff base of the '
+             'current CI build.')
+    parser.add_argument(
+        '--jobs', type=int, metavar='N',
+        help='Check files in-process with N worker processes (0 for one '
+             'per CPU), rather than in a pycodestyle subprocess.')
+    parser.add_argument(
+        '--no-cache', dest='use_cache', action='store_false',
+        help='Check every file, ignoring (and not updating) the cache.')
+    return parser.parse_args()
+
+
+def main(all_files=None, use_cache=True, changed_only=False,
+         num_workers=None):
     """Run pycodestyle on all Python files in the repository.
 
     Args:
         all_files (Optional[list]): A list of all files to consider.
+        use_cache (Optional[bool]): Flag indicating if cached results
+            should be used (and updated).
+        changed_only (Optional[bool]): Flag indicating if only the files
+            changed since the diff base of the current CI build should
+            be checked. Ignored if ``all_files`` is passed.
+        num_workers (Optional[int]): The number of worker processes to
+            check files in-process with (``0`` for one per CPU). If not
+            passed, a single pycodestyle subprocess is used.
     """
+    if changed_only and all_files is None:
+        all_files = get_changed_python_files(ci_diff_helper.get_config().base)
+        if all_files is None:
+            print(_FULL_RUN_MESSAGE)
     if all_files is None:
         all_files = ci_diff_helper.get_checked_in_files()
 
-    python_files = []
-    for filename in all_files:
-        _, ext = os.path.splitext(filename)
-        if ext == '.py':
-            python_files.append(filename)
+    python_files = list(_PYTHON_FILES.filter(all_files))
 
     if not python_files:
         print('No Python files to lint, exiting.')
+        return
+
+    cache = None
+    if use_cache:
+        cache = lint_cache.LintCache(
+            lint_cache.get_cache_dir(), get_cache_namespace())
+
+    if num_workers is None:
+        status_code = check_serial(python_files, cache=cache)
     else:
-        pycodestyle_command = ['pycodestyle'] + python_files
-        status_code = subprocess.call(pycodestyle_command)
-        if status_code != 0:
-            sys.exit(status_code)
+        status_code = check_parallel(
+            python_files, num_workers or get_num_workers(), cache=cache)
+
+    if cache is not None:
+        cache.prune()
+        print(cache.report(), file=sys.stderr)
+    if status_code != 0:
+        sys.exit(status_code)
 
 
 if __name__ == '__main__':
-    main()
+    ARGS = get_args()
+    main(all_files=ARGS.filenames or None, use_cache=ARGS.use_cache,
+         changed_only=ARGS.changed_only, num_workers=ARGS.jobs)
@@ -10,22 +10,238 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Custom script to run lint rules on ci-diff-helper."""
+"""Custom script to run lint rules on ci-diff-helper.
+
+The checked in files are listed once and passed to each checker (Pylint,
+pycodestyle and the README check). The checkers run concurrently, each
+in its own subprocess, with their output buffered so it is printed in
+one piece as each checker finishes. A timing summary is printed at the
+end.
+
+With ``--fail-fast``, the first failure stops the checkers that are still
+running and skips those that haven't started.
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import multiprocessing.pool
+import os
+import subprocess
+import sys
+import threading
+import timeit
 
 import ci_diff_helper
-import pycodestyle_on_repo
 import run_pylint
 
 
-def main():
+_SCRIPTS_DIR = os.path.abspath(os.path.dirname(__file__))
+_ROOT_DIR = os.path.abspath(os.path.join(_SCRIPTS_DIR, '..'))
+# NOTE: Slowest first, so it starts first when parallelism is bounded.
+_CHECKS = (
+    ('pylint', 'run_pylint.py', True),
+    ('pycodestyle', 'pycodestyle_on_repo.py', True),
+    ('README', 'check_readme.py', False),
+)
+_HEADER_TEMPLATE = '{:=^72}'
+_SUMMARY_TEMPLATE = '  {:<12} {:>8.2f}s  {}'
+_STATUS_PASSED = 'passed'
+_STATUS_FAILED = 'failed (status {:d})'
+_STATUS_CANCELLED = 'cancelled'
+
+CheckResult = collections.namedtuple(
+    'CheckResult', ['name', 'status', 'output', 'elapsed'])
+"""The result of running a checker.
+
+``status`` is the exit status of the checker, or :data:`None` if it was
+cancelled. ``output`` is its combined STDOUT and STDERR.
+"""
+
+
+def get_check_commands(filenames):
+    """Get the command to run each checker.
+
+    Args:
+        filenames (list): The files to check, relative to the root of
+            the repository.
+
+    Returns:
+        list: Pairs of the name of each checker and its command.
+    """
+    commands = []
+    for name, script, takes_files in _CHECKS:
+        command = [sys.executable, os.path.join(_SCRIPTS_DIR, script)]
+        if takes_files:
+            command.extend(filenames)
+        commands.append((name, command))
+    return commands
+
+
+class CheckRunner(object):
+    """Runs checkers in subprocesses, with optional fail-fast cancellation.
+
+    Args:
+        fail_fast (bool): Flag indicating if the first failure should
+            cancel the other checkers.
+    """
+
+    def __init__(self, fail_fast):
+        self.fail_fast = fail_fast
+        self._lock = threading.Lock()
+        self._running = []
+        self._cancelled = False
+
+    def _cancel(self):
+        """Stop the running checkers and skip the ones not started.
+
+        Must be called with the lock held.
+        """
+        self._cancelled = True
+        for proc in self._running:
+            proc.terminate()
+
+    def run(self, check):
+        """Run one checker and buffer its output.
+
+        Args:
+            check (tuple): Pair of the name of the checker and its
+                command.
+
+        Returns:
+            CheckResult: The result of the checker.
+        """
+        name, command = check
+        with self._lock:
+            if self._cancelled:
+                return CheckResult(name, None, '', 0.0)
+            start = timeit.default_timer()
+            proc = subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                cwd=_ROOT_DIR)
+            self._running.append(proc)
+
+        output, _ = proc.communicate()
+        elapsed = timeit.default_timer() - start
+        status = proc.returncode
+        with self._lock:
+            self._running.remove(proc)
+            if self._cancelled and status != 0:
+                # Stopped because another checker failed.
+                status = None
+            elif status != 0 and self.fail_fast:
+                self._cancel()
+
+        return CheckResult(name, status, output.decode('utf-8'), elapsed)
+
+
+def describe_status(status):
+    """Describe the exit status of a checker.
+
+    Args:
+        status (Optional[int]): The exit status, or :data:`None` if the
+            checker was cancelled.
+
+    Returns:
+        str: The description.
+    """
+    if status is None:
+        return _STATUS_CANCELLED
+    if status == 0:
+        return _STATUS_PASSED
+    return _STATUS_FAILED.format(status)
+
+
+def run_checks(commands, num_workers, fail_fast=False):
+    """Run checkers concurrently, printing each output as it finishes.
+
+    Args:
+        commands (list): Pairs of the name of each checker and its
+            command, as produced by :func:`get_check_commands`.
+        num_workers (int): The most checkers to run at once.
+        fail_fast (bool): Flag indicating if the first failure should
+            cancel the other checkers.
+
+    Returns:
+        list: The :class:`CheckResult` of each checker, in the order of
+        ``commands``.
+    """
+    runner = CheckRunner(fail_fast)
+    pool = multiprocessing.pool.ThreadPool(
+        max(min(num_workers, len(commands)), 1))
+    results = {}
+    try:
+        for result in pool.imap_unordered(runner.run, commands):
+            results[result.name] = result
+            if result.status is None:
+                continue
+            header = ' {}: {} '.format(
+                result.name, describe_status(result.status))
+            print(_HEADER_TEMPLATE.format(header))
+            sys.stdout.write(result.output)
+            sys.stdout.flush()
+    finally:
+        pool.close()
+        pool.join()
+
+    return [results[name] for name, _ in commands]
+
+
+def print_summary(results):
+    """Print the time taken and outcome of each checker.
+
+    Args:
+        results (list): The :class:`CheckResult` of each checker.
+    """
+    print(_HEADER_TEMPLATE.format(' Summary '))
+    for result in results:
+        print(_SUMMARY_TEMPLATE.format(
+            result.name, result.elapsed, describe_status(result.status)))
+
+
+def get_args():
+    """Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description='Run all lint checks on the repo.')
+    parser.add_argument(
+        '--jobs', type=int, metavar='N',
+        help='Run at most N checkers at once (default: one per CPU).')
+    parser.add_argument(
+        '--fail-fast', action='store_true',
+        help='Stop all checkers as soon as one fails.')
+    return parser.parse_args()
+
+
+def main(num_workers=None, fail_fast=False):
     """Script entry point.
 
-    Runs Pylint and pycodestyle.
+    Runs Pylint, pycodestyle and the README check.
+
+    Args:
+        num_workers (Optional[int]): The most checkers to run at once.
+            Defaults to the number of CPUs.
+        fail_fast (Optional[bool]): Flag indicating if the first failure
+            should cancel the other checkers.
     """
-    all_files = ci_diff_helper.get_checked_in_files()
-    pycodestyle_on_repo.main(all_files=all_files)
-    run_pylint.main(all_files=all_files)
+    if num_workers is None:
+        num_workers = run_pylint.get_num_workers()
+    all_files = [
+        os.path.relpath(filename, _ROOT_DIR)
+        for filename in ci_diff_helper.get_checked_in_files()
+    ]
+
+    results = run_checks(
+        get_check_commands(all_files), num_workers, fail_fast=fail_fast)
+    print_summary(results)
+    if any(result.status != 0 for result in results):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
-    main()
+    ARGS = get_args()
+    main(num_workers=ARGS.jobs, fail_fast=ARGS.fail_fast)
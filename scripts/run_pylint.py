@@ -12,25 +12,53 @@
 
 """Custom script to run Pylint on ci-diff-helper.
 
-This runs pylint as a script via subprocess in two different
-subprocesses. The first lints the production/library code
-using the default rc file (PRODUCTION_RC). The second lints the
-test code using an rc file (TEST_RC) which allows more style
-violations (hence it has a reduced number of style checks).
+This runs pylint as a script via subprocess on two sets of files.
+The first set is the production/library code, linted using the
+default rc file (PRODUCTION_RC). The second is the test code, linted
+using an rc file (TEST_RC) which allows more style violations (hence
+it has a reduced number of style checks).
+
+Each set is split into shards of roughly equal total file size and
+all shards (of both sets) are linted concurrently, one ``pylint``
+subprocess per CPU.
+
+Results are cached per file (see :mod:`ci_diff_helper.lint_cache`), so
+only files whose contents, or imported modules, changed since a previous
+run are linted again.
+
+Checks that compare files with each other (duplicate-code and
+cyclic-import) would only see the files in the same shard (and miss the
+cached files), so they are disabled in the shards and run in a separate
+``pylint`` process on every file in the set, which is never cached. With
+``--no-cache``, each set is linted by a single ``pylint`` process that
+runs every check.
 """
 
 from __future__ import print_function
 
+import argparse
 import collections
 import copy
+import functools
+import hashlib
+import heapq
 import io
+import json
+import multiprocessing
+import multiprocessing.pool
 import os
+import re
+import shutil
 import subprocess
 import sys
 
 import six
 
 import ci_diff_helper
+from ci_diff_helper import git_tools
+from ci_diff_helper import import_graph
+from ci_diff_helper import lint_cache
+from ci_diff_helper import path_filter
 
 
 _SCRIPTS_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -39,6 +67,24 @@ TEST_RC = os.path.join(_SCRIPTS_DIR, 'pylintrc_test')
 
 _ERROR_TEMPLATE = 'Pylint failed on {} with status {:d}.'
 _SKIP_TEMPLATE = 'Skipping {}, no files to lint.'
+_FULL_RUN_MESSAGE = 'Linting all files, the diff base or config changed.'
+_DELETED_STATUS = 'D'
+_MIN_SHARD_FILES = 8
+"""The fewest files worth starting a separate ``pylint`` process for."""
+# NOTE: The output must start with the path of each file so it can be
+#       cached per file. Also, ``pylint`` 1.x doesn't include it by default.
+_MSG_TEMPLATE = '{path}:{line}:{column}: {msg_id}: {msg} ({symbol})'
+_MESSAGE_ID = re.compile(r'\b([FEWRC])\d{4}\b')
+_CATEGORY_STATUS = {'F': 1, 'E': 2, 'W': 4, 'R': 8, 'C': 16}
+# NOTE: These messages compare all linted files with each other, so
+#       they can't be cached per file.
+_CROSS_MODULE_MESSAGES = ('R0401', 'R0801')
+# NOTE: The symbol, message ID and checker of each check comparing files.
+_CROSS_FILE_CHECKS = (
+    ('cyclic-import', 'R0401', 'imports'),
+    ('duplicate-code', 'R0801', 'similarities'),
+)
+_MESSAGES_CONTROL = 'MESSAGES CONTROL'
 
 _PRODUCTION_RC_ADDITIONS = {
     'MESSAGES CONTROL': {
@@ -51,7 +97,8 @@ _PRODUCTION_RC_ADDITIONS = {
 _PRODUCTION_RC_REPLACEMENTS = {
     'MASTER': {
         'load-plugins': 'pylint.extensions.check_docs',
-        'jobs': '4',
+        # NOTE: Files are sharded across ``pylint`` processes instead.
+        'jobs': '1',
     },
     'DESIGN': {
         'max-attributes': '10',
@@ -82,6 +129,15 @@ _ROOT_DIR = os.path.abspath(os.path.join(_SCRIPTS_DIR, '..'))
 IGNORED_FILES = (
     os.path.join(_ROOT_DIR, 'docs', 'conf.py'),
 )
+_PYTHON_FILES = path_filter.PathFilter(
+    include=['*.py'],
+    exclude=[os.path.relpath(filename, _ROOT_DIR)
+             for filename in IGNORED_FILES],
+    root=_ROOT_DIR)
+# NOTE: The pylintrc files are generated by this script, so a change to
+#       it may also change the configuration.
+_FULL_RUN_FILES = path_filter.PathFilter(
+    include=['pylintrc*', '.pylintrc', 'setup.cfg', 'scripts/run_pylint.py'])
 
 
 def get_default_config():
@@ -114,6 +170,65 @@ def read_config(contents):
     return config
 
 
+def get_cross_file_checks(rc_filename):
+    """Get the enabled checks that compare files with each other.
+
+    Args:
+        rc_filename (str): The name of a Pylint config RC file.
+
+    Returns:
+        list: The symbols of the checks in ``_CROSS_FILE_CHECKS`` that
+        the RC file doesn't disable (by symbol, message ID, checker or
+        category).
+    """
+    with io.open(rc_filename, 'r', encoding='utf-8') as file_obj:
+        config = read_config(file_obj.read())
+    disabled = set()
+    if config.has_option(_MESSAGES_CONTROL, 'disable'):
+        value = config.get(_MESSAGES_CONTROL, 'disable', raw=True)
+        disabled.update(name.strip() for name in value.split(','))
+
+    result = []
+    for symbol, message_id, checker in _CROSS_FILE_CHECKS:
+        names = (symbol, message_id, checker, message_id[0], 'all')
+        if disabled.isdisjoint(names):
+            result.append(symbol)
+    return result
+
+
+def get_pylint_version():
+    """Get the version of Pylint.
+
+    Asks the ``pylint`` executable that lints the files, which may not
+    be installed for the interpreter running this script.
+
+    Returns:
+        str: The version of Pylint.
+    """
+    result = subprocess.check_output(['pylint', '--version'])
+    return result.decode('utf-8')
+
+
+def get_rc_cache_key():
+    """Get the key the generated rc files are cached under.
+
+    The rc files only change if the Pylint version or the additions
+    and replacements made by this script change.
+
+    Returns:
+        str: The cache key.
+    """
+    key_parts = [
+        get_pylint_version(),
+        _PRODUCTION_RC_ADDITIONS,
+        _PRODUCTION_RC_REPLACEMENTS,
+        _TEST_RC_ADDITIONS,
+        _TEST_RC_REPLACEMENTS,
+    ]
+    serialized = json.dumps(key_parts, sort_keys=True)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
 def _transform_opt(opt_val):
     """Transform a config option value to a string.
 
@@ -187,6 +302,45 @@ def make_rc(base_cfg, target_filename,
         new_cfg.write(file_obj)
 
 
+def write_rc_files(cache_dir=None):
+    """Write the rc files for production and test code.
+
+    The rc files are copied from the cache if they have already been
+    generated for the current :func:`get_rc_cache_key`, which skips the
+    (slow) ``pylint --generate-rcfile`` step.
+
+    Args:
+        cache_dir (Optional[str]): The directory for the cached rc files.
+            Defaults to :func:`ci_diff_helper.lint_cache.get_cache_dir`.
+    """
+    if cache_dir is None:
+        cache_dir = lint_cache.get_cache_dir()
+    key_dir = os.path.join(cache_dir, 'pylintrc', get_rc_cache_key())
+    cached_files = [
+        (os.path.join(key_dir, os.path.basename(filename)), filename)
+        for filename in (PRODUCTION_RC, TEST_RC)
+    ]
+    if all(os.path.exists(cached) for cached, _ in cached_files):
+        for cached, filename in cached_files:
+            shutil.copyfile(cached, filename)
+        return
+
+    default_config = read_config(get_default_config())
+    make_rc(default_config, PRODUCTION_RC,
+            additions=_PRODUCTION_RC_ADDITIONS,
+            replacements=_PRODUCTION_RC_REPLACEMENTS)
+    make_rc(default_config, TEST_RC,
+            additions=_TEST_RC_ADDITIONS,
+            replacements=_TEST_RC_REPLACEMENTS)
+
+    if not os.path.isdir(key_dir):
+        os.makedirs(key_dir)
+    for cached, filename in cached_files:
+        # Copy, then rename, so a partial copy is never used.
+        shutil.copyfile(filename, cached + '.tmp')
+        os.rename(cached + '.tmp', cached)
+
+
 def valid_filename(filename):
     """Checks if a file is a valid Python file.
 
@@ -196,12 +350,7 @@ def valid_filename(filename):
     Returns:
         bool: Flag indicating if the file is valid.
     """
-    if filename in IGNORED_FILES:
-        return False
-    if not os.path.exists(filename):
-        return False
-    _, ext = os.path.splitext(filename)
-    return ext == '.py'
+    return _PYTHON_FILES(filename) and os.path.exists(filename)
 
 
 def is_test_filename(filename):
@@ -216,6 +365,27 @@ def is_test_filename(filename):
     return 'test' in filename
 
 
+def _split_python_files(filenames):
+    """Separates files based on test or production code.
+
+    Args:
+        filenames (Iterable[str]): The Python files.
+
+    Returns:
+        Tuple[list, list]: A tuple containing two lists. The first list
+            contains all production files, the next all test files.
+    """
+    production_files = []
+    test_files = []
+    for filename in filenames:
+        if is_test_filename(filename):
+            test_files.append(filename)
+        else:
+            production_files.append(filename)
+
+    return production_files, test_files
+
+
 def get_python_files(all_files=None):
     """Gets a list of all Python files in the repository.
 
@@ -232,58 +402,352 @@ def get_python_files(all_files=None):
     if all_files is None:
         all_files = ci_diff_helper.get_checked_in_files()
 
-    production_files = []
-    test_files = []
-    for filename in all_files:
-        if not valid_filename(filename):
-            continue
-        if is_test_filename(filename):
-            test_files.append(filename)
-        else:
-            production_files.append(filename)
+    return _split_python_files(
+        filename for filename in all_files if valid_filename(filename))
 
-    return production_files, test_files
 
+def get_changed_python_files(base):
+    """Gets the Python files changed since a diff base.
 
-def lint_fileset(filenames, rc_filename, description):
-    """Lints a group of files using a given rcfile.
+    Deleted files are dropped based on the status in the diff, so
+    (unlike :func:`get_python_files`) no file is checked on disk.
 
     Args:
-        filenames (list): A list of files to be linted.
-        rc_filename (str): The name of the Pylint config RC file.
-        description (str): A description of the files and configuration
-            currently being run.
+        base (Union[str, object]): The diff base, e.g. the ``base`` of
+            the current CI config.
+
+    Returns:
+        Optional[Tuple[list, list]]: A tuple of the changed production
+            files and the changed test files. If all files must be
+            linted (i.e. the diff base is unknown or the ``pylint``
+            configuration changed), returns :data:`None`.
     """
-    if filenames:
-        pylint_shell_command = ['pylint', '--rcfile', rc_filename]
-        pylint_shell_command.extend(filenames)
-        status_code = subprocess.call(pylint_shell_command)
+    if base is ci_diff_helper.FULL_BUILD:
+        return None
+
+    root_dir = ci_diff_helper.git_root()
+    changed_files = []
+    for entry in git_tools.get_changed_status(base, 'HEAD'):
+        status, path = entry[0], entry[-1]
+        if _FULL_RUN_FILES(path):
+            return None
+        if status != _DELETED_STATUS and _PYTHON_FILES(path):
+            changed_files.append(os.path.join(root_dir, path))
+
+    return _split_python_files(changed_files)
+
+
+def get_num_workers():
+    """Get the number of ``pylint`` processes to run at once.
+
+    Returns:
+        int: The number of CPUs (at least 1).
+    """
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def shard_files(filenames, num_shards):
+    """Split files into shards of roughly equal total size.
+
+    Files are assigned largest first, each to the shard with the
+    smallest total size so far.
+
+    Args:
+        filenames (list): The files to split.
+        num_shards (int): The maximum number of shards. Fewer shards are
+            used if there aren't enough files to keep each busy.
+
+    Returns:
+        List[list]: The (non-empty) shards, each sorted by filename.
+    """
+    num_shards = min(num_shards, -(-len(filenames) // _MIN_SHARD_FILES))
+    num_shards = max(num_shards, 1)
+    by_size = sorted(((os.path.getsize(filename), filename)
+                      for filename in filenames), reverse=True)
+    heap = [(0, index) for index in six.moves.range(num_shards)]
+    shards = [[] for _ in six.moves.range(num_shards)]
+    for size, filename in by_size:
+        total, index = heapq.heappop(heap)
+        shards[index].append(filename)
+        heapq.heappush(heap, (total + size, index))
+    return [sorted(shard) for shard in shards if shard]
+
+
+def _run_pylint(task):
+    """Run ``pylint`` on a shard of files (in a worker thread).
+
+    Args:
+        task (tuple): Triple of the name of the Pylint config RC file,
+            extra ``pylint`` options and the files to lint.
+
+    Returns:
+        Tuple[int, str]: The exit status and the (combined) output.
+    """
+    rc_filename, options, filenames = task
+    pylint_shell_command = [
+        'pylint', '--rcfile', rc_filename, '--msg-template', _MSG_TEMPLATE]
+    pylint_shell_command.extend(options)
+    pylint_shell_command.extend(filenames)
+    proc = subprocess.Popen(pylint_shell_command, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT)
+    output, _ = proc.communicate()
+    return proc.returncode, output.decode('utf-8')
+
+
+def file_status(lines):
+    """Get the exit status ``pylint`` has for the output of one file.
+
+    Args:
+        lines (list): The cached output lines for a file.
+
+    Returns:
+        int: The bit flags of the categories of the messages.
+    """
+    status = 0
+    for line in lines:
+        match = _MESSAGE_ID.search(line)
+        if line.startswith(':') and match is not None:
+            status |= _CATEGORY_STATUS[match.group(1)]
+    return status
+
+
+def is_cacheable(entry):
+    """Checks if the ``pylint`` results for a file can be cached.
+
+    Args:
+        entry (dict): The cache entry for the file.
+
+    Returns:
+        bool: Flag indicating if the entry has no messages that depend
+            on the other linted files.
+    """
+    return not any(message_id in line
+                   for line in entry['lines']
+                   for message_id in _CROSS_MODULE_MESSAGES)
+
+
+def _dependency_filenames(graph, root_dir, filename):
+    """Get the files a file (transitively) imports.
+
+    Args:
+        graph (ci_diff_helper.import_graph.ImportGraph): The imports in
+            the repository.
+        root_dir (str): The root of the repository.
+        filename (str): An absolute filename.
+
+    Returns:
+        list: The absolute filenames of the imported modules.
+    """
+    path = os.path.relpath(filename, root_dir)
+    return [os.path.join(root_dir, dependency)
+            for dependency in graph.dependency_paths(path)]
+
+
+def get_caches(filesets):
+    """Get a result cache for each group of files.
+
+    Cache keys cover the blob SHAs of each file and of the modules it
+    (transitively) imports, the Pylint version and the rc file.
+
+    Args:
+        filesets (list): Triples of a list of files to be linted, the
+            name of the Pylint config RC file and a description.
+
+    Returns:
+        list: Triples of a :class:`~ci_diff_helper.lint_cache.LintCache`,
+            the cache keys and the cache hits for each group.
+    """
+    cache_dir = lint_cache.get_cache_dir()
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    graph = import_graph.ImportGraph.build(
+        cache_filename=os.path.join(cache_dir, 'imports.json'))
+    dependencies = functools.partial(
+        _dependency_filenames, graph, ci_diff_helper.git_root())
+    rc_cache_key = get_rc_cache_key()
+
+    result = []
+    for filenames, rc_filename, _ in filesets:
+        cache = lint_cache.LintCache(cache_dir, lint_cache.hash_key(
+            'pylint', rc_cache_key, os.path.basename(rc_filename)))
+        keys = cache.keys_for(filenames, dependencies=dependencies)
+        result.append((cache, keys, cache.lookup(keys)))
+    return result
+
+
+def lint_filesets(filesets, num_workers=None, use_cache=True):
+    """Lints groups of files, each using a given rcfile.
+
+    All groups are linted concurrently and the output is printed once
+    every ``pylint`` process is done, group by group and file by file.
+
+    Args:
+        filesets (list): Triples of a list of files to be linted, the
+            name of the Pylint config RC file and a description of the
+            files and configuration.
+        num_workers (Optional[int]): The number of ``pylint`` processes
+            to run at once. Defaults to :func:`get_num_workers`.
+        use_cache (Optional[bool]): Flag indicating if cached results
+            should be used (and updated). If so, each group is split into
+            shards and the checks which compare files with each other run
+            in a separate ``pylint`` process on the whole group. If not,
+            each group is linted by a single ``pylint`` process.
+
+    Returns:
+        int: The worst exit status, i.e. the bitwise OR of the ``pylint``
+            exit statuses (which are bit flags for each message
+            category).
+    """
+    if num_workers is None:
+        num_workers = get_num_workers()
+    if use_cache:
+        caches = get_caches(filesets)
+    else:
+        caches = [(None, {}, {})] * len(filesets)
+
+    to_lint = []
+    for (filenames, _, _), (_, _, hits) in six.moves.zip(filesets, caches):
+        to_lint.append([filename for filename in filenames
+                        if filename not in hits])
+
+    total_size = sum(os.path.getsize(filename)
+                     for filenames in to_lint for filename in filenames)
+    # Each task is a triple of the fileset index, a flag indicating if it
+    # runs the checks comparing files and the arguments of _run_pylint.
+    tasks = []
+    for index, (filenames, rc_filename, _) in enumerate(filesets):
+        options = ()
+        cross_file_checks = []
+        if use_cache and filenames:
+            cross_file_checks = get_cross_file_checks(rc_filename)
+        if cross_file_checks:
+            enabled = ','.join(cross_file_checks)
+            cross_file_options = ('--disable=all', '--enable=' + enabled)
+            tasks.append(
+                (index, True, (rc_filename, cross_file_options, filenames)))
+            options = ('--disable=' + enabled,)
+
+        if not to_lint[index]:
+            continue
+        if use_cache:
+            # Split the workers between the filesets by size.
+            fileset_size = sum(os.path.getsize(name)
+                               for name in to_lint[index])
+            num_shards = num_workers * fileset_size // max(total_size, 1)
+        else:
+            num_shards = 1
+        for shard in shard_files(to_lint[index], max(num_shards, 1)):
+            tasks.append((index, False, (rc_filename, options, shard)))
+
+    pool_size = max(min(num_workers, len(tasks)), 1)
+    pool = multiprocessing.pool.ThreadPool(pool_size)
+    try:
+        results = pool.map(_run_pylint, [task for _, _, task in tasks])
+    finally:
+        pool.close()
+        pool.join()
+
+    worst_status = 0
+    for index, (filenames, _, description) in enumerate(filesets):
+        if not filenames:
+            print(_SKIP_TEMPLATE.format(description))
+            continue
+
+        status_code = 0
+        lines = []
+        cross_file_status = 0
+        cross_file_lines = []
+        for (task_index, cross_file, _), (task_status, output) in (
+                six.moves.zip(tasks, results)):
+            if task_index != index:
+                continue
+            if cross_file:
+                cross_file_status |= task_status
+                cross_file_lines.extend(output.splitlines())
+            else:
+                status_code |= task_status
+                lines.extend(output.splitlines())
+        cache, keys, hits = caches[index]
+        if cache is not None:
+            status_code, lines = cache.record(
+                filenames, keys, hits, status_code, lines, file_status,
+                cacheable=is_cacheable)
+        status_code |= cross_file_status
+        lines.extend(cross_file_lines)
+
+        for line in lines:
+            print(line)
         if status_code != 0:
             error_message = _ERROR_TEMPLATE.format(
                 description, status_code)
             print(error_message, file=sys.stderr)
-            sys.exit(status_code)
-    else:
-        print(_SKIP_TEMPLATE.format(description))
+        worst_status |= status_code
+
+    for cache, _, _ in caches:
+        if cache is not None:
+            print(cache.report(), file=sys.stderr)
+    if use_cache and caches:
+        # NOTE: All caches share a directory, so pruning once is enough.
+        caches[0][0].prune()
+    return worst_status
 
 
-def main(all_files=None):
+def get_args():
+    """Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description='Run pylint on the repo.')
+    parser.add_argument(
+        'filenames', nargs='*',
+        help='Files to lint (default: all checked in files).')
+    parser.add_argument(
+        '--changed-only', action='store_true',
+        help='Only lint the files changed since the diff base of the '
+             'current CI build.')
+    parser.add_argument(
+        '--no-cache', dest='use_cache', action='store_false',
+        help='Lint every file in one process per set of files, ignoring '
+             '(and not updating) the cache.')
+    return parser.parse_args()
+
+
+def main(all_files=None, changed_only=False, use_cache=True):
     """Script entry point. Lints both sets of files.
 
     Args:
         all_files (Optional[list]): A list of all files to consider.
+        changed_only (Optional[bool]): Flag indicating if only the files
+            changed since the diff base of the current CI build should
+            be linted. Ignored if ``all_files`` is passed.
+        use_cache (Optional[bool]): Flag indicating if cached results
+            should be used (and updated).
     """
-    default_config = read_config(get_default_config())
-    make_rc(default_config, PRODUCTION_RC,
-            additions=_PRODUCTION_RC_ADDITIONS,
-            replacements=_PRODUCTION_RC_REPLACEMENTS)
-    make_rc(default_config, TEST_RC,
-            additions=_TEST_RC_ADDITIONS,
-            replacements=_TEST_RC_REPLACEMENTS)
-    production_files, test_files = get_python_files(all_files=all_files)
-    lint_fileset(production_files, PRODUCTION_RC, 'Library')
-    lint_fileset(test_files, TEST_RC, 'Test')
+    write_rc_files()
+
+    python_files = None
+    if changed_only and all_files is None:
+        python_files = get_changed_python_files(
+            ci_diff_helper.get_config().base)
+        if python_files is None:
+            print(_FULL_RUN_MESSAGE)
+    if python_files is None:
+        python_files = get_python_files(all_files=all_files)
+
+    production_files, test_files = python_files
+    status_code = lint_filesets([
+        (production_files, PRODUCTION_RC, 'Library'),
+        (test_files, TEST_RC, 'Test'),
+    ], use_cache=use_cache)
+    if status_code != 0:
+        sys.exit(status_code)
 
 
 if __name__ == '__main__':
-    main()
+    ARGS = get_args()
+    main(all_files=ARGS.filenames or None, changed_only=ARGS.changed_only,
+         use_cache=ARGS.use_cache)
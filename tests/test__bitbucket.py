@@ -0,0 +1,245 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class _LocalServer(object):
+    """Stand-in for the Bitbucket API, served from a background thread.
+
+    ``routes`` maps a request path to a list of
+    ``(status, headers, body)`` responses, which are returned in order. Each request (path and
+    headers) is recorded in ``requests``.
+    """
+
+    def __init__(self, routes):
+        import threading
+        from six.moves import BaseHTTPServer
+
+        self.routes = routes
+        self.requests = []
+        local_server = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                local_server.requests.append(
+                    (self.path, dict(self.headers.items())))
+                status, headers, body = local_server.routes[
+                    self.path].pop(0)
+                body = body.encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'poll_interval': 0.01})
+        self.thread.daemon = True
+
+    @property
+    def root(self):
+        return 'http://127.0.0.1:{:d}'.format(self.server.server_port)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+def _fresh_session():
+    import contextlib
+    import mock
+    from ci_diff_helper import _bitbucket
+    from ci_diff_helper import _utils
+
+    @contextlib.contextmanager
+    def fresh():
+        with mock.patch.object(_utils, '_SESSION', new={'value': None}):
+            with mock.patch.object(_bitbucket, '_CACHE', new={}):
+                yield
+
+    return fresh()
+
+
+class Test__get_headers(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import _bitbucket
+        return _bitbucket._get_headers()
+
+    def test_without_auth(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            headers = self._call_function_under_test()
+
+        self.assertEqual(headers, {})
+
+    def test_with_auth(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        token = 'jsonwebtoken'
+        mock_env = {env.BB_TOKEN: token}
+        with mock.patch('os.environ', new=mock_env):
+            headers = self._call_function_under_test()
+
+        self.assertEqual(headers, {'Authorization': 'Bearer ' + token})
+
+
+class Test__get_json(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(api_url):
+        from ci_diff_helper import _bitbucket
+        return _bitbucket._get_json(api_url)
+
+    def _helper(self, routes, paths):
+        import mock
+
+        results = []
+        with mock.patch('os.environ', new={}):
+            with _fresh_session():
+                with _LocalServer(routes) as server:
+                    for path in paths:
+                        results.append(
+                            self._call_function_under_test(
+                                server.root + path))
+        return results, server.requests
+
+    def test_success(self):
+        path = '/resource'
+        routes = {path: [(200, {}, '{"a": 1}')]}
+        results, requests_made = self._helper(routes, [path])
+
+        self.assertEqual(results, [{'a': 1}])
+        self.assertEqual(len(requests_made), 1)
+        self.assertEqual(requests_made[0][0], path)
+
+    def test_conditional_request(self):
+        path = '/resource'
+        routes = {
+            path: [
+                (200, {'ETag': '"abc"'}, '{"a": 1}'),
+                (304, {'ETag': '"abc"'}, ''),
+            ],
+        }
+        results, requests_made = self._helper(routes, [path, path])
+
+        self.assertEqual(results, [{'a': 1}, {'a': 1}])
+        self.assertEqual(len(requests_made), 2)
+        self.assertNotIn('If-None-Match', requests_made[0][1])
+        self.assertEqual(requests_made[1][1]['If-None-Match'], '"abc"')
+
+    def test_changed_resource(self):
+        path = '/resource'
+        routes = {
+            path: [
+                (200, {'ETag': '"abc"'}, '{"a": 1}'),
+                (200, {'ETag': '"def"'}, '{"a": 2}'),
+                (304, {}, ''),
+            ],
+        }
+        results, requests_made = self._helper(routes, [path, path, path])
+
+        self.assertEqual(results, [{'a': 1}, {'a': 2}, {'a': 2}])
+        self.assertEqual(requests_made[2][1]['If-None-Match'], '"def"')
+
+    def test_no_etag(self):
+        path = '/resource'
+        routes = {
+            path: [
+                (200, {}, '{"a": 1}'),
+                (200, {}, '{"a": 1}'),
+            ],
+        }
+        results, requests_made = self._helper(routes, [path, path])
+
+        self.assertEqual(results, [{'a': 1}, {'a': 1}])
+        self.assertNotIn('If-None-Match', requests_made[1][1])
+
+    def test_failure(self):
+        import requests
+
+        routes = {'/missing': [(404, {}, '{"type": "error"}')]}
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self._helper(routes, ['/missing'])
+
+    def test_unexpected_status(self):
+        import requests
+
+        routes = {'/resource': [(304, {}, '')]}
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self._helper(routes, ['/resource'])
+
+    def test_request(self):
+        import mock
+
+        response = mock.Mock(
+            status_code=200, headers={},
+            spec=['status_code', 'headers', 'json'])
+        response.json.return_value = mock.sentinel.payload
+        api_url = 'https://api.bitbucket.org/2.0/foo'
+
+        get_patch = mock.patch(
+            'ci_diff_helper._utils.http_get', return_value=response)
+        headers_patch = mock.patch(
+            'ci_diff_helper._bitbucket._get_headers',
+            return_value={})
+        cache_patch = mock.patch(
+            'ci_diff_helper._bitbucket._CACHE', new={})
+        with get_patch as mocked, headers_patch, cache_patch:
+            result = self._call_function_under_test(api_url)
+
+        self.assertIs(result, mock.sentinel.payload)
+        mocked.assert_called_once_with(api_url, {})
+
+
+class Test_pr_info(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(slug, pr_id):
+        from ci_diff_helper import _bitbucket
+        return _bitbucket.pr_info(slug, pr_id)
+
+    def test_it(self):
+        import json
+        import mock
+        from ci_diff_helper import _bitbucket
+
+        payload = {'destination': {'commit': {'hash': '7450ebe1a213'}}}
+        path = '/repositories/bucket/chuck-it/pullrequests/817'
+        routes = {path: [(200, {}, json.dumps(payload))]}
+
+        with mock.patch('os.environ', new={}):
+            with _fresh_session():
+                with _LocalServer(routes) as server:
+                    root_patch = mock.patch.object(
+                        _bitbucket, 'API_ROOT', new=server.root)
+                    with root_patch:
+                        result = self._call_function_under_test(
+                            'bucket/chuck-it', 817)
+
+        self.assertEqual(result, payload)
+        self.assertEqual(server.requests[0][0], path)
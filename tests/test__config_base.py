@@ -73,6 +73,54 @@ class Test__ci_branch(unittest.TestCase):
                 self._call_function_under_test(env_var)
 
 
+class Test__ci_shard(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(index_env_var, total_env_var,
+                                  index_offset=0):
+        from ci_diff_helper._config_base import _ci_shard
+        return _ci_shard(index_env_var, total_env_var, index_offset)
+
+    def _helper(self, mock_env, *args):
+        import mock
+
+        with mock.patch('os.environ', new=mock_env):
+            return self._call_function_under_test(*args)
+
+    def test_success(self):
+        mock_env = {'MY_INDEX': '2', 'MY_TOTAL': '4'}
+        result = self._helper(mock_env, 'MY_INDEX', 'MY_TOTAL')
+        self.assertEqual(result, (2, 4))
+
+    def test_one_based(self):
+        mock_env = {'MY_INDEX': '4', 'MY_TOTAL': '4'}
+        result = self._helper(mock_env, 'MY_INDEX', 'MY_TOTAL', 1)
+        self.assertEqual(result, (3, 4))
+
+    def test_fallback(self):
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {
+            'MY_INDEX': '',
+            env.SHARD_INDEX: '1',
+            env.SHARD_TOTAL: '3',
+        }
+        result = self._helper(mock_env, 'MY_INDEX', 'MY_TOTAL', 1)
+        self.assertEqual(result, (1, 3))
+        result = self._helper(mock_env, None, None)
+        self.assertEqual(result, (1, 3))
+
+    def test_unset(self):
+        self.assertEqual(self._helper({}, 'MY_INDEX', 'MY_TOTAL'), (0, 1))
+        self.assertEqual(self._helper({}, None, None), (0, 1))
+
+    def test_invalid(self):
+        for index, total in (('a', '2'), ('2', '2'), ('-1', '2')):
+            mock_env = {'MY_INDEX': index, 'MY_TOTAL': total}
+            with self.assertRaises(ValueError):
+                self._helper(mock_env, 'MY_INDEX', 'MY_TOTAL')
+
+
 class TestConfig(unittest.TestCase):
 
     @staticmethod
@@ -93,6 +141,52 @@ class TestConfig(unittest.TestCase):
         self.assertIs(config._active, _utils.UNSET)
         self.assertIs(config._branch, _utils.UNSET)
         self.assertIs(config._is_merge, _utils.UNSET)
+        self.assertIsNone(config._expires)
+
+    def test_constructor_with_deadline(self):
+        import mock
+
+        klass = self._get_target_class()
+        with mock.patch('time.time', return_value=1000.0):
+            config = klass(deadline=12.5)
+        self.assertEqual(config._expires, 1012.5)
+
+    def test__bounded_no_deadline(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        config = self._make_one()
+        func = mock.Mock(return_value=mock.sentinel.result, spec=[])
+        result = config._bounded(func, 1, 2)
+        self.assertIs(result, mock.sentinel.result)
+        func.assert_called_once_with(1, 2)
+        self.assertIsNone(_utils._DEADLINE.expires)
+
+    def test__bounded_with_deadline(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        klass = self._get_target_class()
+        config = klass(deadline=60.0)
+
+        def func(arg):
+            self.assertEqual(_utils._DEADLINE.expires, config._expires)
+            return arg
+
+        self.assertIs(config._bounded(func, mock.sentinel.arg),
+                      mock.sentinel.arg)
+        self.assertIsNone(_utils._DEADLINE.expires)
+
+    def test__bounded_expired(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        klass = self._get_target_class()
+        config = klass(deadline=60.0)
+        func = mock.Mock(side_effect=_utils.DeadlineExceeded('Too slow'),
+                         spec=[])
+        self.assertIs(config._bounded(func), _utils.FULL_BUILD)
+        func.assert_called_once_with()
 
     def _active_helper(self, env_var, active_val):
         import mock
@@ -114,6 +208,15 @@ class TestConfig(unittest.TestCase):
 
         return mocked, config
 
+    def test_get_active_env_var(self):
+        klass = self._get_target_class()
+        self.assertIsNone(klass.get_active_env_var())
+
+        class Custom(klass):
+            _active_env_var = 'MY_CI'
+
+        self.assertEqual(Custom.get_active_env_var(), 'MY_CI')
+
     def test_active_property(self):
         active_val = object()
         env_var = 'MY_CI'
@@ -237,6 +340,18 @@ class TestConfig(unittest.TestCase):
 
         return config
 
+    def test_shard_property(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        mock_env = {env.SHARD_INDEX: '1', env.SHARD_TOTAL: '2'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(config.shard, (1, 2))
+        # Test that the value is cached.
+        self.assertEqual(config._shard, (1, 2))
+        self.assertEqual(config.shard, (1, 2))
+
     def test_tag_property_unset(self):
         env_var = 'MY_CI'
         self._tag_helper(env_var)
@@ -130,7 +130,8 @@ class Test_commit_compare(unittest.TestCase):
         payload = {'hi': 'bye'}
         response = self._make_response(payload)
 
-        patch_get = mock.patch('requests.get', return_value=response)
+        patch_get = mock.patch('ci_diff_helper._utils.http_get',
+                               return_value=response)
         slug = 'a/b'
         start = '1234'
         finish = '6789'
@@ -153,7 +154,7 @@ class Test_commit_compare(unittest.TestCase):
         headers_mock.assert_called_once_with()
         fail_mock.assert_called_once_with(response)
         mocked_get.assert_called_once_with(
-            expected_url, headers=mock.sentinel.headers)
+            expected_url, mock.sentinel.headers)
 
 
 class Test_pr_info(unittest.TestCase):
@@ -183,7 +184,8 @@ class Test_pr_info(unittest.TestCase):
         payload = {'base': {'sha': base_sha}}
         response = self._make_response(payload)
 
-        patch_get = mock.patch('requests.get', return_value=response)
+        patch_get = mock.patch('ci_diff_helper._utils.http_get',
+                               return_value=response)
         slug = 'a/b'
         pr_id = 808
         expected_url = _github._GH_PR_TEMPLATE.format(slug, pr_id)
@@ -204,4 +206,4 @@ class Test_pr_info(unittest.TestCase):
         headers_mock.assert_called_once_with()
         fail_mock.assert_called_once_with(response)
         mocked_get.assert_called_once_with(
-            expected_url, headers=mock.sentinel.headers)
+            expected_url, mock.sentinel.headers)
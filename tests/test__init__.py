@@ -16,9 +16,9 @@ import unittest
 class Test_get_config(unittest.TestCase):
 
     @staticmethod
-    def _call_function_under_test():
+    def _call_function_under_test(**kwargs):
         from ci_diff_helper import get_config
-        return get_config()
+        return get_config(**kwargs)
 
     def test_none(self):
         import mock
@@ -49,3 +49,16 @@ class Test_get_config(unittest.TestCase):
             config = self._call_function_under_test()
 
         self.assertIsInstance(config, travis.Travis)
+
+    def test_match_with_deadline(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+        from ci_diff_helper import circle_ci
+
+        mock_env = {env.IN_CIRCLE_CI: 'true'}
+        with mock.patch('os.environ', new=mock_env):
+            with mock.patch('time.time', return_value=10.0):
+                config = self._call_function_under_test(deadline=2.0)
+
+        self.assertIsInstance(config, circle_ci.CircleCI)
+        self.assertEqual(config._expires, 12.0)
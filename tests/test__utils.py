@@ -20,16 +20,26 @@ class Test_check_output(unittest.TestCase):
         from ci_diff_helper._utils import check_output
         return check_output(*args, **kwargs)
 
+    @staticmethod
+    def _make_proc(output=b'', returncode=0):
+        import mock
+
+        proc = mock.Mock(returncode=returncode, spec=['communicate'])
+        proc.communicate.return_value = (output, None)
+        return proc
+
     def _helper(self, ret_val, expected_result):
+        import subprocess
         import mock
 
         arg1 = 'foo'
         arg2 = 'bar'
-        check_mock = mock.patch('subprocess.check_output',
-                                return_value=ret_val)
-        with check_mock as mocked:
+        popen_mock = mock.patch('subprocess.Popen',
+                                return_value=self._make_proc(ret_val))
+        with popen_mock as mocked:
             result = self._call_function_under_test(arg1, arg2)
-            mocked.assert_called_once_with((arg1, arg2))
+            mocked.assert_called_once_with(
+                (arg1, arg2), stdout=subprocess.PIPE)
             self.assertEqual(result, expected_result)
 
     def test_bytes(self):
@@ -49,16 +59,16 @@ class Test_check_output(unittest.TestCase):
         kwargs = {}
         if ignore_err:
             kwargs['ignore_err'] = True
-        check_mock = mock.patch(
-            'subprocess.check_output',
-            side_effect=subprocess.CalledProcessError(1, ''))
+        popen_mock = mock.patch(
+            'subprocess.Popen',
+            return_value=self._make_proc(b'out', returncode=1))
 
         arg = 'hello-is-it-me'
-        with check_mock as mocked:
+        with popen_mock as mocked:
             result = self._call_function_under_test(arg, **kwargs)
             # We can only get here in the ignore_err case.
             mocked.assert_called_once_with(
-                (arg,), stderr=subprocess.PIPE)
+                (arg,), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             self.assertIsNone(result)
 
     def test_ignore_err(self):
@@ -67,13 +77,387 @@ class Test_check_output(unittest.TestCase):
     def test_uncaught_err(self):
         import subprocess
 
-        with self.assertRaises(subprocess.CalledProcessError):
+        with self.assertRaises(subprocess.CalledProcessError) as exc_info:
             self._err_helper()
+        self.assertEqual(exc_info.exception.returncode, 1)
+        self.assertEqual(exc_info.exception.output, b'out')
+
+    def test_capture_err(self):
+        import subprocess
+        import mock
+
+        proc = self._make_proc(b'out', returncode=2)
+        proc.communicate.return_value = (b'out', b'fatal: bad\n')
+        popen_mock = mock.patch('subprocess.Popen', return_value=proc)
+        with popen_mock as mocked:
+            with self.assertRaises(subprocess.CalledProcessError) as exc_info:
+                self._call_function_under_test('git', capture_err=True)
+
+        mocked.assert_called_once_with(
+            ('git',), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual(exc_info.exception.returncode, 2)
+        self.assertEqual(exc_info.exception.stderr, u'fatal: bad\n')
 
     def test_bad_keywords(self):
         with self.assertRaises(TypeError):
             self._call_function_under_test(huh='bad-kw')
 
+    def test_extra_env(self):
+        import subprocess
+        import mock
+
+        popen_mock = mock.patch('subprocess.Popen',
+                                return_value=self._make_proc(b'abc\n'))
+        with mock.patch('os.environ', new={'HOME': '/home/me'}):
+            with popen_mock as mocked:
+                result = self._call_function_under_test(
+                    'foo', env={'GIT_DIR': '.git'})
+
+        self.assertEqual(result, u'abc')
+        mocked.assert_called_once_with(
+            ('foo',), stdout=subprocess.PIPE,
+            env={'HOME': '/home/me', 'GIT_DIR': '.git'})
+
+    def test_with_deadline(self):
+        import sys
+        import time
+        from ci_diff_helper import _utils
+
+        with _utils.deadline(time.time() + 60.0):
+            result = self._call_function_under_test(
+                sys.executable, '-c', 'print("abc")')
+
+        self.assertEqual(result, u'abc')
+
+    def test_deadline_timeout(self):
+        import sys
+        import time
+        from ci_diff_helper import _utils
+
+        # The command never finishes on its own, so this only returns
+        # if it is killed when the deadline expires.
+        with _utils.deadline(time.time() + 0.5):
+            with self.assertRaises(_utils.DeadlineExceeded):
+                self._call_function_under_test(
+                    sys.executable, '-c', 'while True: pass',
+                    ignore_err=True)
+
+    def test_deadline_already_expired(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        popen_mock = mock.patch('subprocess.Popen')
+        time_mock = mock.patch('time.time', return_value=10.0)
+        with _utils.deadline(9.0):
+            with time_mock:
+                with popen_mock as mocked:
+                    with self.assertRaises(_utils.DeadlineExceeded):
+                        self._call_function_under_test('foo')
+
+        mocked.assert_not_called()
+
+
+class Test_get_session(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper._utils import get_session
+        return get_session()
+
+    def test_it(self):
+        import mock
+        import requests
+        from ci_diff_helper import _utils
+
+        session_patch = mock.patch.object(
+            _utils, '_SESSION', new={'value': None})
+        with session_patch:
+            session = self._call_function_under_test()
+            # Verify that caching works.
+            self.assertIs(self._call_function_under_test(), session)
+
+        self.assertIsInstance(session, requests.Session)
+        for prefix in ('https://', 'http://'):
+            adapter = session.get_adapter(prefix + 'api.github.com')
+            self.assertEqual(
+                adapter.max_retries.total, _utils._MAX_RETRIES)
+        session.close()
+
+
+class Test_http_get(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(url, headers):
+        from ci_diff_helper._utils import http_get
+        return http_get(url, headers)
+
+    def _helper(self, expires=None, side_effect=None):
+        import mock
+        from ci_diff_helper import _utils
+
+        url = 'https://api.github.com/whatever'
+        session = mock.Mock(spec=['get'])
+        session.get.return_value = mock.sentinel.response
+        session.get.side_effect = side_effect
+        session_patch = mock.patch(
+            'ci_diff_helper._utils.get_session', return_value=session)
+        time_patch = mock.patch('time.time', return_value=40.0)
+        with _utils.deadline(expires):
+            with time_patch:
+                with session_patch:
+                    try:
+                        result = self._call_function_under_test(
+                            url, mock.sentinel.headers)
+                    finally:
+                        self.assertEqual(session.get.call_count, 1)
+        return session.get, url, result
+
+    def test_without_deadline(self):
+        import mock
+
+        mocked, url, result = self._helper()
+        self.assertIs(result, mock.sentinel.response)
+        mocked.assert_called_once_with(url, headers=mock.sentinel.headers)
+
+    def test_with_deadline(self):
+        import mock
+
+        mocked, url, result = self._helper(expires=42.5)
+        self.assertIs(result, mock.sentinel.response)
+        mocked.assert_called_once_with(
+            url, headers=mock.sentinel.headers, timeout=2.5)
+
+    def test_timeout(self):
+        import requests
+        from ci_diff_helper import _utils
+
+        with self.assertRaises(_utils.DeadlineExceeded):
+            self._helper(expires=42.5,
+                         side_effect=requests.exceptions.Timeout())
+
+
+class Test__Watchdog(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper._utils import _Watchdog
+        return _Watchdog
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_no_timeout(self):
+        import mock
+
+        proc = mock.Mock(spec=['kill'])
+        with self._make_one(proc, None) as watchdog:
+            self.assertIsNone(watchdog._timer)
+        self.assertFalse(watchdog.expired)
+        proc.kill.assert_not_called()
+
+    def test_finished_in_time(self):
+        import mock
+
+        proc = mock.Mock(spec=['kill'])
+        with self._make_one(proc, 60.0) as watchdog:
+            self.assertTrue(watchdog._timer.daemon)
+        watchdog._timer.join()
+        self.assertFalse(watchdog.expired)
+        proc.kill.assert_not_called()
+
+    def test_expire(self):
+        import mock
+
+        proc = mock.Mock(spec=['kill'])
+        watchdog = self._make_one(proc, 60.0)
+        watchdog._expire()
+        self.assertTrue(watchdog.expired)
+        proc.kill.assert_called_once_with()
+
+    def test_expire_already_finished(self):
+        import mock
+
+        proc = mock.Mock(spec=['kill'])
+        proc.kill.side_effect = OSError('No such process')
+        watchdog = self._make_one(proc, 60.0)
+        watchdog._expire()
+        self.assertTrue(watchdog.expired)
+        proc.kill.assert_called_once_with()
+
+
+class Test_iter_output(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args, **kwargs):
+        from ci_diff_helper._utils import iter_output
+        return iter_output(*args, **kwargs)
+
+    @staticmethod
+    def _python(code):
+        import sys
+        return (sys.executable, '-c', code)
+
+    def test_it(self):
+        cmd = self._python('print("abc"); print(""); print("def")')
+        result = list(self._call_function_under_test(*cmd))
+        self.assertEqual(result, [u'abc', u'', u'def'])
+
+    def test_extra_env(self):
+        cmd = self._python('import os; print(os.environ["CI_DIFF_VAR"])')
+        result = list(self._call_function_under_test(
+            *cmd, env={'CI_DIFF_VAR': 'xyz'}))
+        self.assertEqual(result, [u'xyz'])
+
+    def test_failure(self):
+        import subprocess
+
+        cmd = self._python('import sys; print("a"); sys.exit(3)')
+        lines = self._call_function_under_test(*cmd)
+        self.assertEqual(next(lines), u'a')
+        with self.assertRaises(subprocess.CalledProcessError) as exc_info:
+            next(lines)
+        self.assertEqual(exc_info.exception.returncode, 3)
+
+    def test_stop_early(self):
+        # The command never finishes on its own, so this only returns
+        # if it is killed when the caller stops reading.
+        cmd = self._python('while True: print("x")')
+        lines = self._call_function_under_test(*cmd)
+        self.assertEqual(next(lines), u'x')
+        lines.close()
+
+    def test_bad_keywords(self):
+        with self.assertRaises(TypeError):
+            list(self._call_function_under_test('foo', ignore_err=True))
+
+    def test_deadline_expires(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        cmd = self._python('while True: print("x")')
+        time_patch = mock.patch(
+            'ci_diff_helper._utils.remaining_time',
+            side_effect=[None, 1.0, _utils.DeadlineExceeded('Expired')])
+        with time_patch as mocked:
+            lines = self._call_function_under_test(*cmd)
+            self.assertEqual(next(lines), u'x')
+            with self.assertRaises(_utils.DeadlineExceeded):
+                next(lines)
+
+        self.assertEqual(mocked.call_count, 3)
+
+    def test_deadline_kills_blocked_command(self):
+        import time
+        from ci_diff_helper import _utils
+
+        # The command blocks after one line, so this only returns if it
+        # is killed when the deadline expires.
+        cmd = self._python(
+            'import sys, time; print("x"); sys.stdout.flush(); '
+            'time.sleep(600)')
+        with _utils.deadline(time.time() + 0.5):
+            lines = self._call_function_under_test(*cmd)
+            self.assertEqual(next(lines), u'x')
+            with self.assertRaises(_utils.DeadlineExceeded):
+                next(lines)
+
+    def test_deadline_already_expired(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        popen_patch = mock.patch('subprocess.Popen')
+        time_patch = mock.patch('time.time', return_value=10.0)
+        with _utils.deadline(9.0):
+            with time_patch:
+                with popen_patch as mocked:
+                    with self.assertRaises(_utils.DeadlineExceeded):
+                        list(self._call_function_under_test('foo'))
+
+        mocked.assert_not_called()
+
+
+class Test_deadline(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(expires):
+        from ci_diff_helper._utils import deadline
+        return deadline(expires)
+
+    def test_it(self):
+        from ci_diff_helper import _utils
+
+        self.assertIsNone(_utils._DEADLINE.expires)
+        with self._call_function_under_test(123.0):
+            self.assertEqual(_utils._DEADLINE.expires, 123.0)
+        self.assertIsNone(_utils._DEADLINE.expires)
+
+    def test_nested(self):
+        from ci_diff_helper import _utils
+
+        with self._call_function_under_test(50.0):
+            with self._call_function_under_test(25.0):
+                self.assertEqual(_utils._DEADLINE.expires, 25.0)
+            self.assertEqual(_utils._DEADLINE.expires, 50.0)
+        self.assertIsNone(_utils._DEADLINE.expires)
+
+    def test_restored_on_error(self):
+        from ci_diff_helper import _utils
+
+        with self.assertRaises(RuntimeError):
+            with self._call_function_under_test(50.0):
+                raise RuntimeError('Oops')
+        self.assertIsNone(_utils._DEADLINE.expires)
+
+    def test_per_thread(self):
+        import threading
+        from ci_diff_helper import _utils
+
+        seen = []
+        thread = threading.Thread(
+            target=lambda: seen.append(_utils._DEADLINE.expires))
+        with self._call_function_under_test(50.0):
+            thread.start()
+            thread.join()
+        self.assertEqual(seen, [None])
+
+
+class Test_remaining_time(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper._utils import remaining_time
+        return remaining_time()
+
+    def test_no_deadline(self):
+        self.assertIsNone(self._call_function_under_test())
+
+    def _helper(self, expires, now):
+        import mock
+        from ci_diff_helper import _utils
+
+        with _utils.deadline(expires):
+            with mock.patch('time.time', return_value=now):
+                return self._call_function_under_test()
+
+    def test_remaining(self):
+        self.assertEqual(self._helper(20.0, 15.5), 4.5)
+
+    def test_expired(self):
+        from ci_diff_helper import _utils
+
+        with self.assertRaises(_utils.DeadlineExceeded):
+            self._helper(20.0, 20.0)
+
+
+class Test_FULL_BUILD(unittest.TestCase):
+
+    def test___repr__(self):
+        from ci_diff_helper._utils import FULL_BUILD
+
+        self.assertEqual(repr(FULL_BUILD),
+                         '<FULL_BUILD: diff unknown, run everything>')
+
 
 class Test_pr_from_commit(unittest.TestCase):
 
@@ -48,6 +48,70 @@ class Test__appveyor_provider(unittest.TestCase):
                 self._call_function_under_test()
 
 
+class Test__appveyor_pr(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import appveyor
+        return appveyor._appveyor_pr()
+
+    def test_success(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {env.APPVEYOR_PR_NUM: '1014'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(self._call_function_under_test(), 1014)
+
+    def test_failure_unset(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            self.assertIsNone(self._call_function_under_test())
+
+
+class Test__pr_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(branch):
+        from ci_diff_helper import appveyor
+        return appveyor._pr_base(branch)
+
+    def _helper(self, mock_env, merge_bases):
+        import mock
+
+        base_patch = mock.patch(
+            'ci_diff_helper.git_tools.merge_base', side_effect=merge_bases)
+        with mock.patch('os.environ', new=mock_env):
+            with base_patch as mocked:
+                result = self._call_function_under_test('master')
+        return result, mocked
+
+    def test_remote_branch(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        head = 'c3a3e4d9b5e0a9ff4ee1b7d3f2c7e3e53f6f2e01'
+        mock_env = {env.APPVEYOR_PR_HEAD: head}
+        result, mocked = self._helper(mock_env, [mock.sentinel.base])
+        self.assertIs(result, mock.sentinel.base)
+        mocked.assert_called_once_with('origin/master', head)
+
+    def test_local_branch(self):
+        import mock
+
+        result, mocked = self._helper({}, [None, mock.sentinel.base])
+        self.assertIs(result, mock.sentinel.base)
+        self.assertEqual(mocked.mock_calls, [
+            mock.call('origin/master', 'HEAD'),
+            mock.call('master', 'HEAD'),
+        ])
+
+    def test_unresolved(self):
+        result, _ = self._helper({}, [None, None])
+        self.assertEqual(result, 'master')
+
+
 class TestAppVeyorRepoProvider(unittest.TestCase):
 
     @staticmethod
@@ -112,6 +176,8 @@ class TestAppVeyor(unittest.TestCase):
         klass = self._get_target_class()
         config = self._make_one()
         self.assertIsInstance(config, klass)
+        self.assertIs(config._base, _utils.UNSET)
+        self.assertIs(config._pr, _utils.UNSET)
         self.assertIs(config._provider, _utils.UNSET)
 
     def _provider_helper(self, provider_val):
@@ -167,3 +233,59 @@ class TestAppVeyor(unittest.TestCase):
         mock_env = {env.IN_APPVEYOR: 'false'}
         with mock.patch('os.environ', new=mock_env):
             self.assertEqual(repr(config), '<AppVeyor (active=False)>')
+
+    def test_pr_property(self):
+        import mock
+
+        config = self._make_one()
+        pr_patch = mock.patch('ci_diff_helper.appveyor._appveyor_pr',
+                              return_value=mock.sentinel.pr)
+        with pr_patch as mocked:
+            self.assertIs(config.pr, mock.sentinel.pr)
+            # Verify that caching works.
+            self.assertIs(config.pr, mock.sentinel.pr)
+            mocked.assert_called_once_with()
+
+    def test_in_pr_property(self):
+        config = self._make_one()
+        config._pr = 1014
+        self.assertTrue(config.in_pr)
+
+    def test_in_pr_property_fails(self):
+        config = self._make_one()
+        config._pr = None
+        self.assertFalse(config.in_pr)
+
+    def test_base_property(self):
+        import mock
+
+        config = self._make_one()
+        config._pr = 1014
+        config._branch = 'develop'
+        base_patch = mock.patch('ci_diff_helper.appveyor._pr_base',
+                                return_value=mock.sentinel.base)
+        with base_patch as mocked:
+            self.assertIs(config.base, mock.sentinel.base)
+            # Verify that caching works.
+            self.assertIs(config.base, mock.sentinel.base)
+            mocked.assert_called_once_with('develop')
+
+    def test_base_property_deadline(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        klass = self._get_target_class()
+        config = klass(deadline=10.0)
+        config._pr = 1014
+        config._branch = 'master'
+        base_patch = mock.patch(
+            'ci_diff_helper.appveyor._pr_base',
+            side_effect=_utils.DeadlineExceeded('Too slow'))
+        with base_patch:
+            self.assertIs(config.base, _utils.FULL_BUILD)
+
+    def test_base_property_non_pr(self):
+        config = self._make_one()
+        config._pr = None
+        with self.assertRaises(NotImplementedError):
+            getattr(config, 'base')
@@ -0,0 +1,310 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import utils
+
+
+_SHA1 = '587be6b4c3f93f93c489c0111bba5596147a26cb'
+_SHA2 = '8835708590a9afa236e1bbad18df9d23de82ccd3'
+_NULL_SHA = '0' * 40
+
+
+def _raw(mode1, mode2, status):
+    sha1 = _NULL_SHA if mode1 == '000000' else _SHA1
+    sha2 = _NULL_SHA if mode2 == '000000' else _SHA2
+    return ':{} {} {} {} {}'.format(mode1, mode2, sha1, sha2, status)
+
+
+class TestFileChange(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import change_set
+        return change_set.FileChange
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_constructor(self):
+        change = self._make_one('R', 'a.py', 'b.py', similarity=90,
+                                added=1, removed=2)
+        self.assertEqual(change.status, 'R')
+        self.assertEqual(change.old_path, 'a.py')
+        self.assertEqual(change.new_path, 'b.py')
+        self.assertEqual(change.similarity, 90)
+        self.assertEqual(change.added, 1)
+        self.assertEqual(change.removed, 2)
+        self.assertFalse(hasattr(change, '__dict__'))
+
+    def test_constructor_defaults(self):
+        change = self._make_one('M', 'a.py', 'a.py')
+        self.assertIsNone(change.similarity)
+        self.assertIsNone(change.added)
+        self.assertIsNone(change.removed)
+
+    def test_path(self):
+        self.assertEqual(self._make_one('A', None, 'a.py').path, 'a.py')
+        self.assertEqual(self._make_one('D', 'a.py', None).path, 'a.py')
+        self.assertEqual(self._make_one('R', 'a.py', 'b.py').path, 'b.py')
+
+    def test___eq__(self):
+        change1 = self._make_one('M', 'a.py', 'a.py', added=1, removed=0)
+        change2 = self._make_one('M', 'a.py', 'a.py', added=1, removed=0)
+        change3 = self._make_one('M', 'a.py', 'a.py', added=2, removed=0)
+        self.assertEqual(change1, change2)
+        self.assertFalse(change1 != change2)
+        self.assertNotEqual(change1, change3)
+        self.assertNotEqual(change1, object())
+
+    def test_unhashable(self):
+        change = self._make_one('M', 'a.py', 'a.py')
+        with self.assertRaises(TypeError):
+            hash(change)
+
+    def test___repr__(self):
+        change = self._make_one('M', 'a.py', 'a.py')
+        self.assertEqual(repr(change), '<FileChange M: a.py>')
+        change = self._make_one('R', 'a.py', 'b.py', similarity=85)
+        self.assertEqual(repr(change), '<FileChange R: a.py -> b.py>')
+
+
+class Test__parse_raw(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(fields):
+        from ci_diff_helper.change_set import _parse_raw
+        return _parse_raw(fields)
+
+    def test_it(self):
+        from ci_diff_helper.change_set import FileChange
+
+        fields = [
+            _raw('100644', '000000', 'D'), 'b.txt',
+            _raw('100644', '120000', 'T'), 'link',
+            _raw('000000', '100644', 'A'), 'new.txt',
+            _raw('100644', '100644', 'R085'), 'a.txt', 'z.txt',
+            _raw('100644', '100644', 'C100'), 'c.txt', 'd.txt',
+            '1\t0\tnew.txt',
+        ]
+        changes, index = self._call_function_under_test(fields)
+        expected = [
+            FileChange('D', 'b.txt', None),
+            FileChange('T', 'link', 'link'),
+            FileChange('A', None, 'new.txt'),
+            FileChange('R', 'a.txt', 'z.txt', similarity=85),
+            FileChange('C', 'c.txt', 'd.txt', similarity=100),
+        ]
+        self.assertEqual(changes, expected)
+        self.assertEqual(index, len(fields) - 1)
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test([]), ([], 0))
+
+
+class Test__add_numstat(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(changes, fields, index):
+        from ci_diff_helper.change_set import _add_numstat
+        return _add_numstat(changes, fields, index)
+
+    def test_it(self):
+        from ci_diff_helper.change_set import FileChange
+
+        changes = [
+            FileChange('M', 'bin', 'bin'),
+            FileChange('R', 'a.txt', 'z.txt', similarity=85),
+            FileChange('M', 'c.txt', 'c.txt'),
+        ]
+        fields = [
+            'ignored',
+            '-\t-\tbin',
+            '1\t0\t', 'a.txt', 'z.txt',
+            '3\t2\tc.txt',
+        ]
+        self.assertIsNone(self._call_function_under_test(changes, fields, 1))
+        counts = [(change.added, change.removed) for change in changes]
+        self.assertEqual(counts, [(None, None), (1, 0), (3, 2)])
+
+
+class TestChangeSet(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import change_set
+        return change_set.ChangeSet
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    @staticmethod
+    def _make_changes():
+        from ci_diff_helper.change_set import FileChange
+
+        return [
+            FileChange('D', 'b.txt', None, added=0, removed=1),
+            FileChange('M', 'c.txt', 'c.txt', added=1, removed=0),
+            FileChange('T', 'link', 'link', added=1, removed=1),
+            FileChange('A', None, 'new.txt', added=1, removed=0),
+            FileChange('R', 'a.txt', 'z.txt', similarity=85,
+                       added=1, removed=0),
+            FileChange('C', 'z.txt', 'y.txt', similarity=100,
+                       added=0, removed=0),
+        ]
+
+    def test_container(self):
+        changes = self._make_changes()
+        change_set = self._make_one(changes)
+        self.assertEqual(len(change_set), 6)
+        self.assertEqual(list(change_set), changes)
+        for path in ('a.txt', 'b.txt', 'c.txt', 'link', 'new.txt',
+                     'y.txt', 'z.txt'):
+            self.assertIn(path, change_set)
+        self.assertNotIn('d.txt', change_set)
+
+    def test_get(self):
+        changes = self._make_changes()
+        change_set = self._make_one(changes)
+        self.assertIs(change_set.get('b.txt'), changes[0])
+        self.assertIs(change_set.get('a.txt'), changes[4])
+        # A path that is both a rename target and a copy source maps to
+        # the change that created it.
+        self.assertIs(change_set.get('z.txt'), changes[4])
+        self.assertIs(change_set.get('y.txt'), changes[5])
+        self.assertIsNone(change_set.get('d.txt'))
+        self.assertIs(change_set.get('d.txt', changes), changes)
+
+    def test_paths(self):
+        change_set = self._make_one(self._make_changes())
+        self.assertEqual(
+            change_set.paths,
+            ('b.txt', 'c.txt', 'link', 'new.txt', 'z.txt', 'y.txt'))
+
+    def test_views(self):
+        changes = self._make_changes()
+        change_set = self._make_one(changes)
+        self.assertEqual(change_set.deleted, (changes[0],))
+        self.assertEqual(change_set.modified, (changes[1], changes[2]))
+        self.assertEqual(change_set.added, (changes[3],))
+        self.assertEqual(change_set.renamed, (changes[4],))
+        self.assertEqual(change_set.copied, (changes[5],))
+        # Verify the views are cached.
+        self.assertIs(change_set.modified, change_set.modified)
+
+    def _from_git_helper(self, renames, stats, cmd_output):
+        import mock
+
+        klass = self._get_target_class()
+        with mock.patch('ci_diff_helper._utils.check_output',
+                        return_value=cmd_output) as mocked:
+            change_set = klass.from_git(
+                'HEAD', 'master', renames=renames, stats=stats)
+        return change_set, mocked
+
+    def test_from_git(self):
+        from ci_diff_helper.change_set import FileChange
+
+        fields = [
+            _raw('100644', '000000', 'D'), 'b.txt',
+            _raw('100644', '100644', 'M'), 'bin',
+            _raw('100644', '100644', 'R085'), 'a.txt', 'z.txt',
+            '0\t1\tb.txt',
+            '-\t-\tbin',
+            '1\t0\t', 'a.txt', 'z.txt',
+        ]
+        change_set, mocked = self._from_git_helper(
+            True, True, '\0'.join(fields) + '\0')
+        expected = [
+            FileChange('D', 'b.txt', None, added=0, removed=1),
+            FileChange('M', 'bin', 'bin'),
+            FileChange('R', 'a.txt', 'z.txt', similarity=85,
+                       added=1, removed=0),
+        ]
+        self.assertEqual(list(change_set), expected)
+        mocked.assert_called_once_with(
+            'git', 'diff-tree', '-r', '-z', '--raw', '--numstat',
+            '--find-renames', 'HEAD', 'master')
+
+    def test_from_git_no_stats(self):
+        from ci_diff_helper.change_set import FileChange
+
+        fields = [_raw('000000', '100644', 'A'), 'new.txt']
+        change_set, mocked = self._from_git_helper(
+            True, False, '\0'.join(fields) + '\0')
+        self.assertEqual(list(change_set),
+                         [FileChange('A', None, 'new.txt')])
+        mocked.assert_called_once_with(
+            'git', 'diff-tree', '-r', '-z', '--raw', '--find-renames',
+            'HEAD', 'master')
+
+    def test_from_git_tree_only(self):
+        from ci_diff_helper import git_tools
+
+        change_set, mocked = self._from_git_helper(False, False, '')
+        self.assertEqual(len(change_set), 0)
+        mocked.assert_called_once_with(
+            'git', 'diff-tree', '-r', '-z', '--raw', '--no-renames',
+            'HEAD', 'master', env=git_tools._NO_LAZY_FETCH_ENV,
+            capture_err=True)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_from_git_actual_call(self):
+        import os
+        import shutil
+        import tempfile
+
+        klass = self._get_target_class()
+        root = tempfile.mkdtemp()
+        orig_dir = os.getcwd()
+        try:
+            utils.git(root, 'init', '--quiet')
+            contents = {
+                'a.txt': 'a\nb\nc\nd\ne\nf\n',
+                'b.txt': 'x\n',
+                'c.txt': 'y\n',
+            }
+            for name, value in contents.items():
+                with open(os.path.join(root, name), 'w') as file_obj:
+                    file_obj.write(value)
+            utils.git(root, 'add', '.')
+            utils.git(root, 'commit', '--quiet', '-m', '1')
+
+            utils.git(root, 'mv', 'a.txt', 'z.txt')
+            with open(os.path.join(root, 'z.txt'), 'a') as file_obj:
+                file_obj.write('g\n')
+            with open(os.path.join(root, 'c.txt'), 'a') as file_obj:
+                file_obj.write('yy\n')
+            with open(os.path.join(root, 'new.txt'), 'w') as file_obj:
+                file_obj.write('n\n')
+            utils.git(root, 'rm', '--quiet', 'b.txt')
+            utils.git(root, 'add', '.')
+            utils.git(root, 'commit', '--quiet', '-m', '2')
+
+            os.chdir(root)
+            change_set = klass.from_git('HEAD~1', 'HEAD')
+        finally:
+            os.chdir(orig_dir)
+            shutil.rmtree(root)
+
+        self.assertEqual(
+            [(change.status, change.old_path, change.new_path,
+              change.added, change.removed) for change in change_set],
+            [
+                ('D', 'b.txt', None, 0, 1),
+                ('M', 'c.txt', 'c.txt', 1, 0),
+                ('A', None, 'new.txt', 1, 0),
+                ('R', 'a.txt', 'z.txt', 1, 0),
+            ])
@@ -141,6 +141,143 @@ class TestCircleCIRepoProvider(unittest.TestCase):
             self._make_one('mustard')
 
 
+class Test__compare_range(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import circle_ci
+        return circle_ci._compare_range()
+
+    def _helper(self, compare_url=None):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {}
+        if compare_url is not None:
+            mock_env[env.CIRCLE_CI_COMPARE_URL] = compare_url
+        with mock.patch('os.environ', new=mock_env):
+            return self._call_function_under_test()
+
+    def test_success(self):
+        compare_url = 'https://github.com/a/b/compare/4ad7349...c3a3e4d'
+        self.assertEqual(self._helper(compare_url), ('4ad7349', 'c3a3e4d'))
+
+    def test_unset(self):
+        self.assertIsNone(self._helper())
+
+    def test_single_commit(self):
+        compare_url = 'https://github.com/a/b/commit/c3a3e4d'
+        self.assertIsNone(self._helper(compare_url))
+
+    def test_no_range(self):
+        compare_url = 'https://github.com/a/b/compare/c3a3e4d'
+        self.assertIsNone(self._helper(compare_url))
+
+
+class Test__default_branch_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args):
+        from ci_diff_helper import circle_ci
+        return circle_ci._default_branch_base(*args)
+
+    def test_success(self):
+        import mock
+
+        default_patch = mock.patch(
+            'ci_diff_helper.git_tools.remote_default_branch',
+            return_value='origin/main')
+        base_patch = mock.patch(
+            'ci_diff_helper.git_tools.merge_base',
+            return_value=mock.sentinel.base)
+        with default_patch as mock_default:
+            with base_patch as mock_base:
+                result = self._call_function_under_test()
+
+        self.assertIs(result, mock.sentinel.base)
+        mock_default.assert_called_once_with()
+        mock_base.assert_called_once_with('origin/main', 'HEAD')
+
+    def test_known_default_branch(self):
+        import mock
+
+        base_patch = mock.patch(
+            'ci_diff_helper.git_tools.merge_base',
+            return_value=mock.sentinel.base)
+        with base_patch as mocked:
+            result = self._call_function_under_test('origin/develop')
+
+        self.assertIs(result, mock.sentinel.base)
+        mocked.assert_called_once_with('origin/develop', 'HEAD')
+
+    def test_no_default_branch(self):
+        import mock
+
+        default_patch = mock.patch(
+            'ci_diff_helper.git_tools.remote_default_branch',
+            return_value=None)
+        base_patch = mock.patch('ci_diff_helper.git_tools.merge_base')
+        with default_patch:
+            with base_patch as mocked:
+                self.assertIsNone(self._call_function_under_test())
+
+        mocked.assert_not_called()
+
+
+class Test__local_push_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import circle_ci
+        return circle_ci._local_push_base()
+
+    def test_compare_range(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {
+            env.CIRCLE_CI_COMPARE_URL: (
+                'https://github.com/a/b/compare/abc...def'),
+        }
+        base_patch = mock.patch(
+            'ci_diff_helper.git_tools.merge_base',
+            return_value=mock.sentinel.base)
+        with mock.patch('os.environ', new=mock_env):
+            with base_patch as mocked:
+                result = self._call_function_under_test()
+
+        self.assertIs(result, mock.sentinel.base)
+        mocked.assert_called_once_with('abc', 'def')
+
+    def _default_helper(self, branch, default_branch):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {env.CIRCLE_CI_BRANCH: branch}
+        default_patch = mock.patch(
+            'ci_diff_helper.git_tools.remote_default_branch',
+            return_value=default_branch)
+        base_patch = mock.patch(
+            'ci_diff_helper.circle_ci._default_branch_base',
+            return_value=mock.sentinel.base)
+        with mock.patch('os.environ', new=mock_env):
+            with default_patch:
+                with base_patch as mocked:
+                    return self._call_function_under_test(), mocked
+
+    def test_feature_branch(self):
+        import mock
+
+        result, mocked = self._default_helper('feature', 'origin/master')
+        self.assertIs(result, mock.sentinel.base)
+        mocked.assert_called_once_with('origin/master')
+
+    def test_default_branch(self):
+        result, mocked = self._default_helper('master', 'origin/master')
+        self.assertIsNone(result)
+        mocked.assert_not_called()
+
+
 class TestCircleCI(unittest.TestCase):
 
     @staticmethod
@@ -176,6 +313,18 @@ class TestCircleCI(unittest.TestCase):
         with mock.patch('os.environ', new={}):
             self.assertEqual(repr(config), '<CircleCI (active=False)>')
 
+    def test_shard_property(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        mock_env = {
+            env.CIRCLE_CI_NODE_INDEX: '2',
+            env.CIRCLE_CI_NODE_TOTAL: '4',
+        }
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(config.shard, (2, 4))
+
     def _pr_helper(self, pr_val):
         import mock
         from ci_diff_helper import _utils
@@ -347,7 +496,7 @@ class TestCircleCI(unittest.TestCase):
         self.assertIs(pr_info, mock.sentinel.info)
         self.assertEqual(get_info.call_count, 1)
 
-    def test__pr_info_property_pr_not_github(self):
+    def test__pr_info_property_bitbucket_pr(self):
         import mock
         from ci_diff_helper import circle_ci
         from ci_diff_helper import environment_vars as env
@@ -360,11 +509,15 @@ class TestCircleCI(unittest.TestCase):
             env.CIRCLE_CI_REPO_URL: repo_url,
             env.CIRCLE_CI_PR_NUM: '817',
         }
+        gh_patch = mock.patch('ci_diff_helper._github.pr_info')
+        bb_patch = mock.patch('ci_diff_helper._bitbucket.pr_info',
+                              return_value=mock.sentinel.info)
         with mock.patch('os.environ', new=mock_env):
-            with mock.patch('ci_diff_helper._github.pr_info') as get_info:
-                with self.assertRaises(NotImplementedError):
-                    getattr(config, '_pr_info')
-                get_info.assert_not_called()
+            with gh_patch as gh_info:
+                with bb_patch as bb_info:
+                    self.assertIs(config._pr_info, mock.sentinel.info)
+                    bb_info.assert_called_once_with(slug, 817)
+                gh_info.assert_not_called()
 
     def test_base_property_cache(self):
         import mock
@@ -374,31 +527,287 @@ class TestCircleCI(unittest.TestCase):
 
         self.assertIs(config.base, mock.sentinel.base)
 
-    def test_base_property_non_pr(self):
+    def test__pr_info_property_deadline(self):
+        import mock
+        from ci_diff_helper import _utils
+        from ci_diff_helper import circle_ci
+        from ci_diff_helper import environment_vars as env
+
+        klass = self._get_target_class()
+        config = klass(deadline=10.0)
+
+        mock_env = {
+            env.CIRCLE_CI_REPO_URL: circle_ci._GITHUB_PREFIX + 'a/b',
+            env.CIRCLE_CI_PR_NUM: '101',
+        }
+        info_patch = mock.patch(
+            'ci_diff_helper._github.pr_info',
+            side_effect=_utils.DeadlineExceeded('Too slow'))
+        with mock.patch('os.environ', new=mock_env):
+            with info_patch as get_info:
+                self.assertIs(config._pr_info, _utils.FULL_BUILD)
+                get_info.assert_called_once_with('a/b', 101)
+
+        # Make sure the failure is not cached.
+        self.assertIs(config._pr_info_cached, _utils.UNSET)
+
+    def test_constructor_api_fallback(self):
+        klass = self._get_target_class()
+        self.assertFalse(klass()._api_fallback)
+        self.assertTrue(klass(api_fallback=True)._api_fallback)
+
+    def _base_helper(self, pr_val, helper_name, base):
+        import mock
+
         config = self._make_one()
-        # Fake that we are outside a PR.
-        config._pr = None
+        config._pr = pr_val
+        local_patch = mock.patch(
+            'ci_diff_helper.circle_ci.' + helper_name, return_value=base)
+        with local_patch as mocked:
+            result = config.base
+            # Verify that caching works.
+            self.assertIs(config.base, result)
+            mocked.assert_called_once_with()
+        return config, result
 
-        with self.assertRaises(NotImplementedError):
-            getattr(config, 'base')
+    def test_base_property_pr_local(self):
+        import mock
+
+        _, result = self._base_helper(
+            9, '_default_branch_base', mock.sentinel.base)
+        self.assertIs(result, mock.sentinel.base)
+
+    def test_base_property_push_local(self):
+        import mock
+
+        _, result = self._base_helper(
+            None, '_local_push_base', mock.sentinel.base)
+        self.assertIs(result, mock.sentinel.base)
+
+    def test_base_property_unresolved(self):
+        from ci_diff_helper import _utils
+
+        _, result = self._base_helper(9, '_default_branch_base', None)
+        self.assertIs(result, _utils.FULL_BUILD)
+
+    def test_base_property_local_deadline(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        klass = self._get_target_class()
+        config = klass(deadline=10.0)
+        config._pr = 9
+        local_patch = mock.patch(
+            'ci_diff_helper.circle_ci._default_branch_base',
+            side_effect=_utils.DeadlineExceeded('Too slow'))
+        with local_patch:
+            self.assertIs(config.base, _utils.FULL_BUILD)
+        self.assertIs(config._base, _utils.FULL_BUILD)
+
+    def test_base_property_pr_target(self):
+        import mock
+
+        klass = self._get_target_class()
+        config = klass(api_fallback=True)
+        config._pr = 9
+        target_patch = mock.patch.object(
+            config, '_pr_target_base', return_value=mock.sentinel.base)
+        local_patch = mock.patch(
+            'ci_diff_helper.circle_ci._default_branch_base')
+        with local_patch as mock_local:
+            with target_patch as mock_target:
+                self.assertIs(config.base, mock.sentinel.base)
+                mock_target.assert_called_once_with()
+        mock_local.assert_not_called()
+
+    def test_base_property_api_fallback(self):
+        import mock
+
+        klass = self._get_target_class()
+        config = klass(api_fallback=True)
+        config._pr = 9
+        target_patch = mock.patch.object(
+            config, '_pr_target_base', return_value=None)
+        api_patch = mock.patch.object(
+            config, '_api_base', return_value=mock.sentinel.base)
+        with target_patch:
+            with api_patch as mocked:
+                self.assertIs(config.base, mock.sentinel.base)
+                mocked.assert_called_once_with()
+
+    def _pr_target_helper(self, provider, pr_info):
+        import mock
+
+        config = self._make_fallback(55)
+        config._provider = provider
+        config._pr_info_cached = pr_info
+        base_patch = mock.patch(
+            'ci_diff_helper.git_tools.merge_base',
+            return_value=mock.sentinel.base)
+        with base_patch as mocked:
+            return config._pr_target_base(), mocked
+
+    def test__pr_target_base_github(self):
+        import mock
+        from ci_diff_helper import circle_ci
+
+        pr_info = {'base': {'ref': 'develop', 'sha': 'abc'}}
+        result, mocked = self._pr_target_helper(
+            circle_ci.CircleCIRepoProvider.github, pr_info)
+        self.assertIs(result, mock.sentinel.base)
+        mocked.assert_called_once_with('origin/develop', 'HEAD')
+
+    def test__pr_target_base_bitbucket(self):
+        import mock
+        from ci_diff_helper import circle_ci
+
+        pr_info = {'destination': {'branch': {'name': 'release/1.x'}}}
+        result, mocked = self._pr_target_helper(
+            circle_ci.CircleCIRepoProvider.bitbucket, pr_info)
+        self.assertIs(result, mock.sentinel.base)
+        mocked.assert_called_once_with('origin/release/1.x', 'HEAD')
+
+    def test__pr_target_base_unknown_branch(self):
+        from ci_diff_helper import circle_ci
+
+        result, mocked = self._pr_target_helper(
+            circle_ci.CircleCIRepoProvider.github, {'base': {'sha': 'abc'}})
+        self.assertIsNone(result)
+        mocked.assert_not_called()
+
+    def test__pr_target_base_deadline(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        config = self._make_fallback(56)
+        info_patch = mock.patch.object(
+            self._get_target_class(), '_pr_info', new=_utils.FULL_BUILD)
+        with info_patch:
+            self.assertIs(config._pr_target_base(), _utils.FULL_BUILD)
+
+    def test__api_base_disabled(self):
+        from ci_diff_helper import _utils
 
-    def test_base_property_success(self):
         config = self._make_one()
-        # Fake that we are inside a PR.
-        config._pr = 123
+        self.assertIs(config._api_base(), _utils.FULL_BUILD)
+
+    def _make_fallback(self, pr_val):
+        klass = self._get_target_class()
+        config = klass(api_fallback=True)
+        config._pr = pr_val
+        return config
+
+    def test__api_base_pr(self):
+        from ci_diff_helper import circle_ci
+
+        config = self._make_fallback(123)
+        config._provider = circle_ci.CircleCIRepoProvider.github
         base_sha = '23ff39e7f437d888cb1aa07b4646fc6376f4af35'
-        payload = {'base': {'sha': base_sha}}
-        config._pr_info_cached = payload
+        config._pr_info_cached = {'base': {'sha': base_sha}}
 
-        self.assertEqual(config.base, base_sha)
+        self.assertEqual(config._api_base(), base_sha)
 
-    def test_base_property_pr_bad_payload(self):
-        config = self._make_one()
-        # Fake that we are inside a PR.
-        config._pr = 678
-        config._pr_info_cached = {}
+    def test__api_base_pr_bitbucket(self):
+        from ci_diff_helper import circle_ci
+
+        config = self._make_fallback(124)
+        config._provider = circle_ci.CircleCIRepoProvider.bitbucket
+        base_hash = '7450ebe1a213'
+        config._pr_info_cached = {
+            'destination': {'commit': {'hash': base_hash}},
+        }
+
+        self.assertEqual(config._api_base(), base_hash)
+
+    def test__api_base_pr_deadline(self):
+        from ci_diff_helper import _utils
+
+        config = self._make_fallback(679)
+        # Fake that the PR info could not be retrieved in time.
+        config._pr_info_cached = _utils.FULL_BUILD
+
+        self.assertIs(config._api_base(), _utils.FULL_BUILD)
+
+    def test__api_base_pr_bad_payload(self):
+        from ci_diff_helper import circle_ci
+
+        config = self._make_fallback(678)
+        config._provider = circle_ci.CircleCIRepoProvider.bitbucket
+        config._pr_info_cached = {'destination': {}}
         # Also fake the info that shows up in the exception.
         config._slug = 'foo/food'
 
         with self.assertRaises(KeyError):
-            getattr(config, 'base')
+            config._api_base()
+
+    def _api_push_helper(self, compare_url, provider, **patch_kwargs):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_fallback(None)
+        config._provider = provider
+        config._slug = 'a/b'
+        mock_env = {env.CIRCLE_CI_COMPARE_URL: compare_url}
+        compare_patch = mock.patch(
+            'ci_diff_helper._github.commit_compare', **patch_kwargs)
+        with mock.patch('os.environ', new=mock_env):
+            with compare_patch as mocked:
+                return config._api_base(), mocked
+
+    def test__api_base_push(self):
+        from ci_diff_helper import circle_ci
+
+        base_sha = '7450ebe1a2133442098faa07f3c2c08b612d75f5'
+        payload = {'merge_base_commit': {'sha': base_sha}}
+        compare_url = 'https://github.com/a/b/compare/abc...def'
+        result, mocked = self._api_push_helper(
+            compare_url, circle_ci.CircleCIRepoProvider.github,
+            return_value=payload)
+        self.assertEqual(result, base_sha)
+        mocked.assert_called_once_with('a/b', 'abc', 'def')
+
+    def test__api_base_push_deadline(self):
+        import mock
+        from ci_diff_helper import _utils
+        from ci_diff_helper import circle_ci
+        from ci_diff_helper import environment_vars as env
+
+        klass = self._get_target_class()
+        config = klass(deadline=10.0, api_fallback=True)
+        config._pr = None
+        config._provider = circle_ci.CircleCIRepoProvider.github
+        config._slug = 'a/b'
+        mock_env = {
+            env.CIRCLE_CI_COMPARE_URL: (
+                'https://github.com/a/b/compare/abc...def'),
+        }
+        compare_patch = mock.patch(
+            'ci_diff_helper._github.commit_compare',
+            side_effect=_utils.DeadlineExceeded('Too slow'))
+        with mock.patch('os.environ', new=mock_env):
+            with compare_patch:
+                self.assertIs(config._api_base(), _utils.FULL_BUILD)
+
+    def test__api_base_push_bad_payload(self):
+        from ci_diff_helper import circle_ci
+
+        compare_url = 'https://github.com/a/b/compare/abc...def'
+        with self.assertRaises(KeyError):
+            self._api_push_helper(
+                compare_url, circle_ci.CircleCIRepoProvider.github,
+                return_value={})
+
+    def test__api_base_push_no_range(self):
+        from ci_diff_helper import circle_ci
+
+        with self.assertRaises(NotImplementedError):
+            self._api_push_helper(
+                '', circle_ci.CircleCIRepoProvider.github)
+
+    def test__api_base_push_bitbucket(self):
+        from ci_diff_helper import circle_ci
+
+        compare_url = 'https://bitbucket.org/a/b/compare/abc...def'
+        with self.assertRaises(NotImplementedError):
+            self._api_push_helper(
+                compare_url, circle_ci.CircleCIRepoProvider.bitbucket)
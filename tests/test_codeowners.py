@@ -0,0 +1,195 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+_CODEOWNERS = u"""\
+# Default owners.
+*       @global-owner1 @global-owner2
+
+*.js    @js-owner  # Inline comment.
+/build/logs/ @doctocat
+docs/*  docs@example.com
+apps/   @octocat
+/scripts/
+!negated.py @nobody
+/
+"""
+
+
+class Test_parse_rules(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(lines):
+        from ci_diff_helper.codeowners import parse_rules
+        return parse_rules(lines)
+
+    def test_it(self):
+        rules = self._call_function_under_test(_CODEOWNERS.splitlines())
+        self.assertEqual(rules, [
+            ('*', ('@global-owner1', '@global-owner2')),
+            ('*.js', ('@js-owner',)),
+            ('/build/logs/', ('@doctocat',)),
+            ('docs/*', ('docs@example.com',)),
+            ('apps/', ('@octocat',)),
+            ('/scripts/', ()),
+        ])
+
+
+class TestCodeOwners(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import codeowners
+        return codeowners.CodeOwners
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def _make_default(self, root=None):
+        from ci_diff_helper.codeowners import parse_rules
+        return self._make_one(
+            parse_rules(_CODEOWNERS.splitlines()), root=root)
+
+    def test_constructor(self):
+        rules = [('*.py', ('@a',))]
+        code_owners = self._make_one(rules)
+        self.assertEqual(code_owners.rules, (('*.py', ('@a',)),))
+        self.assertIsNone(code_owners.root)
+
+    def test_owners(self):
+        code_owners = self._make_default()
+        global_owners = ('@global-owner1', '@global-owner2')
+        self.assertEqual(code_owners.owners('README.md'), global_owners)
+        self.assertEqual(code_owners.owners('src/a.js'), ('@js-owner',))
+        self.assertEqual(
+            code_owners.owners('build/logs/a/b.log'), ('@doctocat',))
+        self.assertEqual(
+            code_owners.owners('docs/intro.md'), ('docs@example.com',))
+        # ``docs/*`` does not match nested files.
+        self.assertEqual(code_owners.owners('docs/a/b.md'), global_owners)
+        self.assertEqual(code_owners.owners('x/apps/a.js'), ('@octocat',))
+        self.assertEqual(code_owners.owners('scripts/run.sh'), ())
+
+    def test_owners_last_match_wins_across_prefixes(self):
+        # The wildcard rules below are grouped by different literal
+        # prefixes (none, ``src``, ``src/api`` and ``src/api/v1``).
+        rules = [
+            ('**/*.py', ('@python',)),
+            ('/src/api/**/*.py', ('@api',)),
+            ('/src/**/*_test.py', ('@tests',)),
+            ('/src/api/v1/*.py', ('@v1',)),
+            ('*_pb2.py', ('@protos',)),
+            ('/src/api/v?/legacy*.py', ()),
+        ]
+        code_owners = self._make_one(rules)
+        self.assertEqual(code_owners.owners('lib/a.py'), ('@python',))
+        self.assertEqual(code_owners.owners('src/api/a/b.py'), ('@api',))
+        self.assertEqual(
+            code_owners.owners('src/api/a/b_test.py'), ('@tests',))
+        self.assertEqual(code_owners.owners('src/api/v1/b.py'), ('@v1',))
+        self.assertEqual(
+            code_owners.owners('src/api/v1/b_test.py'), ('@v1',))
+        self.assertEqual(
+            code_owners.owners('src/api/v1/b_pb2.py'), ('@protos',))
+        self.assertEqual(code_owners.owners('src/api/v1/legacy.py'), ())
+        self.assertEqual(
+            code_owners.owners('src/api/v2/legacy_pb2.py'), ())
+
+    def test_owners_no_match(self):
+        code_owners = self._make_one([('/src/', ('@a',))])
+        self.assertEqual(code_owners.owners('README.md'), ())
+
+    def test_owners_with_root(self):
+        import os
+
+        root = os.path.abspath('checkout')
+        code_owners = self._make_default(root=root)
+        filename = os.path.join(root, 'build', 'logs', 'a.log')
+        self.assertEqual(code_owners.owners(filename), ('@doctocat',))
+
+    def test_owners_by_file(self):
+        code_owners = self._make_default()
+        result = code_owners.owners_by_file(['a.js', 'scripts/a.sh'])
+        self.assertEqual(result, {
+            'a.js': ('@js-owner',),
+            'scripts/a.sh': (),
+        })
+
+    def test_all_owners(self):
+        code_owners = self._make_default()
+        paths = ['a.js', 'apps/b.js', 'docs/c.md', 'scripts/a.sh', 'b.js']
+        self.assertEqual(
+            code_owners.all_owners(paths),
+            ('@js-owner', '@octocat', 'docs@example.com'))
+
+    def test_unowned(self):
+        code_owners = self._make_default()
+        paths = ['a.js', 'scripts/a.sh', 'scripts/b.sh']
+        self.assertEqual(code_owners.unowned(paths),
+                         ['scripts/a.sh', 'scripts/b.sh'])
+
+    def _with_files(self, locations):
+        import io
+        import os
+        import shutil
+        import tempfile
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for index, location in enumerate(locations):
+            filename = os.path.join(root, location)
+            dirname = os.path.dirname(filename)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            with io.open(filename, 'w', encoding='utf-8') as file_obj:
+                file_obj.write(u'* @owner{:d}\n'.format(index))
+        return root
+
+    def test_from_file(self):
+        import os
+
+        klass = self._get_target_class()
+        root = self._with_files(['CODEOWNERS'])
+        code_owners = klass.from_file(os.path.join(root, 'CODEOWNERS'))
+        self.assertEqual(code_owners.rules, (('*', ('@owner0',)),))
+        self.assertIsNone(code_owners.root)
+
+    def test_from_repo(self):
+        import os
+
+        klass = self._get_target_class()
+        root = self._with_files([
+            os.path.join('docs', 'CODEOWNERS'),
+            os.path.join('.github', 'CODEOWNERS'),
+        ])
+        code_owners = klass.from_repo(root=root)
+        self.assertEqual(code_owners.rules, (('*', ('@owner1',)),))
+        self.assertEqual(code_owners.root, root)
+
+    def test_from_repo_git_root(self):
+        import mock
+
+        klass = self._get_target_class()
+        root = self._with_files(['CODEOWNERS'])
+        with mock.patch('ci_diff_helper.git_tools.git_root',
+                        return_value=root):
+            code_owners = klass.from_repo()
+        self.assertEqual(code_owners.root, root)
+
+    def test_from_repo_missing(self):
+        klass = self._get_target_class()
+        root = self._with_files([])
+        with self.assertRaises(OSError):
+            klass.from_repo(root=root)
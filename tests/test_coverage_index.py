@@ -0,0 +1,313 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import utils
+
+
+_CONTEXTS = {
+    'pkg/util.py': {
+        1: ['test_a', 'test_b'],
+        5: ['test_a'],
+        9: ['test_c'],
+        12: [],
+    },
+    'pkg/cli.py': {
+        3: ['test_b'],
+    },
+    'pkg/empty.py': {
+        1: [],
+    },
+}
+
+
+class Test_context_test_id(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(context):
+        from ci_diff_helper.coverage_index import context_test_id
+        return context_test_id(context)
+
+    def test_phases(self):
+        for phase in ('run', 'setup', 'teardown'):
+            context = 'tests/test_x.py::test_y|' + phase
+            self.assertEqual(self._call_function_under_test(context),
+                             'tests/test_x.py::test_y')
+
+    def test_no_phase(self):
+        self.assertEqual(self._call_function_under_test('test_y'), 'test_y')
+
+    def test_empty(self):
+        self.assertIsNone(self._call_function_under_test(''))
+
+
+class Test__decode_mask(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(mask):
+        from ci_diff_helper.coverage_index import _decode_mask
+        return _decode_mask(mask)
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test(0), [])
+
+    def test_bits(self):
+        self.assertEqual(self._call_function_under_test((1 << 70) | 0b101),
+                         [0, 2, 70])
+
+
+class TestCoverageIndex(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.coverage_index import CoverageIndex
+        return CoverageIndex
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def _from_contexts(self):
+        klass = self._get_target_class()
+        return klass.from_contexts(_CONTEXTS)
+
+    def test_constructor(self):
+        files = {'a.py': ([1, 2], [1, 2])}
+        index = self._make_one(['test_a', 'test_b'], files)
+        self.assertEqual(index.tests, ('test_a', 'test_b'))
+        self.assertTrue(index.covers('a.py'))
+        self.assertEqual(index.tests_for_lines('a.py', [(2, 2)]),
+                         ('test_b',))
+
+    def test_from_contexts(self):
+        index = self._from_contexts()
+        self.assertEqual(index.tests, ('test_a', 'test_b', 'test_c'))
+        self.assertTrue(index.covers('pkg/util.py'))
+        self.assertTrue(index.covers('pkg/cli.py'))
+        # Files (and lines) no test executed are dropped.
+        self.assertFalse(index.covers('pkg/empty.py'))
+        self.assertEqual(index.tests_for_lines('pkg/util.py', [(12, 12)]),
+                         ())
+
+    def test_tests_for_lines(self):
+        index = self._from_contexts()
+        self.assertEqual(index.tests_for_lines('pkg/util.py', [(1, 1)]),
+                         ('test_a', 'test_b'))
+        self.assertEqual(index.tests_for_lines('pkg/util.py', [(2, 4)]), ())
+        self.assertEqual(index.tests_for_lines('pkg/util.py', [(5, 100)]),
+                         ('test_a', 'test_c'))
+        self.assertEqual(
+            index.tests_for_lines('pkg/util.py', [(9, 9), (4, 5)]),
+            ('test_a', 'test_c'))
+        self.assertEqual(index.tests_for_lines('missing.py', [(1, 9)]), ())
+
+    def test_select_tests(self):
+        index = self._from_contexts()
+        result = index.select_tests({
+            'pkg/util.py': [(9, 10)],
+            'pkg/cli.py': [(1, 3)],
+            'README.rst': [(1, 1)],
+        })
+        self.assertEqual(result, ('test_b', 'test_c'))
+        self.assertEqual(index.select_tests({}), ())
+
+    def test_serialization(self):
+        klass = self._get_target_class()
+        index = self._from_contexts()
+        serialized = index.to_dict()
+        self.assertEqual(serialized['version'], 1)
+        self.assertEqual(serialized['tests'], ['test_a', 'test_b', 'test_c'])
+        self.assertEqual(serialized['files']['pkg/util.py'],
+                         [[1, 5, 9], ['3', '1', '4']])
+
+        new_index = klass.from_dict(serialized)
+        self.assertEqual(new_index.tests, index.tests)
+        # Files are only decoded when queried.
+        self.assertEqual(new_index._files, {})
+        self.assertEqual(new_index.tests_for_lines('pkg/cli.py', [(3, 3)]),
+                         ('test_b',))
+        self.assertEqual(list(new_index._files), ['pkg/cli.py'])
+        # Both decoded and still-encoded files are serialized.
+        self.assertEqual(new_index.to_dict(), serialized)
+
+    def test_from_dict_bad_version(self):
+        klass = self._get_target_class()
+        with self.assertRaises(ValueError):
+            klass.from_dict({'version': 0, 'tests': [], 'files': {}})
+
+    def test_save_and_load(self):
+        import os
+        import shutil
+        import tempfile
+
+        klass = self._get_target_class()
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        filename = os.path.join(temp_dir, 'index.json')
+
+        index = self._from_contexts()
+        index.save(filename)
+        new_index = klass.load(filename)
+        self.assertEqual(new_index.to_dict(), index.to_dict())
+
+    def _write_coverage_data(self, root, contexts):
+        import os
+        import coverage
+
+        data_file = os.path.join(root, '.coverage')
+        data = coverage.CoverageData(basename=data_file)
+        for context, lines in contexts:
+            data.set_context(context)
+            data.add_lines(lines)
+        data.write()
+        return data_file
+
+    @unittest.skipUnless(utils.HAS_COVERAGE_CONTEXTS,
+                         'coverage >= 5.0 not installed')
+    def test_from_coverage_data(self):
+        import os
+        import shutil
+        import tempfile
+
+        klass = self._get_target_class()
+        root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        util_file = os.path.join(root, 'pkg', 'util.py')
+        outside_file = os.path.join(os.path.dirname(root), 'other.py')
+        import_file = os.path.join(root, 'pkg', 'imported.py')
+        data_file = self._write_coverage_data(root, [
+            ('', {util_file: [1, 2], import_file: [1]}),
+            ('test_a|setup', {util_file: [1]}),
+            ('test_a|run', {util_file: [1, 5], outside_file: [1]}),
+            ('test_b|run', {util_file: [5, 9]}),
+        ])
+
+        index = klass.from_coverage_data(data_file, root=root)
+        self.assertEqual(index.tests, ('test_a', 'test_b'))
+        # Lines run outside of any test go to every test of the file
+        # (and files no test executed are dropped).
+        self.assertEqual(index.to_dict()['files'], {
+            'pkg/util.py': [[1, 2, 5, 9], ['3', '3', '3', '2']],
+        })
+
+    @unittest.skipUnless(utils.HAS_COVERAGE_CONTEXTS,
+                         'coverage >= 5.0 not installed')
+    def test_from_coverage_data_default_root(self):
+        import os
+        import shutil
+        import tempfile
+        import mock
+
+        klass = self._get_target_class()
+        root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        util_file = os.path.join(root, 'util.py')
+        data_file = self._write_coverage_data(root, [
+            ('test_a|run', {util_file: [2]}),
+        ])
+
+        with mock.patch('ci_diff_helper.git_tools.git_root',
+                        return_value=root) as mocked:
+            index = klass.from_coverage_data(data_file)
+
+        self.assertEqual(index.tests_for_lines('util.py', [(2, 2)]),
+                         ('test_a',))
+        mocked.assert_called_once_with()
+
+    @unittest.skipUnless(utils.HAS_COVERAGE_CONTEXTS,
+                         'coverage >= 5.0 not installed')
+    def test_from_coverage_data_custom_contexts(self):
+        import os
+        import shutil
+        import tempfile
+
+        klass = self._get_target_class()
+        root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        util_file = os.path.join(root, 'util.py')
+        data_file = self._write_coverage_data(root, [
+            ('test_a', {util_file: [1]}),
+            ('fixture', {util_file: [2]}),
+        ])
+
+        def context_to_test(context):
+            return None if context == 'fixture' else context
+
+        index = klass.from_coverage_data(
+            data_file, root=root, context_to_test=context_to_test)
+        self.assertEqual(index.tests, ('test_a',))
+        self.assertEqual(index.to_dict()['files'], {
+            'util.py': [[1], ['1']],
+        })
+
+    @unittest.skipUnless(utils.HAS_COVERAGE_CONTEXTS,
+                         'coverage >= 5.0 not installed')
+    def test_from_coverage_data_no_contexts(self):
+        import os
+        import shutil
+        import tempfile
+
+        klass = self._get_target_class()
+        root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        data_file = self._write_coverage_data(root, [
+            ('', {os.path.join(root, 'util.py'): [1]}),
+        ])
+
+        with self.assertRaises(ValueError):
+            klass.from_coverage_data(data_file, root=root)
+
+    def test_select_tests_since(self):
+        import mock
+
+        index = self._from_contexts()
+        hunks = [
+            # Only adds lines after line 4: uses lines 4 and 5.
+            ('pkg/util.py', 'pkg/util.py', 4, 0, 5, 2),
+            # Adds lines at the start of the file: uses line 1.
+            ('pkg/cli.py', 'pkg/cli.py', 0, 0, 1, 1),
+            # Removes lines 8-10.
+            ('pkg/cli.py', 'pkg/cli.py', 8, 3, 9, 0),
+            # New files have no coverage.
+            (None, 'pkg/new.py', 0, 0, 1, 3),
+        ]
+        with mock.patch('ci_diff_helper.git_tools.get_changed_hunks',
+                        return_value=hunks) as mocked:
+            result = index.select_tests_since('master')
+
+        self.assertEqual(result, ('test_a',))
+        mocked.assert_called_once_with('master', 'HEAD')
+
+    def test_select_tests_since_removed(self):
+        import mock
+
+        index = self._from_contexts()
+        hunks = [('pkg/util.py', 'pkg/util.py', 8, 3, 7, 0)]
+        with mock.patch('ci_diff_helper.git_tools.get_changed_hunks',
+                        return_value=hunks) as mocked:
+            result = index.select_tests_since('master', head='feature')
+
+        self.assertEqual(result, ('test_c',))
+        mocked.assert_called_once_with('master', 'feature')
+
+    def test_select_tests_since_full_build(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        index = self._from_contexts()
+        hunks_patch = mock.patch('ci_diff_helper.git_tools.get_changed_hunks')
+        with hunks_patch as mocked:
+            result = index.select_tests_since(_utils.FULL_BUILD)
+
+        self.assertEqual(result, ('test_a', 'test_b', 'test_c'))
+        mocked.assert_not_called()
@@ -77,7 +77,8 @@ class Test_get_checked_in_files(unittest.TestCase):
                 with mock_output as mocked:
                     result = self._call_function_under_test()
                     mocked.assert_called_once_with(
-                        'git', 'ls-files', git_root)
+                        'git', 'ls-files', git_root,
+                        env={'GIT_NO_LAZY_FETCH': '1'}, capture_err=True)
                     self.assertEqual(result, filenames)
 
     @staticmethod
@@ -96,15 +97,103 @@ class Test_get_checked_in_files(unittest.TestCase):
         self.assertLessEqual(set(result), self._all_files(root_dir))
 
 
+class Test_get_checked_in_blobs(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.git_tools import get_checked_in_blobs
+        return get_checked_in_blobs()
+
+    def test_it(self):
+        import mock
+
+        sha1 = '587be6b4c3f93f93c489c0111bba5596147a26cb'
+        sha2 = '8835708590a9afa236e1bbad18df9d23de82ccd3'
+        cmd_output = (
+            '100644 {} 0\ta.py\0'
+            '160000 {} 0\tvendored\0'
+            '100755 {} 0\tb/run\tme.sh\0').format(sha1, sha2, sha2)
+        mock_output = mock.patch('ci_diff_helper._utils.check_output',
+                                 return_value=cmd_output)
+        git_root = os.path.join('totally', 'on', 'your', 'filesystem')
+        mock_root = mock.patch('ci_diff_helper.git_tools.git_root',
+                               return_value=git_root)
+        mock_abspath = mock.patch('os.path.abspath', new=lambda path: path)
+
+        with mock_abspath, mock_root, mock_output as mocked:
+            result = self._call_function_under_test()
+
+        self.assertEqual(result, {'a.py': sha1, 'b/run\tme.sh': sha2})
+        mocked.assert_called_once_with(
+            'git', 'ls-files', '--stage', '-z', git_root,
+            env={'GIT_NO_LAZY_FETCH': '1'}, capture_err=True)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call(self):
+        result = self._call_function_under_test()
+        this_file = os.path.abspath(__file__.replace('.pyc', '.py'))
+        self.assertIn(this_file, result)
+        for blob_sha in result.values():
+            self.assertEqual(len(blob_sha), 40)
+
+
+class Test_get_modified_files(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.git_tools import get_modified_files
+        return get_modified_files()
+
+    def test_it(self):
+        import mock
+
+        mock_output = mock.patch('ci_diff_helper._utils.check_output',
+                                 return_value='a.py\0b/with space.py\0')
+        git_root = os.path.join('totally', 'on', 'your', 'filesystem')
+        mock_root = mock.patch('ci_diff_helper.git_tools.git_root',
+                               return_value=git_root)
+        mock_abspath = mock.patch('os.path.abspath', new=lambda path: path)
+
+        with mock_abspath, mock_root, mock_output as mocked:
+            result = self._call_function_under_test()
+
+        self.assertEqual(result, ['a.py', 'b/with space.py'])
+        mocked.assert_called_once_with(
+            'git', 'ls-files', '--modified', '-z', git_root,
+            env={'GIT_NO_LAZY_FETCH': '1'}, capture_err=True)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call(self):
+        import shutil
+        import tempfile
+
+        root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        utils.git(root, 'init', '--quiet')
+        for name in ('a.txt', 'b.txt'):
+            with open(os.path.join(root, name), 'w') as file_obj:
+                file_obj.write('a\n')
+        utils.git(root, 'add', '.')
+        utils.git(root, 'commit', '--quiet', '-m', '1')
+        with open(os.path.join(root, 'b.txt'), 'w') as file_obj:
+            file_obj.write('b\n')
+
+        orig_dir = os.getcwd()
+        os.chdir(root)
+        self.addCleanup(os.chdir, orig_dir)
+        result = self._call_function_under_test()
+        self.assertEqual(result, [os.path.join(root, 'b.txt')])
+
+
 class Test_get_changed_files(unittest.TestCase):
 
     @staticmethod
-    def _call_function_under_test(blob_name1, blob_name2):
+    def _call_function_under_test(blob_name1, blob_name2, **kwargs):
         from ci_diff_helper import git_tools
 
-        return git_tools.get_changed_files(blob_name1, blob_name2)
+        return git_tools.get_changed_files(blob_name1, blob_name2, **kwargs)
 
-    def _helper(self, changed, expected):
+    def _helper(self, changed, expected, **kwargs):
         import mock
 
         blob_name1 = 'HEAD'
@@ -112,17 +201,29 @@ class Test_get_changed_files(unittest.TestCase):
         output_patch = mock.patch('ci_diff_helper._utils.check_output',
                                   return_value=changed)
         with output_patch as mocked:
-            result = self._call_function_under_test(blob_name1, blob_name2)
+            result = self._call_function_under_test(
+                blob_name1, blob_name2, **kwargs)
             self.assertEqual(result, expected)
-            mocked.assert_called_once_with(
-                'git', 'diff', '--name-only', blob_name1, blob_name2)
+        return mocked
 
     def test_empty(self):
-        self._helper('', [])
+        mocked = self._helper('', [])
+        mocked.assert_called_once_with(
+            'git', 'diff-tree', '-r', '-z', '--name-only', '--no-renames',
+            'HEAD', '031cf739bc419eb2c320f8c897b03c04796943a9',
+            env={'GIT_NO_LAZY_FETCH': '1'}, capture_err=True)
 
     def test_with_changes(self):
         expected = ['foo.py', os.path.join('bar', 'baz.txt')]
-        self._helper('\n'.join(expected), expected)
+        self._helper('\0'.join(expected) + '\0', expected)
+
+    def test_renames(self):
+        mocked = self._helper('foo.py\0', ['foo.py'], renames=True)
+        mocked.assert_called_once_with(
+            'git', 'diff-tree', '-r', '-z', '--name-only',
+            '--find-renames', 'HEAD',
+            '031cf739bc419eb2c320f8c897b03c04796943a9',
+            env={'GIT_NO_LAZY_FETCH': '1'}, capture_err=True)
 
     @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
     def test_actual_call_same(self):
@@ -229,3 +330,558 @@ class Test_commit_subject(unittest.TestCase):
             self.assertIs(result, mocked.return_value)
             mocked.assert_called_once_with(
                 'git', 'log', '--pretty=%s', '-1', revision)
+
+
+class Test_merge_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(revision1, revision2):
+        from ci_diff_helper.git_tools import merge_base
+        return merge_base(revision1, revision2)
+
+    def test_it(self):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output')
+        with output_patch as mocked:
+            result = self._call_function_under_test('master', 'HEAD')
+            self.assertIs(result, mocked.return_value)
+            mocked.assert_called_once_with(
+                'git', 'merge-base', 'master', 'HEAD', ignore_err=True)
+
+
+class Test_remote_default_branch(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args):
+        from ci_diff_helper.git_tools import remote_default_branch
+        return remote_default_branch(*args)
+
+    def test_default(self):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  return_value='origin/master')
+        with output_patch as mocked:
+            result = self._call_function_under_test()
+            self.assertEqual(result, 'origin/master')
+            mocked.assert_called_once_with(
+                'git', 'symbolic-ref', '--short',
+                'refs/remotes/origin/HEAD', ignore_err=True)
+
+    def test_explicit(self):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  return_value=None)
+        with output_patch as mocked:
+            self.assertIsNone(self._call_function_under_test('upstream'))
+            mocked.assert_called_once_with(
+                'git', 'symbolic-ref', '--short',
+                'refs/remotes/upstream/HEAD', ignore_err=True)
+
+
+class Test_is_shallow(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.git_tools import is_shallow
+        return is_shallow()
+
+    def _helper(self, output):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  return_value=output)
+        with output_patch as mocked:
+            result = self._call_function_under_test()
+            mocked.assert_called_once_with(
+                'git', 'rev-parse', '--is-shallow-repository')
+        return result
+
+    def test_shallow(self):
+        self.assertTrue(self._helper('true'))
+
+    def test_not_shallow(self):
+        self.assertFalse(self._helper('false'))
+
+
+class Test_resolve_commit(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(revision):
+        from ci_diff_helper.git_tools import resolve_commit
+        return resolve_commit(revision)
+
+    def test_it(self):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output')
+        with output_patch as mocked:
+            result = self._call_function_under_test('abcd')
+            self.assertIs(result, mocked.return_value)
+            mocked.assert_called_once_with(
+                'git', 'rev-parse', '--verify', '--quiet', 'abcd^{commit}',
+                ignore_err=True)
+
+
+class Test_deepen_until(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(revision, **kwargs):
+        from ci_diff_helper.git_tools import deepen_until
+        return deepen_until(revision, **kwargs)
+
+    def _helper(self, resolved, shallow=True, fetched='', **kwargs):
+        import mock
+
+        resolve_patch = mock.patch(
+            'ci_diff_helper.git_tools.resolve_commit', side_effect=resolved)
+        shallow_patch = mock.patch(
+            'ci_diff_helper.git_tools.is_shallow', return_value=shallow)
+        output_patch = mock.patch(
+            'ci_diff_helper._utils.check_output', return_value=fetched)
+        initial_patch = mock.patch(
+            'ci_diff_helper.git_tools._INITIAL_FETCH_DEPTH', new=4)
+        with resolve_patch, shallow_patch, initial_patch:
+            with output_patch as mocked:
+                result = self._call_function_under_test('abcd', **kwargs)
+        depths = [call[1][3] for call in mocked.mock_calls]
+        return result, depths
+
+    def test_already_present(self):
+        result, depths = self._helper(['abcd-full'])
+        self.assertEqual(result, 'abcd-full')
+        self.assertEqual(depths, [])
+
+    def test_exponential(self):
+        result, depths = self._helper([None, None, None, 'abcd-full'])
+        self.assertEqual(result, 'abcd-full')
+        self.assertEqual(
+            depths, ['--deepen=4', '--deepen=4', '--deepen=8'])
+
+    def test_capped(self):
+        result, depths = self._helper([None] * 4, max_depth=10)
+        self.assertIsNone(result)
+        self.assertEqual(
+            depths, ['--deepen=4', '--deepen=4', '--deepen=2'])
+
+    def test_not_shallow(self):
+        result, depths = self._helper([None], shallow=False)
+        self.assertIsNone(result)
+        self.assertEqual(depths, [])
+
+    def test_disabled(self):
+        result, depths = self._helper([None], max_depth=0)
+        self.assertIsNone(result)
+        self.assertEqual(depths, [])
+
+    def test_fetch_fails(self):
+        result, depths = self._helper([None], fetched=None)
+        self.assertIsNone(result)
+        self.assertEqual(depths, ['--deepen=4'])
+
+    def test_fetch_arguments(self):
+        import mock
+
+        resolve_patch = mock.patch(
+            'ci_diff_helper.git_tools.resolve_commit',
+            side_effect=[None, 'abcd-full'])
+        shallow_patch = mock.patch(
+            'ci_diff_helper.git_tools.is_shallow', return_value=True)
+        output_patch = mock.patch(
+            'ci_diff_helper._utils.check_output', return_value='')
+        with resolve_patch, shallow_patch:
+            with output_patch as mocked:
+                self._call_function_under_test('abcd', remote='upstream')
+
+        mocked.assert_called_once_with(
+            'git', 'fetch', '--quiet', '--deepen=64', 'upstream',
+            ignore_err=True)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call(self):
+        import mock
+        from ci_diff_helper import git_tools
+
+        initial_patch = mock.patch.object(
+            git_tools, '_INITIAL_FETCH_DEPTH', new=2)
+        with utils.ShallowClone(12) as clone:
+            self.assertTrue(git_tools.is_shallow())
+            target = clone.shas[5]
+            self.assertIsNone(git_tools.resolve_commit(target))
+            with initial_patch:
+                result = self._call_function_under_test(target)
+            self.assertEqual(result, target)
+            # Only the missing commits were fetched, not the full history.
+            self.assertTrue(git_tools.is_shallow())
+            self.assertIsNone(git_tools.resolve_commit(clone.shas[0]))
+            self.assertEqual(
+                git_tools.merge_base(target, 'HEAD'), target)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call_capped(self):
+        import mock
+        from ci_diff_helper import git_tools
+
+        initial_patch = mock.patch.object(
+            git_tools, '_INITIAL_FETCH_DEPTH', new=2)
+        with utils.ShallowClone(12) as clone:
+            with initial_patch:
+                result = self._call_function_under_test(
+                    clone.shas[0], max_depth=4)
+            self.assertIsNone(result)
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call_deepens_from_boundary(self):
+        import mock
+        from ci_diff_helper import _utils
+        from ci_diff_helper import git_tools
+
+        initial_patch = mock.patch.object(
+            git_tools, '_INITIAL_FETCH_DEPTH', new=2)
+        output_patch = mock.patch(
+            'ci_diff_helper._utils.check_output',
+            wraps=_utils.check_output)
+        with utils.ShallowClone(12, depth=6) as clone:
+            target = clone.shas[4]
+            with initial_patch:
+                with output_patch as mocked:
+                    result = self._call_function_under_test(target)
+            self.assertEqual(result, target)
+            self.assertTrue(git_tools.is_shallow())
+
+        # The history already fetched is extended, so one fetch of
+        # 2 more commits is enough.
+        fetches = [call for call in mocked.mock_calls
+                   if call[1][:2] == ('git', 'fetch')]
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(fetches[0][1][3], '--deepen=2')
+
+
+class Test_is_partial_clone(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.git_tools import is_partial_clone
+        return is_partial_clone()
+
+    def _helper(self, output):
+        import mock
+        from ci_diff_helper import git_tools
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  return_value=output)
+        with output_patch as mocked:
+            result = self._call_function_under_test()
+            mocked.assert_called_once_with(
+                'git', 'config', '--get-regexp',
+                git_tools._PROMISOR_CONFIG_REGEX, ignore_err=True)
+        return result
+
+    def test_partial(self):
+        self.assertTrue(self._helper('remote.origin.promisor true'))
+
+    def test_not_partial(self):
+        self.assertFalse(self._helper(None))
+
+
+class Test__tree_only(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args):
+        from ci_diff_helper.git_tools import _tree_only
+        return _tree_only(*args)
+
+    def test_success(self):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output')
+        with output_patch as mocked:
+            result = self._call_function_under_test('git', 'ls-files')
+            self.assertIs(result, mocked.return_value)
+            mocked.assert_called_once_with(
+                'git', 'ls-files', env={'GIT_NO_LAZY_FETCH': '1'},
+                capture_err=True)
+
+    def _failure_helper(self, partial, stderr):
+        import subprocess
+        import mock
+
+        error = subprocess.CalledProcessError(128, 'git')
+        error.stderr = stderr
+        output_patch = mock.patch(
+            'ci_diff_helper._utils.check_output', side_effect=error)
+        partial_patch = mock.patch(
+            'ci_diff_helper.git_tools.is_partial_clone',
+            return_value=partial)
+        with output_patch, partial_patch:
+            self._call_function_under_test('git', 'diff-tree')
+
+    def test_promisor_fetch(self):
+        from ci_diff_helper import git_tools
+
+        stderr = (
+            'warning: lazy fetching disabled; some objects may not be '
+            'available\nfatal: could not fetch 6178 from promisor remote\n')
+        with self.assertRaises(OSError) as exc_info:
+            self._failure_helper(True, stderr)
+
+        expected = git_tools._PROMISOR_FETCH_TEMPLATE.format('git diff-tree')
+        self.assertEqual(exc_info.exception.args[1], expected)
+        self.assertEqual(exc_info.exception.args[0].stderr, stderr)
+
+    def test_other_failure_partial_clone(self):
+        import subprocess
+
+        stderr = "fatal: ambiguous argument 'nope': unknown revision\n"
+        with self.assertRaises(subprocess.CalledProcessError) as exc_info:
+            self._failure_helper(True, stderr)
+        self.assertEqual(exc_info.exception.stderr, stderr)
+
+    def test_other_failure(self):
+        import subprocess
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            self._failure_helper(
+                False, 'fatal: could not fetch 6178 from promisor remote\n')
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call_partial_clone(self):
+        import subprocess
+
+        with utils.ShallowClone(2, depth=2, blob_filter=True):
+            with self.assertRaises(OSError):
+                self._call_function_under_test(
+                    'git', 'diff-tree', '-p', 'HEAD~1', 'HEAD')
+            with self.assertRaises(subprocess.CalledProcessError) as exc_info:
+                self._call_function_under_test(
+                    'git', 'diff-tree', 'not-a-revision', 'HEAD')
+
+        self.assertIn('not-a-revision', exc_info.exception.stderr)
+
+
+class Test__split_null(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(cmd_output):
+        from ci_diff_helper.git_tools import _split_null
+        return _split_null(cmd_output)
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test(''), [])
+
+    def test_fields(self):
+        result = self._call_function_under_test('a b\0c\nd\0')
+        self.assertEqual(result, ['a b', 'c\nd'])
+
+
+class Test_get_raw_diff(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(blob_name1, blob_name2, **kwargs):
+        from ci_diff_helper import git_tools
+
+        return git_tools.get_raw_diff(blob_name1, blob_name2, **kwargs)
+
+    def _helper(self, cmd_output, **kwargs):
+        import mock
+
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  return_value=cmd_output)
+        with output_patch as mocked:
+            result = self._call_function_under_test(
+                'HEAD', 'master', **kwargs)
+        return result, mocked
+
+    def test_defaults(self):
+        result, mocked = self._helper('a\0b\0')
+        self.assertEqual(result, ['a', 'b'])
+        mocked.assert_called_once_with(
+            'git', 'diff-tree', '-r', '-z', '--raw', '--numstat',
+            '--find-renames', 'HEAD', 'master')
+
+    def test_tree_only(self):
+        result, mocked = self._helper('', renames=False, stats=False)
+        self.assertEqual(result, [])
+        mocked.assert_called_once_with(
+            'git', 'diff-tree', '-r', '-z', '--raw', '--no-renames',
+            'HEAD', 'master', env={'GIT_NO_LAZY_FETCH': '1'}, capture_err=True)
+
+
+class Test_get_changed_status(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(blob_name1, blob_name2, **kwargs):
+        from ci_diff_helper.git_tools import get_changed_status
+        return get_changed_status(blob_name1, blob_name2, **kwargs)
+
+    def test_it(self):
+        import mock
+
+        cmd_output = (
+            'M\0setup.py\0'
+            'R087\0old.py\0new.py\0'
+            'D\0gone.txt\0'
+            'C100\0a.py\0b.py\0'
+            'A\0with space.py\0')
+        output_patch = mock.patch('ci_diff_helper._utils.check_output',
+                                  return_value=cmd_output)
+        with output_patch as mocked:
+            result = self._call_function_under_test(
+                'master', 'HEAD', renames=True)
+
+        self.assertEqual(result, [
+            ('M', 'setup.py'),
+            ('R087', 'old.py', 'new.py'),
+            ('D', 'gone.txt'),
+            ('C100', 'a.py', 'b.py'),
+            ('A', 'with space.py'),
+        ])
+        mocked.assert_called_once_with(
+            'git', 'diff-tree', '-r', '-z', '--name-status',
+            '--find-renames', 'master', 'HEAD',
+            env={'GIT_NO_LAZY_FETCH': '1'}, capture_err=True)
+
+
+class Test__diff_path(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(value):
+        from ci_diff_helper.git_tools import _diff_path
+        return _diff_path(value)
+
+    def test_path(self):
+        self.assertEqual(self._call_function_under_test('a/b.py'), 'a/b.py')
+
+    def test_trailing_tab(self):
+        self.assertEqual(self._call_function_under_test('sp ace.txt\t'),
+                         'sp ace.txt')
+
+    def test_null(self):
+        self.assertIsNone(self._call_function_under_test('/dev/null'))
+
+
+class Test_parse_hunks(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(lines):
+        from ci_diff_helper.git_tools import parse_hunks
+        return list(parse_hunks(lines))
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test([]), [])
+
+    def test_it(self):
+        lines = [
+            'diff --git mod.py mod.py',
+            'index 1234567..89abcde 100644',
+            '--- mod.py',
+            '+++ mod.py',
+            '@@ -3 +3 @@ def f():',
+            '-    return 1',
+            '+    return 2',
+            '@@ -10,0 +11,2 @@',
+            '+x = 1',
+            '+y = 2',
+            '@@ -20,2 +21,0 @@',
+            '--- not a header',
+            '-+++ nor is this',
+            'diff --git new.txt new.txt',
+            'new file mode 100644',
+            '--- /dev/null',
+            '+++ new.txt',
+            '@@ -0,0 +1 @@',
+            '+hello',
+            '\\ No newline at end of file',
+            'diff --git gone.txt gone.txt',
+            '--- gone.txt',
+            '+++ /dev/null',
+            '@@ -1 +0,0 @@',
+            '-bye',
+        ]
+        result = self._call_function_under_test(lines)
+        self.assertEqual(result, [
+            ('mod.py', 'mod.py', 3, 1, 3, 1),
+            ('mod.py', 'mod.py', 10, 0, 11, 2),
+            ('mod.py', 'mod.py', 20, 2, 21, 0),
+            (None, 'new.txt', 0, 0, 1, 1),
+            ('gone.txt', None, 1, 1, 0, 0),
+        ])
+
+
+class Test_get_changed_hunks(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(blob_name1, blob_name2):
+        from ci_diff_helper.git_tools import get_changed_hunks
+        return get_changed_hunks(blob_name1, blob_name2)
+
+    def test_it(self):
+        import mock
+
+        lines = [
+            'diff --git a.py a.py',
+            'index 1234567..89abcde 100644',
+            '--- a.py',
+            '+++ a.py',
+            '@@ -1,2 +1 @@',
+            '-x = 1',
+            '-y = 2',
+            '+z = 3',
+        ]
+        output_patch = mock.patch('ci_diff_helper._utils.iter_output',
+                                  return_value=iter(lines))
+        with output_patch as mocked:
+            result = self._call_function_under_test('master', 'HEAD')
+
+        self.assertEqual(result, [('a.py', 'a.py', 1, 2, 1, 1)])
+        mocked.assert_called_once_with(
+            'git', '-c', 'core.quotePath=false', 'diff-tree', '-r', '-p',
+            '--unified=0', '--no-color', '--no-prefix', '--no-renames',
+            'master', 'HEAD')
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call(self):
+        import os
+        import shutil
+        import tempfile
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        utils.git(root, 'init', '--quiet')
+        filename = os.path.join(root, 'sp ace.txt')
+        with open(filename, 'w') as file_obj:
+            file_obj.write('a\n-- x\nc\n')
+        utils.git(root, 'add', '.')
+        utils.git(root, 'commit', '--quiet', '-m', '1')
+        with open(filename, 'w') as file_obj:
+            file_obj.write('a\nc\nd\n')
+        utils.git(root, 'commit', '--quiet', '-am', '2')
+
+        orig_dir = os.getcwd()
+        os.chdir(root)
+        self.addCleanup(os.chdir, orig_dir)
+        result = self._call_function_under_test('HEAD~1', 'HEAD')
+        self.assertEqual(result, [
+            ('sp ace.txt', 'sp ace.txt', 2, 1, 1, 0),
+            ('sp ace.txt', 'sp ace.txt', 3, 0, 3, 1),
+        ])
+
+
+class TestPartialClone(unittest.TestCase):
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_calls(self):
+        from ci_diff_helper import git_tools
+
+        with utils.ShallowClone(3, depth=3, blob_filter=True) as clone:
+            self.assertTrue(git_tools.is_partial_clone())
+            missing = clone.missing_objects()
+            self.assertEqual(len(missing), 2)
+            result = git_tools.get_changed_files(clone.shas[0], 'HEAD')
+            self.assertEqual(result, ['file.txt'])
+            status = git_tools.get_changed_status(clone.shas[1], 'HEAD')
+            self.assertEqual(status, [('M', 'file.txt')])
+            # Verify that no blobs were fetched.
+            self.assertEqual(clone.missing_objects(), missing)
@@ -0,0 +1,392 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class Test__event_name(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import github_actions
+        return github_actions._event_name()
+
+    def test_success(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {env.GITHUB_ACTIONS_EVENT_NAME: 'push'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(self._call_function_under_test(), 'push')
+
+    def test_failure(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            with self.assertRaises(OSError):
+                self._call_function_under_test()
+
+
+class Test__event_payload(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import github_actions
+        return github_actions._event_payload()
+
+    def test_success(self):
+        import json
+        import os
+        import shutil
+        import tempfile
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        payload = {'before': 'abc', 'number': 7}
+        temp_dir = tempfile.mkdtemp()
+        try:
+            event_path = os.path.join(temp_dir, 'event.json')
+            with open(event_path, 'w') as file_obj:
+                json.dump(payload, file_obj)
+
+            mock_env = {env.GITHUB_ACTIONS_EVENT_PATH: event_path}
+            with mock.patch('os.environ', new=mock_env):
+                result = self._call_function_under_test()
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(result, payload)
+
+    def test_failure(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            with self.assertRaises(OSError):
+                self._call_function_under_test()
+
+
+class Test__github_ref(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import github_actions
+        return github_actions._github_ref()
+
+    def test_success(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        ref = 'refs/heads/feature'
+        mock_env = {env.GITHUB_ACTIONS_REF: ref}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(self._call_function_under_test(), ref)
+
+    def test_failure(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            with self.assertRaises(OSError):
+                self._call_function_under_test()
+
+
+class Test__split_ref(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(ref):
+        from ci_diff_helper import github_actions
+        return github_actions._split_ref(ref)
+
+    def test_branch(self):
+        result = self._call_function_under_test('refs/heads/feature/x')
+        self.assertEqual(result, ('feature/x', False))
+
+    def test_tag(self):
+        result = self._call_function_under_test('refs/tags/0.1.0')
+        self.assertEqual(result, ('0.1.0', True))
+
+    def test_other(self):
+        result = self._call_function_under_test('refs/pull/3/merge')
+        self.assertEqual(result, ('refs/pull/3/merge', False))
+
+
+class Test__github_actions_slug(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import github_actions
+        return github_actions._github_actions_slug()
+
+    def test_success(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        slug = 'foo/bar'
+        mock_env = {env.GITHUB_ACTIONS_REPO: slug}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(self._call_function_under_test(), slug)
+
+    def test_failure(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            with self.assertRaises(OSError):
+                self._call_function_under_test()
+
+
+class TestGitHubActions(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import github_actions
+        return github_actions.GitHubActions
+
+    def _make_one(self):
+        klass = self._get_target_class()
+        return klass()
+
+    def test_constructor(self):
+        from ci_diff_helper import _utils
+
+        klass = self._get_target_class()
+        config = self._make_one()
+        self.assertIsInstance(config, klass)
+        self.assertIs(config._active, _utils.UNSET)
+        self.assertIs(config._base, _utils.UNSET)
+        self.assertIs(config._branch, _utils.UNSET)
+        self.assertIs(config._event, _utils.UNSET)
+        self.assertIs(config._event_name, _utils.UNSET)
+        self.assertIs(config._is_merge, _utils.UNSET)
+        self.assertIs(config._merged_pr, _utils.UNSET)
+        self.assertIs(config._pr, _utils.UNSET)
+        self.assertIs(config._repo_url, _utils.UNSET)
+        self.assertIs(config._slug, _utils.UNSET)
+        self.assertIs(config._tag, _utils.UNSET)
+
+    def test___repr__(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        mock_env = {env.IN_GITHUB_ACTIONS: 'true'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(repr(config), '<GitHubActions (active=True)>')
+
+    def test_event_property(self):
+        import mock
+
+        config = self._make_one()
+        payload_patch = mock.patch(
+            'ci_diff_helper.github_actions._event_payload',
+            return_value=mock.sentinel.event)
+        with payload_patch as mocked:
+            self.assertIs(config.event, mock.sentinel.event)
+            # Verify that caching works.
+            self.assertIs(config.event, mock.sentinel.event)
+            mocked.assert_called_once_with()
+
+    def test_event_name_property(self):
+        import mock
+
+        config = self._make_one()
+        name_patch = mock.patch(
+            'ci_diff_helper.github_actions._event_name',
+            return_value=mock.sentinel.name)
+        with name_patch as mocked:
+            self.assertIs(config.event_name, mock.sentinel.name)
+            # Verify that caching works.
+            self.assertIs(config.event_name, mock.sentinel.name)
+            mocked.assert_called_once_with()
+
+    def test_in_pr_property(self):
+        config = self._make_one()
+        config._event_name = 'pull_request'
+        self.assertTrue(config.in_pr)
+        config._event_name = 'pull_request_target'
+        self.assertTrue(config.in_pr)
+        config._event_name = 'push'
+        self.assertFalse(config.in_pr)
+
+    def test_branch_property_in_pr(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        config._event_name = 'pull_request'
+        mock_env = {
+            env.GITHUB_ACTIONS_BASE_REF: 'master',
+            env.GITHUB_ACTIONS_REF: 'refs/pull/3/merge',
+        }
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(config.branch, 'master')
+        # Verify that caching works.
+        self.assertEqual(config._branch, 'master')
+
+    def test_branch_property_push(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        config._event_name = 'push'
+        mock_env = {env.GITHUB_ACTIONS_REF: 'refs/heads/release'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(config.branch, 'release')
+            # Verify that caching works.
+            self.assertEqual(config.branch, 'release')
+
+    def _tag_helper(self, ref=None):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        mock_env = {}
+        if ref is not None:
+            mock_env[env.GITHUB_ACTIONS_REF] = ref
+        with mock.patch('os.environ', new=mock_env):
+            return config.tag
+
+    def test_tag_property(self):
+        self.assertEqual(self._tag_helper('refs/tags/1.2.3'), '1.2.3')
+
+    def test_tag_property_branch(self):
+        self.assertIsNone(self._tag_helper('refs/heads/1.2.3'))
+
+    def test_tag_property_unset(self):
+        self.assertIsNone(self._tag_helper())
+
+    def test_tag_property_cache(self):
+        config = self._make_one()
+        config._tag = '0.0.1'
+        self.assertEqual(config.tag, '0.0.1')
+
+    def test_pr_property_in_pr(self):
+        config = self._make_one()
+        config._event_name = 'pull_request'
+        config._event = {'pull_request': {'number': 99}}
+        self.assertEqual(config.pr, 99)
+        # Verify that caching works.
+        self.assertEqual(config._pr, 99)
+        self.assertEqual(config.pr, 99)
+
+    def test_pr_property_push(self):
+        config = self._make_one()
+        config._event_name = 'push'
+        self.assertIsNone(config.pr)
+
+    def test_slug_property(self):
+        import mock
+
+        config = self._make_one()
+        slug_patch = mock.patch(
+            'ci_diff_helper.github_actions._github_actions_slug',
+            return_value=mock.sentinel.slug)
+        with slug_patch as mocked:
+            self.assertIs(config.slug, mock.sentinel.slug)
+            # Verify that caching works.
+            self.assertIs(config.slug, mock.sentinel.slug)
+            mocked.assert_called_once_with()
+
+    def test_repo_url_property(self):
+        config = self._make_one()
+        config._slug = 'a/b'
+        self.assertEqual(config.repo_url, 'https://github.com/a/b')
+        # Verify that caching works.
+        self.assertEqual(config._repo_url, 'https://github.com/a/b')
+        self.assertEqual(config.repo_url, 'https://github.com/a/b')
+
+    def test_base_property_cache(self):
+        import mock
+
+        config = self._make_one()
+        config._base = mock.sentinel.base
+        self.assertIs(config.base, mock.sentinel.base)
+
+    def test_base_property_in_pr(self):
+        config = self._make_one()
+        config._event_name = 'pull_request'
+        base_sha = 'f9a1d2b58d6c6ac4e8a4a6fca1b4e0f7a79b8431'
+        config._event = {'pull_request': {'base': {'sha': base_sha}}}
+        self.assertEqual(config.base, base_sha)
+        # Verify that caching works.
+        self.assertEqual(config._base, base_sha)
+
+    def test_base_property_in_pr_bad_payload(self):
+        config = self._make_one()
+        config._event_name = 'pull_request'
+        config._event = {'pull_request': {}}
+        with self.assertRaises(KeyError):
+            getattr(config, 'base')
+
+    def test_base_property_push(self):
+        config = self._make_one()
+        config._event_name = 'push'
+        before = '4ad7349dc7223ebc02175a16dc577a013044a538'
+        config._event = {'before': before}
+        self.assertEqual(config.base, before)
+
+    def test_base_property_push_new_branch(self):
+        from ci_diff_helper import github_actions
+
+        config = self._make_one()
+        config._event_name = 'push'
+        config._event = {'before': github_actions._NULL_SHA}
+        with self.assertRaises(OSError):
+            getattr(config, 'base')
+
+    def test_base_property_push_missing(self):
+        config = self._make_one()
+        config._event_name = 'push'
+        config._event = {}
+        with self.assertRaises(OSError):
+            getattr(config, 'base')
+
+    def test_base_property_unsupported(self):
+        config = self._make_one()
+        config._event_name = 'schedule'
+        config._event = {}
+        with self.assertRaises(NotImplementedError):
+            getattr(config, 'base')
+
+    def test_merged_pr_property_cache(self):
+        import mock
+
+        config = self._make_one()
+        config._merged_pr = mock.sentinel.merged_pr
+        self.assertIs(config.merged_pr, mock.sentinel.merged_pr)
+
+    def test_merged_pr_property_in_pr(self):
+        config = self._make_one()
+        config._event_name = 'pull_request'
+        self.assertIsNone(config.merged_pr)
+
+    def _merged_pr_push_helper(self, event):
+        config = self._make_one()
+        config._event_name = 'push'
+        config._event = event
+        return config.merged_pr
+
+    def test_merged_pr_property_push_merge(self):
+        message = 'Merge pull request #808 from a/b\n\nFix everything #1.'
+        event = {'head_commit': {'message': message}}
+        self.assertEqual(self._merged_pr_push_helper(event), 808)
+
+    def test_merged_pr_property_push_non_merge(self):
+        event = {'head_commit': {'message': 'Fix the thing (#808)'}}
+        self.assertIsNone(self._merged_pr_push_helper(event))
+
+    def test_merged_pr_property_push_no_head_commit(self):
+        self.assertIsNone(self._merged_pr_push_helper({'head_commit': None}))
+
+    def test_merged_pr_property_unsupported(self):
+        config = self._make_one()
+        config._event_name = 'workflow_dispatch'
+        with self.assertRaises(NotImplementedError):
+            getattr(config, 'merged_pr')
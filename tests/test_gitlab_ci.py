@@ -0,0 +1,298 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class Test__gitlab_ci_mr(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import gitlab_ci
+        return gitlab_ci._gitlab_ci_mr()
+
+    def test_success(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {env.GITLAB_CI_MR: '17'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(self._call_function_under_test(), 17)
+
+    def test_failure_unset(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            self.assertIsNone(self._call_function_under_test())
+
+
+class Test__get_sha(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(env_var):
+        from ci_diff_helper import gitlab_ci
+        return gitlab_ci._get_sha(env_var)
+
+    def _helper(self, value):
+        import mock
+
+        env_var = 'SOME_SHA'
+        mock_env = {}
+        if value is not None:
+            mock_env[env_var] = value
+        with mock.patch('os.environ', new=mock_env):
+            return self._call_function_under_test(env_var)
+
+    def test_success(self):
+        sha = '9b2c2bf3f6b13d0de95f8a6fbaa5e7d31e4d97bc'
+        self.assertEqual(self._helper(sha), sha)
+
+    def test_unset(self):
+        self.assertIsNone(self._helper(None))
+
+    def test_empty(self):
+        self.assertIsNone(self._helper(''))
+
+    def test_null(self):
+        from ci_diff_helper import gitlab_ci
+
+        self.assertIsNone(self._helper(gitlab_ci._NULL_SHA))
+
+
+class Test__mr_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import gitlab_ci
+        return gitlab_ci._mr_base()
+
+    def _helper(self, mock_env):
+        import mock
+
+        with mock.patch('os.environ', new=mock_env):
+            return self._call_function_under_test()
+
+    def test_diff_base(self):
+        from ci_diff_helper import environment_vars as env
+
+        sha = 'a20f4e5eb0c3cf5dd4d0b4fe8e4e0b8ed1c7d30e'
+        mock_env = {
+            env.GITLAB_CI_MR_DIFF_BASE: sha,
+            env.GITLAB_CI_MR_TARGET: 'master',
+        }
+        self.assertEqual(self._helper(mock_env), sha)
+
+    def test_target_branch(self):
+        from ci_diff_helper import environment_vars as env
+
+        mock_env = {env.GITLAB_CI_MR_TARGET: 'develop'}
+        self.assertEqual(self._helper(mock_env), 'develop')
+
+    def test_failure(self):
+        with self.assertRaises(OSError):
+            self._helper({})
+
+
+class Test__push_base(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import gitlab_ci
+        return gitlab_ci._push_base()
+
+    def test_success(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        sha = '0c6b9a3fb2d4e0e2e0ef6a5fb1dcb65e5fbb2a4f'
+        mock_env = {env.GITLAB_CI_BEFORE: sha}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(self._call_function_under_test(), sha)
+
+    def test_new_branch(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+        from ci_diff_helper import gitlab_ci
+
+        mock_env = {env.GITLAB_CI_BEFORE: gitlab_ci._NULL_SHA}
+        with mock.patch('os.environ', new=mock_env):
+            with self.assertRaises(OSError):
+                self._call_function_under_test()
+
+
+class Test__required_env(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(env_var, template):
+        from ci_diff_helper import gitlab_ci
+        return gitlab_ci._required_env(env_var, template)
+
+    def test_success(self):
+        import mock
+
+        with mock.patch('os.environ', new={'FOO': 'bar'}):
+            result = self._call_function_under_test('FOO', '{}')
+        self.assertEqual(result, 'bar')
+
+    def test_failure(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            with self.assertRaises(OSError) as exc_info:
+                self._call_function_under_test('FOO', 'Missing {}')
+
+        self.assertEqual(exc_info.exception.args[1], 'Missing FOO')
+
+
+class TestGitLabCI(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import gitlab_ci
+        return gitlab_ci.GitLabCI
+
+    def _make_one(self):
+        klass = self._get_target_class()
+        return klass()
+
+    def test_constructor(self):
+        from ci_diff_helper import _utils
+
+        klass = self._get_target_class()
+        config = self._make_one()
+        self.assertIsInstance(config, klass)
+        self.assertIs(config._active, _utils.UNSET)
+        self.assertIs(config._base, _utils.UNSET)
+        self.assertIs(config._branch, _utils.UNSET)
+        self.assertIs(config._is_merge, _utils.UNSET)
+        self.assertIs(config._pr, _utils.UNSET)
+        self.assertIs(config._repo_url, _utils.UNSET)
+        self.assertIs(config._slug, _utils.UNSET)
+        self.assertIs(config._tag, _utils.UNSET)
+
+    def test___repr__(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        mock_env = {env.IN_GITLAB_CI: 'true'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(repr(config), '<GitLabCI (active=True)>')
+
+    def test_pr_property(self):
+        import mock
+
+        config = self._make_one()
+        mr_patch = mock.patch('ci_diff_helper.gitlab_ci._gitlab_ci_mr',
+                              return_value=mock.sentinel.mr)
+        with mr_patch as mocked:
+            self.assertIs(config.pr, mock.sentinel.mr)
+            # Verify that caching works.
+            self.assertIs(config.pr, mock.sentinel.mr)
+            mocked.assert_called_once_with()
+
+    def test_in_pr_property(self):
+        config = self._make_one()
+        config._pr = 5
+        self.assertTrue(config.in_pr)
+
+    def test_in_pr_property_fails(self):
+        config = self._make_one()
+        config._pr = None
+        self.assertFalse(config.in_pr)
+
+    def _branch_helper(self, pr_val):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        config._pr = pr_val
+        mock_env = {
+            env.GITLAB_CI_BRANCH: 'feature',
+            env.GITLAB_CI_MR_TARGET: 'master',
+        }
+        with mock.patch('os.environ', new=mock_env):
+            result = config.branch
+            # Verify that caching works.
+            self.assertEqual(config.branch, result)
+        return result
+
+    def test_branch_property_in_pr(self):
+        self.assertEqual(self._branch_helper(8), 'master')
+
+    def test_branch_property_push(self):
+        self.assertEqual(self._branch_helper(None), 'feature')
+
+    def test_tag_property(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        mock_env = {env.GITLAB_CI_TAG: 'v1.0.0'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(config.tag, 'v1.0.0')
+
+    def test_shard_property(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        mock_env = {
+            env.GITLAB_CI_NODE_INDEX: '1',
+            env.GITLAB_CI_NODE_TOTAL: '3',
+        }
+        with mock.patch('os.environ', new=mock_env):
+            # NOTE: ``CI_NODE_INDEX`` is one-based.
+            self.assertEqual(config.shard, (0, 3))
+
+    def test_slug_property(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        mock_env = {env.GITLAB_CI_SLUG: 'group/sub/project'}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(config.slug, 'group/sub/project')
+        # Verify that caching works.
+        self.assertEqual(config.slug, 'group/sub/project')
+
+    def test_repo_url_property(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+
+        config = self._make_one()
+        repo_url = 'https://gitlab.com/group/project'
+        mock_env = {env.GITLAB_CI_REPO_URL: repo_url}
+        with mock.patch('os.environ', new=mock_env):
+            self.assertEqual(config.repo_url, repo_url)
+        # Verify that caching works.
+        self.assertEqual(config.repo_url, repo_url)
+
+    def _base_helper(self, pr_val, helper_name):
+        import mock
+
+        config = self._make_one()
+        config._pr = pr_val
+        base_patch = mock.patch(
+            'ci_diff_helper.gitlab_ci.' + helper_name,
+            return_value=mock.sentinel.base)
+        with base_patch as mocked:
+            self.assertIs(config.base, mock.sentinel.base)
+            # Verify that caching works.
+            self.assertIs(config.base, mock.sentinel.base)
+            mocked.assert_called_once_with()
+
+    def test_base_property_in_pr(self):
+        self._base_helper(12, '_mr_base')
+
+    def test_base_property_push(self):
+        self._base_helper(None, '_push_base')
@@ -0,0 +1,459 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import utils
+
+
+_REPO_FILES = {
+    'src/pkg/__init__.py': 'from pkg import core\n',
+    'src/pkg/core.py': 'import os\nfrom . import util\n',
+    'src/pkg/util.py': 'VALUE = 1\n',
+    'src/pkg/cli.py': 'from .core import main\n',
+    'tests/test_core.py': 'import pkg.core\n',
+    'tests/test_util.py': 'from pkg.util import VALUE\n',
+    'tests/test_cli.py': 'from pkg import cli\n',
+    'tests/test_broken.py': 'def oops(:\n',
+    'README.md': 'Not Python.\n',
+}
+
+
+class Test_is_test_path(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path):
+        from ci_diff_helper.import_graph import is_test_path
+        return is_test_path(path)
+
+    def test_it(self):
+        self.assertTrue(self._call_function_under_test('tests/test_a.py'))
+        self.assertTrue(self._call_function_under_test('a_test.py'))
+        self.assertFalse(self._call_function_under_test('tests/conftest.py'))
+        self.assertFalse(self._call_function_under_test('test_data.json'))
+
+
+class Test_parse_imports(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(source):
+        from ci_diff_helper.import_graph import parse_imports
+        return parse_imports(source)
+
+    def test_it(self):
+        source = (
+            b'import os, a.b as c\n'
+            b'from . import x\n'
+            b'from ..y import z, w\n'
+            b'def f():\n'
+            b'    from q import *\n')
+        self.assertEqual(self._call_function_under_test(source), [
+            [0, 'os', None],
+            [0, 'a.b', None],
+            [1, None, ['x']],
+            [2, 'y', ['z', 'w']],
+            [0, 'q', ['*']],
+        ])
+
+    def test_syntax_error(self):
+        self.assertIsNone(self._call_function_under_test(b'def f(:\n'))
+
+    def test_null_byte(self):
+        self.assertIsNone(self._call_function_under_test(b'x = 1\0\n'))
+
+
+class Test_module_name(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path, **kwargs):
+        from ci_diff_helper.import_graph import module_name
+        return module_name(path, **kwargs)
+
+    def test_defaults(self):
+        self.assertEqual(self._call_function_under_test('a/b/c.py'),
+                         ('a.b.c', False))
+        self.assertEqual(self._call_function_under_test('a/b/__init__.py'),
+                         ('a.b', True))
+
+    def test_source_roots(self):
+        source_roots = ('src', 'src/vendored/', 'lib')
+        self.assertEqual(
+            self._call_function_under_test(
+                'src/pkg/mod.py', source_roots=source_roots),
+            ('pkg.mod', False))
+        self.assertEqual(
+            self._call_function_under_test(
+                'src/vendored/six.py', source_roots=source_roots),
+            ('six', False))
+        self.assertEqual(
+            self._call_function_under_test(
+                'srcs/mod.py', source_roots=source_roots),
+            ('srcs.mod', False))
+
+
+class Test__candidates(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(name, is_package, record):
+        from ci_diff_helper.import_graph import _candidates
+        return _candidates(name, is_package, record)
+
+    def test_absolute(self):
+        self.assertEqual(
+            self._call_function_under_test('a.b', False, [0, 'c.d', None]),
+            ['c.d'])
+        self.assertEqual(
+            self._call_function_under_test(
+                'a.b', False, [0, 'c', ['d', '*']]),
+            ['c', 'c.d'])
+
+    def test_relative_module(self):
+        self.assertEqual(
+            self._call_function_under_test('a.b', False, [1, None, ['c']]),
+            ['a', 'a.c'])
+        self.assertEqual(
+            self._call_function_under_test('a.b', True, [1, 'c', ['d']]),
+            ['a.b.c', 'a.b.c.d'])
+        self.assertEqual(
+            self._call_function_under_test('a.b.c', False, [2, 'd', None]),
+            ['a.d'])
+
+    def test_relative_top_level(self):
+        self.assertEqual(
+            self._call_function_under_test('mod', False, [1, None, ['x']]),
+            ['x'])
+        self.assertEqual(
+            self._call_function_under_test('', True, [1, None, ['x']]),
+            ['x'])
+
+
+class Test__parse_all(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(to_parse, processes):
+        from ci_diff_helper.import_graph import _parse_all
+        return _parse_all(to_parse, processes)
+
+    def test_pool_default_size(self):
+        import mock
+
+        to_parse = [('{:040d}'.format(index), 'f.py')
+                    for index in range(100)]
+        pool = mock.Mock(spec=['imap_unordered', 'close', 'join'])
+        pool.imap_unordered.return_value = [('abc', [])]
+        pool_patch = mock.patch('multiprocessing.Pool', return_value=pool)
+        cpu_patch = mock.patch('multiprocessing.cpu_count', return_value=5)
+        with pool_patch as mocked, cpu_patch:
+            result = self._call_function_under_test(to_parse, None)
+
+        self.assertEqual(result, {'abc': []})
+        mocked.assert_called_once_with(processes=5)
+        pool.imap_unordered.assert_called_once_with(
+            mock.ANY, to_parse, chunksize=5)
+        pool.close.assert_called_once_with()
+        pool.join.assert_called_once_with()
+
+
+class Test__load_cache(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(cache_filename):
+        from ci_diff_helper.import_graph import _load_cache
+        return _load_cache(cache_filename)
+
+    def _write(self, contents):
+        import os
+        import shutil
+        import tempfile
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        filename = os.path.join(root, 'cache.json')
+        if contents is not None:
+            with open(filename, 'w') as file_obj:
+                file_obj.write(contents)
+        return filename
+
+    def test_no_filename(self):
+        self.assertEqual(self._call_function_under_test(None), {})
+
+    def test_missing(self):
+        self.assertEqual(self._call_function_under_test(self._write(None)),
+                         {})
+
+    def test_corrupt(self):
+        filename = self._write('{"version": ')
+        self.assertEqual(self._call_function_under_test(filename), {})
+
+    def test_old_version(self):
+        filename = self._write('{"version": 0, "blobs": {"abc": []}}')
+        self.assertEqual(self._call_function_under_test(filename), {})
+
+    def test_round_trip(self):
+        from ci_diff_helper.import_graph import _save_cache
+
+        filename = self._write(None)
+        blobs = {'abc': [[0, 'os', None]], 'def': None}
+        _save_cache(filename, blobs)
+        self.assertEqual(self._call_function_under_test(filename), blobs)
+
+
+class TestImportGraph(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import import_graph
+        return import_graph.ImportGraph
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def _from_repo_files(self):
+        from ci_diff_helper.import_graph import parse_imports
+
+        klass = self._get_target_class()
+        records = {
+            path: parse_imports(contents.encode('utf-8'))
+            for path, contents in _REPO_FILES.items()
+            if path.endswith('.py')
+        }
+        return klass.from_records(records, source_roots=('src',))
+
+    def test_constructor(self):
+        graph = self._make_one({'a': 'a.py', 'b': 'b.py'}, {'a': {'b'}})
+        self.assertEqual(graph.paths, {'a': 'a.py', 'b': 'b.py'})
+        self.assertEqual(graph.imports, {'a': {'b'}})
+        self.assertEqual(graph.unparsed, frozenset())
+
+    def test_from_records(self):
+        graph = self._from_repo_files()
+        self.assertEqual(graph.imports, {
+            'pkg': {'pkg.core'},
+            'pkg.core': {'pkg', 'pkg.util'},
+            'pkg.util': set(),
+            'pkg.cli': {'pkg', 'pkg.core'},
+            'tests.test_core': {'pkg', 'pkg.core'},
+            'tests.test_util': {'pkg', 'pkg.util'},
+            'tests.test_cli': {'pkg', 'pkg.cli'},
+            'tests.test_broken': set(),
+        })
+        self.assertEqual(graph.unparsed, frozenset(['tests.test_broken']))
+        self.assertEqual(graph.paths['pkg'], 'src/pkg/__init__.py')
+
+    def test_from_records_same_module_name(self):
+        klass = self._get_target_class()
+        records = {'src/util.py': [], 'lib/util.py': []}
+        with self.assertRaises(ValueError):
+            klass.from_records(records, source_roots=('src', 'lib'))
+
+    def test_dependents(self):
+        graph = self._make_one(
+            {'a': 'a.py', 'b': 'b.py', 'c': 'c.py', 'd': 'd.py'},
+            {'a': {'b'}, 'b': {'c'}, 'c': {'b'}, 'd': set()})
+        self.assertEqual(graph.dependents(['c']), {'a', 'b', 'c'})
+        self.assertEqual(graph.dependents(['a', 'd']), {'a', 'd'})
+        self.assertEqual(graph.dependents([]), set())
+
+    def test_dependencies(self):
+        graph = self._make_one(
+            {'a': 'a.py', 'b': 'b.py', 'c': 'c.py', 'd': 'd.py'},
+            {'a': {'b'}, 'b': {'c'}, 'c': {'b'}, 'd': set()})
+        self.assertEqual(graph.dependencies(['a']), {'a', 'b', 'c'})
+        self.assertEqual(graph.dependencies(['c', 'd']), {'b', 'c', 'd'})
+        self.assertEqual(graph.dependencies([]), set())
+
+    def test_dependency_paths(self):
+        graph = self._from_repo_files()
+        self.assertEqual(graph.dependency_paths('tests/test_cli.py'), [
+            'src/pkg/__init__.py',
+            'src/pkg/cli.py',
+            'src/pkg/core.py',
+            'src/pkg/util.py',
+        ])
+        self.assertEqual(graph.dependency_paths('src/pkg/util.py'), [])
+        self.assertEqual(graph.dependency_paths('README.md'), [])
+
+    def test_impacted_tests(self):
+        graph = self._from_repo_files()
+        # Every module imports ``pkg``, which imports ``pkg.core``.
+        self.assertEqual(graph.impacted_tests(['src/pkg/util.py']), [
+            'tests/test_broken.py',
+            'tests/test_cli.py',
+            'tests/test_core.py',
+            'tests/test_util.py',
+        ])
+        self.assertEqual(
+            graph.impacted_tests(['src/pkg/cli.py', 'README.md']),
+            ['tests/test_broken.py', 'tests/test_cli.py'])
+
+    def test_impacted_tests_conftest(self):
+        klass = self._get_target_class()
+        records = {
+            'pkg/util.py': [],
+            'tests/conftest.py': [[0, 'pkg.util', None]],
+            'tests/test_a.py': [],
+            'tests/unit/test_b.py': [],
+            'other/test_c.py': [],
+        }
+        graph = klass.from_records(records)
+        expected = ['tests/test_a.py', 'tests/unit/test_b.py']
+        self.assertEqual(graph.impacted_tests(['tests/conftest.py']),
+                         expected)
+        # The ``conftest.py`` imports the changed module.
+        self.assertEqual(graph.impacted_tests(['pkg/util.py']), expected)
+        self.assertEqual(graph.impacted_tests(['other/test_c.py']),
+                         ['other/test_c.py'])
+
+    def test_impacted_tests_root_conftest(self):
+        klass = self._get_target_class()
+        records = {
+            'conftest.py': [],
+            'tests/test_a.py': [],
+            'other/test_c.py': [],
+        }
+        graph = klass.from_records(records)
+        self.assertEqual(graph.impacted_tests(['conftest.py']),
+                         ['other/test_c.py', 'tests/test_a.py'])
+
+    def test_impacted_tests_custom_is_test(self):
+        graph = self._from_repo_files()
+        result = graph.impacted_tests(
+            ['src/pkg/cli.py'], is_test=lambda path: path.endswith('cli.py'))
+        self.assertEqual(result, ['src/pkg/cli.py', 'tests/test_cli.py'])
+
+    def test_impacted_tests_since(self):
+        import mock
+
+        graph = self._from_repo_files()
+        patch = mock.patch('ci_diff_helper.git_tools.get_changed_files',
+                           return_value=['tests/test_util.py'])
+        with patch as mocked:
+            result = graph.impacted_tests_since('master')
+
+        self.assertEqual(result,
+                         ['tests/test_broken.py', 'tests/test_util.py'])
+        mocked.assert_called_once_with('HEAD', 'master')
+
+    def test_impacted_tests_since_full_build(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        graph = self._from_repo_files()
+        patch = mock.patch('ci_diff_helper.git_tools.get_changed_files')
+        with patch as mocked:
+            result = graph.impacted_tests_since(_utils.FULL_BUILD)
+
+        self.assertEqual(result, [
+            'tests/test_broken.py',
+            'tests/test_cli.py',
+            'tests/test_core.py',
+            'tests/test_util.py',
+        ])
+        mocked.assert_not_called()
+
+    def _make_repo(self):
+        import os
+        import shutil
+        import tempfile
+
+        root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        utils.git(root, 'init', '--quiet')
+        for path, contents in _REPO_FILES.items():
+            filename = os.path.join(root, *path.split('/'))
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            with open(filename, 'w') as file_obj:
+                file_obj.write(contents)
+        utils.git(root, 'add', '.')
+        utils.git(root, 'commit', '--quiet', '-m', 'Initial.')
+
+        orig_dir = os.getcwd()
+        os.chdir(root)
+        self.addCleanup(os.chdir, orig_dir)
+        return root
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_build(self):
+        import mock
+
+        klass = self._get_target_class()
+        self._make_repo()
+        with mock.patch('ci_diff_helper.import_graph._MIN_POOL_SIZE', new=0):
+            graph = klass.build(source_roots=('src',), processes=2)
+
+        self.assertEqual(graph.imports, self._from_repo_files().imports)
+        self.assertEqual(graph.unparsed, frozenset(['tests.test_broken']))
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_build_incremental(self):
+        import os
+        import mock
+        from ci_diff_helper import import_graph
+
+        klass = self._get_target_class()
+        root = self._make_repo()
+        cache_filename = os.path.join(root, 'cache.json')
+        graph = klass.build(source_roots=('src',),
+                            cache_filename=cache_filename)
+        self.assertTrue(os.path.exists(cache_filename))
+
+        # Change one file; only it is parsed again.
+        filename = os.path.join(root, 'src', 'pkg', 'cli.py')
+        with open(filename, 'w') as file_obj:
+            file_obj.write('import pkg.util\n')
+        utils.git(root, 'commit', '--quiet', '-am', 'Change.')
+
+        parse_all = import_graph._parse_all
+        with mock.patch('ci_diff_helper.import_graph._parse_all',
+                        wraps=parse_all) as mocked:
+            new_graph = klass.build(source_roots=('src',),
+                                    cache_filename=cache_filename)
+            # The cache is now up to date, so nothing is parsed.
+            klass.build(source_roots=('src',),
+                        cache_filename=cache_filename)
+
+        (to_parse, _), _ = mocked.call_args_list[0]
+        self.assertEqual([os.path.basename(filename)
+                          for _, filename in to_parse], ['cli.py'])
+        (to_parse, _), _ = mocked.call_args_list[1]
+        self.assertEqual(to_parse, [])
+        self.assertEqual(graph.imports['pkg.cli'], {'pkg', 'pkg.core'})
+        self.assertEqual(new_graph.imports['pkg.cli'], {'pkg', 'pkg.util'})
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_build_uncommitted_changes(self):
+        import json
+        import os
+
+        klass = self._get_target_class()
+        root = self._make_repo()
+        # The working tree, not the index, is parsed for changed files.
+        filename = os.path.join(root, 'src', 'pkg', 'cli.py')
+        with open(filename, 'w') as file_obj:
+            file_obj.write('import pkg.util\n')
+        os.remove(os.path.join(root, 'tests', 'test_util.py'))
+
+        cache_filename = os.path.join(root, 'cache.json')
+        graph = klass.build(source_roots=('src',),
+                            cache_filename=cache_filename)
+
+        self.assertEqual(graph.imports['pkg.cli'], {'pkg', 'pkg.util'})
+        self.assertNotIn('tests.test_util', graph.paths)
+        # Only the blobs matching the working tree are cached.
+        with open(cache_filename) as file_obj:
+            cached = json.load(file_obj)['blobs']
+        blob_sha = utils.git(root, 'rev-parse', 'HEAD:src/pkg/cli.py')
+        self.assertNotIn(blob_sha, cached)
+        self.assertNotIn(filename, cached)
+        self.assertEqual(len(cached), len(graph.paths) - 1)
@@ -0,0 +1,146 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import utils
+
+
+class TestLineIndex(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.line_index import LineIndex
+        return LineIndex
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_constructor_defaults(self):
+        index = self._make_one()
+        self.assertEqual(len(index), 0)
+        self.assertEqual(list(index), [])
+        self.assertFalse(index.is_changed('a.py', 1))
+        self.assertEqual(index.ranges('a.py'), [])
+
+    def test_constructor(self):
+        index = self._make_one([('b.py', 3, 4), ('a.py', 1, 1)])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(list(index), ['a.py', 'b.py'])
+        self.assertIn('a.py', index)
+        self.assertNotIn('c.py', index)
+
+    def test_add_in_order(self):
+        index = self._make_one()
+        index.add('a.py', 3, 5)
+        index.add('a.py', 10, 10)
+        # Adjacent and overlapping ranges are merged.
+        index.add('a.py', 11, 12)
+        index.add('a.py', 12, 14)
+        index.add('a.py', 13, 13)
+        self.assertEqual(index.ranges('a.py'), [(3, 5), (10, 14)])
+
+    def test_add_out_of_order(self):
+        index = self._make_one([('a.py', 10, 12), ('a.py', 20, 22),
+                                ('a.py', 30, 32)])
+        # Before all ranges.
+        index.add('a.py', 1, 2)
+        self.assertEqual(index.ranges('a.py'),
+                         [(1, 2), (10, 12), (20, 22), (30, 32)])
+        # Between two ranges.
+        index.add('a.py', 15, 16)
+        self.assertEqual(index.ranges('a.py'),
+                         [(1, 2), (10, 12), (15, 16), (20, 22), (30, 32)])
+        # Spanning (and adjacent to) several ranges.
+        index.add('a.py', 3, 21)
+        self.assertEqual(index.ranges('a.py'), [(1, 22), (30, 32)])
+        # Within an existing range.
+        index.add('a.py', 5, 6)
+        self.assertEqual(index.ranges('a.py'), [(1, 22), (30, 32)])
+
+    def test_add_empty_range(self):
+        index = self._make_one()
+        with self.assertRaises(ValueError):
+            index.add('a.py', 5, 4)
+
+    def test_is_changed(self):
+        index = self._make_one([('a.py', 3, 5), ('a.py', 10, 10)])
+        changed = [line for line in range(1, 13)
+                   if index.is_changed('a.py', line)]
+        self.assertEqual(changed, [3, 4, 5, 10])
+        self.assertFalse(index.is_changed('b.py', 3))
+
+    def test_path_separator(self):
+        import os
+
+        index = self._make_one([(os.path.join('pkg', 'a.py'), 1, 2)])
+        self.assertEqual(list(index), ['pkg/a.py'])
+        self.assertIn(os.path.join('pkg', 'a.py'), index)
+        self.assertTrue(index.is_changed(os.path.join('pkg', 'a.py'), 2))
+        self.assertEqual(index.ranges(os.path.join('pkg', 'a.py')), [(1, 2)])
+
+    def test_from_hunks(self):
+        klass = self._get_target_class()
+        hunks = [
+            ('a.py', 'a.py', 3, 1, 3, 1),
+            # Only removes lines.
+            ('a.py', 'a.py', 7, 2, 6, 0),
+            ('a.py', 'a.py', 10, 0, 9, 3),
+            (None, 'new.py', 0, 0, 1, 2),
+            ('gone.py', None, 1, 4, 0, 0),
+        ]
+        index = klass.from_hunks(hunks)
+        self.assertEqual(list(index), ['a.py', 'new.py'])
+        self.assertEqual(index.ranges('a.py'), [(3, 3), (9, 11)])
+        self.assertEqual(index.ranges('new.py'), [(1, 2)])
+
+    def test_from_diff(self):
+        import mock
+
+        klass = self._get_target_class()
+        hunks = [('a.py', 'a.py', 3, 1, 3, 2)]
+        hunks_patch = mock.patch(
+            'ci_diff_helper.git_tools.iter_changed_hunks',
+            return_value=iter(hunks))
+        with hunks_patch as mocked:
+            index = klass.from_diff('master', 'HEAD')
+
+        self.assertEqual(index.ranges('a.py'), [(3, 4)])
+        mocked.assert_called_once_with('master', 'HEAD')
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_from_diff_actual_call(self):
+        import os
+        import shutil
+        import tempfile
+
+        klass = self._get_target_class()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        utils.git(root, 'init', '--quiet')
+        for name in ('a.txt', 'b.txt'):
+            with open(os.path.join(root, name), 'w') as file_obj:
+                file_obj.write(''.join('%d\n' % line for line in range(20)))
+        utils.git(root, 'add', '.')
+        utils.git(root, 'commit', '--quiet', '-m', '1')
+        with open(os.path.join(root, 'a.txt'), 'w') as file_obj:
+            file_obj.write('0\nnew\n1\n2\nx\n4\n5\n')
+        os.remove(os.path.join(root, 'b.txt'))
+        utils.git(root, 'commit', '--quiet', '-am', '2')
+
+        orig_dir = os.getcwd()
+        os.chdir(root)
+        self.addCleanup(os.chdir, orig_dir)
+        index = klass.from_diff('HEAD~1', 'HEAD')
+        self.assertEqual(list(index), ['a.txt'])
+        self.assertEqual(index.ranges('a.txt'), [(2, 2), (5, 5)])
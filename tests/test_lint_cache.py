@@ -0,0 +1,435 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from tests import utils
+
+
+def _any_lines(lines):
+    return int(any(line.startswith(':') for line in lines))
+
+
+class Test_get_cache_dir(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper.lint_cache import get_cache_dir
+        return get_cache_dir()
+
+    def test_from_env(self):
+        import mock
+
+        with mock.patch.dict('os.environ', {'LINT_CACHE_DIR': '/cache'}):
+            self.assertEqual(self._call_function_under_test(), '/cache')
+
+    def test_default(self):
+        import os
+        import mock
+
+        env_patch = mock.patch.dict('os.environ', {'LINT_CACHE_DIR': ''})
+        root_patch = mock.patch('ci_diff_helper.git_tools.git_root',
+                                return_value='/repo')
+        with env_patch, root_patch:
+            result = self._call_function_under_test()
+
+        self.assertEqual(result, os.path.join('/repo', '.lint_cache'))
+
+
+class Test_hash_key(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*parts):
+        from ci_diff_helper.lint_cache import hash_key
+        return hash_key(*parts)
+
+    def test_it(self):
+        key = self._call_function_under_test('pylint', {'b': 1, 'a': [2]})
+        self.assertEqual(len(key), 64)
+        self.assertEqual(
+            key, self._call_function_under_test('pylint', {'a': [2], 'b': 1}))
+        self.assertNotEqual(key, self._call_function_under_test('pylint'))
+
+
+class Test_split_output(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(lines, filenames, file_status):
+        from ci_diff_helper.lint_cache import split_output
+        return split_output(lines, filenames, file_status)
+
+    def test_it(self):
+        lines = [
+            '************* Module pkg.a',
+            '/r/pkg/a.py:1:0: C0114: Missing module docstring',
+            '/r/pkg/a.py:9:4: W0612: Unused variable',
+            '************* Module other',
+            'other.py:3:0: E0602: Undefined variable',
+            '',
+            'Your code has been rated at 5.00/10',
+            '************* Module pkg.c',
+        ]
+        entries, other = self._call_function_under_test(
+            lines, ['/r/pkg/a.py', '/r/pkg/b.py'], _any_lines)
+        self.assertEqual(entries, {
+            '/r/pkg/a.py': {
+                'status': 1,
+                'lines': [
+                    '************* Module pkg.a',
+                    ':1:0: C0114: Missing module docstring',
+                    ':9:4: W0612: Unused variable',
+                ],
+            },
+            '/r/pkg/b.py': {'status': 0, 'lines': []},
+        })
+        self.assertEqual(other, [
+            '************* Module other',
+            'other.py:3:0: E0602: Undefined variable',
+            '',
+            'Your code has been rated at 5.00/10',
+            '************* Module pkg.c',
+        ])
+
+    def test_relative_paths(self):
+        import os
+
+        filename = os.path.join(os.getcwd(), 'pkg', 'a.py')
+        relative = os.path.join('pkg', 'a.py')
+        lines = [
+            relative + ':1:0: C0114: Missing module docstring',
+            os.path.join('.', relative) + ':2:0: C0115: Missing docstring',
+        ]
+        entries, other = self._call_function_under_test(
+            lines, [filename], _any_lines)
+        self.assertEqual(entries, {
+            filename: {
+                'status': 1,
+                'lines': [
+                    ':1:0: C0114: Missing module docstring',
+                    ':2:0: C0115: Missing docstring',
+                ],
+            },
+        })
+        self.assertEqual(other, [])
+
+    @unittest.skipUnless(utils.HAS_PYLINT, 'pylint not installed')
+    def test_pylint_output(self):
+        import os
+        import shutil
+        import subprocess
+        import tempfile
+
+        temp_dir = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(temp_dir)
+        filename = os.path.join(temp_dir, 'mod.py')
+        with open(filename, 'w') as file_obj:
+            file_obj.write('import os\n')
+
+        # Pylint reports the absolute filename relative to its directory.
+        proc = subprocess.Popen(
+            ['pylint', '--msg-template', '{path}:{line}: {msg_id}',
+             '--disable=all', '--enable=unused-import', filename],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, _ = proc.communicate()
+        lines = output.decode('utf-8').splitlines()
+        self.assertIn('mod.py:1: W0611', lines)
+
+        entries, _ = self._call_function_under_test(
+            lines, [filename], _any_lines)
+        self.assertEqual(entries[filename]['status'], 1)
+        self.assertIn(':1: W0611', entries[filename]['lines'])
+
+
+class Test_merge_output(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(filenames, entries):
+        from ci_diff_helper.lint_cache import merge_output
+        return merge_output(filenames, entries)
+
+    def test_it(self):
+        entries = {
+            'b.py': {'status': 4, 'lines': ['** Module b', ':2:1: W1 Bad']},
+            'a.py': {'status': 16, 'lines': [':1:1: C1 Meh']},
+            'c.py': {'status': 0, 'lines': []},
+        }
+        status, lines = self._call_function_under_test(
+            ['a.py', 'b.py', 'c.py'], entries)
+        self.assertEqual(status, 20)
+        self.assertEqual(lines, [
+            'a.py:1:1: C1 Meh',
+            '** Module b',
+            'b.py:2:1: W1 Bad',
+        ])
+
+    def test_round_trip(self):
+        from ci_diff_helper.lint_cache import split_output
+
+        lines = ['x.py:1:1: E1 One', 'y.py:5:1: E2 Two', 'x.py:7:1: E3 Three']
+        entries, _ = split_output(lines, ['x.py', 'y.py'], _any_lines)
+        status, result = self._call_function_under_test(
+            ['x.py', 'y.py'], entries)
+        self.assertEqual(status, 1)
+        self.assertEqual(result, [lines[0], lines[2], lines[1]])
+
+
+class TestLintCache(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.lint_cache import LintCache
+        return LintCache
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def _make_cache(self, **kwargs):
+        import shutil
+        import tempfile
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return self._make_one(directory, 'namespace', **kwargs)
+
+    def test_constructor(self):
+        from ci_diff_helper.lint_cache import DEFAULT_MAX_BYTES
+
+        cache = self._make_one('/cache', 'ns')
+        self.assertEqual(cache.directory, '/cache')
+        self.assertEqual(cache.namespace, 'ns')
+        self.assertEqual(cache.max_bytes, DEFAULT_MAX_BYTES)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 0)
+        self.assertEqual(cache.hit_rate, 0.0)
+
+    def test_get_and_put(self):
+        cache = self._make_cache()
+        key = 'ab' + 62 * 'c'
+        self.assertIsNone(cache.get(key))
+        entry = {'status': 4, 'lines': [':1:1: W1 Bad']}
+        cache.put(key, entry)
+        self.assertEqual(cache.get(key), entry)
+        # Overwriting an entry.
+        cache.put(key, {'status': 0, 'lines': []})
+        self.assertEqual(cache.get(key), {'status': 0, 'lines': []})
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 1)
+
+    def test_get_touches_entry(self):
+        import os
+
+        cache = self._make_cache()
+        key = 64 * 'a'
+        cache.put(key, {'status': 0, 'lines': []})
+        filename = cache._entry_filename(key)
+        os.utime(filename, (1000, 1000))
+        cache.get(key)
+        self.assertGreater(os.path.getmtime(filename), 1000)
+
+    def test_get_invalid(self):
+        import io
+        import os
+        import six
+
+        cache = self._make_cache()
+        cache.put('k1', {'status': 0, 'lines': []})
+        with io.open(cache._entry_filename('k1'), 'w') as file_obj:
+            file_obj.write(six.u('{"status": 0'))
+        cache.put('k2', {'status': 0, 'lines': []})
+        with io.open(cache._entry_filename('k2'), 'w') as file_obj:
+            file_obj.write(six.u('{"version": 0}'))
+
+        self.assertIsNone(cache.get('k1'))
+        self.assertIsNone(cache.get('k2'))
+        self.assertEqual(cache.misses, 2)
+        self.assertTrue(os.path.exists(cache._entry_filename('k2')))
+
+    def test_lookup_and_store(self):
+        cache = self._make_cache()
+        keys = {'a.py': 'key-a', 'b.py': 'key-b'}
+        self.assertEqual(cache.lookup(keys), {})
+        entries = {
+            'a.py': {'status': 0, 'lines': []},
+            'b.py': {'status': 1, 'lines': [':1:1: E1 Bad']},
+            'c.py': {'status': 0, 'lines': []},
+        }
+        cache.store(keys, entries)
+        result = cache.lookup(dict(keys, **{'c.py': 'key-c'}))
+        self.assertEqual(result, {'a.py': entries['a.py'],
+                                  'b.py': entries['b.py']})
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 3)
+
+    def test_record(self):
+        cache = self._make_cache()
+        keys = {'a.py': 'key-a', 'b.py': 'key-b'}
+        hits = {'b.py': {'status': 1, 'lines': [':2:1: E2 Cached']}}
+        lines = ['a.py:1:1: E1 Fresh', 'Summary']
+        status, result = cache.record(
+            ['a.py', 'b.py', 'c.py'], keys, hits, 1, lines, _any_lines)
+
+        self.assertEqual(status, 1)
+        self.assertEqual(result, [
+            'a.py:1:1: E1 Fresh',
+            'b.py:2:1: E2 Cached',
+            'Summary',
+        ])
+        self.assertEqual(cache.get('key-a'),
+                         {'status': 1, 'lines': [':1:1: E1 Fresh']})
+
+    def test_record_status_mismatch(self):
+        cache = self._make_cache()
+        keys = {'a.py': 'key-a'}
+        status, result = cache.record(
+            ['a.py'], keys, {}, 2, ['Crashed'], _any_lines)
+
+        self.assertEqual(status, 2)
+        self.assertEqual(result, ['Crashed'])
+        self.assertIsNone(cache.get('key-a'))
+
+    def test_record_cacheable(self):
+        cache = self._make_cache()
+        keys = {'a.py': 'key-a', 'b.py': 'key-b'}
+        lines = ['a.py:1:1: E1 Fresh', 'b.py:1:1: R0801 Similar lines']
+        status, result = cache.record(
+            ['a.py', 'b.py'], keys, {}, 1, lines, _any_lines,
+            cacheable=lambda entry: not any(
+                'R0801' in line for line in entry['lines']))
+
+        self.assertEqual(status, 1)
+        self.assertEqual(result, lines)
+        self.assertIsNotNone(cache.get('key-a'))
+        self.assertIsNone(cache.get('key-b'))
+
+    def test_prune(self):
+        import os
+
+        cache = self._make_cache(max_bytes=200)
+        for index, key in enumerate(('key1', 'key2', 'key3')):
+            cache.put(key, {'status': 0, 'lines': [40 * 'x']})
+            mtime = 1000 + index
+            os.utime(cache._entry_filename(key), (mtime, mtime))
+        # Other files are ignored.
+        other_filename = os.path.join(cache.directory, 'imports.json')
+        with open(other_filename, 'w') as file_obj:
+            file_obj.write(1000 * 'x')
+        size = os.path.getsize(cache._entry_filename('key1'))
+        self.assertGreater(3 * size, 200)
+        self.assertLessEqual(2 * size, 200)
+
+        self.assertEqual(cache.prune(), 1)
+        self.assertFalse(os.path.exists(cache._entry_filename('key1')))
+        self.assertTrue(os.path.exists(cache._entry_filename('key2')))
+        self.assertTrue(os.path.exists(other_filename))
+        self.assertEqual(cache.prune(), 0)
+
+    def test_prune_missing_directory(self):
+        cache = self._make_one('/does/not/exist', 'ns')
+        self.assertEqual(cache.prune(), 0)
+
+    def test_report(self):
+        cache = self._make_one('/cache', 'ns')
+        cache.hits = 3
+        cache.misses = 1
+        self.assertEqual(cache.hit_rate, 0.75)
+        self.assertEqual(cache.report(),
+                         'Lint cache: 3 hit(s), 1 miss(es), 75.0% hit rate.')
+
+    def _patch_git(self, root, blobs, modified):
+        import mock
+
+        return (
+            mock.patch('ci_diff_helper.git_tools.git_root',
+                       return_value=root),
+            mock.patch('ci_diff_helper.git_tools.get_checked_in_blobs',
+                       return_value=blobs),
+            mock.patch('ci_diff_helper.git_tools.get_modified_files',
+                       return_value=modified),
+        )
+
+    def test_keys_for(self):
+        import os
+        from ci_diff_helper.lint_cache import hash_key
+
+        root = os.path.abspath('repo')
+        a_file = os.path.join(root, 'a.py')
+        b_file = os.path.join(root, 'b.py')
+        c_file = os.path.join(root, 'c.py')
+        blobs = {a_file: 'sha-a', b_file: 'sha-b', c_file: 'sha-c'}
+        cache = self._make_one('/cache', 'ns')
+        root_patch, blobs_patch, modified_patch = self._patch_git(
+            root, blobs, [c_file])
+        with root_patch, blobs_patch, modified_patch:
+            keys = cache.keys_for(
+                [a_file, b_file, c_file, os.path.join(root, 'new.py')])
+
+        self.assertEqual(keys, {
+            a_file: hash_key('ns', 'a.py', 'sha-a'),
+            b_file: hash_key('ns', 'b.py', 'sha-b'),
+        })
+        self.assertEqual(cache.misses, 2)
+
+    def test_keys_for_dependencies(self):
+        import os
+        from ci_diff_helper.lint_cache import hash_key
+
+        root = os.path.abspath('repo')
+        filenames = {name: os.path.join(root, name + '.py')
+                     for name in ('a', 'b', 'c', 'd')}
+        blobs = {filename: 'sha-' + name
+                 for name, filename in filenames.items()}
+        imports = {
+            filenames['a']: [filenames['b']],
+            filenames['b']: [],
+            filenames['c']: [filenames['d']],
+            filenames['d']: [os.path.join(root, 'new.py')],
+        }
+        cache = self._make_one('/cache', 'ns')
+        root_patch, blobs_patch, modified_patch = self._patch_git(
+            root, blobs, [filenames['d']])
+        with root_patch, blobs_patch, modified_patch:
+            keys = cache.keys_for(
+                sorted(filenames.values()), dependencies=imports.get)
+
+        # ``c.py`` imports a modified file and ``d.py`` a new one.
+        self.assertEqual(keys, {
+            filenames['a']: hash_key('ns', 'a.py', 'sha-a', 'sha-b'),
+            filenames['b']: hash_key('ns', 'b.py', 'sha-b'),
+        })
+
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_keys_for_actual_call(self):
+        import os
+        import shutil
+        import tempfile
+
+        cache = self._make_cache()
+        root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        utils.git(root, 'init', '--quiet')
+        for name in ('a.py', 'b.py'):
+            with open(os.path.join(root, name), 'w') as file_obj:
+                file_obj.write('x = 1\n')
+        utils.git(root, 'add', '.')
+        utils.git(root, 'commit', '--quiet', '-m', '1')
+        with open(os.path.join(root, 'b.py'), 'w') as file_obj:
+            file_obj.write('x = 2\n')
+
+        orig_dir = os.getcwd()
+        os.chdir(root)
+        self.addCleanup(os.chdir, orig_dir)
+        keys = cache.keys_for([os.path.join(root, 'a.py'),
+                               os.path.join(root, 'b.py')])
+        self.assertEqual(list(keys), [os.path.join(root, 'a.py')])
@@ -0,0 +1,206 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class Test__iter_json_array(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(contents, **kwargs):
+        import io
+        from ci_diff_helper.lint_filter import _iter_json_array
+
+        file_obj = io.StringIO(contents)
+        return list(_iter_json_array(file_obj, **kwargs))
+
+    def test_empty(self):
+        self.assertEqual(self._call_function_under_test(u''), [])
+        self.assertEqual(self._call_function_under_test(u' \n'), [])
+
+    def test_empty_array(self):
+        self.assertEqual(self._call_function_under_test(u'[]\n'), [])
+
+    def test_values(self):
+        contents = u'[\n  {"a": [1, 2]},\n  {"b": "]"}, 3\n]\n'
+        expected = [{'a': [1, 2]}, {'b': ']'}, 3]
+        self.assertEqual(self._call_function_under_test(contents), expected)
+        # Values split across chunks.
+        for chunk_size in (1, 2, 5):
+            result = self._call_function_under_test(
+                contents, chunk_size=chunk_size)
+            self.assertEqual(result, expected)
+
+    def test_not_array(self):
+        with self.assertRaises(ValueError):
+            self._call_function_under_test(u'{"a": 1}')
+
+    def test_incomplete(self):
+        with self.assertRaises(ValueError):
+            self._call_function_under_test(u'[{"a": 1}, {"b"')
+        with self.assertRaises(ValueError):
+            self._call_function_under_test(u'[')
+
+
+class TestDiffFilter(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.lint_filter import DiffFilter
+        return DiffFilter
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def _make_filter(self):
+        from ci_diff_helper.line_index import LineIndex
+
+        index = LineIndex([
+            ('pkg/a.py', 3, 4),
+            ('pkg/b.py', 10, 10),
+        ])
+        return self._make_one(index, root='/repo')
+
+    def test_constructor(self):
+        diff_filter = self._make_one(None, root='/repo')
+        self.assertIsNone(diff_filter.index)
+        self.assertEqual(diff_filter.root, '/repo')
+        self.assertEqual(diff_filter.kept, 0)
+        self.assertEqual(diff_filter.dropped, 0)
+
+    def test_constructor_default_root(self):
+        import os
+
+        diff_filter = self._make_one(None)
+        self.assertEqual(diff_filter.root, os.path.abspath(os.getcwd()))
+
+    def test_from_diff(self):
+        import mock
+
+        klass = self._get_target_class()
+        index_patch = mock.patch(
+            'ci_diff_helper.line_index.LineIndex.from_diff',
+            return_value=mock.sentinel.index)
+        root_patch = mock.patch('ci_diff_helper.git_tools.git_root',
+                                return_value='/repo')
+        with index_patch as mocked:
+            with root_patch:
+                diff_filter = klass.from_diff('master')
+
+        self.assertIs(diff_filter.index, mock.sentinel.index)
+        self.assertEqual(diff_filter.root, '/repo')
+        mocked.assert_called_once_with('master', 'HEAD')
+
+    def test_from_config(self):
+        import mock
+
+        klass = self._get_target_class()
+        config = mock.Mock(base='abc123', spec=['base'])
+        with mock.patch.object(klass, 'from_diff') as mocked:
+            result = klass.from_config(config)
+
+        self.assertIs(result, mocked.return_value)
+        mocked.assert_called_once_with('abc123')
+
+    def test_from_config_full_build(self):
+        import mock
+        import ci_diff_helper
+
+        klass = self._get_target_class()
+        config = mock.Mock(base=ci_diff_helper.FULL_BUILD, spec=['base'])
+        config_patch = mock.patch('ci_diff_helper.get_config',
+                                  return_value=config)
+        with config_patch as mocked:
+            diff_filter = klass.from_config()
+
+        self.assertIsNone(diff_filter.index)
+        mocked.assert_called_once_with()
+
+    def test_keeps(self):
+        diff_filter = self._make_filter()
+        self.assertTrue(diff_filter.keeps('/repo/pkg/a.py', 3))
+        self.assertFalse(diff_filter.keeps('/repo/pkg/a.py', 5))
+        self.assertFalse(diff_filter.keeps('/repo/pkg/c.py', 3))
+        self.assertFalse(diff_filter.keeps('/other/pkg/a.py', 3))
+
+    def test_keeps_relative(self):
+        import os
+        from ci_diff_helper.line_index import LineIndex
+
+        index = LineIndex([('pkg/a.py', 3, 3)])
+        diff_filter = self._make_one(index, root=os.getcwd())
+        self.assertTrue(diff_filter.keeps(os.path.join('pkg', 'a.py'), 3))
+        self.assertTrue(diff_filter.keeps(
+            os.path.join(os.curdir, 'pkg', 'a.py'), 3))
+        self.assertFalse(diff_filter.keeps(os.path.join('pkg', 'a.py'), 4))
+
+    def test_keeps_no_index(self):
+        diff_filter = self._make_one(None)
+        self.assertTrue(diff_filter.keeps('anything.py', 1))
+
+    def test_filter_text_pycodestyle(self):
+        diff_filter = self._make_filter()
+        lines = [
+            '/repo/pkg/a.py:2:1: E302 expected 2 blank lines, found 1',
+            '/repo/pkg/a.py:3:80: E501 line too long (82 > 79 characters)',
+            'x = 1  # A really long line...',
+            '                                    ^',
+            '/repo/pkg/b.py:9:1: W391 blank line at end of file',
+            '^',
+            '/repo/pkg/b.py:10:5: E225 missing whitespace around operator',
+        ]
+        result = list(diff_filter.filter_text(lines))
+        self.assertEqual(result, [lines[1], lines[2], lines[3], lines[6]])
+        self.assertEqual(diff_filter.kept, 2)
+        self.assertEqual(diff_filter.dropped, 2)
+
+    def test_filter_text_pylint(self):
+        diff_filter = self._make_filter()
+        lines = [
+            '************* Module pkg.a',
+            '/repo/pkg/a.py:1: [C0114(missing-module-docstring), ] Doc',
+            '/repo/pkg/a.py:4: [W0612(unused-variable), f] Unused x',
+            '/repo/pkg/a.py:8: [W0612(unused-variable), g] Unused y',
+            '************* Module pkg.b',
+            '/repo/pkg/b.py:1: [C0114(missing-module-docstring), ] Doc',
+            '************* Module pkg.c',
+            '/repo/pkg/c.py:10: [E0602(undefined-variable), ] Undefined z',
+        ]
+        result = list(diff_filter.filter_text(lines))
+        self.assertEqual(result, [lines[0], lines[2]])
+        self.assertEqual(diff_filter.kept, 1)
+        self.assertEqual(diff_filter.dropped, 4)
+
+    def test_filter_text_leading_lines(self):
+        diff_filter = self._make_filter()
+        lines = ['Some preamble', '/repo/pkg/c.py:1:1: E101 Bad']
+        result = list(diff_filter.filter_text(lines))
+        self.assertEqual(result, ['Some preamble'])
+
+    def test_filter_json(self):
+        import io
+        import json
+        import six
+
+        diff_filter = self._make_filter()
+        messages = [
+            {'path': '/repo/pkg/a.py', 'line': 4, 'symbol': 'a'},
+            {'path': '/repo/pkg/a.py', 'line': 5, 'symbol': 'b'},
+            {'path': '/repo/pkg/b.py', 'line': 10, 'symbol': 'c'},
+        ]
+        file_obj = io.StringIO(
+            six.text_type(json.dumps(messages, indent=4)))
+        result = list(diff_filter.filter_json(file_obj))
+        self.assertEqual(result, [messages[0], messages[2]])
+        self.assertEqual(diff_filter.kept, 2)
+        self.assertEqual(diff_filter.dropped, 1)
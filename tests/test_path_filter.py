@@ -0,0 +1,322 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class Test__translate(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(pattern):
+        from ci_diff_helper.path_filter import _translate
+        return _translate(pattern)
+
+    def _matches(self, pattern, path):
+        import re
+        regex = self._call_function_under_test(pattern)
+        return re.match('(?:' + regex + ')$', path) is not None
+
+    def test_star(self):
+        self.assertTrue(self._matches('a*.py', 'abc.py'))
+        self.assertFalse(self._matches('a*.py', 'a/b.py'))
+
+    def test_question_mark(self):
+        self.assertTrue(self._matches('a?c', 'abc'))
+        self.assertFalse(self._matches('a?c', 'a/c'))
+
+    def test_double_star(self):
+        self.assertTrue(self._matches('**/foo', 'foo'))
+        self.assertTrue(self._matches('**/foo', 'a/b/foo'))
+        self.assertTrue(self._matches('a/**/b', 'a/b'))
+        self.assertTrue(self._matches('a/**/b', 'a/x/y/b'))
+        self.assertTrue(self._matches('a/**', 'a/x/y'))
+        # Not at the start of a segment, ``**`` is the same as ``*``.
+        self.assertTrue(self._matches('a**b', 'axyb'))
+        self.assertFalse(self._matches('a**b', 'ax/yb'))
+
+    def test_brackets(self):
+        self.assertTrue(self._matches('[abc].py', 'b.py'))
+        self.assertFalse(self._matches('[abc].py', 'd.py'))
+        self.assertTrue(self._matches('[!abc].py', 'd.py'))
+        self.assertFalse(self._matches('[!abc].py', 'a.py'))
+        self.assertTrue(self._matches('[]].py', '].py'))
+        # An unclosed bracket is a literal.
+        self.assertTrue(self._matches('[ab', '[ab'))
+
+    def test_escapes(self):
+        self.assertTrue(self._matches('\\*.py', '*.py'))
+        self.assertFalse(self._matches('\\*.py', 'a.py'))
+        self.assertTrue(self._matches('a.b+c', 'a.b+c'))
+        self.assertFalse(self._matches('a.b', 'axb'))
+
+
+class Test__literal_prefix(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(pattern):
+        from ci_diff_helper.path_filter import _literal_prefix
+        return _literal_prefix(pattern)
+
+    def test_prefix(self):
+        self.assertEqual(
+            self._call_function_under_test('pkg/sub/**/*.js'), 'pkg/sub')
+        self.assertEqual(self._call_function_under_test('pkg/a*'), 'pkg')
+        self.assertEqual(
+            self._call_function_under_test('pkg/s?b/c/*.py'), 'pkg')
+
+    def test_no_prefix(self):
+        self.assertEqual(self._call_function_under_test('*.py'), '')
+        self.assertEqual(self._call_function_under_test('**/a/*.py'), '')
+        self.assertEqual(self._call_function_under_test('p*/a.py'), '')
+
+
+class Test_normalize_path(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path, **kwargs):
+        from ci_diff_helper.path_filter import normalize_path
+        return normalize_path(path, **kwargs)
+
+    def test_relative(self):
+        self.assertEqual(self._call_function_under_test('./././a/b.py'),
+                         'a/b.py')
+
+    def test_absolute(self):
+        import os
+
+        root = os.path.abspath('repo')
+        path = os.path.join(root, 'pkg', 'mod.py')
+        self.assertEqual(self._call_function_under_test(path, root=root),
+                         'pkg/mod.py')
+        self.assertEqual(self._call_function_under_test(path),
+                         path.replace(os.sep, '/'))
+
+
+class TestPatternSet(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import path_filter
+        return path_filter.PatternSet
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def _check(self, patterns, matching, not_matching):
+        pattern_set = self._make_one(patterns)
+        for path in matching:
+            self.assertTrue(pattern_set.matches(path), (patterns, path))
+        for path in not_matching:
+            self.assertFalse(pattern_set.matches(path), (patterns, path))
+
+    def test_empty(self):
+        pattern_set = self._make_one([])
+        self.assertEqual(len(pattern_set), 0)
+        self.assertFalse(pattern_set.matches('a.py'))
+
+    def test_blank_and_comments(self):
+        pattern_set = self._make_one(['', '  ', '# comment\n', '/', 'a.py'])
+        self.assertEqual(len(pattern_set), 1)
+        self.assertTrue(pattern_set.matches('a.py'))
+        self.assertFalse(pattern_set.matches('# comment'))
+
+    def test_escaped_prefix(self):
+        self._check(['\\#a', '\\!b'], ['#a', '!b'], ['a', 'b'])
+
+    def test_literal_name(self):
+        self._check(
+            ['build'],
+            ['build', 'build/a.py', 'src/build/a.py', 'src/build'],
+            ['builder/a.py', 'a/rebuild'])
+
+    def test_literal_dir_name(self):
+        self._check(
+            ['build/'],
+            ['build/a.py', 'src/build/a.py'],
+            ['build', 'src/build'])
+
+    def test_literal_path(self):
+        self._check(
+            ['docs/conf.py', '/setup.py'],
+            ['docs/conf.py', 'setup.py'],
+            ['src/docs/conf.py', 'src/setup.py', 'docs/conf.pyc'])
+
+    def test_literal_dir_path(self):
+        self._check(
+            ['/services/foo/'],
+            ['services/foo/main.py', 'services/foo/lib/util.py'],
+            ['services/foo', 'services/foobar/main.py',
+             'src/services/foo/main.py'])
+
+    def test_suffix(self):
+        self._check(
+            ['*.py', '*.tar.gz'],
+            ['a.py', 'src/a.py', '.py', 'a.tar.gz', 'x.py/b.txt'],
+            ['a.pyc', 'a.gz', 'py', 'src/a'])
+
+    def test_regex(self):
+        self._check(
+            ['test_*.py', 'src/**/*.js', 'tmp*/', '*~'],
+            ['test_a.py', 'a/test_b.py', 'src/a.js', 'src/a/b/c.js',
+             'tmp1/a.py', 'a/tmp/b', 'a.py~'],
+            ['a_test.py', 'lib/src/a.js', 'tmp1', 'a.py'])
+
+    def test_negation(self):
+        self._check(
+            ['*.py', '!tests/', 'tests/conftest.py'],
+            ['a.py', 'tests/conftest.py'],
+            ['tests/a.py', 'a/tests/b.py'])
+
+    def test_last_match_wins(self):
+        # Mix regex, suffix and literal patterns to check the
+        # precedence is independent of the lookup used.
+        self._check(
+            ['!a*.py', '*.py', '!b?.py', 'bar.py', '!foo.py'],
+            ['a.py', 'bar.py', 'x/abc.py'],
+            ['bz.py', 'foo.py', 'x/foo.py'])
+        self._check(
+            ['a*.py', '!*.py', 'b?.py', 'a?.py', '!ab.py'],
+            ['bz.py', 'ac.py'],
+            ['ab.py', 'abc.py', 'c.py'])
+
+    def test_grouped_by_prefix(self):
+        pattern_set = self._make_one(
+            ['pkg1/**/*.js', 'pkg2/*.js', 'pkg1/sub/*.js', '*~'])
+        self.assertEqual(
+            sorted(pattern_set._groups), ['', 'pkg1', 'pkg1/sub', 'pkg2'])
+        self.assertTrue(pattern_set.matches('pkg1/a/b.js'))
+        self.assertTrue(pattern_set.matches('pkg2/b.js'))
+        self.assertFalse(pattern_set.matches('pkg3/b.js'))
+        self.assertFalse(pattern_set.matches('a/pkg1/b.js'))
+        self.assertEqual(pattern_set.match_index('pkg1/sub/b.js'), 2)
+        self.assertEqual(pattern_set.match_index('pkg1/b.js~'), 3)
+        # Only the groups for the parent directories are tried.
+        self.assertEqual(
+            [indices for _, indices in pattern_set._dir_cache['pkg1/a'][1]],
+            [[None, 3], [None, 0]])
+
+    def test_last_match_wins_across_groups(self):
+        self._check(
+            ['src/**/*.py', '!src/a/*.py', 'src/a/b/**', '!*_pb2.py'],
+            ['src/x.py', 'src/a/b/c.py', 'src/a/b/c.txt'],
+            ['src/a/x.py', 'src/a/b/c_pb2.py', 'src/x_pb2.py'])
+
+    def test_duplicate_literal(self):
+        self._check(['!a.py', 'a.py', '!a.py'], [], ['a.py'])
+        self._check(['a.py', '!a.py', 'a.py'], ['a.py'], [])
+
+    def test_shallow_star(self):
+        pattern_set = self._make_one(['docs/*'])
+        self.assertTrue(pattern_set.matches('docs/a/b.md'))
+        pattern_set = self._make_one(['docs/*', 'build/'], shallow_star=True)
+        self.assertTrue(pattern_set.matches('docs/a.md'))
+        self.assertFalse(pattern_set.matches('docs/a/b.md'))
+        self.assertTrue(pattern_set.matches('build/a/b.o'))
+
+    def test_match_index(self):
+        pattern_set = self._make_one(['*.py', '!a.py', 'src/'])
+        self.assertEqual(pattern_set.match_index('b.py'), 0)
+        self.assertEqual(pattern_set.match_index('a.py'), 1)
+        self.assertEqual(pattern_set.match_index('src/a.py'), 2)
+        self.assertEqual(pattern_set.match_index('b.js'), -1)
+
+    def test_cached(self):
+        pattern_set = self._make_one(['src/'])
+        self.assertTrue(pattern_set.matches('src/a/b.py'))
+        self.assertTrue(pattern_set.matches('src/a/c.py'))
+        self.assertEqual(pattern_set._dir_cache, {
+            '': (-1, []),
+            'src': (0, []),
+            'src/a': (0, []),
+        })
+        self.assertEqual(pattern_set._name_cache, {'b.py': -1, 'c.py': -1})
+
+    def test_cache_bounded(self):
+        import mock
+
+        pattern_set = self._make_one(['src/', '*.txt'])
+        with mock.patch('ci_diff_helper.path_filter._MAX_CACHED', new=2):
+            self.assertTrue(pattern_set.matches('src/a/b.py'))
+            self.assertEqual(sorted(pattern_set._dir_cache), ['src/a'])
+            self.assertTrue(pattern_set.matches('x/c.txt'))
+            self.assertFalse(pattern_set.matches('y/d.py'))
+            self.assertFalse(pattern_set.matches('y/e.py'))
+
+        # Each cache was cleared once full, instead of growing.
+        self.assertEqual(sorted(pattern_set._dir_cache), ['y'])
+        self.assertEqual(sorted(pattern_set._name_cache), ['d.py', 'e.py'])
+
+
+class TestPathFilter(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import path_filter
+        return path_filter.PathFilter
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_defaults(self):
+        path_filter = self._make_one()
+        self.assertIsNone(path_filter.root)
+        self.assertTrue(path_filter('a.py'))
+        self.assertTrue(path_filter('a/b/c.txt'))
+
+    def test_include(self):
+        path_filter = self._make_one(include=['*.py'])
+        self.assertTrue(path_filter('a/b.py'))
+        self.assertFalse(path_filter('a/b.js'))
+
+    def test_empty_include(self):
+        path_filter = self._make_one(include=[])
+        self.assertFalse(path_filter('a.py'))
+
+    def test_exclude(self):
+        path_filter = self._make_one(
+            include=['*.py'], exclude=['docs/', '!docs/keep.py'])
+        self.assertTrue(path_filter('a.py'))
+        self.assertTrue(path_filter('docs/keep.py'))
+        self.assertFalse(path_filter('docs/conf.py'))
+        self.assertFalse(path_filter('docs/b.txt'))
+
+    def test_relative_dot(self):
+        path_filter = self._make_one(include=['/a.py'])
+        self.assertTrue(path_filter('./a.py'))
+        self.assertTrue(path_filter('././a.py'))
+
+    def test_root(self):
+        import os
+
+        root = os.path.abspath('checkout')
+        path_filter = self._make_one(exclude=['/docs/conf.py'], root=root)
+        self.assertEqual(path_filter.root, root)
+        self.assertFalse(path_filter(os.path.join(root, 'docs', 'conf.py')))
+        self.assertTrue(path_filter(os.path.join(root, 'conf.py')))
+        self.assertFalse(path_filter('docs/conf.py'))
+
+    def test_filter_list(self):
+        path_filter = self._make_one(include=['*.py'], exclude=['tests/'])
+        paths = ['a.py', 'b.txt', 'tests/c.py', 'd/e.py']
+        self.assertEqual(list(path_filter.filter(paths)), ['a.py', 'd/e.py'])
+
+    def test_filter_stream(self):
+        import itertools
+
+        path_filter = self._make_one(include=['*.py'])
+        paths = ('{:d}.{}'.format(index, 'py' if index % 2 else 'js')
+                 for index in itertools.count())
+        filtered = path_filter.filter(paths)
+        self.assertEqual(next(filtered), '1.py')
+        self.assertEqual(next(filtered), '3.py')
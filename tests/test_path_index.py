@@ -0,0 +1,171 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class TestPathIndex(unittest.TestCase):
+
+    PATHS = (
+        'README.md',
+        'services/foo/main.py',
+        'services/foo/lib/util.py',
+        'services/bar/main.py',
+        './docs/index.rst',
+    )
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import path_index
+        return path_index.PathIndex
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_constructor_defaults(self):
+        index = self._make_one()
+        self.assertIsNone(index.root)
+        self.assertEqual(len(index), 0)
+        self.assertFalse(index.has_prefix(''))
+
+    def test_add(self):
+        index = self._make_one(self.PATHS)
+        self.assertEqual(len(index), 5)
+        # Duplicates and the root are ignored.
+        index.add('services/foo/main.py')
+        index.add('')
+        self.assertEqual(len(index), 5)
+        # A file above an existing directory is still counted.
+        index.add('services/foo')
+        self.assertEqual(len(index), 6)
+        self.assertEqual(index.count('services'), 4)
+
+    def test___contains__(self):
+        index = self._make_one(self.PATHS)
+        self.assertIn('services/foo/main.py', index)
+        self.assertIn('docs/index.rst', index)
+        self.assertNotIn('services/foo', index)
+        self.assertNotIn('services/baz/main.py', index)
+
+    def test_has_prefix(self):
+        index = self._make_one(self.PATHS)
+        self.assertTrue(index.has_prefix('services/foo/'))
+        self.assertTrue(index.has_prefix('services/foo'))
+        self.assertTrue(index.has_prefix('README.md'))
+        self.assertFalse(index.has_prefix('services/baz'))
+        self.assertFalse(index.has_prefix('services/foo/lib/nope'))
+
+    def test_count(self):
+        index = self._make_one(self.PATHS)
+        self.assertEqual(index.count(''), 5)
+        self.assertEqual(index.count('services'), 3)
+        self.assertEqual(index.count('services/foo'), 2)
+        self.assertEqual(index.count('services/foo/lib/util.py'), 1)
+        self.assertEqual(index.count('nope'), 0)
+
+    def test_deepest_ancestor(self):
+        index = self._make_one(self.PATHS)
+        self.assertEqual(
+            index.deepest_ancestor('services/foo/baz/qux.py'),
+            'services/foo')
+        self.assertEqual(
+            index.deepest_ancestor('services/foo/lib/util.py'),
+            'services/foo/lib/util.py')
+        self.assertEqual(
+            index.deepest_ancestor('services/qux'), 'services')
+        self.assertIsNone(index.deepest_ancestor('web/app.js'))
+
+    def test_longest_prefix(self):
+        index = self._make_one(['services', 'services/foo', 'web/app'])
+        self.assertEqual(
+            index.longest_prefix('services/foo/bar.py'), 'services/foo')
+        self.assertEqual(
+            index.longest_prefix('services/foobar/x.py'), 'services')
+        self.assertEqual(index.longest_prefix('services'), 'services')
+        self.assertIsNone(index.longest_prefix('web/other/x.py'))
+        self.assertIsNone(index.longest_prefix('README.md'))
+
+    def test_iter_files(self):
+        index = self._make_one(self.PATHS)
+        self.assertEqual(list(index.iter_files()), [
+            'README.md',
+            'docs/index.rst',
+            'services/bar/main.py',
+            'services/foo/lib/util.py',
+            'services/foo/main.py',
+        ])
+        self.assertEqual(list(index.iter_files('services/foo/')), [
+            'services/foo/lib/util.py',
+            'services/foo/main.py',
+        ])
+        self.assertEqual(list(index.iter_files('nope')), [])
+
+    def test_root(self):
+        import os
+
+        root = os.path.abspath(os.path.join('path', 'to', 'checkout'))
+        paths = [os.path.join(root, 'services', 'foo', 'main.py')]
+        index = self._make_one(paths, root=root)
+        self.assertIn('services/foo/main.py', index)
+        self.assertTrue(index.has_prefix(os.path.join(root, 'services')))
+        self.assertEqual(index.count(root), 1)
+
+    def test_serialization(self):
+        import json
+
+        klass = self._get_target_class()
+        index = self._make_one(self.PATHS, root='/checkout')
+        serialized = json.loads(json.dumps(index.to_dict()))
+        new_index = klass.from_dict(serialized)
+
+        self.assertEqual(new_index.root, '/checkout')
+        self.assertEqual(new_index.to_dict(), index.to_dict())
+        self.assertEqual(list(new_index.iter_files()),
+                         list(index.iter_files()))
+        self.assertEqual(new_index.count('services/foo'), 2)
+
+    def test_from_dict_bad_version(self):
+        klass = self._get_target_class()
+        with self.assertRaises(ValueError):
+            klass.from_dict({'version': 0, 'root': None, 'trie': None})
+
+    def test_from_changed_files(self):
+        import mock
+
+        klass = self._get_target_class()
+        changed = ['a/b.py', 'c.py']
+        patch = mock.patch('ci_diff_helper.git_tools.get_changed_files',
+                           return_value=changed)
+        with patch as mocked:
+            index = klass.from_changed_files('HEAD', 'master')
+
+        self.assertEqual(list(index.iter_files()), changed)
+        mocked.assert_called_once_with('HEAD', 'master')
+
+    def test_from_checked_in_files(self):
+        import os
+        import mock
+
+        klass = self._get_target_class()
+        root = os.path.abspath('checkout')
+        checked_in = [os.path.join(root, 'a', 'b.py')]
+        files_patch = mock.patch(
+            'ci_diff_helper.git_tools.get_checked_in_files',
+            return_value=checked_in)
+        root_patch = mock.patch(
+            'ci_diff_helper.git_tools.git_root', return_value=root)
+        with files_patch, root_patch:
+            index = klass.from_checked_in_files()
+
+        self.assertEqual(index.root, root)
+        self.assertEqual(list(index.iter_files()), ['a/b.py'])
@@ -0,0 +1,253 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+_PROJECT_MAP = {
+    'projects': {
+        'api': {'path': 'services/api', 'dependencies': ['common']},
+        'web': {'path': 'services/web/', 'dependencies': ['api']},
+        'admin': {'path': 'services/web/admin', 'dependencies': ['web']},
+        'common': {'path': 'lib/common'},
+        'tools': {'path': 'tools'},
+    },
+}
+
+
+class Test__transitive_dependents(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(dependencies):
+        from ci_diff_helper.projects import _transitive_dependents
+        return _transitive_dependents(dependencies)
+
+    def test_it(self):
+        dependencies = {
+            'a': (),
+            'b': ('a',),
+            'c': ('b',),
+            'd': ('a', 'c'),
+            'e': (),
+        }
+        result = self._call_function_under_test(dependencies)
+        self.assertEqual(result, {
+            'a': ('a', 'b', 'c', 'd'),
+            'b': ('b', 'c', 'd'),
+            'c': ('c', 'd'),
+            'd': ('d',),
+            'e': ('e',),
+        })
+
+    def test_cycle(self):
+        dependencies = {'a': ('b',), 'b': ('a',)}
+        result = self._call_function_under_test(dependencies)
+        self.assertEqual(result, {'a': ('a', 'b'), 'b': ('a', 'b')})
+
+
+class TestProjectMap(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper import projects
+        return projects.ProjectMap
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def _make_default(self):
+        klass = self._get_target_class()
+        return klass.from_json(_PROJECT_MAP)
+
+    def test_constructor(self):
+        project_map = self._make_one({'a': 'x', 'b': 'y'}, {'b': ['a']})
+        self.assertEqual(project_map.paths, {'a': 'x', 'b': 'y'})
+        self.assertEqual(project_map.dependencies, {'a': (), 'b': ('a',)})
+
+    def test_constructor_unknown_project(self):
+        with self.assertRaises(ValueError):
+            self._make_one({'a': 'x'}, {'b': ['a']})
+
+    def test_constructor_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            self._make_one({'a': 'x'}, {'a': ['b', 'c']})
+
+    def test_constructor_root_directory(self):
+        project_map = self._make_one({'a': './', 'b': 'x'})
+        self.assertEqual(project_map.project_for('README.md'), 'a')
+        self.assertEqual(project_map.project_for('y/z.py'), 'a')
+        self.assertEqual(project_map.project_for('x/z.py'), 'b')
+
+    def test_constructor_shared_root_directory(self):
+        with self.assertRaises(ValueError):
+            self._make_one({'a': '', 'b': '.'})
+
+    def test_constructor_shared_directory(self):
+        with self.assertRaises(ValueError):
+            self._make_one({'a': 'x/y', 'b': 'x/y/'})
+
+    def test_project_for(self):
+        project_map = self._make_default()
+        self.assertEqual(
+            project_map.project_for('services/api/main.py'), 'api')
+        self.assertEqual(
+            project_map.project_for('services/web/admin/x.js'), 'admin')
+        self.assertEqual(
+            project_map.project_for('services/web/index.js'), 'web')
+        self.assertIsNone(project_map.project_for('services/other/a.py'))
+        self.assertIsNone(project_map.project_for('README.md'))
+
+    def test_dependents(self):
+        project_map = self._make_default()
+        self.assertEqual(project_map.dependents('common'),
+                         ('admin', 'api', 'common', 'web'))
+        self.assertEqual(project_map.dependents('tools'), ('tools',))
+
+    def test_changed_projects(self):
+        project_map = self._make_default()
+        paths = ['services/api/a.py', 'services/api/b.py', 'README.md']
+        self.assertEqual(project_map.changed_projects(paths), ('api',))
+
+    def test_affected(self):
+        project_map = self._make_default()
+        self.assertEqual(
+            project_map.affected(['services/api/a.py', 'tools/x.sh']),
+            ('admin', 'api', 'tools', 'web'))
+        self.assertEqual(project_map.affected(['README.md']), ())
+
+    def test_affected_by_diff(self):
+        import mock
+
+        project_map = self._make_default()
+        patch = mock.patch('ci_diff_helper.git_tools.get_changed_files',
+                           return_value=['lib/common/util.py'])
+        with patch as mocked:
+            result = project_map.affected_by_diff('HEAD', 'master')
+
+        self.assertEqual(result, ('admin', 'api', 'common', 'web'))
+        mocked.assert_called_once_with('HEAD', 'master')
+
+    def test_affected_by_diff_full_build(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        project_map = self._make_default()
+        patch = mock.patch('ci_diff_helper.git_tools.get_changed_files')
+        with patch as mocked:
+            result = project_map.affected_by_diff('HEAD', _utils.FULL_BUILD)
+
+        self.assertEqual(result, tuple(sorted(project_map.paths)))
+        self.assertGreater(len(result), 1)
+        mocked.assert_not_called()
+
+    def test_serialization(self):
+        import json
+
+        klass = self._get_target_class()
+        project_map = self._make_default()
+        serialized = json.loads(json.dumps(project_map.to_dict()))
+        new_map = klass.from_dict(serialized)
+
+        self.assertEqual(new_map.to_dict(), project_map.to_dict())
+        self.assertEqual(new_map.dependents('api'), ('admin', 'api', 'web'))
+        self.assertEqual(
+            new_map.project_for('services/web/index.js'), 'web')
+
+    def test_from_dict_bad_version(self):
+        klass = self._get_target_class()
+        with self.assertRaises(ValueError):
+            klass.from_dict({'version': 0})
+
+    def _write_map(self, value):
+        import json
+        import os
+        import shutil
+        import tempfile
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        filename = os.path.join(root, 'projects.json')
+        with open(filename, 'w') as file_obj:
+            json.dump(value, file_obj)
+        return filename, os.path.join(root, 'cache.json')
+
+    def test_from_file(self):
+        import os
+
+        klass = self._get_target_class()
+        filename, cache_filename = self._write_map(_PROJECT_MAP)
+        project_map = klass.from_file(filename)
+        self.assertEqual(project_map.dependents('tools'), ('tools',))
+        self.assertFalse(os.path.exists(cache_filename))
+
+    def test_from_file_with_cache(self):
+        import json
+        import mock
+
+        klass = self._get_target_class()
+        filename, cache_filename = self._write_map(_PROJECT_MAP)
+        project_map = klass.from_file(filename, cache_filename=cache_filename)
+        with open(cache_filename) as file_obj:
+            cached = json.load(file_obj)
+        self.assertIn('source_hash', cached)
+
+        # The second load uses the cache, without rebuilding.
+        with mock.patch.object(klass, 'from_json') as from_json:
+            new_map = klass.from_file(
+                filename, cache_filename=cache_filename)
+        from_json.assert_not_called()
+        self.assertEqual(new_map.to_dict(), project_map.to_dict())
+
+    def test_from_file_stale_cache(self):
+        import json
+
+        klass = self._get_target_class()
+        filename, cache_filename = self._write_map(_PROJECT_MAP)
+        klass.from_file(filename, cache_filename=cache_filename)
+        with open(filename, 'w') as file_obj:
+            json.dump({'projects': {'solo': {'path': 'solo'}}}, file_obj)
+
+        project_map = klass.from_file(
+            filename, cache_filename=cache_filename)
+        self.assertEqual(project_map.paths, {'solo': 'solo'})
+
+    def test_from_file_other_version_cache(self):
+        import json
+        from ci_diff_helper import projects
+
+        klass = self._get_target_class()
+        filename, cache_filename = self._write_map(_PROJECT_MAP)
+        klass.from_file(filename, cache_filename=cache_filename)
+        with open(cache_filename) as file_obj:
+            cached = json.load(file_obj)
+        cached['version'] = projects._VERSION + 1
+        with open(cache_filename, 'w') as file_obj:
+            json.dump(cached, file_obj)
+
+        # The cache is rebuilt rather than failing.
+        project_map = klass.from_file(
+            filename, cache_filename=cache_filename)
+        self.assertEqual(project_map.dependents('tools'), ('tools',))
+        with open(cache_filename) as file_obj:
+            self.assertEqual(
+                json.load(file_obj)['version'], projects._VERSION)
+
+    def test_from_file_corrupt_cache(self):
+        klass = self._get_target_class()
+        filename, cache_filename = self._write_map(_PROJECT_MAP)
+        with open(cache_filename, 'w') as file_obj:
+            file_obj.write('{not json')
+
+        project_map = klass.from_file(
+            filename, cache_filename=cache_filename)
+        self.assertEqual(project_map.dependents('tools'), ('tools',))
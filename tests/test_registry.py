@@ -0,0 +1,612 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+class Test__matches(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(value, expected):
+        from ci_diff_helper import registry
+        return registry._matches(value, expected)
+
+    def test_expected_value(self):
+        self.assertTrue(self._call_function_under_test('True', 'true'))
+        self.assertFalse(self._call_function_under_test('false', 'true'))
+
+    def test_any_value(self):
+        self.assertTrue(self._call_function_under_test('http://ci/', None))
+        self.assertFalse(self._call_function_under_test('', None))
+
+
+class Test__env_value(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(env_var):
+        from ci_diff_helper import registry
+        return registry._env_value(env_var)
+
+    def test_no_env_var(self):
+        self.assertIsNone(self._call_function_under_test(None))
+
+    def test_unset(self):
+        import mock
+
+        with mock.patch('os.environ', new={}):
+            self.assertIsNone(self._call_function_under_test('FOO'))
+
+    def test_empty(self):
+        import mock
+
+        with mock.patch('os.environ', new={'FOO': ''}):
+            self.assertIsNone(self._call_function_under_test('FOO'))
+
+    def test_success(self):
+        import mock
+
+        with mock.patch('os.environ', new={'FOO': 'bar'}):
+            self.assertEqual(self._call_function_under_test('FOO'), 'bar')
+
+
+class Test_declare(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(name, table):
+        from ci_diff_helper import registry
+        return registry.declare(name, table)
+
+    def test_full_table(self):
+        from ci_diff_helper import registry
+
+        table = {
+            'active': 'MY_CI',
+            'active_value': 'YES',
+            'branch': 'MY_BRANCH',
+            'tag': 'MY_TAG',
+            'pr': 'MY_PR',
+            'base': 'MY_BASE',
+            'slug': 'MY_SLUG',
+            'shard_index': 'MY_INDEX',
+            'shard_total': 'MY_TOTAL',
+        }
+        klass = self._call_function_under_test('MyCI', table)
+        self.assertTrue(issubclass(klass, registry.DeclaredConfig))
+        self.assertEqual(klass.__name__, 'MyCI')
+        self.assertEqual(klass._active_env_var, 'MY_CI')
+        self.assertEqual(klass._active_value, 'yes')
+        self.assertEqual(klass._branch_env_var, 'MY_BRANCH')
+        self.assertEqual(klass._tag_env_var, 'MY_TAG')
+        self.assertEqual(klass._pr_env_var, 'MY_PR')
+        self.assertEqual(klass._base_env_var, 'MY_BASE')
+        self.assertEqual(klass._slug_env_var, 'MY_SLUG')
+        self.assertEqual(klass._shard_index_env_var, 'MY_INDEX')
+        self.assertEqual(klass._shard_total_env_var, 'MY_TOTAL')
+
+    def test_minimal_table(self):
+        klass = self._call_function_under_test('MyCI', {'active': 'MY_CI'})
+        self.assertEqual(klass._active_value, 'true')
+        self.assertIsNone(klass._branch_env_var)
+        self.assertIsNone(klass._tag_env_var)
+        self.assertIsNone(klass._pr_env_var)
+        self.assertIsNone(klass._base_env_var)
+        self.assertIsNone(klass._slug_env_var)
+        self.assertIsNone(klass._shard_index_env_var)
+        self.assertIsNone(klass._shard_total_env_var)
+
+    def test_any_active_value(self):
+        table = {'active': 'MY_CI', 'active_value': None}
+        klass = self._call_function_under_test('MyCI', table)
+        self.assertIsNone(klass._active_value)
+
+    def test_missing_active(self):
+        with self.assertRaises(KeyError):
+            self._call_function_under_test('MyCI', {'branch': 'MY_BRANCH'})
+
+    def test_unsupported_keys(self):
+        table = {'active': 'MY_CI', 'color': 'MY_COLOR'}
+        with self.assertRaises(ValueError) as exc_info:
+            self._call_function_under_test('MyCI', table)
+
+        self.assertEqual(exc_info.exception.args[1], ['color'])
+
+
+class TestDeclaredConfig(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class(**table):
+        from ci_diff_helper import registry
+
+        table.setdefault('active', 'MY_CI')
+        return registry.declare('MyCI', table)
+
+    def _make_one(self, **table):
+        klass = self._get_target_class(**table)
+        return klass()
+
+    def test_constructor(self):
+        from ci_diff_helper import _utils
+
+        config = self._make_one()
+        self.assertIs(config._active, _utils.UNSET)
+        self.assertIs(config._base, _utils.UNSET)
+        self.assertIs(config._branch, _utils.UNSET)
+        self.assertIs(config._pr, _utils.UNSET)
+        self.assertIs(config._slug, _utils.UNSET)
+        self.assertIs(config._tag, _utils.UNSET)
+
+    def test___repr__(self):
+        import mock
+
+        config = self._make_one()
+        with mock.patch('os.environ', new={'MY_CI': 'True'}):
+            self.assertEqual(repr(config), '<MyCI (active=True)>')
+
+    def test_active_property_any_value(self):
+        import mock
+
+        config = self._make_one(active_value=None)
+        with mock.patch('os.environ', new={'MY_CI': 'http://ci/'}):
+            self.assertTrue(config.active)
+        # Verify that caching works.
+        self.assertTrue(config.active)
+
+    def test_active_property_inactive(self):
+        import mock
+
+        config = self._make_one(active_value=None)
+        with mock.patch('os.environ', new={}):
+            self.assertFalse(config.active)
+
+    def test_branch_property(self):
+        import mock
+
+        config = self._make_one(branch='MY_BRANCH')
+        with mock.patch('os.environ', new={'MY_BRANCH': 'master'}):
+            self.assertEqual(config.branch, 'master')
+
+    def test_tag_property(self):
+        import mock
+
+        config = self._make_one(tag='MY_TAG')
+        with mock.patch('os.environ', new={'MY_TAG': '0.1.0'}):
+            self.assertEqual(config.tag, '0.1.0')
+
+    def test_tag_property_not_declared(self):
+        import mock
+
+        config = self._make_one()
+        with mock.patch('os.environ', new={}):
+            self.assertIsNone(config.tag)
+
+    def test_pr_property(self):
+        import mock
+
+        config = self._make_one(pr='MY_PR')
+        with mock.patch('os.environ', new={'MY_PR': '1234'}):
+            self.assertEqual(config.pr, 1234)
+        # Verify that caching works.
+        self.assertEqual(config.pr, 1234)
+        self.assertTrue(config.in_pr)
+
+    def test_pr_property_not_int(self):
+        import mock
+
+        config = self._make_one(pr='MY_PR')
+        with mock.patch('os.environ', new={'MY_PR': 'false'}):
+            self.assertIsNone(config.pr)
+        self.assertFalse(config.in_pr)
+
+    def test_pr_property_not_declared(self):
+        config = self._make_one()
+        self.assertIsNone(config.pr)
+
+    def test_base_property(self):
+        import mock
+
+        config = self._make_one(base='MY_BASE')
+        config._pr = 4
+        with mock.patch('os.environ', new={'MY_BASE': 'develop'}):
+            self.assertEqual(config.base, 'develop')
+        # Verify that caching works.
+        self.assertEqual(config.base, 'develop')
+
+    def test_base_property_not_in_pr(self):
+        config = self._make_one(base='MY_BASE')
+        config._pr = None
+        with self.assertRaises(NotImplementedError):
+            getattr(config, 'base')
+
+    def test_base_property_not_declared(self):
+        config = self._make_one()
+        config._pr = 4
+        with self.assertRaises(NotImplementedError):
+            getattr(config, 'base')
+
+    def test_base_property_unset(self):
+        import mock
+
+        config = self._make_one(base='MY_BASE')
+        config._pr = 4
+        with mock.patch('os.environ', new={}):
+            with self.assertRaises(OSError):
+                getattr(config, 'base')
+
+    def test_slug_property(self):
+        import mock
+
+        config = self._make_one(slug='MY_SLUG')
+        with mock.patch('os.environ', new={'MY_SLUG': 'a/b'}):
+            self.assertEqual(config.slug, 'a/b')
+        # Verify that caching works.
+        self.assertEqual(config.slug, 'a/b')
+
+    def test_slug_property_not_declared(self):
+        config = self._make_one()
+        with self.assertRaises(NotImplementedError):
+            getattr(config, 'slug')
+
+    def test_slug_property_unset(self):
+        import mock
+
+        config = self._make_one(slug='MY_SLUG')
+        with mock.patch('os.environ', new={}):
+            with self.assertRaises(OSError):
+                getattr(config, 'slug')
+
+
+class Test_register(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(config_type):
+        from ci_diff_helper import registry
+        return registry.register(config_type)
+
+    def test_new_type(self):
+        import mock
+        from ci_diff_helper import _config_base
+        from ci_diff_helper import registry
+
+        class MyCI(_config_base.Config):
+            _active_env_var = 'MY_CI'
+
+        with mock.patch.object(registry, '_REGISTRY', new=[]):
+            with mock.patch.object(registry, '_INDEX', new={}):
+                result = self._call_function_under_test(MyCI)
+                self.assertIs(result, MyCI)
+                self.assertEqual(registry._REGISTRY, [MyCI])
+                self.assertEqual(
+                    registry._INDEX, {'MY_CI': [('true', MyCI)]})
+
+    def test_shared_env_var(self):
+        import mock
+        from ci_diff_helper import registry
+
+        klass1 = registry.declare('One', {'active': 'CI'})
+        klass2 = registry.declare(
+            'Two', {'active': 'CI', 'active_value': 'two'})
+        with mock.patch.object(registry, '_REGISTRY', new=[]):
+            with mock.patch.object(registry, '_INDEX', new={}):
+                self._call_function_under_test(klass1)
+                self._call_function_under_test(klass2)
+                self.assertEqual(
+                    registry._INDEX,
+                    {'CI': [('true', klass1), ('two', klass2)]})
+
+    def test_already_registered(self):
+        import mock
+        from ci_diff_helper import registry
+
+        klass = registry.declare('MyCI', {'active': 'MY_CI'})
+        with mock.patch.object(registry, '_REGISTRY', new=[klass]):
+            with mock.patch.object(registry, '_INDEX', new={}):
+                result = self._call_function_under_test(klass)
+                self.assertIs(result, klass)
+                self.assertEqual(registry._REGISTRY, [klass])
+                self.assertEqual(registry._INDEX, {})
+
+
+class Test_unregister(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(config_type):
+        from ci_diff_helper import registry
+        return registry.unregister(config_type)
+
+    def test_last_for_env_var(self):
+        import mock
+        from ci_diff_helper import registry
+
+        klass = registry.declare('MyCI', {'active': 'MY_CI'})
+        with mock.patch.object(registry, '_REGISTRY', new=[]):
+            with mock.patch.object(registry, '_INDEX', new={}):
+                registry.register(klass)
+                self._call_function_under_test(klass)
+                self.assertEqual(registry._REGISTRY, [])
+                self.assertEqual(registry._INDEX, {})
+
+    def test_shared_env_var(self):
+        import mock
+        from ci_diff_helper import registry
+
+        klass1 = registry.declare('One', {'active': 'CI'})
+        klass2 = registry.declare('Two', {'active': 'CI'})
+        with mock.patch.object(registry, '_REGISTRY', new=[]):
+            with mock.patch.object(registry, '_INDEX', new={}):
+                registry.register(klass1)
+                registry.register(klass2)
+                self._call_function_under_test(klass1)
+                self.assertEqual(registry._REGISTRY, [klass2])
+                self.assertEqual(registry._INDEX, {'CI': [('true', klass2)]})
+
+    def test_not_registered(self):
+        import mock
+        from ci_diff_helper import registry
+
+        klass = registry.declare('MyCI', {'active': 'MY_CI'})
+        with mock.patch.object(registry, '_REGISTRY', new=[]):
+            with self.assertRaises(ValueError):
+                self._call_function_under_test(klass)
+
+
+class Test_registered(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import registry
+        return registry.registered()
+
+    def test_builtins(self):
+        from ci_diff_helper import appveyor
+        from ci_diff_helper import circle_ci
+        from ci_diff_helper import github_actions
+        from ci_diff_helper import gitlab_ci
+        from ci_diff_helper import registry
+        from ci_diff_helper import travis
+
+        result = self._call_function_under_test()
+        expected = [
+            appveyor.AppVeyor,
+            registry.Buildkite,
+            circle_ci.CircleCI,
+            registry.Drone,
+            github_actions.GitHubActions,
+            gitlab_ci.GitLabCI,
+            registry.Jenkins,
+            travis.Travis,
+        ]
+        self.assertEqual(result[:len(expected)], expected)
+        # Make sure a copy is returned.
+        self.assertIsNot(result, registry._REGISTRY)
+
+
+class Test__iter_entry_points(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import registry
+        return registry._iter_entry_points()
+
+    def test_it(self):
+        import mock
+
+        entry_points = mock.Mock(spec=['select'])
+        entry_points.select.return_value = mock.sentinel.selected
+        patch = mock.patch(
+            'importlib.metadata.entry_points', return_value=entry_points)
+        with patch as mocked:
+            result = self._call_function_under_test()
+
+        self.assertIs(result, mock.sentinel.selected)
+        mocked.assert_called_once_with()
+        entry_points.select.assert_called_once_with(
+            group='ci_diff_helper.providers')
+
+
+class Test_load_entry_points(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import registry
+        return registry.load_entry_points()
+
+    def test_already_loaded(self):
+        import mock
+        from ci_diff_helper import registry
+
+        patch_loaded = mock.patch.object(
+            registry, '_ENTRY_POINTS', new={'loaded': True})
+        patch_iter = mock.patch(
+            'ci_diff_helper.registry._iter_entry_points')
+        with patch_loaded:
+            with patch_iter as mocked:
+                self._call_function_under_test()
+
+        mocked.assert_not_called()
+
+    def test_load(self):
+        import mock
+        from ci_diff_helper import _config_base
+        from ci_diff_helper import registry
+
+        class Custom(_config_base.Config):
+            _active_env_var = 'CUSTOM_CI'
+
+        table_entry = mock.Mock(spec=['load'])
+        table_entry.name = 'Woodpecker'
+        table_entry.load.return_value = {'active': 'CI_WOODPECKER'}
+        class_entry = mock.Mock(spec=['load'])
+        class_entry.name = 'custom'
+        class_entry.load.return_value = Custom
+
+        loaded = {'loaded': False}
+        patch_loaded = mock.patch.object(
+            registry, '_ENTRY_POINTS', new=loaded)
+        patch_iter = mock.patch(
+            'ci_diff_helper.registry._iter_entry_points',
+            return_value=[table_entry, class_entry])
+        with patch_loaded:
+            with patch_iter:
+                with mock.patch.object(registry, '_REGISTRY', new=[]):
+                    with mock.patch.object(registry, '_INDEX', new={}):
+                        self._call_function_under_test()
+                        registered = registry.registered()
+
+        self.assertEqual(loaded, {'loaded': True})
+        self.assertEqual(len(registered), 2)
+        self.assertEqual(registered[0].__name__, 'Woodpecker')
+        self.assertEqual(registered[0]._active_env_var, 'CI_WOODPECKER')
+        self.assertIs(registered[1], Custom)
+
+    def test_load_failure(self):
+        import warnings
+        import mock
+        from ci_diff_helper import registry
+
+        broken_entry = mock.Mock(spec=['load'])
+        broken_entry.name = 'broken'
+        broken_entry.load.side_effect = ImportError('No module named nope')
+        invalid_entry = mock.Mock(spec=['load'])
+        invalid_entry.name = 'Invalid'
+        invalid_entry.load.return_value = {'bad-key': 'CI_INVALID'}
+        table_entry = mock.Mock(spec=['load'])
+        table_entry.name = 'Woodpecker'
+        table_entry.load.return_value = {'active': 'CI_WOODPECKER'}
+
+        patch_loaded = mock.patch.object(
+            registry, '_ENTRY_POINTS', new={'loaded': False})
+        patch_iter = mock.patch(
+            'ci_diff_helper.registry._iter_entry_points',
+            return_value=[broken_entry, invalid_entry, table_entry])
+        with patch_loaded:
+            with patch_iter:
+                with mock.patch.object(registry, '_REGISTRY', new=[]):
+                    with mock.patch.object(registry, '_INDEX', new={}):
+                        with warnings.catch_warnings(record=True) as caught:
+                            warnings.simplefilter('always')
+                            self._call_function_under_test()
+                        registered = registry.registered()
+
+        self.assertEqual(len(registered), 1)
+        self.assertEqual(registered[0].__name__, 'Woodpecker')
+        self.assertEqual(len(caught), 2)
+        for warning in caught:
+            self.assertIs(warning.category, RuntimeWarning)
+        self.assertIn("'broken'", str(caught[0].message))
+        self.assertIn('No module named nope', str(caught[0].message))
+        self.assertIn("'Invalid'", str(caught[1].message))
+
+
+class Test_detect(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test():
+        from ci_diff_helper import registry
+        return registry.detect()
+
+    def _helper(self, mock_env):
+        import mock
+
+        patch_load = mock.patch(
+            'ci_diff_helper.registry.load_entry_points')
+        with patch_load as mocked:
+            with mock.patch('os.environ', new=mock_env):
+                result = self._call_function_under_test()
+
+        mocked.assert_called_once_with()
+        return result
+
+    def test_none(self):
+        self.assertEqual(self._helper({}), [])
+
+    def test_inactive_value(self):
+        from ci_diff_helper import environment_vars as env
+
+        self.assertEqual(self._helper({env.IN_TRAVIS: 'false'}), [])
+
+    def test_single(self):
+        from ci_diff_helper import environment_vars as env
+        from ci_diff_helper import registry
+
+        mock_env = {env.IN_JENKINS: 'https://jenkins.example.com/'}
+        self.assertEqual(self._helper(mock_env), [registry.Jenkins])
+
+    def test_registration_order(self):
+        from ci_diff_helper import appveyor
+        from ci_diff_helper import environment_vars as env
+        from ci_diff_helper import travis
+
+        mock_env = {
+            env.IN_TRAVIS: 'true',
+            env.IN_APPVEYOR: 'True',
+        }
+        self.assertEqual(
+            self._helper(mock_env), [appveyor.AppVeyor, travis.Travis])
+
+
+class TestBuiltins(unittest.TestCase):
+
+    def test_jenkins(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+        from ci_diff_helper import registry
+
+        mock_env = {
+            env.IN_JENKINS: 'https://jenkins.example.com/',
+            env.JENKINS_BRANCH: 'PR-17',
+            env.JENKINS_PR: '17',
+            env.JENKINS_PR_TARGET: 'master',
+        }
+        config = registry.Jenkins()
+        with mock.patch('os.environ', new=mock_env):
+            self.assertTrue(config.active)
+            self.assertEqual(config.branch, 'PR-17')
+            self.assertIsNone(config.tag)
+            self.assertEqual(config.pr, 17)
+            self.assertEqual(config.base, 'master')
+
+    def test_buildkite(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+        from ci_diff_helper import registry
+
+        mock_env = {
+            env.IN_BUILDKITE: 'true',
+            env.BUILDKITE_BRANCH: 'feature',
+            env.BUILDKITE_PR: 'false',
+            env.BUILDKITE_PARALLEL_JOB: '0',
+            env.BUILDKITE_PARALLEL_JOB_COUNT: '3',
+        }
+        config = registry.Buildkite()
+        with mock.patch('os.environ', new=mock_env):
+            self.assertTrue(config.active)
+            self.assertEqual(config.branch, 'feature')
+            self.assertFalse(config.in_pr)
+            self.assertEqual(config.shard, (0, 3))
+
+    def test_drone(self):
+        import mock
+        from ci_diff_helper import environment_vars as env
+        from ci_diff_helper import registry
+
+        mock_env = {
+            env.IN_DRONE: 'true',
+            env.DRONE_PR: '5',
+            env.DRONE_PR_TARGET: 'develop',
+            env.DRONE_SLUG: 'octocat/hello-world',
+        }
+        config = registry.Drone()
+        with mock.patch('os.environ', new=mock_env):
+            self.assertTrue(config.active)
+            self.assertEqual(config.pr, 5)
+            self.assertEqual(config.base, 'develop')
+            self.assertEqual(config.slug, 'octocat/hello-world')
@@ -0,0 +1,256 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+
+_DURATIONS = {
+    'tests/test_a.py': 10.0,
+    'tests/test_b.py': 7.0,
+    'tests/test_c.py': 6.0,
+    'tests/test_d.py': 5.0,
+    'tests/test_e.py': 4.0,
+    'tests/test_f.py': 2.0,
+}
+
+
+class Test__preference(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(path, shard):
+        from ci_diff_helper.sharding import _preference
+        return _preference(path, shard)
+
+    def test_stable(self):
+        score = self._call_function_under_test('tests/test_a.py', 1)
+        self.assertEqual(
+            score, self._call_function_under_test('tests/test_a.py', 1))
+        self.assertNotEqual(
+            score, self._call_function_under_test('tests/test_a.py', 2))
+        self.assertNotEqual(
+            score, self._call_function_under_test('tests/test_b.py', 1))
+
+
+class TestTimingDatabase(unittest.TestCase):
+
+    @staticmethod
+    def _get_target_class():
+        from ci_diff_helper.sharding import TimingDatabase
+        return TimingDatabase
+
+    def _make_one(self, *args, **kwargs):
+        klass = self._get_target_class()
+        return klass(*args, **kwargs)
+
+    def test_constructor(self):
+        import os
+        from ci_diff_helper import sharding
+
+        path = os.path.join('tests', 'test_a.py')
+        timings = self._make_one({path: 3})
+        self.assertEqual(timings.durations, {'tests/test_a.py': 3.0})
+        self.assertEqual(timings.smoothing, sharding.DEFAULT_SMOOTHING)
+
+    def test_constructor_defaults(self):
+        timings = self._make_one()
+        self.assertEqual(timings.durations, {})
+
+    def test_record(self):
+        timings = self._make_one(smoothing=0.25)
+        timings.record('tests/test_a.py', 8.0)
+        self.assertEqual(timings.durations, {'tests/test_a.py': 8.0})
+        timings.record('tests/test_a.py', 4.0)
+        self.assertEqual(timings.durations, {'tests/test_a.py': 7.0})
+
+    def test_update(self):
+        timings = self._make_one({'tests/test_a.py': 2.0})
+        timings.update({'tests/test_a.py': 4.0, 'tests/test_b.py': 1.0})
+        expected = {'tests/test_a.py': 3.0, 'tests/test_b.py': 1.0}
+        self.assertEqual(timings.durations, expected)
+
+    def test_estimate(self):
+        timings = self._make_one(
+            {'tests/test_a.py': 2.0, 'tests/test_b.py': 6.0})
+        self.assertEqual(timings.estimate('tests/test_a.py'), 2.0)
+        # Unknown files are expected to take the average.
+        self.assertEqual(timings.estimate('tests/test_new.py'), 4.0)
+
+    def test_estimate_empty(self):
+        timings = self._make_one()
+        self.assertEqual(timings.estimate('tests/test_a.py'), 1.0)
+
+    def test_estimate_explicit_default(self):
+        timings = self._make_one({'tests/test_a.py': 2.0})
+        self.assertEqual(
+            timings.estimate('tests/test_a.py', default=9.0), 2.0)
+        self.assertEqual(
+            timings.estimate('tests/test_new.py', default=9.0), 9.0)
+
+    def test_default_duration(self):
+        timings = self._make_one(
+            {'tests/test_a.py': 2.0, 'tests/test_b.py': 6.0})
+        self.assertEqual(timings.default_duration(), 4.0)
+        self.assertEqual(self._make_one().default_duration(), 1.0)
+
+    def test_to_dict(self):
+        from ci_diff_helper import sharding
+
+        timings = self._make_one(_DURATIONS)
+        expected = {
+            'version': sharding._VERSION,
+            'durations': _DURATIONS,
+        }
+        self.assertEqual(timings.to_dict(), expected)
+
+    def test_from_dict(self):
+        klass = self._get_target_class()
+        timings = klass.from_dict({'version': 1, 'durations': _DURATIONS})
+        self.assertEqual(timings.durations, _DURATIONS)
+
+    def test_from_dict_bad_version(self):
+        klass = self._get_target_class()
+        with self.assertRaises(ValueError):
+            klass.from_dict({'version': 0, 'durations': {}})
+
+    def test_save_and_load(self):
+        import os
+        import shutil
+        import tempfile
+
+        klass = self._get_target_class()
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        filename = os.path.join(temp_dir, 'timings.json')
+
+        timings = self._make_one(_DURATIONS)
+        timings.save(filename)
+        new_timings = klass.load(filename)
+        self.assertEqual(new_timings.durations, _DURATIONS)
+
+
+class Test_assign_shards(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args, **kwargs):
+        from ci_diff_helper.sharding import assign_shards
+        return assign_shards(*args, **kwargs)
+
+    @staticmethod
+    def _loads(shards, durations):
+        return [sum(durations[name] for name in shard) for shard in shards]
+
+    def test_longest_processing_time_first(self):
+        from ci_diff_helper.sharding import TimingDatabase
+
+        timings = TimingDatabase(_DURATIONS)
+        shards = self._call_function_under_test(
+            sorted(_DURATIONS), 2, timings=timings, tolerance=0)
+        self.assertEqual(sorted(self._loads(shards, _DURATIONS)), [17, 17])
+        self.assertEqual(sorted(sum(shards, [])), sorted(_DURATIONS))
+        for shard in shards:
+            self.assertEqual(shard, sorted(shard))
+
+    def test_deterministic(self):
+        from ci_diff_helper.sharding import TimingDatabase
+
+        timings = TimingDatabase(_DURATIONS)
+        shards = self._call_function_under_test(
+            sorted(_DURATIONS), 3, timings=timings)
+        reverse_shards = self._call_function_under_test(
+            sorted(_DURATIONS, reverse=True), 3, timings=timings)
+        self.assertEqual(shards, reverse_shards)
+
+    def test_balanced(self):
+        import random
+        from ci_diff_helper.sharding import TimingDatabase
+
+        rng = random.Random(1234)
+        durations = {}
+        for index in range(200):
+            path = 'tests/test_{:03d}.py'.format(index)
+            durations[path] = rng.lognormvariate(0.0, 1.0)
+        timings = TimingDatabase(durations)
+        shards = self._call_function_under_test(
+            sorted(durations), 8, timings=timings)
+        loads = self._loads(shards, durations)
+        self.assertLess(max(loads) - min(loads), 0.03 * max(loads))
+
+    def test_stable_with_tolerance(self):
+        # Without timings, every file takes as long, so the tolerance
+        # lets each file stay on the shard it prefers.
+        filenames = ['tests/test_{:d}.py'.format(index)
+                     for index in range(20)]
+        shards = self._call_function_under_test(
+            filenames, 2, tolerance=0.5)
+        new_shards = self._call_function_under_test(
+            filenames + ['tests/test_new.py'], 2, tolerance=0.5)
+        for shard, new_shard in zip(shards, new_shards):
+            self.assertLessEqual(set(shard), set(new_shard))
+
+    def test_default_computed_once(self):
+        import mock
+        from ci_diff_helper.sharding import TimingDatabase
+
+        timings = TimingDatabase(_DURATIONS)
+        filenames = ['tests/test_new{:d}.py'.format(index)
+                     for index in range(10)]
+        default_patch = mock.patch.object(
+            timings, 'default_duration', return_value=3.0)
+        with default_patch as mocked:
+            shards = self._call_function_under_test(
+                sorted(_DURATIONS) + filenames, 2, timings=timings)
+
+        mocked.assert_called_once_with()
+        self.assertEqual(sorted(self._loads(shards, dict(
+            _DURATIONS, **{name: 3.0 for name in filenames}))), [32, 32])
+
+    def test_more_shards_than_files(self):
+        shards = self._call_function_under_test(['tests/test_a.py'], 3)
+        self.assertEqual(sorted(shards), [[], [], ['tests/test_a.py']])
+
+    def test_invalid_num_shards(self):
+        with self.assertRaises(ValueError):
+            self._call_function_under_test(['tests/test_a.py'], 0)
+
+
+class Test_current_shard(unittest.TestCase):
+
+    @staticmethod
+    def _call_function_under_test(*args, **kwargs):
+        from ci_diff_helper.sharding import current_shard
+        return current_shard(*args, **kwargs)
+
+    def test_explicit_config(self):
+        import mock
+        from ci_diff_helper.sharding import assign_shards
+        from ci_diff_helper.sharding import TimingDatabase
+
+        timings = TimingDatabase(_DURATIONS)
+        expected = assign_shards(sorted(_DURATIONS), 3, timings=timings)
+        for index in range(3):
+            config = mock.Mock(shard=(index, 3), spec=['shard'])
+            result = self._call_function_under_test(
+                sorted(_DURATIONS), timings, config=config)
+            self.assertEqual(result, expected[index])
+
+    def test_default_config(self):
+        import mock
+
+        config = mock.Mock(shard=(0, 1), spec=['shard'])
+        config_patch = mock.patch('ci_diff_helper.get_config',
+                                  return_value=config)
+        with config_patch as mocked:
+            result = self._call_function_under_test(
+                ['tests/test_b.py', 'tests/test_a.py'])
+
+        self.assertEqual(result, ['tests/test_a.py', 'tests/test_b.py'])
+        mocked.assert_called_once_with()
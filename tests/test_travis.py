@@ -12,6 +12,8 @@
 
 import unittest
 
+from tests import utils
+
 
 class Test__travis_pr(unittest.TestCase):
 
@@ -193,11 +195,11 @@ class Test__get_merge_base_from_github(unittest.TestCase):
 class Test__push_build_base(unittest.TestCase):
 
     @staticmethod
-    def _call_function_under_test(slug):
+    def _call_function_under_test(slug, *args):
         from ci_diff_helper.travis import _push_build_base
-        return _push_build_base(slug)
+        return _push_build_base(slug, *args)
 
-    def test_unresolved_start_commit(self):
+    def _unresolved_helper(self, deepened, *args):
         import mock
 
         start = 'abcd'
@@ -211,8 +213,11 @@ class Test__push_build_base(unittest.TestCase):
         patch_output = mock.patch(
             'ci_diff_helper._utils.check_output',
             return_value=None)
-        # Make sure ``start_full`` is empty, indicating that the
-        # local ``git`` checkout doesn't have the commit.
+        patch_deepen = mock.patch(
+            'ci_diff_helper.git_tools.deepen_until',
+            return_value=deepened)
+        patch_verify = mock.patch(
+            'ci_diff_helper.travis._verify_merge_base')
         sha = '058b526c33dea1e8fc7013b498593cd106300411'
         patch_from_github = mock.patch(
             'ci_diff_helper.travis._get_merge_base_from_github',
@@ -220,13 +225,45 @@ class Test__push_build_base(unittest.TestCase):
 
         with patch_range as mocked_range:
             with patch_output as mocked_output:
-                with patch_from_github as mocked:
-                    result = self._call_function_under_test(slug)
-                    self.assertEqual(result, sha)
-                    mocked.called_once_with(slug, start, finish)
-                    mocked_output.assert_called_once_with(
-                        'git', 'rev-parse', start, ignore_err=True)
-                    mocked_range.assert_called_once_with()
+                with patch_deepen as mocked_deepen:
+                    with patch_verify as mocked_verify:
+                        with patch_from_github as mocked_github:
+                            result = self._call_function_under_test(
+                                slug, *args)
+        mocked_output.assert_called_once_with(
+            'git', 'rev-parse', '--verify', '--quiet', start + '^{commit}',
+            ignore_err=True)
+        mocked_range.assert_called_once_with()
+        return (result, sha, mocked_deepen, mocked_verify, mocked_github)
+
+    def test_unresolved_start_commit(self):
+        from ci_diff_helper import git_tools
+
+        result, sha, mocked_deepen, mocked_verify, mocked_github = (
+            self._unresolved_helper(None))
+        self.assertEqual(result, sha)
+        mocked_deepen.assert_called_once_with(
+            'abcd', max_depth=git_tools.DEFAULT_MAX_FETCH_DEPTH)
+        mocked_verify.assert_not_called()
+        mocked_github.assert_called_once_with(
+            'raindrops/roses', 'abcd', 'wxyz')
+
+    def test_unresolved_start_commit_deepened(self):
+        start_full = 'abcd-zomg-more'
+        result, _, mocked_deepen, mocked_verify, mocked_github = (
+            self._unresolved_helper(start_full, 256))
+        self.assertEqual(result, start_full)
+        mocked_deepen.assert_called_once_with('abcd', max_depth=256)
+        mocked_verify.assert_called_once_with(start_full, 'wxyz')
+        mocked_github.assert_not_called()
+
+    def test_unresolved_start_commit_no_deepen(self):
+        result, sha, mocked_deepen, _, mocked_github = (
+            self._unresolved_helper(None, 0))
+        self.assertEqual(result, sha)
+        mocked_deepen.assert_not_called()
+        mocked_github.assert_called_once_with(
+            'raindrops/roses', 'abcd', 'wxyz')
 
     def test_success(self):
         import mock
@@ -240,8 +277,8 @@ class Test__push_build_base(unittest.TestCase):
         # Just hide the verification / make it do nothing.
         patch_verify = mock.patch(
             'ci_diff_helper.travis._verify_merge_base')
-        # Make sure ``start_full`` is empty, indicating that the
-        # local ``git`` checkout doesn't have the commit.
+        # Make sure ``start_full`` is set, indicating that the
+        # local ``git`` checkout has the commit.
         patch_output = mock.patch(
             'ci_diff_helper._utils.check_output',
             return_value=start_full)
@@ -252,10 +289,34 @@ class Test__push_build_base(unittest.TestCase):
                     result = self._call_function_under_test(None)
                     self.assertEqual(result, start_full)
                     mocked.assert_called_once_with(
-                        'git', 'rev-parse', start, ignore_err=True)
+                        'git', 'rev-parse', '--verify', '--quiet',
+                        start + '^{commit}', ignore_err=True)
                     mocked_verify.assert_called_once_with(start_full, finish)
                     mocked_range.assert_called_once_with()
 
+    @unittest.skipUnless(utils.HAS_GIT, 'git not installed')
+    def test_actual_call_missing_full_sha(self):
+        import mock
+        from ci_diff_helper import _utils
+
+        with utils.ShallowClone(6) as clone:
+            start = clone.shas[2]
+            # The full SHA is well-formed, so ``rev-parse`` accepts it
+            # even though the commit is missing from the shallow clone.
+            self.assertEqual(
+                _utils.check_output('git', 'rev-parse', start), start)
+            patch_range = mock.patch(
+                'ci_diff_helper.travis._get_commit_range',
+                return_value=(start, clone.shas[-1]))
+            patch_github = mock.patch(
+                'ci_diff_helper.travis._get_merge_base_from_github')
+            with patch_range:
+                with patch_github as mocked_github:
+                    result = self._call_function_under_test(None)
+
+        self.assertEqual(result, start)
+        mocked_github.assert_not_called()
+
 
 class Test__travis_slug(unittest.TestCase):
 
@@ -337,6 +398,7 @@ class TestTravis(unittest.TestCase):
 
     def test_constructor(self):
         from ci_diff_helper import _utils
+        from ci_diff_helper import git_tools
 
         klass = self._get_target_class()
         config = self._make_one()
@@ -346,6 +408,8 @@ class TestTravis(unittest.TestCase):
         self.assertIs(config._merged_pr, _utils.UNSET)
         self.assertIs(config._pr, _utils.UNSET)
         self.assertIs(config._slug, _utils.UNSET)
+        self.assertEqual(
+            config._max_fetch_depth, git_tools.DEFAULT_MAX_FETCH_DEPTH)
 
     def _pr_helper(self, pr_val):
         import mock
@@ -399,6 +463,7 @@ class TestTravis(unittest.TestCase):
     def test_base_property_push(self):
         import mock
         from ci_diff_helper import _utils
+        from ci_diff_helper import git_tools
         from ci_diff_helper import travis
 
         config = self._make_one()
@@ -419,11 +484,30 @@ class TestTravis(unittest.TestCase):
         self.assertIs(config._base, _utils.UNSET)
         with push_base_patch as mocked:
             self.assertEqual(config.base, base_val)
-            mocked.assert_called_once_with(slug)
+            mocked.assert_called_once_with(
+                slug, git_tools.DEFAULT_MAX_FETCH_DEPTH)
         # Verify that caching works.
         self.assertEqual(config._base, base_val)
         self.assertEqual(config.base, base_val)
 
+    def test_base_property_push_deadline(self):
+        import mock
+        from ci_diff_helper import _utils
+        from ci_diff_helper import travis
+
+        klass = self._get_target_class()
+        config = klass(deadline=30.0, max_fetch_depth=0)
+        config._event_type = travis.TravisEventType.push
+        config._slug = 'rainbows/puppies'
+        push_base_patch = mock.patch(
+            'ci_diff_helper.travis._push_build_base',
+            side_effect=_utils.DeadlineExceeded('Too slow'))
+        with push_base_patch as mocked:
+            self.assertIs(config.base, _utils.FULL_BUILD)
+            mocked.assert_called_once_with('rainbows/puppies', 0)
+        # Verify that caching works.
+        self.assertIs(config._base, _utils.FULL_BUILD)
+
     def test_base_property_unsupported(self):
         from ci_diff_helper import travis
 
@@ -10,7 +10,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import shutil
 import subprocess
+import tempfile
 
 
 try:
@@ -21,3 +24,84 @@ try:
     del _PROC
 except OSError:  # pragma: NO COVER
     HAS_GIT = False
+
+try:
+    _PROC = subprocess.Popen(['pylint', '--version'],
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+    _PROC.communicate()
+    HAS_PYLINT = _PROC.returncode == 0
+    del _PROC
+except OSError:  # pragma: NO COVER
+    HAS_PYLINT = False
+
+try:
+    import coverage
+    # NOTE: Dynamic contexts require ``coverage >= 5.0``.
+    HAS_COVERAGE_CONTEXTS = hasattr(coverage.CoverageData, 'set_context')
+    del coverage
+except ImportError:  # pragma: NO COVER
+    HAS_COVERAGE_CONTEXTS = False
+
+
+def git(cwd, *args):
+    """Run a ``git`` command in a directory (with a fixed committer)."""
+    cmd = ('git', '-c', 'user.name=Test', '-c', 'user.email=test@test.invalid',
+           '-c', 'init.defaultBranch=master') + args
+    with open(os.devnull, 'w') as devnull:
+        output = subprocess.check_output(cmd, cwd=cwd, stderr=devnull)
+    return output.decode('utf-8').strip()
+
+
+class ShallowClone(object):
+    """A bare ``git`` remote with linear history and a shallow clone of it.
+
+    While active, the current directory is the clone. The commits in
+    the remote are in ``shas`` (oldest first). If ``blob_filter`` is set,
+    the clone is also a partial clone (``--filter=blob:none``).
+    """
+
+    def __init__(self, num_commits, depth=1, blob_filter=False):
+        self.num_commits = num_commits
+        self.depth = depth
+        self.blob_filter = blob_filter
+        self.shas = []
+        self.root = None
+        self.clone_dir = None
+        self._orig_dir = None
+
+    def __enter__(self):
+        self.root = tempfile.mkdtemp()
+        remote_dir = os.path.join(self.root, 'remote.git')
+        work_dir = os.path.join(self.root, 'work')
+        git(self.root, 'init', '--quiet', '--bare', remote_dir)
+        git(self.root, 'init', '--quiet', work_dir)
+        for index in range(self.num_commits):
+            with open(os.path.join(work_dir, 'file.txt'), 'w') as file_obj:
+                file_obj.write('{:d}\n'.format(index))
+            git(work_dir, 'add', 'file.txt')
+            git(work_dir, 'commit', '--quiet', '-m', str(index))
+            self.shas.append(git(work_dir, 'rev-parse', 'HEAD'))
+        git(work_dir, 'push', '--quiet', remote_dir, 'master')
+        git(remote_dir, 'config', 'uploadpack.allowFilter', 'true')
+
+        self.clone_dir = os.path.join(self.root, 'clone')
+        clone_args = ['--depth', str(self.depth)]
+        if self.blob_filter:
+            clone_args.append('--filter=blob:none')
+        remote_url = 'file://' + remote_dir
+        git(self.root, 'clone', '--quiet', *(clone_args + [
+            remote_url, self.clone_dir]))
+        self._orig_dir = os.getcwd()
+        os.chdir(self.clone_dir)
+        return self
+
+    def __exit__(self, *exc_info):
+        os.chdir(self._orig_dir)
+        shutil.rmtree(self.root)
+
+    def missing_objects(self):
+        """Get the objects missing from the clone (i.e. not fetched)."""
+        output = git(self.clone_dir, 'rev-list', '--objects', '--all',
+                     '--missing=print')
+        return [line for line in output.split('\n') if line.startswith('?')]